@@ -0,0 +1,30 @@
+"""add_dedup_stats
+
+Revision ID: 3c7a1e5d9b2f
+Revises: 2b4e8d9f6c3a
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c7a1e5d9b2f'
+down_revision: Union[str, None] = '2b4e8d9f6c3a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Add dedup_stats column (JSON text) to generation_metadata table
+    with op.batch_alter_table('generation_metadata', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('dedup_stats', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    # Remove dedup_stats column from generation_metadata table
+    with op.batch_alter_table('generation_metadata', schema=None) as batch_op:
+        batch_op.drop_column('dedup_stats')
@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from app.core.config import ADAPTIVE_CONCURRENCY_CONFIG
+
+THROTTLE_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+    "InternalServerException",
+}
+
+
+def is_throttle_error(e: BaseException) -> bool:
+    """True for provider errors that mean "slow down": throttling, HTTP 429 and 5xx"""
+    if isinstance(e, ClientError):
+        error = e.response.get("Error", {})
+        status = e.response.get("ResponseMetadata", {}).get("HTTPStatusCode")
+        return error.get("Code") in THROTTLE_ERROR_CODES or status == 429 or (status or 0) >= 500
+
+    # OpenAI SDK (APIStatusError) and httpx expose status_code, google api_core exposes code
+    status = getattr(e, "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is None and isinstance(getattr(e, "code", None), int):
+        status = e.code
+    return status == 429 or (isinstance(status, int) and 500 <= status < 600)
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limiter for concurrent LLM calls against one (provider, model_id).
+
+    The limit grows additively (about one slot per ``limit`` successful calls)
+    while latency stays within ``latency_tolerance`` of its baseline and the
+    recent error rate is low, and is cut multiplicatively on throttles, 429s
+    and 5xx responses. State is guarded by a thread lock and waiters are woken
+    through their own loop, so one limiter can be shared across event loops.
+    """
+
+    def __init__(self, provider: str, model_id: str, config: Optional[Dict[str, Any]] = None):
+        cfg = {**ADAPTIVE_CONCURRENCY_CONFIG, **(config or {})}
+        self.provider = provider
+        self.model_id = model_id
+        self.min_limit = max(1, cfg["min_limit"])
+        self.max_limit = max(self.min_limit, cfg["max_limit"])
+        self.backoff_ratio = cfg["backoff_ratio"]
+        self.latency_tolerance = cfg["latency_tolerance"]
+        self.max_error_rate = cfg["max_error_rate"]
+        self.decrease_cooldown = cfg["decrease_cooldown"]
+        self.window_seconds = cfg["window_seconds"]
+
+        self._lock = threading.Lock()
+        self._limit = float(min(max(cfg["initial_limit"], self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._latency_ewma: Optional[float] = None
+        self._latency_baseline: Optional[float] = None
+        self._last_decrease = 0.0
+        self._calls: Deque[float] = deque()
+        self._throttles: Deque[float] = deque()
+        self._errors: Deque[float] = deque()
+        self.total_calls = 0
+        self.total_throttles = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    async def acquire(self) -> None:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._in_flight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    granted = False
+                except ValueError:
+                    granted = True
+            if granted:
+                # The slot was handed over just as we were cancelled; give it back
+                self._release(None, throttled=False, failed=False)
+            raise
+
+    def _wake_waiters_locked(self) -> None:
+        while self._waiters and self._in_flight < self.limit:
+            loop, future = self._waiters.popleft()
+            if future.done():
+                continue
+            self._in_flight += 1
+            loop.call_soon_threadsafe(_grant, future)
+
+    def _trim_locked(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        for window in (self._calls, self._throttles, self._errors):
+            while window and window[0] < horizon:
+                window.popleft()
+
+    def _release(self, latency: Optional[float], throttled: bool, failed: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight -= 1
+            if latency is not None:
+                self._record_locked(now, latency, throttled, failed)
+            self._wake_waiters_locked()
+
+    def _record_locked(self, now: float, latency: float, throttled: bool, failed: bool) -> None:
+        self.total_calls += 1
+        self._calls.append(now)
+        self._trim_locked(now)
+
+        if throttled:
+            self.total_throttles += 1
+            self._throttles.append(now)
+            # Multiplicative decrease, at most once per cooldown so a burst of
+            # throttles from the same overload only halves the limit once
+            if now - self._last_decrease >= self.decrease_cooldown:
+                self._limit = max(float(self.min_limit), self._limit * self.backoff_ratio)
+                self._last_decrease = now
+            return
+
+        if failed:
+            self._errors.append(now)
+            return
+
+        self._latency_ewma = latency if self._latency_ewma is None else 0.8 * self._latency_ewma + 0.2 * latency
+        if self._latency_baseline is None or self._latency_ewma < self._latency_baseline:
+            self._latency_baseline = self._latency_ewma
+        else:
+            # Let the baseline drift up slowly so a permanently slower model is not held back forever
+            self._latency_baseline += (self._latency_ewma - self._latency_baseline) * 0.01
+
+        error_rate = (len(self._errors) + len(self._throttles)) / max(len(self._calls), 1)
+        latency_ok = self._latency_ewma <= self._latency_baseline * self.latency_tolerance
+        if latency_ok and error_rate <= self.max_error_rate:
+            # Additive increase: +1 slot per `limit` successful calls
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / self._limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one concurrency slot for the duration of a single provider call"""
+        await self.acquire()
+        start = time.monotonic()
+        try:
+            yield
+        except asyncio.CancelledError:
+            self._release(None, throttled=False, failed=False)
+            raise
+        except Exception as e:
+            self._release(time.monotonic() - start, throttled=is_throttle_error(e), failed=True)
+            raise
+        else:
+            self._release(time.monotonic() - start, throttled=False, failed=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            self._trim_locked(time.monotonic())
+            return {
+                "provider": self.provider,
+                "model_id": self.model_id,
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "recent_calls": len(self._calls),
+                "recent_throttles": len(self._throttles),
+                "recent_errors": len(self._errors),
+                "window_seconds": self.window_seconds,
+                "total_calls": self.total_calls,
+                "total_throttles": self.total_throttles,
+                "latency_ewma_ms": round(self._latency_ewma * 1000, 1) if self._latency_ewma is not None else None,
+            }
+
+
+def _grant(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+_limiters: Dict[Tuple[str, str], AdaptiveConcurrencyLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str, model_id: str) -> AdaptiveConcurrencyLimiter:
+    """Return the process-wide limiter for a (provider, model_id) pair"""
+    key = (provider, model_id)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveConcurrencyLimiter(provider, model_id)
+        return limiter
+
+
+def limiter_snapshots() -> List[Dict[str, Any]]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return [limiter.snapshot() for limiter in limiters]
@@ -0,0 +1,365 @@
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import boto3
+
+from app.core.client_registry import client_registry
+from app.core.config import BULK_INFERENCE_CONFIG
+from app.core.exceptions import ModelHandlerError
+from app.core.response_cache import response_cache
+
+# record id -> (generated text, error message); exactly one of them is set
+BatchOutputs = Dict[str, Tuple[Optional[str], Optional[str]]]
+
+
+@dataclass
+class BatchJobStatus:
+    state: str
+    finished: bool
+    failed: bool = False
+    message: str = ""
+
+
+class OpenAIBatchBackend:
+    """
+    OpenAI Batch API: prompts are uploaded as a JSONL file of ``/v1/chat/completions``
+    requests, and the output file is read back once the batch is done. Works with
+    OpenAI-compatible servers that implement the Files and Batches endpoints.
+    """
+
+    FINISHED = {"completed", "expired", "cancelled", "failed"}
+
+    def __init__(self, handler, client=None):
+        self.handler = handler
+        self._client = client
+
+    async def _get_client(self):
+        if self._client is None:
+            self._client = await client_registry.get_async_openai_client(
+                self.handler.inference_type,
+                timeout=self.handler._openai_timeout(),
+                **self.handler._openai_client_args(),
+            )
+        return self._client
+
+    async def submit(self, records: Dict[str, str]) -> str:
+        client = await self._get_client()
+        lines = []
+        for record_id, prompt in records.items():
+            body = self.handler._openai_completion_kwargs(prompt)
+            body.pop("stream", None)
+            lines.append(json.dumps({
+                "custom_id": record_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": body,
+            }))
+        batch_file = await client.files.create(
+            file=("batch_input.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch",
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> BatchJobStatus:
+        client = await self._get_client()
+        batch = await client.batches.retrieve(batch_id)
+        message = ""
+        errors = getattr(getattr(batch, "errors", None), "data", None)
+        if errors:
+            message = "; ".join(str(getattr(e, "message", e)) for e in errors)
+        # An expired batch still has output for the requests it finished
+        return BatchJobStatus(
+            state=batch.status,
+            finished=batch.status in self.FINISHED,
+            failed=batch.status == "failed" or (batch.status == "cancelled" and not batch.output_file_id),
+            message=message,
+        )
+
+    async def results(self, batch_id: str) -> BatchOutputs:
+        client = await self._get_client()
+        batch = await client.batches.retrieve(batch_id)
+        outputs: BatchOutputs = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await client.files.content(file_id)
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if entry.get("error") or response.get("status_code") != 200:
+                    error = entry.get("error") or response.get("body", {}).get("error") or "request failed"
+                    outputs[entry["custom_id"]] = (None, str(error))
+                else:
+                    outputs[entry["custom_id"]] = (response["body"]["choices"][0]["message"]["content"], None)
+        return outputs
+
+
+class BedrockBatchBackend:
+    """
+    Bedrock batch inference: records are written to S3 as JSONL and run by a
+    model invocation job, whose ``.jsonl.out`` files are read back when it ends.
+    Batch jobs take the model's native InvokeModel body, so only the Claude and
+    Llama request formats are supported.
+    """
+
+    FINISHED = {"Completed", "PartiallyCompleted", "Failed", "Stopped", "Expired"}
+    FAILED = {"Failed", "Stopped"}
+
+    def __init__(self, handler, s3_uri: Optional[str], role_arn: Optional[str], bedrock_client=None, s3_client=None):
+        if not s3_uri or not role_arn:
+            raise ModelHandlerError(
+                "Bulk inference on Bedrock needs SDS_BULK_BEDROCK_S3_URI and SDS_BULK_BEDROCK_ROLE_ARN", 400
+            )
+        self.handler = handler
+        self.bucket, _, prefix = s3_uri.removeprefix("s3://").partition("/")
+        self.prefix = prefix.strip("/")
+        self.role_arn = role_arn
+        region = getattr(getattr(handler.bedrock_client, "meta", None), "region_name", None)
+        self.bedrock = bedrock_client or boto3.client("bedrock", region_name=region)
+        self.s3 = s3_client or boto3.client("s3", region_name=region)
+
+    def _key(self, *parts: str) -> str:
+        return "/".join(p for p in (self.prefix, *parts) if p)
+
+    def _model_input(self, prompt: str) -> Dict[str, Any]:
+        params = self.handler.model_params
+        if "claude" in self.handler.model_id:
+            return {
+                "anthropic_version": "bedrock-2023-05-31",
+                "max_tokens": params.max_tokens,
+                "temperature": min(params.temperature, 1.0),
+                "top_p": params.top_p,
+                "top_k": params.top_k,
+                "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
+            }
+        if "llama" in self.handler.model_id:
+            return {
+                "prompt": prompt,
+                "max_gen_len": min(params.max_tokens, 2048),
+                "temperature": params.temperature,
+                "top_p": params.top_p,
+            }
+        raise ModelHandlerError(f"Bulk inference on Bedrock does not support {self.handler.model_id}", 400)
+
+    @staticmethod
+    def _output_text(model_output: Dict[str, Any]) -> str:
+        if "content" in model_output:
+            return "".join(part.get("text", "") for part in model_output["content"] if part.get("type", "text") == "text")
+        return model_output.get("generation", "")
+
+    async def submit(self, records: Dict[str, str]) -> str:
+        job_name = f"sds-bulk-{uuid.uuid4().hex[:12]}"
+        input_key = self._key(job_name, "input", "records.jsonl")
+        body = "\n".join(
+            json.dumps({"recordId": record_id, "modelInput": self._model_input(prompt)})
+            for record_id, prompt in records.items()
+        )
+        await asyncio.to_thread(self.s3.put_object, Bucket=self.bucket, Key=input_key, Body=body.encode("utf-8"))
+        response = await asyncio.to_thread(
+            self.bedrock.create_model_invocation_job,
+            jobName=job_name,
+            roleArn=self.role_arn,
+            modelId=self.handler.model_id,
+            inputDataConfig={"s3InputDataConfig": {"s3Uri": f"s3://{self.bucket}/{input_key}", "s3InputFormat": "JSONL"}},
+            outputDataConfig={"s3OutputDataConfig": {"s3Uri": f"s3://{self.bucket}/{self._key(job_name, 'output')}/"}},
+        )
+        return response["jobArn"]
+
+    async def status(self, job_arn: str) -> BatchJobStatus:
+        job = await asyncio.to_thread(self.bedrock.get_model_invocation_job, jobIdentifier=job_arn)
+        state = job["status"]
+        return BatchJobStatus(state, state in self.FINISHED, state in self.FAILED, job.get("message", ""))
+
+    async def results(self, job_arn: str) -> BatchOutputs:
+        job = await asyncio.to_thread(self.bedrock.get_model_invocation_job, jobIdentifier=job_arn)
+        output_uri = job["outputDataConfig"]["s3OutputDataConfig"]["s3Uri"]
+        bucket, _, prefix = output_uri.removeprefix("s3://").partition("/")
+        # Output lands under <output uri>/<job id>/
+        prefix = f"{prefix.rstrip('/')}/{job_arn.rsplit('/', 1)[-1]}/"
+
+        def read_outputs() -> BatchOutputs:
+            outputs: BatchOutputs = {}
+            paginator = self.s3.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+                for obj in page.get("Contents", []):
+                    if not obj["Key"].endswith(".jsonl.out"):
+                        continue
+                    body = self.s3.get_object(Bucket=bucket, Key=obj["Key"])["Body"].read().decode("utf-8")
+                    for line in body.splitlines():
+                        if not line.strip():
+                            continue
+                        entry = json.loads(line)
+                        if entry.get("error"):
+                            outputs[entry["recordId"]] = (None, str(entry["error"]))
+                        else:
+                            outputs[entry["recordId"]] = (self._output_text(entry.get("modelOutput", {})), None)
+            return outputs
+
+        return await asyncio.to_thread(read_outputs)
+
+
+def create_batch_backend(handler, config: Optional[Dict[str, Any]] = None):
+    """Batch API client for the handler's provider"""
+    cfg = {**BULK_INFERENCE_CONFIG, **(config or {})}
+    if handler.inference_type in ("openai", "openai_compatible"):
+        return OpenAIBatchBackend(handler)
+    if handler.inference_type == "aws_bedrock":
+        return BedrockBatchBackend(handler, cfg["bedrock_s3_uri"], cfg["bedrock_role_arn"])
+    raise ModelHandlerError(f"Bulk inference is not available for inference_type={handler.inference_type}", 400)
+
+
+class BulkModelHandler:
+    """
+    Drop-in for ``UnifiedModelHandler.agenerate_response`` that runs calls as provider batch jobs.
+
+    Calls are held until no new prompt arrived for ``collect_window`` seconds,
+    then submitted together; each caller gets its parsed response once the job
+    finishes, so the services keep their own validation and output path. Rounds
+    smaller than ``min_records`` (e.g. single-row fallbacks) run on demand.
+    """
+
+    def __init__(self, handler, backend=None, config: Optional[Dict[str, Any]] = None):
+        cfg = {**BULK_INFERENCE_CONFIG, **(config or {})}
+        self.handler = handler
+        self.backend = backend or create_batch_backend(handler, cfg)
+        self.model_id = handler.model_id
+        self.inference_type = handler.inference_type
+        self.min_records = cfg["min_records"]
+        self.max_records = cfg["max_records"]
+        self.collect_window = cfg["collect_window"]
+        self.poll_interval = cfg["poll_interval"]
+        self.timeout = cfg["timeout"]
+
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._collector: Optional[asyncio.Task] = None
+        self._jobs: Set[asyncio.Task] = set()
+        self.batch_jobs = 0
+        self.batch_records = 0
+        self.on_demand_records = 0
+
+    async def agenerate_response(
+        self,
+        prompt: str,
+        retry_with_reduced_tokens: bool = True,
+        request_id: Optional[str] = None,
+    ):
+        cache_key = self.handler._response_cache_key(prompt)
+        if cache_key:
+            cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((prompt, future))
+        if self._collector is None or self._collector.done():
+            self._collector = asyncio.create_task(self._collect())
+        return await future
+
+    async def _collect(self) -> None:
+        """Hand pending calls to a job once callers stop adding more"""
+        while self._pending:
+            seen = -1
+            while seen != len(self._pending) and len(self._pending) < self.max_records:
+                seen = len(self._pending)
+                await asyncio.sleep(self.collect_window)
+            calls = self._pending[:self.max_records]
+            self._pending = self._pending[self.max_records:]
+            job = asyncio.create_task(self._run(calls))
+            self._jobs.add(job)
+            job.add_done_callback(self._jobs.discard)
+
+    async def _run(self, calls: List[Tuple[str, asyncio.Future]]) -> None:
+        if len(calls) < self.min_records:
+            self.on_demand_records += len(calls)
+            await asyncio.gather(*(self._run_on_demand(prompt, future) for prompt, future in calls))
+            return
+
+        records = {f"record-{i:08d}": prompt for i, (prompt, _) in enumerate(calls)}
+        try:
+            outputs = await self._run_batch_job(records)
+        except Exception as e:
+            for _, future in calls:
+                if not future.done():
+                    future.set_exception(ModelHandlerError(f"Batch inference job failed: {e}", 500))
+            return
+
+        for (record_id, prompt), (_, future) in zip(records.items(), calls):
+            if future.done():
+                continue
+            text, error = outputs.get(record_id, (None, "no output for record"))
+            if error is not None:
+                future.set_exception(ModelHandlerError(f"Batch record failed: {error}", 500))
+                continue
+            response = self.handler._extract_json_from_text(text) if not self.handler.custom_p else text
+            cache_key = self.handler._response_cache_key(prompt)
+            if cache_key and self.handler._cacheable(response):
+                await response_cache.aput(cache_key, response)
+            future.set_result(response)
+
+    async def _run_on_demand(self, prompt: str, future: asyncio.Future) -> None:
+        try:
+            response = await self.handler.agenerate_response(prompt)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(response)
+
+    async def _run_batch_job(self, records: Dict[str, str]) -> BatchOutputs:
+        batch_id = await self.backend.submit(records)
+        self.batch_jobs += 1
+        self.batch_records += len(records)
+        print(f"Submitted batch inference job {batch_id} with {len(records)} prompts")
+
+        deadline = time.monotonic() + self.timeout
+        while True:
+            status = await self.backend.status(batch_id)
+            if status.finished:
+                break
+            if time.monotonic() > deadline:
+                raise ModelHandlerError(f"Batch inference job {batch_id} did not finish within {self.timeout:.0f}s", 504)
+            await asyncio.sleep(self.poll_interval)
+
+        if status.failed:
+            raise ModelHandlerError(f"Batch inference job {batch_id} {status.state}: {status.message}", 502)
+        outputs = await self.backend.results(batch_id)
+        print(f"Batch inference job {batch_id} {status.state}: {len(outputs)} of {len(records)} records returned")
+        return outputs
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "batch_jobs": self.batch_jobs,
+            "batch_records": self.batch_records,
+            "on_demand_records": self.on_demand_records,
+        }
+
+
+def use_bulk_inference(request, is_demo: bool) -> bool:
+    """Whether a job should run through the provider's batch API"""
+    if is_demo:
+        return False
+    enabled = request.bulk if getattr(request, "bulk", None) is not None else BULK_INFERENCE_CONFIG["enabled"]
+    return bool(enabled)
+
+
+def bulk_handler_for(request, model_handler, is_demo: bool):
+    """``model_handler`` wrapped for bulk execution when the request asks for it"""
+    if not use_bulk_inference(request, is_demo):
+        return model_handler
+    try:
+        return BulkModelHandler(model_handler)
+    except ModelHandlerError as e:
+        print(f"Bulk inference unavailable, running on demand: {e.message}")
+        return model_handler
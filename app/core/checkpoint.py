@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core.config import CHECKPOINT_DIR, CHECKPOINT_SAVE_INTERVAL
+from app.core.row_writer import iter_jsonl, jsonl_path_for
+
+OMIT_WINDOW = 100  # same window the generators keep in their prompts
+
+
+class JobCheckpoint:
+    """
+    Resume manifest for one generation job.
+
+    Records the request, the output file and, per topic, how many rows were
+    generated, whether the topic finished and the recent ``omit_questions``
+    window. The streamed JSONL output stays the source of truth for row
+    counts (see ``reconcile``); the manifest adds what cannot be recovered
+    from the rows themselves.
+    """
+
+    def __init__(self, job_name: str, generation_type: str, output_file: str, params: Dict[str, Any],
+                 topics: Optional[Dict[str, Dict[str, Any]]] = None, status: str = "running",
+                 directory: str = CHECKPOINT_DIR):
+        self.job_name = job_name
+        self.generation_type = generation_type
+        self.output_file = output_file
+        self.params = params
+        self.topics: Dict[str, Dict[str, Any]] = topics or {}
+        self.status = status
+        self.directory = directory
+
+        self._lock = threading.Lock()
+        # Saves run on the I/O pool; one at a time so an older manifest never replaces a newer one
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+
+    @staticmethod
+    def path_for(job_name: str, directory: str = CHECKPOINT_DIR) -> str:
+        return os.path.join(directory, f"{job_name}.json")
+
+    @property
+    def path(self) -> str:
+        return self.path_for(self.job_name, self.directory)
+
+    @classmethod
+    def create(cls, job_name: str, generation_type: str, output_file: str, params: Dict[str, Any],
+               directory: str = CHECKPOINT_DIR) -> "JobCheckpoint":
+        checkpoint = cls(job_name, generation_type, output_file, params, directory=directory)
+        checkpoint.save(force=True)
+        return checkpoint
+
+    @classmethod
+    def load(cls, job_name: str, directory: str = CHECKPOINT_DIR) -> Optional["JobCheckpoint"]:
+        path = cls.path_for(job_name, directory)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            data["job_name"],
+            data["generation_type"],
+            data["output_file"],
+            data["params"],
+            topics=data.get("topics", {}),
+            status=data.get("status", "running"),
+            directory=directory,
+        )
+
+    def _topic_locked(self, topic: str) -> Dict[str, Any]:
+        return self.topics.setdefault(topic, {"rows": 0, "completed": False, "omit_questions": []})
+
+    def topic_state(self, topic: str) -> Dict[str, Any]:
+        with self._lock:
+            state = self._topic_locked(topic)
+            return {"rows": state["rows"], "completed": state["completed"],
+                    "omit_questions": list(state["omit_questions"])}
+
+    def record(self, topic: str, rows: int, omit_questions: Optional[List[str]] = None) -> None:
+        """Count rows just written for a topic and remember its dedup window"""
+        with self._lock:
+            state = self._topic_locked(topic)
+            state["rows"] += rows
+            if omit_questions is not None:
+                state["omit_questions"] = list(omit_questions[-OMIT_WINDOW:])
+            self._dirty = True
+        self.save()
+
+    def complete_topic(self, topic: str, omit_questions: Optional[List[str]] = None) -> None:
+        with self._lock:
+            state = self._topic_locked(topic)
+            state["completed"] = True
+            if omit_questions is not None:
+                state["omit_questions"] = list(omit_questions[-OMIT_WINDOW:])
+            self._dirty = True
+        self.save(force=True)
+
+    def reconcile(self, topic_key: str) -> None:
+        """Recount rows per topic from the streamed output, which may be ahead of the last manifest write"""
+        counts: Dict[str, int] = {}
+        jsonl_path = jsonl_path_for(self.output_file)
+        if os.path.exists(jsonl_path):
+            rows = iter_jsonl(jsonl_path)
+        elif os.path.exists(self.output_file):
+            with open(self.output_file, "r", encoding="utf-8") as f:
+                rows = json.load(f)
+        else:
+            rows = []
+        for row in rows:
+            topic = row.get(topic_key)
+            if topic is not None:
+                counts[topic] = counts.get(topic, 0) + 1
+        with self._lock:
+            for topic, state in self.topics.items():
+                state["rows"] = counts.get(topic, 0)
+            for topic, count in counts.items():
+                self._topic_locked(topic)["rows"] = count
+            self._dirty = True
+        self.save(force=True)
+
+    def finish(self, status: str) -> None:
+        with self._lock:
+            self.status = status
+            self._dirty = True
+        self.save(force=True)
+
+    def save(self, force: bool = False) -> None:
+        """Write the manifest atomically; without ``force`` at most once per CHECKPOINT_SAVE_INTERVAL"""
+        with self._save_lock:
+            now = time.monotonic()
+            with self._lock:
+                if not force and (not self._dirty or now - self._last_save < CHECKPOINT_SAVE_INTERVAL):
+                    return
+                data = {
+                    "job_name": self.job_name,
+                    "generation_type": self.generation_type,
+                    "output_file": self.output_file,
+                    "status": self.status,
+                    "updated_at": datetime.now(timezone.utc).isoformat(),
+                    "params": self.params,
+                    "topics": self.topics,
+                }
+                payload = json.dumps(data, indent=2)
+                self._dirty = False
+                self._last_save = now
+
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,190 @@
+import hashlib
+import mmap
+import os
+import threading
+import uuid
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import CHUNK_STORE_CONFIG
+
+
+class StoredChunks(Sequence):
+    """
+    The chunks of one stored document, read from disk on access.
+
+    ``<key>.txt`` holds the UTF-8 chunks back to back and ``<key>.npy`` the
+    byte offset of each chunk plus the end; both are memory mapped, so
+    large documents are paged in as chunks are read rather than loaded.
+    """
+
+    def __init__(self, text_path: str, offsets_path: str):
+        self._offsets = np.load(offsets_path, mmap_mode="r")
+        with open(text_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chunk index out of range")
+        return self._text[int(self._offsets[index]):int(self._offsets[index + 1])].decode("utf-8")
+
+    def sizes(self) -> np.ndarray:
+        """UTF-8 length in bytes of every chunk, without reading them"""
+        return np.diff(self._offsets)
+
+    def batches(self, size: int) -> Iterator[List[str]]:
+        for start in range(0, len(self), size):
+            yield self[start:start + size]
+
+
+class ChunkWriter:
+    """Chunks of one document written as they are produced; nothing is visible until ``commit``"""
+
+    def __init__(self, store: "ChunkStore", key: str):
+        self.store = store
+        self.key = key
+        suffix = f".{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        self._text_tmp = store.text_path(key) + suffix
+        self._offsets_tmp = store.offsets_path(key) + suffix
+        self._offsets = array("q", [0])
+        self._file = open(self._text_tmp, "wb")
+
+    def add(self, chunks: Iterable[str]) -> None:
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            self._file.write(data)
+            self._offsets.append(self._offsets[-1] + len(data))
+
+    def commit(self) -> None:
+        try:
+            self._file.close()
+            with open(self._offsets_tmp, "wb") as f:
+                np.save(f, np.frombuffer(self._offsets, dtype=np.int64))
+            # The offsets file goes last: its presence marks a complete entry
+            os.replace(self._text_tmp, self.store.text_path(self.key))
+            os.replace(self._offsets_tmp, self.store.offsets_path(self.key))
+        except OSError as e:
+            print(f"Chunk store write failed: {str(e)}")
+            self.abort()
+            return
+        self.store.evict()
+
+    def abort(self) -> None:
+        self._file.close()
+        for path in (self._text_tmp, self._offsets_tmp):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ChunkStore:
+    """
+    Extracted document chunks on disk, keyed by file content hash and chunking settings.
+
+    Content hashes are remembered per (path, size, mtime) for the life of
+    the process, so a file is hashed once however often it is used. Errors
+    reading or writing the store are printed and treated as a miss.
+    """
+
+    def __init__(self, path: str, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def text_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.txt")
+
+    def offsets_path(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.npy")
+
+    def file_hash(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        identity = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._hashes.get(identity)
+        if digest is None:
+            sha = hashlib.sha256()
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    sha.update(block)
+            digest = sha.hexdigest()
+            with self._lock:
+                self._hashes[identity] = digest
+        return digest
+
+    def key(self, file_path: str, *settings) -> str:
+        """Key of a file's chunks; ``settings`` is everything else they depend on (chunk sizes, extractor version)"""
+        parts = "\0".join([self.file_hash(file_path), *map(str, settings)])
+        return hashlib.sha256(parts.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[StoredChunks]:
+        try:
+            chunks = StoredChunks(self.text_path(key), self.offsets_path(key))
+            os.utime(self.offsets_path(key))  # recency for eviction
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Chunk store read failed: {str(e)}")
+            return None
+        with self._lock:
+            self.hits += 1
+        return chunks
+
+    def writer(self, key: str) -> Optional[ChunkWriter]:
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            return ChunkWriter(self, key)
+        except OSError as e:
+            print(f"Chunk store write failed: {str(e)}")
+            return None
+
+    def save(self, key: str, chunks: Iterable[str]) -> None:
+        writer = self.writer(key)
+        if writer is not None:
+            writer.add(chunks)
+            writer.commit()
+
+    def evict(self) -> None:
+        """Remove least recently used documents until the store fits ``max_bytes``"""
+        try:
+            entries = []
+            total = 0
+            for name in os.listdir(self.path):
+                if not name.endswith(".npy"):
+                    continue
+                key = name[:-len(".npy")]
+                offsets_stat = os.stat(self.offsets_path(key))
+                size = offsets_stat.st_size + os.path.getsize(self.text_path(key))
+                entries.append((offsets_stat.st_mtime, key, size))
+                total += size
+            for _, key, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                os.remove(self.offsets_path(key))
+                os.remove(self.text_path(key))
+                total -= size
+        except OSError as e:
+            print(f"Chunk store eviction failed: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+chunk_store = ChunkStore(CHUNK_STORE_CONFIG["path"], max_bytes=CHUNK_STORE_CONFIG["max_bytes"])
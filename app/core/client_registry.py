@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import importlib.util
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+from app.core.config import HTTP_POOL_CONFIG
+
+CA_BUNDLE_PATH = "/etc/ssl/certs/ca-certificates.crt"
+
+
+class ClientRegistry:
+    """
+    Process-wide registry of OpenAI-SDK clients.
+
+    Clients are keyed by (inference_type, base_url, token) so every handler
+    instance and worker talking to the same endpoint shares one keep-alive
+    connection pool instead of paying TLS and CA-bundle loading per prompt.
+    Async clients are additionally keyed by event loop, since httpx async
+    connections cannot be shared across loops. When a token rotates (e.g. a
+    CAII JWT refresh) the old client is no longer handed out but stays open
+    for requests still in flight on it, until the idle sweep closes it.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    SWEEP_INTERVAL = 60.0  # seconds between idle-client sweeps
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(ClientRegistry, cls).__new__(cls)
+                cls._instance._initialized = False
+            return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self._clients_lock = threading.Lock()
+        self._sync_clients: Dict[Tuple, Tuple[OpenAI, float]] = {}
+        self._async_clients: Dict[Tuple, Tuple[AsyncOpenAI, float]] = {}
+        self._last_sweep = time.monotonic()
+        self._verify = CA_BUNDLE_PATH if os.path.exists(CA_BUNDLE_PATH) else True
+        self._http2 = HTTP_POOL_CONFIG["http2"] and importlib.util.find_spec("h2") is not None
+        if HTTP_POOL_CONFIG["http2"] and not self._http2:
+            print("HTTP/2 requested but the `h2` package is not installed; using HTTP/1.1")
+
+    @staticmethod
+    def _key(inference_type: str, base_url: Optional[str], api_key: Optional[str]) -> Tuple:
+        # Only a digest of the token is kept in the key
+        token_digest = hashlib.sha256((api_key or "").encode()).hexdigest()
+        return (inference_type, base_url or "", token_digest)
+
+    def _httpx_kwargs(self, timeout: httpx.Timeout) -> Dict[str, Any]:
+        return {
+            "verify": self._verify,
+            "timeout": timeout,
+            "http2": self._http2,
+            "limits": httpx.Limits(
+                max_connections=HTTP_POOL_CONFIG["max_connections"],
+                max_keepalive_connections=HTTP_POOL_CONFIG["max_keepalive_connections"],
+                keepalive_expiry=HTTP_POOL_CONFIG["keepalive_expiry"],
+            ),
+        }
+
+    def get_openai_client(self, inference_type: str, api_key: Optional[str], base_url: Optional[str] = None,
+                          timeout: Optional[httpx.Timeout] = None) -> OpenAI:
+        """Return the shared sync client for an endpoint, creating it on first use"""
+        key = self._key(inference_type, base_url, api_key)
+        now = time.monotonic()
+        with self._clients_lock:
+            entry = self._sync_clients.get(key)
+            if entry is None:
+                client = OpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=httpx.Client(**self._httpx_kwargs(timeout)),
+                )
+            else:
+                client = entry[0]
+            self._sync_clients[key] = (client, now)
+            stale = self._collect_idle_sync(now)
+
+        for old in stale:
+            self._close_quietly(old)
+        return client
+
+    async def get_async_openai_client(self, inference_type: str, api_key: Optional[str], base_url: Optional[str] = None,
+                                      timeout: Optional[httpx.Timeout] = None) -> AsyncOpenAI:
+        """Return the shared async client for an endpoint on the running event loop"""
+        loop = asyncio.get_running_loop()
+        key = self._key(inference_type, base_url, api_key) + (id(loop),)
+        now = time.monotonic()
+        with self._clients_lock:
+            entry = self._async_clients.get(key)
+            if entry is None:
+                client = AsyncOpenAI(
+                    api_key=api_key,
+                    base_url=base_url,
+                    http_client=httpx.AsyncClient(**self._httpx_kwargs(timeout)),
+                )
+            else:
+                client = entry[0]
+            self._async_clients[key] = (client, now)
+            stale = self._collect_idle_async(now, id(loop))
+
+        for old in stale:
+            await self._aclose_quietly(old)
+        return client
+
+    def _collect_idle_sync(self, now: float) -> list:
+        if now - self._last_sweep < self.SWEEP_INTERVAL:
+            return []
+        self._last_sweep = now
+        ttl = HTTP_POOL_CONFIG["client_idle_ttl"]
+        idle = [k for k, (_, last_used) in self._sync_clients.items() if now - last_used > ttl]
+        return [self._sync_clients.pop(k)[0] for k in idle]
+
+    def _collect_idle_async(self, now: float, loop_id: int) -> list:
+        ttl = HTTP_POOL_CONFIG["client_idle_ttl"]
+        idle = []
+        for k, (_, last_used) in list(self._async_clients.items()):
+            if k[3] != loop_id:
+                # Clients of a loop that has gone away cannot be closed from here; just drop them
+                if now - last_used > ttl:
+                    self._async_clients.pop(k)
+            elif now - last_used > ttl:
+                idle.append(self._async_clients.pop(k)[0])
+        return idle
+
+    @staticmethod
+    def _close_quietly(client: OpenAI) -> None:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"Error closing HTTP client: {str(e)}")
+
+    @staticmethod
+    async def _aclose_quietly(client: AsyncOpenAI) -> None:
+        try:
+            await client.close()
+        except Exception as e:
+            print(f"Error closing async HTTP client: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        with self._clients_lock:
+            return {"sync_clients": len(self._sync_clients), "async_clients": len(self._async_clients)}
+
+    async def aclose_all(self) -> None:
+        """Close every pooled client; async ones are closed if they belong to the running loop"""
+        loop_id = id(asyncio.get_running_loop())
+        with self._clients_lock:
+            sync_clients = [c for c, _ in self._sync_clients.values()]
+            async_clients = [c for k, (c, _) in self._async_clients.items() if k[3] == loop_id]
+            self._sync_clients.clear()
+            self._async_clients.clear()
+        for client in sync_clients:
+            self._close_quietly(client)
+        for client in async_clients:
+            await self._aclose_quietly(client)
+
+
+client_registry = ClientRegistry()
@@ -845,6 +845,216 @@ MODEL_CONFIGS = {
     ModelID.MISTRAL: {"max_tokens": 2048, "max_input_tokens": 2048}
 }
 
+# Requests-per-minute / tokens-per-minute budgets enforced before every LLM call and
+# shared by all jobs in the process. None means unlimited.
+#   MODEL_RATE_LIMITS:    per model_id (any provider)
+#   PROVIDER_RATE_LIMITS: per provider account (Bedrock region, CAII / OpenAI compatible
+#                         endpoint, or the single OpenAI / Gemini key)
+# Either can be overridden with a JSON object in SDS_MODEL_RATE_LIMITS / SDS_PROVIDER_RATE_LIMITS,
+# e.g. '{"us.anthropic.claude-3-5-haiku-20241022-v1:0": {"rpm": 250, "tpm": 400000}}'.
+MODEL_RATE_LIMITS: Dict[str, Dict[str, Optional[int]]] = json.loads(os.getenv("SDS_MODEL_RATE_LIMITS", "{}"))
+PROVIDER_RATE_LIMITS: Dict[str, Dict[str, Optional[int]]] = {
+    "aws_bedrock": {"rpm": None, "tpm": None},
+    "CAII": {"rpm": None, "tpm": None},
+    "openai": {"rpm": None, "tpm": None},
+    "openai_compatible": {"rpm": None, "tpm": None},
+    "gemini": {"rpm": None, "tpm": None},
+    **json.loads(os.getenv("SDS_PROVIDER_RATE_LIMITS", "{}")),
+}
+
+# Shared keep-alive connection pools for the OpenAI-SDK based providers
+# (OpenAI, OpenAI compatible, CAII). One pool per (inference_type, base_url, token).
+HTTP_POOL_CONFIG = {
+    "max_connections": int(os.getenv("SDS_HTTP_MAX_CONNECTIONS", 200)),
+    "max_keepalive_connections": int(os.getenv("SDS_HTTP_MAX_KEEPALIVE", 50)),
+    "keepalive_expiry": float(os.getenv("SDS_HTTP_KEEPALIVE_EXPIRY", 30.0)),  # seconds an idle connection is kept open
+    "client_idle_ttl": float(os.getenv("SDS_HTTP_CLIENT_IDLE_TTL", 900.0)),  # seconds before an unused client is closed
+    "http2": os.getenv("SDS_HTTP2", "false").lower() == "true",  # needs the `h2` package
+}
+
+# AIMD limiter for in-flight LLM calls, one per (inference_type, model_id) and shared by
+# every job in the process. Grows by ~1 slot per round trip while healthy and is cut by
+# `backoff_ratio` on throttles / 429 / 5xx.
+ADAPTIVE_CONCURRENCY_CONFIG = {
+    "initial_limit": int(os.getenv("SDS_CONCURRENCY_INITIAL", 8)),
+    "min_limit": int(os.getenv("SDS_CONCURRENCY_MIN", 1)),
+    "max_limit": int(os.getenv("SDS_CONCURRENCY_MAX", 256)),
+    "backoff_ratio": 0.5,
+    "latency_tolerance": 2.0,   # stop growing once latency exceeds this multiple of the baseline
+    "max_error_rate": 0.1,      # stop growing once this share of recent calls failed
+    "decrease_cooldown": 2.0,   # seconds; one back-off per burst of throttles
+    "window_seconds": 60.0,     # window for the reported throttle / error counts
+}
+
+# Routing across equivalent CAII / OpenAI-compatible replicas (`caii_endpoints` on a request).
+# strategy: "least_outstanding" or "latency" (in-flight calls weighted by latency EWMA).
+# A replica failing `eject_after` calls in a row (5xx / 429 / connection errors) is skipped
+# for `cooldown_seconds`.
+ENDPOINT_POOL_CONFIG = {
+    "strategy": os.getenv("SDS_ENDPOINT_STRATEGY", "least_outstanding"),
+    "eject_after": int(os.getenv("SDS_ENDPOINT_EJECT_AFTER", 3)),
+    "cooldown_seconds": float(os.getenv("SDS_ENDPOINT_COOLDOWN", 30.0)),
+    "latency_alpha": 0.3,
+}
+
+# Hedged evaluation calls: a call still running after the model's observed `percentile`
+# latency gets a duplicate (routed to another replica when the model has an endpoint pool)
+# and the first response wins. Hedges are paid for from a budget of `max_hedge_ratio` of
+# all calls. A request's `hedge` field overrides the default.
+HEDGING_CONFIG = {
+    "enabled": os.getenv("SDS_HEDGING", "false").lower() == "true",
+    "percentile": float(os.getenv("SDS_HEDGE_PERCENTILE", 95)),
+    "max_hedge_ratio": float(os.getenv("SDS_HEDGE_MAX_RATIO", 0.05)),
+    "min_samples": int(os.getenv("SDS_HEDGE_MIN_SAMPLES", 20)),  # latencies observed before hedging starts
+    "window": int(os.getenv("SDS_HEDGE_WINDOW", 500)),  # recent latencies the percentile is taken over
+    "max_burst": 10,  # unused hedge budget that can be saved up for a burst of slow calls
+}
+
+# Evaluation prompts that score several rows / QA pairs at once. `rows` is the most per
+# prompt (1 keeps one call per row); fewer are packed when they would not fit the model's
+# context window (`context_tokens` unless MODEL_CONFIGS knows the model) or its max_tokens
+# at `output_tokens_per_row`. A request's `eval_batch_size` overrides `rows`.
+EVAL_BATCH_CONFIG = {
+    "rows": int(os.getenv("SDS_EVAL_BATCH_ROWS", 1)),
+    "context_tokens": int(os.getenv("SDS_EVAL_CONTEXT_TOKENS", 32000)),
+    "output_tokens_per_row": int(os.getenv("SDS_EVAL_OUTPUT_TOKENS_PER_ROW", 250)),
+}
+
+# Content-addressed cache of LLM responses (memory LRU + SQLite). Off by default; only
+# temperature-0 calls are cached unless the handler is created with cache_sampled=True.
+RESPONSE_CACHE_CONFIG = {
+    "enabled": os.getenv("SDS_RESPONSE_CACHE", "false").lower() == "true",
+    "path": os.getenv("SDS_RESPONSE_CACHE_PATH", "response_cache.db"),
+    "memory_entries": int(os.getenv("SDS_RESPONSE_CACHE_MEMORY_ENTRIES", 1024)),
+    "max_disk_bytes": int(os.getenv("SDS_RESPONSE_CACHE_MAX_BYTES", 512 * 1024 * 1024)),
+    "ttl_seconds": float(os.getenv("SDS_RESPONSE_CACHE_TTL", 7 * 24 * 3600)),
+}
+
+# Provider-side prompt caching of the stable instruction/example prefix of every prompt.
+# Bedrock gets a `cachePoint` after the prefix on the models listed in `bedrock_models`
+# (substrings of the model id) once the prefix is at least `bedrock_min_tokens`; OpenAI and
+# CAII / vLLM cache matching prefixes on their own. Gemini prefixes of `gemini_min_tokens`
+# or more are stored as cached contents for `gemini_ttl_seconds`.
+PROMPT_CACHE_CONFIG = {
+    "enabled": os.getenv("SDS_PROMPT_CACHE", "true").lower() == "true",
+    "bedrock_models": [m for m in os.getenv(
+        "SDS_PROMPT_CACHE_BEDROCK_MODELS",
+        "claude-3-5-haiku,claude-3-7-sonnet,claude-sonnet-4,claude-opus-4,amazon.nova",
+    ).split(",") if m],
+    "bedrock_min_tokens": int(os.getenv("SDS_PROMPT_CACHE_BEDROCK_MIN_TOKENS", 1024)),
+    "gemini_min_tokens": int(os.getenv("SDS_PROMPT_CACHE_GEMINI_MIN_TOKENS", 32768)),
+    "gemini_ttl_seconds": int(os.getenv("SDS_PROMPT_CACHE_GEMINI_TTL", 3600)),
+}
+
+# Parsed example/data files kept in memory by DataLoader, keyed by path, mtime, size and
+# sample_rows so an edited file is read again. Least recently used frames are dropped once
+# their estimated size passes `max_bytes`.
+DATA_LOADER_CACHE_CONFIG = {
+    "enabled": os.getenv("SDS_DATA_CACHE", "true").lower() == "true",
+    "max_bytes": int(os.getenv("SDS_DATA_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+}
+
+# Files of at least `threshold_bytes` are read in chunks of `chunk_rows` (CSV/TSV, JSON lines,
+# Parquet row groups) so peak memory follows the requested sample, not the file size.
+DATA_LOADER_STREAM_CONFIG = {
+    "threshold_bytes": int(os.getenv("SDS_DATA_STREAM_THRESHOLD_BYTES", 64 * 1024 * 1024)),
+    "chunk_rows": int(os.getenv("SDS_DATA_STREAM_CHUNK_ROWS", 50000)),
+}
+
+# Threads for blocking file, SQLite and health-check work of API routes, kept apart from the default
+# executor, which also runs Bedrock calls and can be saturated by a large evaluation.
+BLOCKING_IO_CONFIG = {
+    "workers": int(os.getenv("SDS_BLOCKING_IO_WORKERS", 8)),
+}
+
+# Document ingestion for doc_paths: PDF page ranges and text file blocks are extracted in a
+# pool of `workers` processes (0 uses threads) with up to `prefetch_tasks` in flight, and the
+# chunks go to the generation queue as they are produced.
+DOC_INGEST_CONFIG = {
+    "workers": int(os.getenv("SDS_DOC_INGEST_WORKERS", min(4, os.cpu_count() or 1))),
+    "pdf_pages_per_task": int(os.getenv("SDS_DOC_INGEST_PDF_PAGES", 16)),
+    "txt_bytes_per_task": int(os.getenv("SDS_DOC_INGEST_TXT_BYTES", 4 * 1024 * 1024)),
+    "prefetch_tasks": int(os.getenv("SDS_DOC_INGEST_PREFETCH", 16)),
+}
+
+# Chunking of `doc_paths` for generation. With `chunk_tokens` > 0 chunks are packed up to that
+# many tokens (~4 characters each) at sentence and paragraph boundaries, repeating up to
+# `overlap_tokens` of the previous chunk; 0 keeps 1000-character chunks with 100 characters of overlap.
+# When there are more chunks than num_questions, `sampling` picks them: first (the default, streamed
+# from the start so generation begins while the rest is extracted), or across the whole corpus, which
+# waits for all of it: uniform, stratified (a share per document) or weighted (by length).
+DOC_CHUNK_CONFIG = {
+    "chunk_tokens": int(os.getenv("SDS_DOC_CHUNK_TOKENS", 0)),
+    "overlap_tokens": int(os.getenv("SDS_DOC_CHUNK_OVERLAP_TOKENS", 25)),
+    "sampling": os.getenv("SDS_CHUNK_SAMPLING", "first"),
+    "sampling_seed": int(os.getenv("SDS_CHUNK_SAMPLING_SEED", 0)),
+}
+
+# Chunks of parsed documents kept on disk, keyed by file content hash, chunk_size, overlap and
+# extractor version, so repeated runs over the same doc_paths skip extraction. Least recently
+# used documents are removed once the store passes `max_bytes`. A document the consumer stops
+# reading part way (e.g. a demo that needs only its first chunks) is finished in the background
+# and stored unless `finish_on_close` is off.
+CHUNK_STORE_CONFIG = {
+    "enabled": os.getenv("SDS_CHUNK_STORE", "true").lower() == "true",
+    "path": os.getenv("SDS_CHUNK_STORE_PATH", "chunk_store"),
+    "max_bytes": int(os.getenv("SDS_CHUNK_STORE_MAX_BYTES", 2 * 1024 * 1024 * 1024)),
+    "read_batch_chunks": int(os.getenv("SDS_CHUNK_STORE_READ_BATCH", 256)),
+    "finish_on_close": os.getenv("SDS_CHUNK_STORE_FINISH_ON_CLOSE", "true").lower() == "true",
+}
+
+# Generation output is appended to a .jsonl file as rows arrive. `legacy_json` converts it
+# into the indented JSON array the rest of the app reads once the job finishes.
+OUTPUT_WRITER_CONFIG = {
+    "fsync_interval_seconds": float(os.getenv("SDS_OUTPUT_FSYNC_INTERVAL", 5.0)),
+    "fsync_every_rows": int(os.getenv("SDS_OUTPUT_FSYNC_ROWS", 500)),
+    "progress_every_rows": int(os.getenv("SDS_OUTPUT_PROGRESS_ROWS", 100)),  # completed_rows update cadence
+    "legacy_json": os.getenv("SDS_LEGACY_JSON_OUTPUT", "true").lower() == "true",
+    "keep_jsonl": os.getenv("SDS_KEEP_JSONL_OUTPUT", "false").lower() == "true",
+}
+
+# Per-job checkpoint manifests used by /synthesis/resume/{job_name}
+CHECKPOINT_DIR = os.getenv("SDS_CHECKPOINT_DIR", "checkpoints")
+CHECKPOINT_SAVE_INTERVAL = float(os.getenv("SDS_CHECKPOINT_SAVE_INTERVAL", 5.0))  # seconds between manifest writes
+
+# Job-wide near-duplicate rejection of generated rows. Prompts then only carry the last
+# `hint_items` identifiers of a topic (each cut to `hint_chars`) as a diversity hint.
+# backend: "minhash" (MinHash/LSH over character shingles) or "embedding" (needs sentence-transformers)
+DEDUP_CONFIG = {
+    "enabled": os.getenv("SDS_DEDUP", "true").lower() == "true",
+    "backend": os.getenv("SDS_DEDUP_BACKEND", "minhash"),
+    "threshold": float(os.getenv("SDS_DEDUP_THRESHOLD", 0.8)),  # estimated Jaccard similarity
+    "num_perm": int(os.getenv("SDS_DEDUP_NUM_PERM", 128)),
+    "bands": int(os.getenv("SDS_DEDUP_BANDS", 32)),
+    "shingle_size": int(os.getenv("SDS_DEDUP_SHINGLE_SIZE", 5)),
+    "embedding_model": os.getenv("SDS_DEDUP_EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+    "embedding_threshold": float(os.getenv("SDS_DEDUP_EMBEDDING_THRESHOLD", 0.92)),  # cosine similarity
+    "hint_items": int(os.getenv("SDS_DEDUP_HINT_ITEMS", 5)),
+    "hint_chars": int(os.getenv("SDS_DEDUP_HINT_CHARS", 120)),
+}
+
+# Streamed generation: rows are parsed, validated and written while the model is still
+# producing the rest of the batch, and the stream is closed once the batch has all its rows.
+# A request's `stream` field overrides the default.
+STREAMING_CONFIG = {
+    "enabled": os.getenv("SDS_STREAMING", "false").lower() == "true",
+}
+
+# Bulk execution of non-demo jobs through provider batch APIs (OpenAI Batch, Bedrock
+# model invocation jobs). Prompts are collected until callers stop adding more for
+# `collect_window` seconds; rounds smaller than `min_records` (Bedrock's minimum job size)
+# run on demand instead. A request's `bulk` field overrides the default.
+BULK_INFERENCE_CONFIG = {
+    "enabled": os.getenv("SDS_BULK_INFERENCE", "false").lower() == "true",
+    "min_records": int(os.getenv("SDS_BULK_MIN_RECORDS", 100)),
+    "max_records": int(os.getenv("SDS_BULK_MAX_RECORDS", 50000)),  # per provider job
+    "collect_window": float(os.getenv("SDS_BULK_COLLECT_WINDOW", 2.0)),
+    "poll_interval": float(os.getenv("SDS_BULK_POLL_INTERVAL", 60.0)),
+    "timeout": float(os.getenv("SDS_BULK_TIMEOUT", 24 * 3600)),
+    "bedrock_s3_uri": os.getenv("SDS_BULK_BEDROCK_S3_URI"),  # s3://bucket/prefix for job input/output
+    "bedrock_role_arn": os.getenv("SDS_BULK_BEDROCK_ROLE_ARN"),  # service role Bedrock assumes to read/write it
+}
+
 def get_model_family(model_id: str) -> ModelFamily:
     if "anthropic.claude" in model_id or "us.anthropic.claude" in model_id:
         return ModelFamily.CLAUDE
@@ -1016,6 +1226,23 @@ def caii_check(endpoint: str, timeout: int = 3) -> requests.Response:
 
     return r
 
+def caii_check_pool(endpoints: List[Optional[str]], timeout: int = 3) -> requests.Response:
+    """
+    ``caii_check`` for a pool of replicas: passes when at least one is healthy,
+    since the balancer routes around the others.
+    """
+    endpoints = [e for e in endpoints if e]
+    if not endpoints:
+        raise HTTPException(400, "CAII endpoint not provided")
+    error = None
+    for endpoint in endpoints:
+        try:
+            return caii_check(endpoint, timeout)
+        except HTTPException as exc:
+            print(f"CAII endpoint {endpoint} failed its health check: {exc.detail}")
+            error = exc
+    raise error
+
 LENDING_DATA_PROMPT = """
         Create profile data for the LendingClub company which specialises in lending various types of loans to urban customers.
 
@@ -2,21 +2,154 @@ import pandas as pd
 import numpy as np
 import json
 import os
+import threading
 import warnings
+from collections import OrderedDict
 from pathlib import Path
-from typing import Optional, Union
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+from app.core.config import DATA_LOADER_CACHE_CONFIG, DATA_LOADER_STREAM_CONFIG
+
+# read_csv options tried in order; the last one is the permissive last resort
+CSV_READ_OPTIONS = (
+    {"encoding": "utf-8"},
+    {"encoding": "latin1"},
+    # Sniff the delimiter
+    {"sep": None, "engine": "python"},
+    {"sep": None, "engine": "python", "encoding": "latin1", "on_bad_lines": "skip"},
+)
+
+
+class LoadedFrameCache:
+    """
+    Parsed DataFrames keyed by (path, mtime, size, sample_rows, sampling), least recently used dropped first.
+
+    Each entry is charged ``DataFrame.memory_usage(deep=True)``; frames are
+    copied on the way in and out since callers convert columns in place. The
+    read_csv options that parsed a file are remembered separately, per
+    (path, mtime, size), so a reload of the same file (another ``sample_rows``,
+    an evicted frame) skips the ones that failed; an edited file starts over.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._frames: "OrderedDict[Tuple, Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._bytes = 0
+        self._csv_options: Dict[str, Tuple[Tuple, Dict[str, Any]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(path: str, *params) -> Tuple:
+        stat = os.stat(path)
+        return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, *params)
+
+    def get(self, key: Tuple) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._frames.move_to_end(key)
+            self.hits += 1
+            return entry[0].copy()
+
+    def put(self, key: Tuple, df: pd.DataFrame) -> None:
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        df = df.copy()
+        with self._lock:
+            previous = self._frames.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._frames[key] = (df, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._frames.popitem(last=False)
+                self._bytes -= evicted
+
+    def csv_options(self, path: str) -> Optional[Dict[str, Any]]:
+        identity = self.key(path)
+        with self._lock:
+            entry = self._csv_options.get(identity[0])
+        return entry[1] if entry is not None and entry[0] == identity else None
+
+    def remember_csv_options(self, path: str, options: Dict[str, Any]) -> None:
+        identity = self.key(path)
+        with self._lock:
+            self._csv_options[identity[0]] = (identity, options)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+            self._csv_options.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._frames), "bytes": self._bytes, "hits": self.hits, "misses": self.misses}
+
+
+loaded_frame_cache = LoadedFrameCache(DATA_LOADER_CACHE_CONFIG["max_bytes"])
+
+
+def head_rows(chunks: Iterable[pd.DataFrame], n: int) -> pd.DataFrame:
+    """The first ``n`` rows of a chunked read; later chunks are never read"""
+    taken = []
+    count = 0
+    for chunk in chunks:
+        taken.append(chunk.iloc[:n - count])
+        count += len(taken[-1])
+        if count >= n:
+            break
+    return pd.concat(taken, ignore_index=True) if taken else pd.DataFrame()
+
+
+def reservoir_sample(chunks: Iterable[pd.DataFrame], n: int, seed: int = 42) -> pd.DataFrame:
+    """
+    A uniform random sample of ``n`` rows of a chunked read, in file order.
+
+    Every row gets a random key and the ``n`` smallest keys are kept, so at
+    most ``n`` rows plus one chunk are in memory at a time.
+    """
+    rng = np.random.default_rng(seed)
+    kept, kept_keys = None, np.empty(0)
+    seen = 0
+    for chunk in chunks:
+        chunk.index = pd.RangeIndex(seen, seen + len(chunk))
+        seen += len(chunk)
+        keys = rng.random(len(chunk))
+        if kept is not None:
+            chunk = pd.concat([kept, chunk])
+            keys = np.concatenate([kept_keys, keys])
+        if len(chunk) > n:
+            smallest = np.argpartition(keys, n)[:n] if n else np.empty(0, dtype=int)
+            chunk, keys = chunk.iloc[smallest], keys[smallest]
+        kept, kept_keys = chunk, keys
+    if kept is None:
+        return pd.DataFrame()
+    return kept.sort_index().reset_index(drop=True)
+
 
 class DataLoader:
     """Load arbitrary tabular data into a DataFrame with robust error handling."""
     
     @staticmethod
-    def load(path: str, sample_rows: int = 100000) -> pd.DataFrame:
+    def load(path: str, sample_rows: int = 100000, sampling: str = "random") -> pd.DataFrame:
         """
         Load data from various file formats into a pandas DataFrame.
+
+        Parsed files are cached per process until the file changes (see
+        ``LoadedFrameCache``); every call gets its own copy. Large CSV/TSV,
+        JSON lines and Parquet files are read in chunks, keeping only the
+        sampled rows in memory.
         
         Args:
             path: Path to the data file
             sample_rows: Maximum number of rows to load for large files
+            sampling: "random" for a seeded random sample, "head" for the first rows
             
         Returns:
             pandas DataFrame with the loaded data
@@ -24,33 +157,27 @@ class DataLoader:
         # Validate the path exists
         if not os.path.exists(path):
             raise FileNotFoundError(f"File not found: {path}")
+
+        cache_key = None
+        if DATA_LOADER_CACHE_CONFIG["enabled"]:
+            cache_key = loaded_frame_cache.key(path, sample_rows, sampling)
+            cached = loaded_frame_cache.get(cache_key)
+            if cached is not None:
+                return cached
             
         # Get file extension
         ext = Path(path).suffix.lower()
         
         try:
             if ext == ".csv":
-                # Try different encoding and delimiter options
-                try:
-                    df = pd.read_csv(path, encoding='utf-8')
-                except:
-                    try:
-                        df = pd.read_csv(path, encoding='latin1')
-                    except:
-                        try:
-                            # Try with different delimiters
-                            df = pd.read_csv(path, sep=None, engine='python')
-                        except:
-                            # Last resort - try reading with very permissive settings
-                            df = pd.read_csv(path, sep=None, engine='python', 
-                                             encoding='latin1', on_bad_lines='skip')
+                df = DataLoader._read_csv(path, sample_rows, sampling)
             elif ext == ".tsv":
-                df = pd.read_csv(path, sep='\t')
-            elif ext == ".json":
+                df = DataLoader._sampled_read(lambda **kw: pd.read_csv(path, sep='\t', **kw), path, sample_rows, sampling)
+            elif ext in (".json", ".jsonl"):
                 # Try multiple JSON formats
                 try:
                     # Try JSONL format first
-                    df = pd.read_json(path, lines=True)
+                    df = DataLoader._sampled_read(lambda **kw: pd.read_json(path, lines=True, **kw), path, sample_rows, sampling)
                 except ValueError:
                     try:
                         # Then try normal JSON
@@ -81,7 +208,7 @@ class DataLoader:
             elif ext == ".xlsb":
                 df = pd.read_excel(path, engine="pyxlsb")
             elif ext == ".parquet":
-                df = pd.read_parquet(path)
+                df = DataLoader._read_parquet(path, sample_rows, sampling)
             elif ext == ".feather":
                 df = pd.read_feather(path)
             elif ext == ".pickle" or ext == ".pkl":
@@ -106,18 +233,69 @@ class DataLoader:
                               
             # Keep memory/latency bounded
             if len(df) > sample_rows:
-                df = df.sample(sample_rows, random_state=42)
+                df = df.head(sample_rows) if sampling == "head" else df.sample(sample_rows, random_state=42)
                 
             # Process column types
             df = DataLoader.infer_dtypes(df)
-                
-            return df.reset_index(drop=True)
+            df = df.reset_index(drop=True)
+
+            # Failed loads below are not cached, so a fixed file is picked up on the next call
+            if cache_key is not None:
+                loaded_frame_cache.put(cache_key, df)
+            return df
             
         except Exception as e:
             print(f"Error loading data from {path}: {str(e)}")
             # Return an empty DataFrame with a message column
             return pd.DataFrame({"error_message": [f"Failed to load data: {str(e)}"]})
         
+    @staticmethod
+    def _sampled_read(reader: Callable[..., Any], path: str, sample_rows: int, sampling: str) -> pd.DataFrame:
+        """
+        Call ``reader`` (a pandas reader taking ``nrows`` / ``chunksize``) for at most ``sample_rows`` rows.
+
+        Files below the streaming threshold are read whole and sampled by ``load``.
+        """
+        if os.path.getsize(path) < DATA_LOADER_STREAM_CONFIG["threshold_bytes"]:
+            return reader()
+        if sampling == "head":
+            return reader(nrows=sample_rows)
+        with reader(chunksize=DATA_LOADER_STREAM_CONFIG["chunk_rows"]) as chunks:
+            return reservoir_sample(chunks, sample_rows)
+
+    @staticmethod
+    def _read_parquet(path: str, sample_rows: int, sampling: str) -> pd.DataFrame:
+        """Large files are read batch by batch across row groups when pyarrow is available"""
+        if os.path.getsize(path) < DATA_LOADER_STREAM_CONFIG["threshold_bytes"]:
+            return pd.read_parquet(path)
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            return pd.read_parquet(path)
+        parquet_file = pq.ParquetFile(path)
+        batches = (
+            batch.to_pandas()
+            for batch in parquet_file.iter_batches(batch_size=DATA_LOADER_STREAM_CONFIG["chunk_rows"])
+        )
+        if sampling == "head":
+            return head_rows(batches, sample_rows)
+        return reservoir_sample(batches, sample_rows)
+
+    @staticmethod
+    def _read_csv(path: str, sample_rows: int, sampling: str) -> pd.DataFrame:
+        """Try the read_csv options in turn, starting with the ones that last worked for this path"""
+        known = loaded_frame_cache.csv_options(path)
+        attempts = ([known] if known is not None else []) + [o for o in CSV_READ_OPTIONS if o is not known]
+        for options in attempts:
+            try:
+                df = DataLoader._sampled_read(lambda **kw: pd.read_csv(path, **options, **kw), path, sample_rows, sampling)
+            except Exception as e:
+                error = e
+                continue
+            loaded_frame_cache.remember_csv_options(path, options)
+            return df
+        raise error
+
     @staticmethod
     def parse_datetime(series):
         """
@@ -72,7 +72,8 @@ class DatabaseManager:
                         job_name TEXT UNIQUE,
                         job_status TEXT,
                         job_creator_name TEXT,
-                        completed_rows INTEGER
+                        completed_rows INTEGER,
+                        dedup_stats TEXT
 
                     )
                 """)
@@ -164,8 +165,9 @@ class DatabaseManager:
                     custom_prompt, model_parameters, input_key, output_key, output_value, generate_file_name,
                     display_name, local_export_path, hf_export_path, s3_export_path,
                     num_questions, total_count, topics, examples, 
-                    schema, doc_paths, input_path, job_id, job_name, job_status, job_creator_name, completed_rows
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    schema, doc_paths, input_path, job_id, job_name, job_status, job_creator_name, completed_rows,
+                    dedup_stats
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """
                 
                 values = (
@@ -196,7 +198,8 @@ class DatabaseManager:
                     metadata.get('job_name', None),
                     metadata.get('job_status', None),
                     metadata.get('job_creator_name', None),
-                    metadata.get('completed_rows', None)
+                    metadata.get('completed_rows', None),
+                    metadata.get('dedup_stats', None)
                 )
                 
                 cursor.execute(query, values)
@@ -214,7 +217,7 @@ class DatabaseManager:
             print(f"Error saving metadata to database: {str(e)}")
             raise
 
-    def update_job_generate(self, job_name: str, generate_file_name: str, local_export_path: str, timestamp: str, job_status, completed_rows):
+    def update_job_generate(self, job_name: str, generate_file_name: str, local_export_path: str, timestamp: str, job_status, completed_rows, dedup_stats: Optional[str] = None):
         """Update job generate with retry mechanism"""
         max_retries = 3
         retry_delay = 1  # seconds
@@ -247,11 +250,12 @@ class DatabaseManager:
                             local_export_path = ?,
                             timestamp = ?,
                             job_status = ?,
-                            completed_rows = ?
+                            completed_rows = ?,
+                            dedup_stats = COALESCE(?, dedup_stats)
                         WHERE job_name = ?
                         AND job_name IS NOT NULL 
                         AND job_name != ''
-                    """, (generate_file_name, local_export_path, timestamp, job_status, completed_rows,job_name))
+                    """, (generate_file_name, local_export_path, timestamp, job_status, completed_rows, dedup_stats, job_name))
                     
                     rows_affected = cursor.rowcount
                     conn.commit()
@@ -280,6 +284,39 @@ class DatabaseManager:
     
         raise Exception(f"Failed to update job after {max_retries} attempts")
 
+    def update_job_resumed(self, job_name: str, job_id: str, job_status: str) -> None:
+        """Point an existing generation job at the CML job run that resumes it"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE generation_metadata SET job_id = ?, job_status = ? WHERE job_name = ?",
+                    (job_id, job_status, job_name)
+                )
+                conn.commit()
+                if cursor.rowcount == 0:
+                    print(f"No record found for job name: {job_name}")
+        except Exception as e:
+            print(f"Error updating resumed job {job_name}: {str(e)}")
+            raise
+
+    def update_job_progress(self, job_name: str, completed_rows: int) -> bool:
+        """Record rows generated so far for a running job; best effort, never raises"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE generation_metadata SET completed_rows = ? WHERE job_name = ?",
+                    (completed_rows, job_name)
+                )
+                conn.commit()
+                return cursor.rowcount > 0
+        except Exception as e:
+            print(f"Error updating job progress for {job_name}: {str(e)}")
+            return False
+
 
 
 
@@ -967,6 +1004,18 @@ class DatabaseManager:
             return 0, []
                 
 
+    def get_generation_job_id(self, job_name: str) -> Optional[str]:
+        """CML job id currently tracked for a generation job"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT job_id FROM generation_metadata WHERE job_name = ?", (job_name,))
+                row = cursor.fetchone()
+                return row[0] if row else None
+        except Exception as e:
+            print(f"Error retrieving job id for {job_name}: {str(e)}")
+            return None
+
     def get_metadata_by_filename(self, file_name: str) -> Optional[Dict]:
         """Retrieve metadata by filename"""
         try:
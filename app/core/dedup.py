@@ -0,0 +1,220 @@
+import json
+import re
+import threading
+import zlib
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.core.config import DEDUP_CONFIG
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:  # optional: the embedding backend falls back to MinHash
+    SentenceTransformer = None
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse punctuation/whitespace so trivial rewrites compare equal"""
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def item_text(item: Any) -> str:
+    """
+    Text a generated row is compared on: every value, so tabular rows that differ
+    only in numbers or flags stay apart. Keys are left out, being the same in every row.
+    """
+    if isinstance(item, dict):
+        return " ".join(v if isinstance(v, str) else json.dumps(v, sort_keys=True, default=str)
+                        for v in item.values())
+    return str(item)
+
+
+def compact_hint(identifier: str, max_chars: int) -> str:
+    """Cut an omit_questions entry down for the prompt's diversity hint"""
+    if len(identifier) <= max_chars:
+        return identifier
+    return identifier[:max_chars].rstrip() + "..."
+
+
+class NearDuplicateIndex:
+    """
+    Job-wide MinHash/LSH index of generated rows.
+
+    Each text is reduced to ``num_perm`` MinHash values over character
+    shingles; the signature is split into ``bands`` buckets so only rows
+    sharing a bucket are compared. A row is a duplicate when its estimated
+    Jaccard similarity to an indexed row reaches ``threshold``.
+    """
+
+    backend = "minhash"
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 32,
+                 shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+        self._b = generator.randint(0, np.iinfo(np.int64).max, size=num_perm, dtype=np.int64).astype(np.uint64)
+
+        self._lock = threading.Lock()
+        self._exact = set()
+        self._signatures = np.empty((64, num_perm), dtype=np.uint64)  # grown by doubling
+        self._count = 0
+        self._buckets: List[Dict[bytes, List[int]]] = [defaultdict(list) for _ in range(bands)]
+        self.checked = 0
+        self.duplicates = 0
+        self.exact_duplicates = 0
+
+    def _shingles(self, text: str) -> Iterable[str]:
+        if len(text) <= self.shingle_size:
+            return {text}
+        return {text[i:i + self.shingle_size] for i in range(len(text) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) for s in self._shingles(text)), dtype=np.uint64
+        )
+        # (a * h + b) mod p for every permutation/shingle pair, minimum per permutation
+        permuted = np.bitwise_and((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME, _MAX_HASH)
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        r = self.rows_per_band
+        return [signature[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def add_if_new(self, text: str) -> bool:
+        """Index ``text`` and return True, or return False when it near-duplicates an indexed row"""
+        normalized = normalize_text(text)
+        with self._lock:
+            self.checked += 1
+            if normalized in self._exact:
+                self.duplicates += 1
+                self.exact_duplicates += 1
+                return False
+
+        signature = self.signature(normalized)
+        keys = self._band_keys(signature)
+        with self._lock:
+            # Re-check under the lock: another batch may have added the same row meanwhile
+            if normalized in self._exact:
+                self.duplicates += 1
+                self.exact_duplicates += 1
+                return False
+            candidates = set()
+            for band, key in zip(self._buckets, keys):
+                candidates.update(band.get(key, ()))
+            if candidates:
+                similarity = (self._signatures[list(candidates)] == signature).mean(axis=1)
+                if similarity.max() >= self.threshold:
+                    self.duplicates += 1
+                    return False
+
+            row_id = self._count
+            if row_id == len(self._signatures):
+                self._signatures = np.concatenate([self._signatures, np.empty_like(self._signatures)])
+            self._signatures[row_id] = signature
+            self._count += 1
+            self._exact.add(normalized)
+            for band, key in zip(self._buckets, keys):
+                band[key].append(row_id)
+            return True
+
+    def seed(self, texts: Iterable[str]) -> None:
+        """Index rows produced earlier (e.g. by the run a resumed job continues) without counting them"""
+        for text in texts:
+            self.add_if_new(text)
+        with self._lock:
+            self.checked = self.duplicates = self.exact_duplicates = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "backend": self.backend,
+                "checked": self.checked,
+                "unique": self.checked - self.duplicates,
+                "duplicates": self.duplicates,
+                "exact_duplicates": self.exact_duplicates,
+                "duplicate_rate": round(self.duplicates / self.checked, 4) if self.checked else 0.0,
+            }
+
+
+class EmbeddingDuplicateIndex(NearDuplicateIndex):
+    """
+    Near-duplicate index on sentence embeddings, for paraphrases MinHash misses.
+
+    Exact matches are still caught by the normalized-text set; everything else
+    is compared by cosine similarity against every indexed row.
+    """
+
+    backend = "embedding"
+
+    def __init__(self, model_name: str, threshold: float = 0.92):
+        # No MinHash state: only the exact-match set and counters are shared with the parent
+        self.threshold = threshold
+        self._model = SentenceTransformer(model_name)
+        self._lock = threading.Lock()
+        self._exact = set()
+        self._vectors: Optional[np.ndarray] = None  # allocated on the first row, grown by doubling
+        self._count = 0
+        self.checked = 0
+        self.duplicates = 0
+        self.exact_duplicates = 0
+
+    def add_if_new(self, text: str) -> bool:
+        normalized = normalize_text(text)
+        with self._lock:
+            self.checked += 1
+            if normalized in self._exact:
+                self.duplicates += 1
+                self.exact_duplicates += 1
+                return False
+
+        vector = np.asarray(self._model.encode([text], normalize_embeddings=True), dtype=np.float32)
+        with self._lock:
+            if normalized in self._exact:
+                self.duplicates += 1
+                self.exact_duplicates += 1
+                return False
+            if self._count and float((self._vectors[:self._count] @ vector[0]).max()) >= self.threshold:
+                self.duplicates += 1
+                return False
+            if self._vectors is None:
+                self._vectors = np.empty((64, vector.shape[1]), dtype=np.float32)
+            elif self._count == len(self._vectors):
+                self._vectors = np.concatenate([self._vectors, np.empty_like(self._vectors)])
+            self._vectors[self._count] = vector[0]
+            self._count += 1
+            self._exact.add(normalized)
+            return True
+
+
+def create_dedup_index(config: Optional[Dict[str, Any]] = None) -> Optional[NearDuplicateIndex]:
+    """Index for one generation job, or None when deduplication is disabled"""
+    cfg = {**DEDUP_CONFIG, **(config or {})}
+    if not cfg["enabled"]:
+        return None
+    if cfg["backend"] == "embedding":
+        if SentenceTransformer is not None:
+            return EmbeddingDuplicateIndex(cfg["embedding_model"], cfg["embedding_threshold"])
+        print("sentence-transformers is not installed, using MinHash deduplication")
+    return NearDuplicateIndex(
+        threshold=cfg["threshold"],
+        num_perm=cfg["num_perm"],
+        bands=cfg["bands"],
+        shingle_size=cfg["shingle_size"],
+    )
@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+from openai import APIConnectionError
+
+from app.core.config import ENDPOINT_POOL_CONFIG
+from app.core.exceptions import APIError
+
+# Failures to reach the replica at all: refused or reset connections, timeouts
+TRANSPORT_ERRORS = (APIConnectionError, httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError)
+
+
+@dataclass
+class EndpointState:
+    url: str
+    outstanding: int = 0
+    latency_ewma: Optional[float] = None
+    consecutive_failures: int = 0
+    ejected_until: float = 0.0
+    ejections: int = 0
+    total_calls: int = 0
+    total_failures: int = 0
+
+    def available(self, now: float) -> bool:
+        return self.ejected_until <= now
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """
+    Errors that say something about the replica (connection, throttling, upstream 5xx) rather than the request.
+
+    Our own ``APIError`` wrappers and errors without an upstream status (a bad
+    prompt, unparseable output, missing configuration) never count.
+    """
+    if isinstance(error, APIError):
+        return False
+    if isinstance(error, TRANSPORT_ERRORS):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return isinstance(status, int) and (status == 429 or 500 <= status < 600)
+
+
+class EndpointPool:
+    """
+    Routes calls across equivalent replicas of one model.
+
+    ``least_outstanding`` picks the replica with the fewest calls in flight
+    (ties go to the lower latency EWMA, then round robin); ``latency`` weighs
+    calls in flight by each replica's latency EWMA. A replica that fails
+    ``eject_after`` calls in a row is ejected for ``cooldown_seconds`` and then
+    gets traffic again; if it fails its next call it is ejected again at once.
+    """
+
+    def __init__(self, urls: Iterable[str], strategy: Optional[str] = None, eject_after: Optional[int] = None,
+                 cooldown_seconds: Optional[float] = None, latency_alpha: Optional[float] = None):
+        cfg = ENDPOINT_POOL_CONFIG
+        self.endpoints = [EndpointState(url) for url in dict.fromkeys(urls)]
+        if not self.endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.strategy = strategy or cfg["strategy"]
+        self.eject_after = eject_after or cfg["eject_after"]
+        self.cooldown_seconds = cooldown_seconds if cooldown_seconds is not None else cfg["cooldown_seconds"]
+        self.latency_alpha = latency_alpha or cfg["latency_alpha"]
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.endpoints)
+
+    @property
+    def urls(self) -> List[str]:
+        return [e.url for e in self.endpoints]
+
+    def _score(self, endpoint: EndpointState) -> Tuple:
+        latency = endpoint.latency_ewma if endpoint.latency_ewma is not None else 0.0
+        if self.strategy == "latency":
+            # Unmeasured replicas score 0 so each gets tried once
+            return ((endpoint.outstanding + 1) * latency, endpoint.outstanding)
+        return (endpoint.outstanding, latency)
+
+    def acquire(self, exclude: Iterable[str] = ()) -> EndpointState:
+        """Pick a replica for one call and count it as in flight; release it with ``release``"""
+        excluded = set(exclude)
+        now = time.monotonic()
+        with self._lock:
+            candidates = [e for e in self.endpoints if e.url not in excluded] or self.endpoints
+            healthy = [e for e in candidates if e.available(now)]
+            if healthy:
+                # Rotate the start so equal scores spread round robin
+                offset = next(self._turn) % len(healthy)
+                rotated = healthy[offset:] + healthy[:offset]
+                endpoint = min(rotated, key=self._score)
+            else:
+                # Everything is ejected: try the replica that comes back first
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.total_calls += 1
+            return endpoint
+
+    def release(self, endpoint: EndpointState, latency: Optional[float] = None,
+                error: Optional[BaseException] = None, cancelled: bool = False) -> None:
+        """Finish a call started with ``acquire``; a cancelled call says nothing about the replica"""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if cancelled:
+                return
+            if error is not None:
+                if not is_endpoint_failure(error):
+                    return
+                endpoint.total_failures += 1
+                endpoint.consecutive_failures += 1
+                now = time.monotonic()
+                if endpoint.consecutive_failures >= self.eject_after and endpoint.available(now):
+                    endpoint.ejected_until = now + self.cooldown_seconds
+                    endpoint.ejections += 1
+                    print(f"Ejecting endpoint {endpoint.url} for {self.cooldown_seconds:.0f}s after "
+                          f"{endpoint.consecutive_failures} consecutive failures")
+                return
+            endpoint.consecutive_failures = 0
+            if latency is not None:
+                endpoint.latency_ewma = latency if endpoint.latency_ewma is None else (
+                    self.latency_alpha * latency + (1 - self.latency_alpha) * endpoint.latency_ewma
+                )
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "url": e.url,
+                "healthy": e.available(now),
+                "outstanding": e.outstanding,
+                "latency_ewma_ms": round(e.latency_ewma * 1000, 1) if e.latency_ewma is not None else None,
+                "consecutive_failures": e.consecutive_failures,
+                "ejections": e.ejections,
+                "total_calls": e.total_calls,
+                "total_failures": e.total_failures,
+            } for e in self.endpoints]
+
+
+_pools: Dict[Tuple[str, Tuple[str, ...]], EndpointPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_endpoint_pool(inference_type: str, urls: Iterable[str]) -> EndpointPool:
+    """Return the process-wide pool for a set of replicas, so every job routing to them shares its state"""
+    key = (inference_type, tuple(dict.fromkeys(urls)))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = EndpointPool(key[1])
+        return pool
+
+
+def endpoint_pool_snapshots() -> List[Dict[str, Any]]:
+    with _pools_lock:
+        pools = list(_pools.items())
+    return [{"inference_type": key[0], "endpoints": pool.snapshot()} for key, pool in pools]
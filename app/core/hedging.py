@@ -0,0 +1,199 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import HEDGING_CONFIG
+from app.core.response_cache import response_cache
+
+
+class HedgePolicy:
+    """
+    Observed latency and hedge budget of one (provider, model_id) pair.
+
+    The hedge delay is the ``percentile`` of the last ``window`` call latencies,
+    available once ``min_samples`` were seen. Every call adds ``max_hedge_ratio``
+    to the budget (capped at ``max_burst``) and every hedge spends 1 from it, so
+    duplicates never exceed that share of all calls.
+    """
+
+    def __init__(self, provider: str, model_id: str, config: Optional[Dict[str, Any]] = None):
+        cfg = {**HEDGING_CONFIG, **(config or {})}
+        self.provider = provider
+        self.model_id = model_id
+        self.percentile = cfg["percentile"]
+        self.max_hedge_ratio = cfg["max_hedge_ratio"]
+        self.min_samples = cfg["min_samples"]
+        self.max_burst = cfg["max_burst"]
+        self._latencies: Deque[float] = deque(maxlen=cfg["window"])
+        self._threshold: Optional[float] = None
+        self._stale = True
+        self._budget = 0.0
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self._stale = True
+
+    def threshold(self) -> Optional[float]:
+        """Seconds a call may run before it is hedged; None until enough latencies were seen"""
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            if self._stale:
+                ordered = sorted(self._latencies)
+                index = min(len(ordered) - 1, math.ceil(len(ordered) * self.percentile / 100) - 1)
+                self._threshold = ordered[max(0, index)]
+                self._stale = False
+            return self._threshold
+
+    def start_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self._budget = min(self.max_burst, self._budget + self.max_hedge_ratio)
+
+    def try_hedge(self) -> bool:
+        """Spend one hedge from the budget; False when the budget is used up"""
+        with self._lock:
+            if self._budget < 1:
+                return False
+            self._budget -= 1
+            self.hedged += 1
+            return True
+
+    def hedge_won(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        threshold = self.threshold()
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "model_id": self.model_id,
+                "hedge_after_ms": round(threshold * 1000, 1) if threshold is not None else None,
+                "samples": len(self._latencies),
+                "calls": self.calls,
+                "hedged": self.hedged,
+                "hedge_wins": self.hedge_wins,
+                "hedge_ratio": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            }
+
+
+_policies: Dict[Tuple[str, str], HedgePolicy] = {}
+_policies_lock = threading.Lock()
+
+
+def get_hedge_policy(provider: str, model_id: str) -> HedgePolicy:
+    """Return the process-wide hedge policy for a (provider, model_id) pair"""
+    key = (provider, model_id)
+    with _policies_lock:
+        policy = _policies.get(key)
+        if policy is None:
+            policy = _policies[key] = HedgePolicy(provider, model_id)
+        return policy
+
+
+def hedge_policy_snapshots() -> List[Dict[str, Any]]:
+    with _policies_lock:
+        policies = list(_policies.values())
+    return [policy.snapshot() for policy in policies]
+
+
+class HedgedModelHandler:
+    """
+    Drop-in for ``UnifiedModelHandler.agenerate_response`` that hedges slow calls.
+
+    A call still running after the policy's threshold gets a duplicate, the
+    first successful response is returned and the other call is cancelled.
+    With an endpoint pool the duplicate goes through the pool too, so the
+    least-loaded replica (usually not the one holding the slow call) takes it.
+    Bedrock calls on the blocking client's worker threads are not hedged:
+    cancelling one frees its limiter slot while the thread keeps running.
+    """
+
+    def __init__(self, handler, policy: Optional[HedgePolicy] = None):
+        self.handler = handler
+        self.model_id = handler.model_id
+        self.inference_type = handler.inference_type
+        self.policy = policy or get_hedge_policy(handler.inference_type, handler.model_id)
+
+    async def agenerate_response(
+        self,
+        prompt: str,
+        retry_with_reduced_tokens: bool = True,
+        request_id: Optional[str] = None,
+    ):
+        # Cache hits are answered here so they don't drag the latency percentile down
+        cache_key = self.handler._response_cache_key(prompt)
+        if cache_key:
+            cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+
+        response = await self._hedged_call(prompt, retry_with_reduced_tokens)
+        if cache_key and self.handler._cacheable(response):
+            await response_cache.aput(cache_key, response)
+        return response
+
+    async def _hedged_call(self, prompt: str, retry_with_reduced_tokens: bool):
+        policy = self.policy
+        policy.start_call()
+        delay = policy.threshold()
+        start = time.monotonic()
+        primary = asyncio.ensure_future(self.handler._adispatch_request(prompt, retry_with_reduced_tokens))
+        tasks = [primary]
+        try:
+            if delay is not None:
+                await asyncio.wait(tasks, timeout=delay)
+            if primary.done() or delay is None or not policy.try_hedge():
+                response = await primary
+                policy.record(time.monotonic() - start)
+                return response
+
+            tasks.append(asyncio.ensure_future(
+                self.handler._adispatch_request(prompt, retry_with_reduced_tokens)
+            ))
+            first_error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        # Latency as the caller saw it, so slow calls stay in the window
+                        policy.record(time.monotonic() - start)
+                        if task is not primary:
+                            policy.hedge_won()
+                        return task.result()
+                    first_error = first_error or task.exception()
+            raise first_error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.policy.snapshot()
+
+
+def use_hedging(request) -> bool:
+    """Whether a job's calls should be hedged"""
+    enabled = request.hedge if getattr(request, "hedge", None) is not None else HEDGING_CONFIG["enabled"]
+    return bool(enabled)
+
+
+def hedged_handler_for(request, model_handler):
+    """``model_handler`` wrapped for hedged calls when the request asks for it"""
+    if not use_hedging(request) or not hasattr(model_handler, "_adispatch_request"):
+        # Bulk handlers have nothing to hedge: their calls finish with the batch job
+        return model_handler
+    if model_handler._calls_in_thread():
+        # A cancelled thread keeps its call running, so a hedge would only add load
+        return model_handler
+    return HedgedModelHandler(model_handler)
@@ -0,0 +1,183 @@
+import ast
+import json
+import re
+from typing import Any, List, Optional
+
+_STRUCTURAL = re.compile(r'[{}\[\]"\\]')
+_IN_STRING = re.compile(r'["\\]')
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class ParsedRows(list):
+    """
+    Objects recovered from model output.
+
+    A plain list for every caller, with ``salvaged``/``dropped`` counts so the
+    generators know how many rows were lost to malformed JSON.
+    """
+
+    def __init__(self, rows=(), salvaged: int = 0, dropped: int = 0):
+        super().__init__(rows)
+        self.salvaged = salvaged
+        self.dropped = dropped
+
+
+class UnparsedOutput(ParsedRows):
+    """Model output with no JSON in it, passed on as ``[{"text": output}]``; never cached"""
+
+
+def decode_fragment(fragment: str) -> Optional[Any]:
+    """Decode one array element, repairing the usual model mistakes; None when it can't be saved"""
+    try:
+        return json.loads(fragment, strict=False)
+    except json.JSONDecodeError:
+        pass
+    repaired = _TRAILING_COMMA.sub(r"\1", fragment)
+    try:
+        return json.loads(repaired, strict=False)
+    except json.JSONDecodeError:
+        pass
+    try:
+        # Python-style dicts with single quotes / True / None
+        value = ast.literal_eval(repaired)
+        return value if isinstance(value, (dict, list)) else None
+    except (SyntaxError, ValueError, MemoryError, RecursionError):
+        return None
+
+
+class IncrementalJsonArrayParser:
+    """
+    Single-pass, tolerant parser for the JSON array a model was asked to return.
+
+    Text can be fed in chunks (e.g. streamed tokens); every object or nested
+    array at the top level of the first array is decoded on its own as soon as
+    its closing bracket arrives, so one malformed element is dropped instead
+    of failing the whole response. Prose before the array is skipped, and a
+    bare object or a sequence of objects without an enclosing array is
+    accepted too. An element still open when the text ends counts as dropped.
+    """
+
+    def __init__(self):
+        self._buf = ""
+        self._pos = 0
+        self._mode = "seek"  # seek -> array | objects -> done
+        self._depth = 0  # nesting inside the current element
+        self._start: Optional[int] = None  # buffer offset where the current element began
+        self._in_string = False
+        self._escape = False
+        self._array_rows = 0
+        self.rows: List[Any] = []
+        self.salvaged = 0
+        self.dropped = 0
+
+    @property
+    def done(self) -> bool:
+        return self._mode == "done"
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Consume more text; returns the elements completed by it"""
+        if self._mode == "done" or not chunk:
+            return []
+        self._buf += chunk
+        completed: List[Any] = []
+        buf = self._buf
+        pos = self._pos
+        end = len(buf)
+
+        while pos < end and self._mode != "done":
+            if self._escape:
+                self._escape = False
+                pos += 1
+                continue
+            if self._in_string:
+                match = _IN_STRING.search(buf, pos)
+                if match is None:
+                    pos = end
+                    break
+                pos = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                continue
+
+            match = _STRUCTURAL.search(buf, pos)
+            if match is None:
+                pos = end
+                break
+            i = match.start()
+            c = match.group()
+            pos = i + 1
+
+            if self._depth > 0:
+                if c == '"':
+                    self._in_string = True
+                elif c == "\\":
+                    self._escape = True
+                elif c in "{[":
+                    self._depth += 1
+                elif c in "}]":
+                    self._depth -= 1
+                    if self._depth == 0:
+                        self._finish(buf[self._start:pos], completed)
+                        self._start = None
+                continue
+
+            # Between elements
+            if self._mode == "seek":
+                if c == "[":
+                    self._mode = "array"
+                    self._array_rows = 0
+                elif c == "{":
+                    self._mode = "objects"
+                    self._open(i)
+            elif self._mode == "array":
+                if c in "{[":
+                    self._open(i)
+                elif c == '"':
+                    self._in_string = True  # scalar element; skip it so its brackets don't count
+                elif c == "]":
+                    # An array without objects (e.g. "[1]" in prose) is not the payload; keep looking
+                    self._mode = "done" if self._array_rows or self.dropped else "seek"
+            elif self._mode == "objects":
+                if c == "{":
+                    self._open(i)
+
+        self._pos = pos
+        # Drop consumed text, keeping the element in progress
+        keep_from = self._start if self._start is not None else self._pos
+        if keep_from:
+            self._buf = self._buf[keep_from:]
+            self._pos -= keep_from
+            if self._start is not None:
+                self._start = 0
+        return completed
+
+    def _open(self, index: int) -> None:
+        self._start = index
+        self._depth = 1
+
+    def _finish(self, fragment: str, completed: List[Any]) -> None:
+        value = decode_fragment(fragment)
+        if value is None:
+            self.dropped += 1
+            return
+        self._array_rows += 1
+        self.salvaged += 1
+        self.rows.append(value)
+        completed.append(value)
+
+    def close(self) -> ParsedRows:
+        """Finish parsing; an element left open (truncated output) is dropped"""
+        if self._start is not None:
+            self.dropped += 1
+            self._start = None
+        self._mode = "done"
+        return ParsedRows(self.rows, self.salvaged, self.dropped)
+
+
+def salvage_json_array(text: str) -> ParsedRows:
+    """Every well-formed element of the (possibly broken) JSON array in ``text``"""
+    parser = IncrementalJsonArrayParser()
+    parser.feed(text)
+    return parser.close()
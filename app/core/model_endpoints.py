@@ -247,9 +247,8 @@ async def _probe_bedrock(model_id: str, runtime) -> Tuple[str, bool]:
                                   model_params=_MIN_PARAMS)
     try:
         await asyncio.wait_for(
-            asyncio.to_thread(handler.generate_response,
-                              "Return HEALTHY if you can process this message.",
-                              False),
+            handler.agenerate_response("Return HEALTHY if you can process this message.",
+                                       False),
             timeout=5
         )
         return model_id, True
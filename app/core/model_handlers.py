@@ -1,22 +1,45 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Callable, Optional, Tuple
 import json
 import time
+import asyncio
+import inspect
+import threading
+from contextlib import AsyncExitStack
 import boto3
 from botocore.exceptions import ClientError, ConnectionClosedError, EndpointConnectionError
 from urllib3.exceptions import ProtocolError
-import ast
 import re
-from app.core.config import get_model_family, MODEL_CONFIGS
+from app.core.config import get_model_family, MODEL_CONFIGS, RESPONSE_CACHE_CONFIG
 from app.models.request_models import ModelParameters
-from openai import OpenAI
+from app.core.client_registry import client_registry
+from app.core.adaptive_concurrency import get_limiter
+from app.core.endpoint_pool import get_endpoint_pool, is_endpoint_failure
+from app.core.rate_limiter import rate_limiter, estimate_tokens
+from app.core.response_cache import response_cache
 from app.core.exceptions import APIError, InvalidModelError, ModelHandlerError, JSONParsingError
+from app.core.json_stream import IncrementalJsonArrayParser, ParsedRows, UnparsedOutput, salvage_json_array
+from app.core.prompt_caching import (
+    bedrock_cache_point,
+    disable_bedrock_cache_point,
+    gemini_context_cache,
+    has_bedrock_cache_point,
+    is_cache_point_rejection,
+    record_bedrock_usage,
+    record_gemini_usage,
+    record_openai_usage,
+)
 from app.core.telemetry_integration import track_llm_operation
 from app.core.config import  _get_caii_token
 import os
 from dotenv import load_dotenv
 load_dotenv() 
 import google.generativeai as genai 
+try:
+    from aiobotocore.session import get_session as get_aio_session
+except ImportError:  # optional: Bedrock async calls fall back to a worker thread
+    get_aio_session = None
 
+BEDROCK_RETRYABLE_ERRORS = (ClientError, ConnectionClosedError, EndpointConnectionError, ProtocolError)
 
 
 class UnifiedModelHandler:
@@ -28,7 +51,7 @@ class UnifiedModelHandler:
     
     GEMINI_TIMEOUT = 3600.0  # 1 hour timeout for Gemini
     
-    def __init__(self, model_id: str, bedrock_client=None, model_params: Optional[ModelParameters] = None, inference_type = "aws_bedrock", caii_endpoint:Optional[str]=None, custom_p = False):
+    def __init__(self, model_id: str, bedrock_client=None, model_params: Optional[ModelParameters] = None, inference_type = "aws_bedrock", caii_endpoint:Optional[str]=None, custom_p = False, cache_sampled: bool = False, caii_endpoints: Optional[List[str]] = None):
         """
         Initialize the model handler
         
@@ -36,6 +59,8 @@ class UnifiedModelHandler:
             model_id: The ID of the model to use
             bedrock_client: Optional pre-configured Bedrock client
             model_params: Optional model parameters
+            cache_sampled: Use the response cache even when temperature > 0
+            caii_endpoints: Optional replicas of caii_endpoint to balance calls across
         """
         self.model_id = model_id
         self.bedrock_client = bedrock_client or boto3.client('bedrock-runtime')
@@ -44,6 +69,13 @@ class UnifiedModelHandler:
         self.inference_type = inference_type
         self.caii_endpoint = caii_endpoint
         self.custom_p = custom_p
+        self.cache_sampled = cache_sampled
+
+        # Replicas of a CAII / OpenAI-compatible model share one process-wide pool
+        endpoints = list(dict.fromkeys(e for e in [caii_endpoint, *(caii_endpoints or [])] if e))
+        self.endpoint_pool = None
+        if inference_type in ("CAII", "openai_compatible") and len(endpoints) > 1:
+            self.endpoint_pool = get_endpoint_pool(inference_type, endpoints)
         
         # AWS Step Functions style retry config
         self.MAX_RETRIES = 2
@@ -54,15 +86,32 @@ class UnifiedModelHandler:
         self.CONNECT_TIMEOUT = 5  # 5 seconds connect timeout
         self.READ_TIMEOUT = 3600  # 1 hour read timeout (same as AWS Bedrock)
 
+        # Lazily opened aiobotocore client used by agenerate_response
+        self._async_bedrock_client = None
+        self._async_bedrock_stack = None
+        self._async_bedrock_loop = None
+
+        # AIMD limiter shared by every handler calling this provider/model
+        self.limiter = get_limiter(inference_type, model_id)
+
     def _exponential_backoff(self, retry_count: int) -> None:
         """AWS Step Functions style backoff: 3s -> 4.5s -> 6.75s"""
         delay = self.BASE_DELAY * (self.MULTIPLIER ** retry_count)
         time.sleep(delay)
 
+    async def _aexponential_backoff(self, retry_count: int) -> None:
+        """Non-blocking variant of ``_exponential_backoff``"""
+        delay = self.BASE_DELAY * (self.MULTIPLIER ** retry_count)
+        await asyncio.sleep(delay)
+
     def _extract_json_from_text(self, text: str) -> List[Dict[str, Any]]:
         """
         Extract JSON array from text response with robust parsing.
         Handles both QA pairs and evaluation responses.
+
+        Well-formed output is decoded directly; otherwise a single tolerant pass
+        recovers every well-formed element of a partly broken array. The result
+        is a ``ParsedRows`` list carrying ``salvaged``/``dropped`` counts.
         
         Args:
             text: The text to parse
@@ -80,57 +129,23 @@ class UnifiedModelHandler:
                 except:
                     return []
 
-            # First attempt: Try direct JSON parsing of the entire text
+            # Fast path: the entire text is valid JSON
             try:
                 parsed = json.loads(text)
                 if isinstance(parsed, list):
-                    return parsed
+                    return ParsedRows(parsed, salvaged=len(parsed))
                 elif isinstance(parsed, dict):
-                    return [parsed]
+                    return ParsedRows([parsed], salvaged=1)
                 return []
             except json.JSONDecodeError:
-                # Continue with other parsing methods if direct parsing fails
                 pass
 
-            # Find JSON array boundaries
-            start_idx = text.find('[')
-            end_idx = text.rfind(']') + 1
-
-            if start_idx != -1 and end_idx != -1:
-                json_text = text[start_idx:end_idx]
-                
-                # Multiple parsing attempts
-                try:
-                    # Try parsing the extracted JSON
-                    parsed = json.loads(json_text)
-                    if isinstance(parsed, list):
-                        return parsed
-                    elif isinstance(parsed, dict):
-                        return [parsed]
-                except json.JSONDecodeError:
-                    try:
-                        # Try using ast.literal_eval
-                        parsed = ast.literal_eval(json_text)
-                        if isinstance(parsed, list):
-                            return parsed
-                        elif isinstance(parsed, dict):
-                            return [parsed]
-                    except (SyntaxError, ValueError):
-                        # Try cleaning the text
-                        cleaned = (json_text
-                                .replace('\n', ' ')
-                                .replace('\\n', ' ')
-                                .replace("'", '"')
-                                .replace('\t', ' ')
-                                .strip())
-                        try:
-                            parsed = json.loads(cleaned)
-                            if isinstance(parsed, list):
-                                return parsed
-                            elif isinstance(parsed, dict):
-                                return [parsed]
-                        except json.JSONDecodeError:
-                            pass
+            # One pass over the text, keeping every element that decodes on its own
+            rows = salvage_json_array(text)
+            if rows.dropped:
+                print(f"Recovered {rows.salvaged} objects from malformed JSON, dropped {rows.dropped}")
+            if rows:
+                return rows
 
             # If JSON parsing fails, try regex patterns for both formats
             results = []
@@ -158,8 +173,12 @@ class UnifiedModelHandler:
             if results:
                 return results
 
+            if rows.dropped:
+                # A JSON array was there but nothing in it could be saved
+                return rows
+
             # If all parsing attempts fail, return the original text wrapped in a list
-            return [{"text": text}]
+            return UnparsedOutput([{"text": text}])
 
         except Exception as e:
             print(f"ERROR: JSON extraction failed: {str(e)}")
@@ -167,6 +186,30 @@ class UnifiedModelHandler:
             return []
 
 
+    def _response_cache_key(self, prompt: str) -> Optional[str]:
+        """Cache key for this call, or None when the response cache should be bypassed"""
+        if not RESPONSE_CACHE_CONFIG["enabled"]:
+            return None
+        if self.model_params.temperature > 0 and not self.cache_sampled:
+            return None
+        return response_cache.make_key(
+            model_id=self.model_id,
+            inference_type=self.inference_type,
+            caii_endpoint=self.caii_endpoint,
+            custom_p=self.custom_p,
+            model_params=self.model_params.model_dump(),
+            prompt=prompt,
+        )
+
+    @staticmethod
+    def _cacheable(response) -> bool:
+        """Empty responses and output that held no JSON are not worth replaying"""
+        return bool(response) and not isinstance(response, UnparsedOutput)
+
+    def _calls_in_thread(self) -> bool:
+        """Whether async calls fall back to the blocking Bedrock client on a worker thread"""
+        return self.inference_type == "aws_bedrock" and get_aio_session is None and self._async_bedrock_client is None
+
     #@track_llm_operation("generate")
     def generate_response(
         self,
@@ -174,6 +217,18 @@ class UnifiedModelHandler:
         retry_with_reduced_tokens: bool = True,
         request_id: Optional[str] = None,
     ):
+        cache_key = self._response_cache_key(prompt)
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        response = self._dispatch_request(prompt, retry_with_reduced_tokens)
+        if cache_key and self._cacheable(response):
+            response_cache.put(cache_key, response)
+        return response
+
+    def _dispatch_request(self, prompt: str, retry_with_reduced_tokens: bool):
         if self.inference_type == "aws_bedrock":
             return self._handle_bedrock_request(prompt, retry_with_reduced_tokens)
         if self.inference_type == "CAII":
@@ -186,106 +241,170 @@ class UnifiedModelHandler:
             return self._handle_gemini_request(prompt)
         raise ModelHandlerError(f"Unsupported inference_type={self.inference_type}", 400)
 
+    async def agenerate_response(
+        self,
+        prompt: str,
+        retry_with_reduced_tokens: bool = True,
+        request_id: Optional[str] = None,
+    ):
+        """
+        Async counterpart of ``generate_response``.
+
+        Uses the providers' native async clients so callers can keep many
+        requests in flight on one event loop instead of one thread per request.
+        """
+        cache_key = self._response_cache_key(prompt)
+        if cache_key:
+            cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                return cached
+
+        response = await self._adispatch_request(prompt, retry_with_reduced_tokens)
+        if cache_key and self._cacheable(response):
+            await response_cache.aput(cache_key, response)
+        return response
+
+    async def _adispatch_request(self, prompt: str, retry_with_reduced_tokens: bool):
+        if self.inference_type == "aws_bedrock":
+            return await self._ahandle_bedrock_request(prompt, retry_with_reduced_tokens)
+        if self.inference_type == "CAII":
+            return await self._ahandle_caii_request(prompt)
+        if self.inference_type == "openai":
+            return await self._ahandle_openai_request(prompt)
+        if self.inference_type == "openai_compatible":
+            return await self._ahandle_openai_compatible_request(prompt)
+        if self.inference_type == "gemini":
+            return await self._ahandle_gemini_request(prompt)
+        raise ModelHandlerError(f"Unsupported inference_type={self.inference_type}", 400)
+
+    def _rate_limit_account(self, endpoint: Optional[str] = None) -> str:
+        """Provider account a call is billed against, for the shared RPM/TPM budgets"""
+        if self.inference_type == "aws_bedrock":
+            return str(getattr(self.bedrock_client.meta, "region_name", None) or "default")
+        if self.inference_type in ("CAII", "openai_compatible"):
+            return endpoint or self.caii_endpoint or "default"
+        return "default"
+
+    async def _areserve_rate_budget(self, prompt: str, max_tokens: Optional[int] = None, endpoint: Optional[str] = None):
+        """
+        Wait for RPM/TPM budget using an estimate. Use the reservation as a context
+        manager around the call (refunded if it fails) and settle it with the reported usage.
+        """
+        estimate = estimate_tokens(prompt, max_tokens or self.model_params.max_tokens)
+        return await rate_limiter.acquire(self.inference_type, self._rate_limit_account(endpoint), self.model_id, estimate)
+
+    def _bedrock_converse_kwargs(self, prompt: str, max_tokens_cap: int) -> Dict[str, Any]:
+        """Build the keyword arguments for a Bedrock ``converse`` call"""
+        cached = bedrock_cache_point(self.model_id, prompt)
+        if cached:
+            # Instructions and examples are cached; only the topic / row part is billed in full
+            content = [{"text": cached[0]}, {"cachePoint": {"type": "default"}}, {"text": cached[1]}]
+        else:
+            content = [{"text": prompt}]
+        conversation = [{
+            "role": "user",
+            "content": content
+        }]
+        inference_config = {
+            "maxTokens": min(self.model_params.max_tokens, max_tokens_cap),
+            "temperature": min(self.model_params.temperature, 1.0),
+            "topP": self.model_params.top_p,
+            "stopSequences": ["\n\nHuman:"] if "claude" in self.model_id else [],
+        }
+        kwargs = {
+            "modelId": self.model_id,
+            "messages": conversation,
+            "inferenceConfig": inference_config,
+        }
+        if "claude" in self.model_id:
+            kwargs["additionalModelRequestFields"] = {"top_k": self.model_params.top_k}
+        else:
+            print(inference_config)
+        return kwargs
+
+    def _parse_bedrock_response(self, response: Dict[str, Any]):
+        """Pull the generated text out of a ``converse`` response"""
+        record_bedrock_usage(self.model_id, response.get("usage"))
+        try:
+            response_text = response["output"]["message"]["content"][0]["text"]
+            return self._extract_json_from_text(response_text) if not self.custom_p else response_text
+        except KeyError as e:
+            print(f"Unexpected response format: {str(e)}")
+            print(f"Response structure: {response}")
+            raise ModelHandlerError(f"Unexpected response format: {str(e)}", status_code=500)
+
+    def _bedrock_retry_plan(self, e: Exception, retries: int, retry_with_reduced_tokens: bool,
+                            cache_point: bool = False) -> Tuple[bool, Optional[int]]:
+        """
+        Decide how to retry a failed Bedrock call; ``cache_point`` says whether it carried a cachePoint.
+
+        Returns:
+            Tuple of (reconnect, new max_tokens cap or None).
+
+        Raises:
+            InvalidModelError / ModelHandlerError when the error is not retryable.
+        """
+        error_message = str(e)
+
+        # Check for specific connection errors
+        if "Connection was closed" in error_message or \
+           "EndpointConnectionError" in error_message or \
+           "Connection reset by peer" in error_message:
+            if retries < self.MAX_RETRIES:
+                print(f"Retry {retries + 1}: Connection error, retrying after backoff...")
+                print(f"Error details: {error_message}")
+                return True, None
+
+        # Handle other AWS errors
+        if isinstance(e, ClientError):
+            error_code = e.response['Error']['Code']
+
+            if error_code == 'ValidationException':
+                if cache_point and is_cache_point_rejection(error_message):
+                    # The model doesn't take cache points after all; resend the plain prompt
+                    disable_bedrock_cache_point(self.model_id)
+                    if retries < self.MAX_RETRIES:
+                        return False, None
+                if 'model identifier is invalid' in error_message:
+                    raise InvalidModelError(self.model_id, error_message)
+                elif "on-demand throughput isn't supported" in error_message:
+                    raise InvalidModelError(self.model_id, error_message)
+
+                if retry_with_reduced_tokens and retries < 1:
+                    return False, 4096
+                if retry_with_reduced_tokens and retries == 1:
+                    print("trying with 2040 tokens")
+                    return False, 2048
+
+            elif error_code in ['ThrottlingException', 'ServiceUnavailableException']:
+                if retries < self.MAX_RETRIES:
+                    return False, None
+
+        raise ModelHandlerError(f"Bedrock API error: {error_message}", status_code=503)
+
     def _handle_bedrock_request(self, prompt: str, retry_with_reduced_tokens: bool):
         """Handle Bedrock requests with retry logic"""
         retries = 0
         last_exception = None
         new_max_tokens = 8192
         while retries <= self.MAX_RETRIES:  # Changed to <= to match AWS behavior
+            kwargs = {}
             try:
-                conversation = [{
-                    "role": "user",
-                    "content": [{"text": prompt}]
-                }]
-                additional_model_fields = {"top_k": self.model_params.top_k}
-                
-                if "claude" in self.model_id:
-                    inference_config = {
-                                "maxTokens": min(self.model_params.max_tokens, new_max_tokens),
-                                "temperature": min(self.model_params.temperature, 1.0),
-                                "topP": self.model_params.top_p,
-                                "stopSequences": ["\n\nHuman:"],
-                              
-                             }
-                    response = self.bedrock_client.converse(
-                        modelId=self.model_id,
-                        messages=conversation,
-                        inferenceConfig=inference_config,
-                        additionalModelRequestFields=additional_model_fields
-                    )
-                else:
-                    inference_config = {
-                                "maxTokens": min(self.model_params.max_tokens, new_max_tokens),
-                                "temperature": min(self.model_params.temperature, 1.0),
-                                "topP": self.model_params.top_p,
-                               "stopSequences": []
-                             }
-                    print(inference_config)
-                    response = self.bedrock_client.converse(
-                        modelId=self.model_id,
-                        messages=conversation,
-                        inferenceConfig=inference_config
-                       )
-                
-                try:
-                    response_text = response["output"]["message"]["content"][0]["text"]
-                    #print(response)
-                    return self._extract_json_from_text(response_text) if not self.custom_p else response_text
-                except KeyError as e:
-                    print(f"Unexpected response format: {str(e)}")
-                    print(f"Response structure: {response}")
-                    raise ModelHandlerError(f"Unexpected response format: {str(e)}", status_code=500)
-
-            except (ClientError, ConnectionClosedError, EndpointConnectionError, ProtocolError) as e:
-                        error_message = str(e)
-                        
-                        # Check for specific connection errors
-                        if "Connection was closed" in error_message or \
-                           "EndpointConnectionError" in error_message or \
-                           "Connection reset by peer" in error_message:
-                            if retries < self.MAX_RETRIES:
-                                print(f"Retry {retries + 1}: Connection error, retrying after backoff...")
-                                print(f"Error details: {error_message}")
-                                self._exponential_backoff(retries)
-                                retries += 1
-                                
-                                # Create a new client on connection errors
-                                self.bedrock_client = boto3.client(
-                                    service_name="bedrock-runtime",
-                                    config=self.bedrock_client.meta.config
-                                )
-                                continue
-                        
-                        # Handle other AWS errors
-                        if isinstance(e, ClientError):
-                            error_code = e.response['Error']['Code']
-                            
-                            if error_code == 'ValidationException':
-                                if 'model identifier is invalid' in error_message:
-                                    raise InvalidModelError(self.model_id,error_message )
-                                elif "on-demand throughput isn't supported" in error_message:
-                                    print("Hi")
-                                    raise InvalidModelError(self.model_id, error_message)
-                                
-                                if retry_with_reduced_tokens and retries<1:
-                                    new_max_tokens = 4096
-                                    self._exponential_backoff(retries)
-                                    retries += 1
-                                    continue
-                                if retry_with_reduced_tokens and retries==1 :
-                                    new_max_tokens = 2048
-                                    self._exponential_backoff(retries)
-                                    print("trying with 2040 tokens")
-                                    retries += 1
-                                    continue
-                                    
-                            elif error_code in ['ThrottlingException', 'ServiceUnavailableException']:
-                                if retries < self.MAX_RETRIES:
-                                    self._exponential_backoff(retries)
-                                    retries += 1
-                                    continue
-                        
-                        raise ModelHandlerError(f"Bedrock API error: {error_message}", status_code=503)
+                kwargs = self._bedrock_converse_kwargs(prompt, new_max_tokens)
+                response = self.bedrock_client.converse(**kwargs)
+                return self._parse_bedrock_response(response)
+
+            except BEDROCK_RETRYABLE_ERRORS as e:
+                reconnect, max_tokens_cap = self._bedrock_retry_plan(
+                    e, retries, retry_with_reduced_tokens, has_bedrock_cache_point(kwargs)
+                )
+                self._exponential_backoff(retries)
+                retries += 1
+                if max_tokens_cap:
+                    new_max_tokens = max_tokens_cap
+                if reconnect:
+                    self._reconnect_bedrock_client()
+                continue
 
             except Exception as e:
                 last_exception = e
@@ -303,108 +422,309 @@ class UnifiedModelHandler:
                 raise last_exception
             raise ModelHandlerError(f"Failed after {self.MAX_RETRIES} retries: {str(last_exception)}", status_code=500)
 
+    def _reconnect_bedrock_client(self) -> None:
+        """Create a new client on connection errors"""
+        self.bedrock_client = boto3.client(
+            service_name="bedrock-runtime",
+            config=self.bedrock_client.meta.config,
+            endpoint_url=self.bedrock_client.meta.endpoint_url
+        )
 
-    # ---------- OpenAI -------------------------------------------------------
-    def _handle_openai_request(self, prompt: str):
-        try:
-            import httpx
-            from openai import OpenAI
-            
-            # Configure timeout for OpenAI client (OpenAI v1.57.2)
-            timeout_config = httpx.Timeout(
-                connect=self.OPENAI_CONNECT_TIMEOUT,
-                read=self.OPENAI_READ_TIMEOUT,
-                write=10.0,
-                pool=5.0
-            )
-            
-            # Configure httpx client with certificate verification for private cloud
-            if os.path.exists("/etc/ssl/certs/ca-certificates.crt"):
-                http_client = httpx.Client(
-                    verify="/etc/ssl/certs/ca-certificates.crt",
-                    timeout=timeout_config
+    async def _get_async_bedrock_client(self):
+        """
+        Lazily open an aiobotocore ``bedrock-runtime`` client mirroring the region
+        and config of the synchronous client. Clients are bound to the event loop
+        they were created on, so a new one is opened when the loop changes.
+        """
+        loop = asyncio.get_running_loop()
+        if self._async_bedrock_client is not None and (
+            self._async_bedrock_stack is None or self._async_bedrock_loop is loop
+        ):
+            # Either a caller-supplied client or one opened on this loop
+            return self._async_bedrock_client
+
+        await self.aclose()
+        meta = getattr(self.bedrock_client, "meta", None)
+        client_kwargs = {"service_name": "bedrock-runtime"}
+        if meta is not None:
+            client_kwargs["region_name"] = getattr(meta, "region_name", None)
+            client_kwargs["config"] = getattr(meta, "config", None)
+            client_kwargs["endpoint_url"] = getattr(meta, "endpoint_url", None)
+
+        exit_stack = AsyncExitStack()
+        self._async_bedrock_client = await exit_stack.enter_async_context(
+            get_aio_session().create_client(**client_kwargs)
+        )
+        self._async_bedrock_stack = exit_stack
+        self._async_bedrock_loop = loop
+        return self._async_bedrock_client
+
+    async def _ahandle_bedrock_request(self, prompt: str, retry_with_reduced_tokens: bool):
+        """
+        Async twin of ``_handle_bedrock_request`` built on aiobotocore.
+
+        Without aiobotocore each ``converse`` attempt runs the blocking client on a
+        worker thread. Either way one attempt holds one limiter slot, and retries and
+        backoff happen here, so the limiter sees every throttle.
+        """
+        in_thread = self._calls_in_thread()
+        retries = 0
+        last_exception = None
+        new_max_tokens = 8192
+        while retries <= self.MAX_RETRIES:
+            kwargs = {}
+            try:
+                client = None if in_thread else await self._get_async_bedrock_client()
+                kwargs = self._bedrock_converse_kwargs(prompt, new_max_tokens)
+                reservation = await self._areserve_rate_budget(prompt, min(self.model_params.max_tokens, new_max_tokens))
+                with reservation:
+                    async with self.limiter.slot():
+                        if client is None:
+                            response = await asyncio.to_thread(self.bedrock_client.converse, **kwargs)
+                        else:
+                            response = await client.converse(**kwargs)
+                    reservation.settle(response.get("usage", {}).get("totalTokens"))
+                return self._parse_bedrock_response(response)
+
+            except BEDROCK_RETRYABLE_ERRORS as e:
+                reconnect, max_tokens_cap = self._bedrock_retry_plan(
+                    e, retries, retry_with_reduced_tokens, has_bedrock_cache_point(kwargs)
                 )
-            else:
-                http_client = httpx.Client(timeout=timeout_config)
-            
-            client = OpenAI(
-                api_key=os.getenv('OPENAI_API_KEY'),
-                http_client=http_client
-            )
-            completion = client.chat.completions.create(
-                model=self.model_id,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=self.model_params.max_tokens,
-                temperature=self.model_params.temperature,
-                top_p=self.model_params.top_p,
-                stream=False,
-            )
-            text = completion.choices[0].message.content
-            return self._extract_json_from_text(text) if not self.custom_p else text
-        except Exception as e:
-            raise ModelHandlerError(f"OpenAI request failed: {e}", 500)
+                await self._aexponential_backoff(retries)
+                retries += 1
+                if max_tokens_cap:
+                    new_max_tokens = max_tokens_cap
+                if reconnect:
+                    if in_thread:
+                        self._reconnect_bedrock_client()
+                    else:
+                        await self.aclose()
+                continue
 
-    # ---------- OpenAI Compatible -------------------------------------------------------
-    def _handle_openai_compatible_request(self, prompt: str):
-        """Handle OpenAI compatible endpoints with proper timeout configuration"""
+            except Exception as e:
+                last_exception = e
+                if retries < self.MAX_RETRIES:
+                    print(f"Retry {retries + 1}: Unexpected error, retrying after backoff...")
+                    print(f"Error details: {str(e)}")
+                    await self._aexponential_backoff(retries)
+                    retries += 1
+                    continue
+                break
+
+        if last_exception:
+            print(f"All {self.MAX_RETRIES} retries exhausted. Final error: {str(last_exception)}")
+            if isinstance(last_exception, (InvalidModelError, ModelHandlerError)):
+                raise last_exception
+            raise ModelHandlerError(f"Failed after {self.MAX_RETRIES} retries: {str(last_exception)}", status_code=500)
+
+    async def aclose(self) -> None:
+        """Close the async Bedrock client, if one was opened"""
+        stack = self._async_bedrock_stack
+        if stack is None:
+            return
+        self._async_bedrock_client = None
+        self._async_bedrock_stack = None
+        self._async_bedrock_loop = None
         try:
-            import httpx
-            from openai import OpenAI
-            
+            await stack.aclose()
+        except Exception as e:
+            print(f"Error closing async Bedrock client: {str(e)}")
+
+
+    # ---------- OpenAI-SDK clients (OpenAI, OpenAI compatible, CAII) ---------
+    # Clients come from the process-wide client_registry so keep-alive connections
+    # are reused across prompts, handler instances and threads.
+    def _openai_timeout(self):
+        import httpx
+        # Configure timeout for OpenAI client (OpenAI v1.57.2). The connection pool is
+        # shared process-wide, so wait for a free connection instead of failing fast.
+        return httpx.Timeout(
+            connect=self.OPENAI_CONNECT_TIMEOUT,
+            read=self.OPENAI_READ_TIMEOUT,
+            write=10.0,
+            pool=None
+        )
+
+    def _openai_client_args(self, endpoint: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Resolve ``api_key``/``base_url`` for the current OpenAI-SDK based inference type (or one of its replicas).
+
+        Raises on missing configuration; resolve the arguments before acquiring
+        a replica so such errors are never charged to the pool.
+        """
+        endpoint = endpoint or self.caii_endpoint
+        if self.inference_type == "openai":
+            return {"api_key": os.getenv('OPENAI_API_KEY')}
+
+        if self.inference_type == "openai_compatible":
             # Get API key from environment variable (only credential needed)
             api_key = os.getenv('OpenAI_Endpoint_Compatible_Key')
             if not api_key:
                 raise ModelHandlerError("OpenAI_Endpoint_Compatible_Key environment variable not set", 500)
-            
+
             # Base URL comes from caii_endpoint parameter (passed during initialization)
-            openai_compatible_endpoint = self.caii_endpoint
-            if not openai_compatible_endpoint:
+            if not endpoint:
                 raise ModelHandlerError("OpenAI compatible endpoint not provided", 500)
-            
-            # Configure timeout for OpenAI compatible client (same as OpenAI v1.57.2)
-            timeout_config = httpx.Timeout(
-                connect=self.OPENAI_CONNECT_TIMEOUT,
-                read=self.OPENAI_READ_TIMEOUT,
-                write=10.0,
-                pool=5.0
-            )
-            
-            # Configure httpx client with certificate verification for private cloud
-            if os.path.exists("/etc/ssl/certs/ca-certificates.crt"):
-                http_client = httpx.Client(
-                    verify="/etc/ssl/certs/ca-certificates.crt",
-                    timeout=timeout_config
-                )
-            else:
-                http_client = httpx.Client(timeout=timeout_config)
-            
             # Remove trailing '/chat/completions' if present (similar to CAII handling)
-            openai_compatible_endpoint = openai_compatible_endpoint.removesuffix('/chat/completions')
-            
-            client = OpenAI(
-                api_key=api_key,
-                base_url=openai_compatible_endpoint,
-                http_client=http_client
-            )
-            
-            completion = client.chat.completions.create(
-                model=self.model_id,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=self.model_params.max_tokens,
-                temperature=self.model_params.temperature,
-                top_p=self.model_params.top_p,
-                stream=False,
+            return {"api_key": api_key, "base_url": endpoint.removesuffix('/chat/completions')}
+
+        # CAII
+        return {"api_key": _get_caii_token(), "base_url": endpoint.removesuffix('/chat/completions')}
+
+    def _replica_client_args(self) -> Dict[str, Dict[str, Any]]:
+        """Client arguments of every replica in the pool, keyed by URL"""
+        args = self._openai_client_args()
+        return {url: {**args, "base_url": url.removesuffix('/chat/completions')} for url in self.endpoint_pool.urls}
+
+    def _openai_completion_kwargs(self, prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self.model_id,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": self.model_params.max_tokens,
+            "temperature": self.model_params.temperature,
+            "top_p": self.model_params.top_p,
+            "stream": False,
+        }
+
+    def _openai_sdk_request(self, prompt: str) -> str:
+        completion = self._openai_create(self._openai_completion_kwargs(prompt))
+        record_openai_usage(self.inference_type, self.model_id, getattr(completion, "usage", None))
+        return completion.choices[0].message.content
+
+    async def _aopenai_sdk_request(self, prompt: str) -> str:
+        completion = await self._aopenai_create(self._openai_completion_kwargs(prompt), prompt)
+        record_openai_usage(self.inference_type, self.model_id, getattr(completion, "usage", None))
+        return completion.choices[0].message.content
+
+    def _openai_create(self, kwargs: Dict[str, Any]):
+        """``chat.completions.create`` on the endpoint, failing over across replicas when there is a pool"""
+        if self.endpoint_pool is None:
+            client = client_registry.get_openai_client(
+                self.inference_type, timeout=self._openai_timeout(), **self._openai_client_args()
             )
-            
+            return client.chat.completions.create(**kwargs)
+
+        client_args = self._replica_client_args()
+        tried: List[str] = []
+        while True:
+            endpoint = self.endpoint_pool.acquire(exclude=tried)
+            start = time.monotonic()
+            try:
+                client = client_registry.get_openai_client(
+                    self.inference_type, timeout=self._openai_timeout(), **client_args[endpoint.url]
+                )
+                completion = client.chat.completions.create(**kwargs)
+            except Exception as e:
+                self.endpoint_pool.release(endpoint, error=e)
+                tried.append(endpoint.url)
+                if not is_endpoint_failure(e) or len(tried) >= len(self.endpoint_pool):
+                    raise
+                print(f"Endpoint {endpoint.url} failed, retrying on another replica: {str(e)}")
+                continue
+            self.endpoint_pool.release(endpoint, latency=time.monotonic() - start)
+            return completion
+
+    async def _aopenai_call(self, kwargs: Dict[str, Any], prompt: str, client_args: Dict[str, Any],
+                            endpoint: Optional[str] = None):
+        """One ``chat.completions.create`` call, charged to the rate budget of the endpoint serving it"""
+        client = await client_registry.get_async_openai_client(
+            self.inference_type, timeout=self._openai_timeout(), **client_args
+        )
+        reservation = await self._areserve_rate_budget(prompt, endpoint=endpoint)
+        with reservation:
+            async with self.limiter.slot():
+                completion = await client.chat.completions.create(**kwargs)
+            reservation.settle(getattr(getattr(completion, "usage", None), "total_tokens", None))
+        return completion
+
+    async def _aopenai_create(self, kwargs: Dict[str, Any], prompt: str):
+        """Async ``_openai_create``"""
+        if self.endpoint_pool is None:
+            return await self._aopenai_call(kwargs, prompt, self._openai_client_args())
+
+        client_args = self._replica_client_args()
+        tried: List[str] = []
+        while True:
+            endpoint = self.endpoint_pool.acquire(exclude=tried)
+            start = time.monotonic()
+            try:
+                completion = await self._aopenai_call(kwargs, prompt, client_args[endpoint.url], endpoint.url)
+            except asyncio.CancelledError:
+                self.endpoint_pool.release(endpoint, cancelled=True)
+                raise
+            except Exception as e:
+                self.endpoint_pool.release(endpoint, error=e)
+                tried.append(endpoint.url)
+                if not is_endpoint_failure(e) or len(tried) >= len(self.endpoint_pool):
+                    raise
+                print(f"Endpoint {endpoint.url} failed, retrying on another replica: {str(e)}")
+                continue
+            self.endpoint_pool.release(endpoint, latency=time.monotonic() - start)
+            return completion
+
+    # ---------- OpenAI -------------------------------------------------------
+    def _handle_openai_request(self, prompt: str):
+        try:
+            text = self._openai_sdk_request(prompt)
+            return self._extract_json_from_text(text) if not self.custom_p else text
+        except Exception as e:
+            raise ModelHandlerError(f"OpenAI request failed: {e}", 500)
+
+    async def _ahandle_openai_request(self, prompt: str):
+        try:
+            text = await self._aopenai_sdk_request(prompt)
+            return self._extract_json_from_text(text) if not self.custom_p else text
+        except Exception as e:
+            raise ModelHandlerError(f"OpenAI request failed: {e}", 500)
+
+    # ---------- OpenAI Compatible -------------------------------------------------------
+    def _handle_openai_compatible_request(self, prompt: str):
+        """Handle OpenAI compatible endpoints with proper timeout configuration"""
+        try:
+            response_text = self._openai_sdk_request(prompt)
+            print("generated via OpenAI Compatible endpoint")
+            return self._extract_json_from_text(response_text) if not self.custom_p else response_text
+        except Exception as e:
+            raise ModelHandlerError(f"OpenAI Compatible request failed: {str(e)}", status_code=500)
+
+    async def _ahandle_openai_compatible_request(self, prompt: str):
+        try:
+            response_text = await self._aopenai_sdk_request(prompt)
             print("generated via OpenAI Compatible endpoint")
-            response_text = completion.choices[0].message.content
-            
             return self._extract_json_from_text(response_text) if not self.custom_p else response_text
-            
         except Exception as e:
             raise ModelHandlerError(f"OpenAI Compatible request failed: {str(e)}", status_code=500)
 
     # ---------- Gemini -------------------------------------------------------
+    def _gemini_model(self, prompt: str):
+        """Model and contents for a call; a long stable prefix is served from a cached content"""
+        cached = gemini_context_cache.eligible(prompt)
+        if cached:
+            cached_content = gemini_context_cache.get(self.model_id, cached[0])
+            if cached_content is not None:
+                return genai.GenerativeModel.from_cached_content(cached_content), cached[1]
+        return genai.GenerativeModel(self.model_id), str(prompt)  # e.g. 'gemini-1.5-pro-latest'
+
+    async def _agemini_model(self, prompt: str):
+        if gemini_context_cache.eligible(prompt):
+            # Looking up or creating the cached content is a blocking call
+            return await asyncio.to_thread(self._gemini_model, prompt)
+        return self._gemini_model(prompt)
+
+    def _gemini_request_args(self):
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        kwargs = {
+            "generation_config": {
+                "max_output_tokens": self.model_params.max_tokens,
+                "temperature": self.model_params.temperature,
+                "top_p": self.model_params.top_p,
+            },
+            "request_options": {
+                "timeout": self.GEMINI_TIMEOUT  # Use the dedicated Gemini timeout constant
+            }
+        }
+        return kwargs
+
     def _handle_gemini_request(self, prompt: str):
         if genai is None:
             raise ModelHandlerError(
@@ -412,78 +732,295 @@ class UnifiedModelHandler:
                 500,
             )
         try:
-            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-            model = genai.GenerativeModel(self.model_id)  # e.g. 'gemini-1.5-pro-latest'
-            resp = model.generate_content(
-                prompt,
-                generation_config={
-                    "max_output_tokens": self.model_params.max_tokens,
-                    "temperature": self.model_params.temperature,
-                    "top_p": self.model_params.top_p,
-                },
-                request_options={
-                    "timeout": self.GEMINI_TIMEOUT  # Use the dedicated Gemini timeout constant
-                }
-            )
+            kwargs = self._gemini_request_args()
+            model, contents = self._gemini_model(prompt)
+            resp = model.generate_content(contents, **kwargs)
+            record_gemini_usage(self.model_id, getattr(resp, "usage_metadata", None))
             text = resp.text
             return self._extract_json_from_text(text) if not self.custom_p else text
         except Exception as e:
             raise ModelHandlerError(f"Gemini request failed: {e}", 500)
 
+    async def _ahandle_gemini_request(self, prompt: str):
+        if genai is None:
+            raise ModelHandlerError(
+                "google-generativeai library not installed — `pip install google-generativeai`",
+                500,
+            )
+        try:
+            kwargs = self._gemini_request_args()
+            model, contents = await self._agemini_model(prompt)
+            reservation = await self._areserve_rate_budget(prompt)
+            with reservation:
+                async with self.limiter.slot():
+                    resp = await model.generate_content_async(contents, **kwargs)
+                reservation.settle(getattr(getattr(resp, "usage_metadata", None), "total_token_count", None))
+            record_gemini_usage(self.model_id, getattr(resp, "usage_metadata", None))
+            text = resp.text
+            return self._extract_json_from_text(text) if not self.custom_p else text
+        except Exception as e:
+            raise ModelHandlerError(f"Gemini request failed: {e}", 500)
 
+    # ---------- CAII -------------------------------------------------------
     def _handle_caii_request(self, prompt: str):
         """CAII implementation with proper timeout configuration (uses OpenAI SDK)"""
         try:
-            import httpx
-            from openai import OpenAI
-            
-            API_KEY = _get_caii_token()
-            MODEL_ID = self.model_id
-            caii_endpoint = self.caii_endpoint
-            
-            caii_endpoint = caii_endpoint.removesuffix('/chat/completions')
-            
-            # Configure timeout for CAII client (same as OpenAI since it uses OpenAI SDK v1.57.2)
-            timeout_config = httpx.Timeout(
-                connect=self.OPENAI_CONNECT_TIMEOUT,
-                read=self.OPENAI_READ_TIMEOUT,
-                write=10.0,
-                pool=5.0
-            )
-            
-            # Configure httpx client with certificate verification for private cloud
-            if os.path.exists("/etc/ssl/certs/ca-certificates.crt"):
-                http_client = httpx.Client(
-                    verify="/etc/ssl/certs/ca-certificates.crt",
-                    timeout=timeout_config
-                )
-            else:
-                http_client = httpx.Client(timeout=timeout_config)
-            
-            client_ca = OpenAI(
-                base_url=caii_endpoint,
-                api_key=API_KEY,
-                http_client=http_client
-            )
-
-            completion = client_ca.chat.completions.create(
-                model=MODEL_ID,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.model_params.temperature,
-                top_p=self.model_params.top_p,
-                max_tokens=self.model_params.max_tokens,
-                stream=False
-            )
+            response_text = self._openai_sdk_request(prompt)
+            print("generated via CAII")
+            return self._extract_json_from_text(response_text) if not self.custom_p else response_text
+        except Exception as e:
+            raise ModelHandlerError(f"CAII request failed: {str(e)}", status_code=500)
 
+    async def _ahandle_caii_request(self, prompt: str):
+        try:
+            response_text = await self._aopenai_sdk_request(prompt)
             print("generated via CAII")
-            response_text = completion.choices[0].message.content
-            
             return self._extract_json_from_text(response_text) if not self.custom_p else response_text
-            
         except Exception as e:
             raise ModelHandlerError(f"CAII request failed: {str(e)}", status_code=500)
 
-def create_handler(model_id: str, bedrock_client=None, model_params: Optional[ModelParameters] = None, inference_type:Optional[str] = "aws_bedrock", caii_endpoint:Optional[str]=None, custom_p = False) -> UnifiedModelHandler:
+    # ---------- Streaming ----------------------------------------------------
+    async def astream_rows(
+        self,
+        prompt: str,
+        on_row: Callable[[Any], bool],
+        request_id: Optional[str] = None,
+    ):
+        """
+        Generate with a streamed completion, handing every row of the returned JSON
+        array to ``on_row`` as soon as its closing bracket arrives.
+
+        ``on_row`` returns False once the caller has all the rows it needs; the
+        stream is then closed so the model stops producing (and billing) tokens.
+        A stream that fails before its first row is retried as a regular request.
+
+        Returns:
+            Every row parsed from the output, with ``salvaged``/``dropped`` counts
+        """
+        if self.custom_p:
+            response = await self.agenerate_response(prompt, request_id=request_id)
+            self._feed_rows(response, on_row)
+            return response
+
+        cache_key = self._response_cache_key(prompt)
+        if cache_key:
+            cached = await response_cache.aget(cache_key)
+            if cached is not None:
+                self._feed_rows(cached, on_row)
+                return cached
+
+        parser = IncrementalJsonArrayParser()
+        received: List[str] = []
+        emitted = 0
+        stopped = False
+
+        def consume(text: str) -> bool:
+            nonlocal emitted, stopped
+            received.append(text)
+            for row in parser.feed(text):
+                emitted += 1
+                if on_row(row) is False:
+                    stopped = True
+                    return False
+            return not parser.done
+
+        try:
+            await self._astream_dispatch(prompt, consume)
+        except Exception as e:
+            if emitted:
+                raise ModelHandlerError(f"Streaming request failed after {emitted} rows: {e}", status_code=500)
+            print(f"Streaming request failed, retrying without streaming: {str(e)}")
+            response = await self._adispatch_request(prompt, True)
+            self._feed_rows(response, on_row)
+            return response
+
+        rows = parser.close()
+        if stopped:
+            print(f"Stream closed early after {emitted} rows")
+            return rows
+        if not rows:
+            # Not a JSON array after all: let the regular extraction have a go at the text
+            rows = self._extract_json_from_text("".join(received))
+            self._feed_rows(rows, on_row)
+        elif rows.dropped:
+            print(f"Recovered {len(rows)} rows from malformed JSON, dropped {rows.dropped}")
+        if cache_key and self._cacheable(rows):
+            await response_cache.aput(cache_key, rows)
+        return rows
+
+    @staticmethod
+    def _feed_rows(rows, on_row: Callable[[Any], bool]) -> None:
+        """Hand rows of a non-streamed response to ``on_row`` until it asks to stop"""
+        if not isinstance(rows, list):
+            return
+        for row in rows:
+            if on_row(row) is False:
+                break
+
+    async def _astream_dispatch(self, prompt: str, consume: Callable[[str], bool]) -> None:
+        if self.inference_type == "aws_bedrock":
+            if self._calls_in_thread():
+                return await self._astream_bedrock_in_thread(prompt, consume)
+            return await self._astream_bedrock(prompt, consume)
+        if self.inference_type in ("CAII", "openai", "openai_compatible"):
+            return await self._astream_openai_sdk(prompt, consume)
+        if self.inference_type == "gemini":
+            return await self._astream_gemini(prompt, consume)
+        raise ModelHandlerError(f"Unsupported inference_type={self.inference_type}", 400)
+
+    async def _astream_openai_sdk(self, prompt: str, consume: Callable[[str], bool]) -> None:
+        # A stream stays on one replica; astream_rows retries a failed one as a regular (balanced) request
+        if self.endpoint_pool is not None:
+            replica_args = self._replica_client_args()
+            endpoint = self.endpoint_pool.acquire()
+            client_args = replica_args[endpoint.url]
+        else:
+            endpoint, client_args = None, self._openai_client_args()
+        try:
+            client = await client_registry.get_async_openai_client(
+                self.inference_type, timeout=self._openai_timeout(), **client_args
+            )
+            kwargs = {**self._openai_completion_kwargs(prompt), "stream": True}
+            if self.inference_type == "openai":
+                # Compatible servers don't all accept stream_options
+                kwargs["stream_options"] = {"include_usage": True}
+            reservation = await self._areserve_rate_budget(prompt, endpoint=endpoint.url if endpoint else None)
+            total_tokens = None
+            with reservation:
+                async with self.limiter.slot():
+                    stream = await client.chat.completions.create(**kwargs)
+                    try:
+                        async for chunk in stream:
+                            if getattr(chunk, "usage", None) is not None:
+                                total_tokens = chunk.usage.total_tokens
+                                record_openai_usage(self.inference_type, self.model_id, chunk.usage)
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                if not consume(chunk.choices[0].delta.content):
+                                    break
+                    finally:
+                        await stream.close()
+                reservation.settle(total_tokens)
+        except asyncio.CancelledError:
+            if endpoint is not None:
+                self.endpoint_pool.release(endpoint, cancelled=True)
+            raise
+        except Exception as e:
+            if endpoint is not None:
+                self.endpoint_pool.release(endpoint, error=e)
+            raise
+        if endpoint is not None:
+            self.endpoint_pool.release(endpoint)
+
+    async def _astream_gemini(self, prompt: str, consume: Callable[[str], bool]) -> None:
+        if genai is None:
+            raise ModelHandlerError(
+                "google-generativeai library not installed — `pip install google-generativeai`",
+                500,
+            )
+        kwargs = self._gemini_request_args()
+        model, contents = await self._agemini_model(prompt)
+        reservation = await self._areserve_rate_budget(prompt)
+        total_tokens = None
+        last_usage = None
+        with reservation:
+            async with self.limiter.slot():
+                resp = await model.generate_content_async(contents, stream=True, **kwargs)
+                async for chunk in resp:
+                    usage = getattr(chunk, "usage_metadata", None)
+                    if usage is not None:
+                        total_tokens = getattr(usage, "total_token_count", None) or total_tokens
+                        last_usage = usage
+                    try:
+                        text = chunk.text
+                    except ValueError:  # chunk without text parts, e.g. a safety stop
+                        continue
+                    if text and not consume(text):
+                        break
+            reservation.settle(total_tokens)
+        record_gemini_usage(self.model_id, last_usage)
+
+    @staticmethod
+    def _bedrock_stream_event(event: Dict[str, Any], usage: Dict[str, Any]) -> Optional[str]:
+        """Text delta of one ``converse_stream`` event; usage totals are collected into ``usage``"""
+        if "metadata" in event:
+            usage.update(event["metadata"].get("usage", {}))
+        return event.get("contentBlockDelta", {}).get("delta", {}).get("text")
+
+    async def _astream_bedrock(self, prompt: str, consume: Callable[[str], bool]) -> None:
+        client = await self._get_async_bedrock_client()
+        usage: Dict[str, Any] = {}
+        reservation = await self._areserve_rate_budget(prompt, min(self.model_params.max_tokens, 8192))
+        with reservation:
+            async with self.limiter.slot():
+                response = await client.converse_stream(**self._bedrock_converse_kwargs(prompt, 8192))
+                stream = response["stream"]
+                try:
+                    async for event in stream:
+                        text = self._bedrock_stream_event(event, usage)
+                        if text and not consume(text):
+                            break
+                finally:
+                    close = getattr(stream, "close", None)
+                    if close is not None:
+                        result = close()
+                        if inspect.isawaitable(result):
+                            await result
+            reservation.settle(usage.get("totalTokens"))
+        record_bedrock_usage(self.model_id, usage)
+
+    async def _astream_bedrock_in_thread(self, prompt: str, consume: Callable[[str], bool]) -> None:
+        """
+        ``converse_stream`` on the blocking client without aiobotocore: a worker thread
+        reads the event stream and passes text to the event loop, where ``consume`` runs.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        usage: Dict[str, Any] = {}
+
+        def publish(item) -> None:
+            try:
+                loop.call_soon_threadsafe(chunks.put_nowait, item)
+            except RuntimeError:  # event loop already closed
+                pass
+
+        def produce() -> None:
+            try:
+                response = self.bedrock_client.converse_stream(**self._bedrock_converse_kwargs(prompt, 8192))
+                stream = response["stream"]
+                try:
+                    for event in stream:
+                        if stop.is_set():
+                            break
+                        text = self._bedrock_stream_event(event, usage)
+                        if text:
+                            publish(text)
+                finally:
+                    stream.close()
+                publish(None)
+            except Exception as e:
+                publish(e)
+
+        reservation = await self._areserve_rate_budget(prompt, min(self.model_params.max_tokens, 8192))
+        with reservation:
+            async with self.limiter.slot():
+                loop.run_in_executor(None, produce)
+                try:
+                    while True:
+                        item = await chunks.get()
+                        if item is None:
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        if not consume(item):
+                            break
+                finally:
+                    # The worker closes the stream at its next event
+                    stop.set()
+            reservation.settle(usage.get("totalTokens"))
+        record_bedrock_usage(self.model_id, usage)
+
+def create_handler(model_id: str, bedrock_client=None, model_params: Optional[ModelParameters] = None, inference_type:Optional[str] = "aws_bedrock", caii_endpoint:Optional[str]=None, custom_p = False, cache_sampled: bool = False, caii_endpoints: Optional[List[str]] = None) -> UnifiedModelHandler:
     """
     Factory function to create model handler
     
@@ -491,8 +1028,9 @@ def create_handler(model_id: str, bedrock_client=None, model_params: Optional[Mo
         model_id: The ID of the model to use
         bedrock_client: Optional pre-configured Bedrock client
         model_params: Optional model parameters
+        caii_endpoints: Optional replicas of caii_endpoint to balance calls across
         
     Returns:
         UnifiedModelHandler instance
     """
-    return UnifiedModelHandler(model_id, bedrock_client, model_params, inference_type, caii_endpoint, custom_p)
\ No newline at end of file
+    return UnifiedModelHandler(model_id, bedrock_client, model_params, inference_type, caii_endpoint, custom_p, cache_sampled, caii_endpoints)
\ No newline at end of file
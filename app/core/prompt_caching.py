@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import PROMPT_CACHE_CONFIG
+from app.core.rate_limiter import CHARS_PER_TOKEN
+
+logger = logging.getLogger("prompt_caching")
+
+
+class CacheablePrompt(str):
+    """
+    A prompt whose first ``prefix_len`` characters stay the same across a job.
+
+    A plain string for every caller (services, response cache, batch jobs);
+    the model handlers read ``prefix`` / ``suffix`` to put a provider cache
+    point between the instructions/examples and the topic- or row-specific
+    part. Concatenating or formatting it yields a plain ``str`` again.
+    """
+
+    prefix_len: int
+
+    def __new__(cls, prefix: str, suffix: str):
+        prompt = super().__new__(cls, prefix + suffix)
+        prompt.prefix_len = len(prefix)
+        return prompt
+
+    def __getnewargs__(self):
+        return self.prefix, self.suffix
+
+    @property
+    def prefix(self) -> str:
+        return self[:self.prefix_len]
+
+    @property
+    def suffix(self) -> str:
+        return self[self.prefix_len:]
+
+
+def split_prompt(prompt: str) -> Tuple[str, str]:
+    """(stable prefix, variable suffix); the prefix is empty for plain strings"""
+    if isinstance(prompt, CacheablePrompt) and prompt.prefix_len:
+        return prompt.prefix, prompt.suffix
+    return "", str(prompt)
+
+
+def estimate_prefix_tokens(prefix: str) -> int:
+    return len(prefix) // CHARS_PER_TOKEN
+
+
+class PromptCacheStats:
+    """Input tokens per (provider, model_id), split into cache reads, cache writes and uncached"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[Tuple[str, str], Dict[str, int]] = {}
+
+    def record(self, provider: str, model_id: str, input_tokens: Optional[int] = None,
+               cache_read_tokens: Optional[int] = None, cache_write_tokens: Optional[int] = None) -> None:
+        """``input_tokens`` is the full prompt size, cached parts included"""
+        input_tokens, cache_read_tokens, cache_write_tokens = (
+            value if isinstance(value, int) else 0 for value in (input_tokens, cache_read_tokens, cache_write_tokens)
+        )
+        with self._lock:
+            stats = self._stats.setdefault((provider, model_id), {
+                "calls": 0, "input_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0, "cache_hits": 0,
+            })
+            stats["calls"] += 1
+            stats["input_tokens"] += input_tokens or 0
+            stats["cache_read_tokens"] += cache_read_tokens or 0
+            stats["cache_write_tokens"] += cache_write_tokens or 0
+            if cache_read_tokens:
+                stats["cache_hits"] += 1
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            items = [(key, dict(stats)) for key, stats in self._stats.items()]
+        result = []
+        for (provider, model_id), stats in items:
+            total = stats["input_tokens"]
+            result.append({
+                "provider": provider,
+                "model_id": model_id,
+                **stats,
+                "cache_misses": stats["calls"] - stats["cache_hits"],
+                "cached_input_ratio": round(stats["cache_read_tokens"] / total, 4) if total else 0.0,
+            })
+        return result
+
+
+prompt_cache_stats = PromptCacheStats()
+
+
+# ---------- Bedrock ----------------------------------------------------------
+_bedrock_unsupported: set = set()
+
+# ValidationException messages that reject the cachePoint block itself
+_BEDROCK_CACHE_POINT_REJECTED = re.compile(
+    r"cachePoint|prompt caching[^.]*\b(not|unsupported)\b|\b(not|unsupported)\b[^.]*prompt caching",
+    re.IGNORECASE,
+)
+
+
+def bedrock_cache_point(model_id: str, prompt: str) -> Optional[Tuple[str, str]]:
+    """(prefix, suffix) to send around a ``cachePoint``, or None when this call should not use one"""
+    if not PROMPT_CACHE_CONFIG["enabled"] or model_id in _bedrock_unsupported:
+        return None
+    if not any(name in model_id for name in PROMPT_CACHE_CONFIG["bedrock_models"]):
+        return None
+    prefix, suffix = split_prompt(prompt)
+    if estimate_prefix_tokens(prefix) < PROMPT_CACHE_CONFIG["bedrock_min_tokens"] or not suffix.strip():
+        return None
+    return prefix, suffix
+
+
+def has_bedrock_cache_point(kwargs: Dict[str, Any]) -> bool:
+    """True when the ``converse`` arguments carry a cachePoint block"""
+    return any("cachePoint" in block for message in kwargs.get("messages", []) for block in message.get("content", []))
+
+
+def is_cache_point_rejection(error_message: str) -> bool:
+    return bool(_BEDROCK_CACHE_POINT_REJECTED.search(error_message))
+
+
+def disable_bedrock_cache_point(model_id: str) -> None:
+    """Stop sending cache points to a model that rejected one"""
+    if model_id not in _bedrock_unsupported:
+        logger.warning(f"Prompt caching not accepted by {model_id}; sending plain prompts from now on")
+    _bedrock_unsupported.add(model_id)
+
+
+def record_bedrock_usage(model_id: str, usage: Dict[str, Any]) -> None:
+    if not usage:
+        return
+    read = usage.get("cacheReadInputTokens") or 0
+    write = usage.get("cacheWriteInputTokens") or 0
+    # Bedrock's inputTokens counts only the uncached part
+    prompt_cache_stats.record("aws_bedrock", model_id, (usage.get("inputTokens") or 0) + read + write, read, write)
+
+
+# ---------- OpenAI SDK (OpenAI, OpenAI compatible, CAII) ---------------------
+def record_openai_usage(provider: str, model_id: str, usage: Any) -> None:
+    """Automatic prefix caching reports hits in ``prompt_tokens_details.cached_tokens``"""
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    prompt_cache_stats.record(provider, model_id, getattr(usage, "prompt_tokens", None), cached)
+
+
+# ---------- Gemini -----------------------------------------------------------
+class GeminiContextCache:
+    """
+    Gemini cached contents holding a prompt prefix, one per (model, prefix).
+
+    Entries are recreated shortly before their TTL runs out. A prefix whose
+    cache could not be created (model without context caching, prefix below
+    the provider minimum) is not tried again in this process.
+    """
+
+    REFRESH_MARGIN = 60  # seconds before expiry an entry is no longer handed out
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Any, float]] = {}
+        self._failed: set = set()
+
+    @staticmethod
+    def _key(model_id: str, prefix: str) -> str:
+        return hashlib.sha256(f"{model_id}\0{prefix}".encode("utf-8")).hexdigest()
+
+    def eligible(self, prompt: str) -> Optional[Tuple[str, str]]:
+        if not PROMPT_CACHE_CONFIG["enabled"]:
+            return None
+        prefix, suffix = split_prompt(prompt)
+        if estimate_prefix_tokens(prefix) < PROMPT_CACHE_CONFIG["gemini_min_tokens"] or not suffix.strip():
+            return None
+        return prefix, suffix
+
+    def get(self, model_id: str, prefix: str):
+        """The cached content for ``prefix``, creating it if needed; None when caching is unavailable"""
+        key = self._key(model_id, prefix)
+        now = time.monotonic()
+        with self._lock:
+            if key in self._failed:
+                return None
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                return entry[0]
+        try:
+            from google.generativeai import caching
+            ttl = PROMPT_CACHE_CONFIG["gemini_ttl_seconds"]
+            name = model_id if model_id.startswith("models/") else f"models/{model_id}"
+            cached = caching.CachedContent.create(model=name, contents=[prefix], ttl=ttl)
+        except Exception as e:
+            print(f"Gemini context caching unavailable for {model_id}: {e}")
+            with self._lock:
+                self._failed.add(key)
+            return None
+        with self._lock:
+            self._entries[key] = (cached, now + ttl - self.REFRESH_MARGIN)
+        return cached
+
+
+gemini_context_cache = GeminiContextCache()
+
+
+def record_gemini_usage(model_id: str, usage: Any) -> None:
+    if usage is None:
+        return
+    prompt_cache_stats.record(
+        "gemini", model_id,
+        getattr(usage, "prompt_token_count", None),
+        getattr(usage, "cached_content_token_count", None),
+    )
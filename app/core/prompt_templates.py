@@ -1,4 +1,4 @@
-from typing import List, Dict, Optional, Any, Union
+from typing import List, Dict, Optional, Any, Callable, Tuple, Union
 import json
 import csv
 import os
@@ -9,6 +9,7 @@ from app.core.config import UseCase, Technique, ModelFamily, get_model_family,US
 from app.core.data_loader import DataLoader
 from app.core.data_analyser import DataAnalyser
 from app.core.summary_formatter import SummaryFormatter
+from app.core.prompt_caching import CacheablePrompt
 
 DEFAULT_SCHEMA = """CREATE TABLE employees (
     id INT PRIMARY KEY,
@@ -402,6 +403,48 @@ class PromptHandler:
 class ModelPrompts:
     """Model family specific prompt templates"""
 
+    @staticmethod
+    def _chat_frame(model_id: str) -> Tuple[str, str, str]:
+        """(opening, separator, closing) of the model family's chat format around the stable and variable parts"""
+        model_family = get_model_family(model_id)
+
+        if model_family == ModelFamily.LLAMA:
+            return "<|begin_of_text|><|start_header_id|>user<|end_header_id|>" + '\n', '\n', '\n' + "<|eot_id|><|start_header_id|>assistant<|end_header_id|>"
+        elif model_family == ModelFamily.MISTRAL:
+            return "[INST]" + "\n", '\n', '\n' + '[/INST]'
+        elif model_family == ModelFamily.QWEN:
+            system_prompt = "You are Qwen, created by Alibaba Cloud. You are a helpful assistant."
+            opening = f'''<|im_start|>system
+                                {system_prompt}<|im_end|>
+                                <|im_start|>user
+                                '''
+            separator = '''
+                                '''
+            closing = '''<|im_end|>
+                                <|im_start|>assistant
+                                '''
+            return opening, separator, closing
+        return "", '\n', ""
+
+    @staticmethod
+    def _chat_prompt(model_id: str, stable: str, variable: str) -> CacheablePrompt:
+        """
+        Prompt in the chat format of the model family, split for provider prompt caching.
+
+        ``stable`` (instructions, schema, examples) is the same for every call of
+        a job and goes first so providers can cache it; ``variable`` (topic, rows,
+        items to avoid) follows it.
+        """
+        opening, separator, closing = ModelPrompts._chat_frame(model_id)
+        return CacheablePrompt(opening + stable + separator, variable + closing)
+
+    @staticmethod
+    def _eval_preamble(model_id: str, base_prompt: str) -> str:
+        """The judge preamble; Claude and the default family get the instructions only"""
+        if get_model_family(model_id) in (ModelFamily.LLAMA, ModelFamily.MISTRAL, ModelFamily.QWEN):
+            return base_prompt + '\n'
+        return ""
+
     @staticmethod
     def get_generate_prompt(model_id: str,
         use_case: UseCase,
@@ -413,27 +456,22 @@ class ModelPrompts:
         schema = Optional[str],
         custom_prompt = Optional[str]
     ) -> str:
-        
+        # Instructions, schema and examples first: they are the same for every batch of
+        # the job, so providers can cache them. The topic and items to avoid come last.
+        stable = ModelPrompts._generate_prefix(use_case, examples, schema, custom_prompt)
+        variable = ModelPrompts._generate_task(use_case, topic, num_questions, omit_questions)
+        return ModelPrompts._chat_prompt(model_id, stable, variable)
+
+    @staticmethod
+    def _generate_prefix(use_case: UseCase, examples: List[Example], schema: Optional[str], custom_prompt: Optional[str]) -> str:
+        """The part of ``get_generate_prompt`` shared by every topic and batch of a job"""
         examples_str = PromptHandler.get_default_example(use_case, examples)
         
         #print(examples, '\n', examples_str)
         schema_str = PromptHandler.get_default_schema(use_case, schema)
         custom_prompt_str = PromptHandler.get_default_custom_prompt(use_case, custom_prompt)
 
-        # base_prompt = f"""<examples>
-        #         {examples_str}
-        #         </examples>
-
-        #         """
         base_prompt = '\n' + "You are a very helpful assistant which creates a valid json array based on instructions given"
-
-        # handling duplicates for each topics
-        if len(omit_questions)==0:
-           omit_prompt =  " "
-        else:
-            # Join the questions list with newlines and bullet points
-            formatted_questions = " | ".join(omit_questions)
-            omit_prompt =  "Make it absolutely sure that you don't include questions mentioned in below list as we already have question pair solutions for them. \n\n"+ formatted_questions
         
         json_instruction = f"""Output MUST be a JSON array with objects in this exact format:
                 
@@ -453,53 +491,40 @@ class ModelPrompts:
                 - No text or comments outside the JSON array
 
                 Return ONLY the JSON array."""
-        json_prompt = omit_prompt +  '\n' +  json_instruction
+
+        if use_case == UseCase.TEXT2SQL:
+            base_prompt += f"""
+                            Using this database schema:
+                            {schema_str}"""
+
+        return base_prompt + '\n' + custom_prompt_str + '\n' + json_instruction
+
+    @staticmethod
+    def _generate_task(use_case: UseCase, topic: str, num_questions: int, omit_questions: List) -> str:
+        """The per-batch part of ``get_generate_prompt``"""
+        # handling duplicates for each topics
+        if len(omit_questions)==0:
+           omit_prompt =  " "
+        else:
+            # Join the questions list with newlines and bullet points
+            formatted_questions = " | ".join(omit_questions)
+            omit_prompt =  "Make it absolutely sure that you don't include questions mentioned in below list as we already have question pair solutions for them. \n\n"+ formatted_questions
 
         if use_case == UseCase.CODE_GENERATION:
-            base_prompt += f"""Create {num_questions} programming question-solution pairs about the following topic:
+            task_prompt = f"""Create {num_questions} programming question-solution pairs about the following topic:
                         <topic>{topic}</topic>"""
 
-            
         elif use_case == UseCase.TEXT2SQL:
-            base_prompt += f"""Using this database schema:
-                            {schema_str}
-
-                            Create {num_questions} natural language to SQL query pairs about the following topic:
+            task_prompt = f"""Create {num_questions} natural language to SQL query pairs about the following topic:
                             <topic>{topic}</topic>"""
 
         elif use_case == UseCase.CUSTOM:
-            base_prompt+= f"""Create {num_questions} question-solution pairs about the following topic:
-                        <topic>{topic}</topic>""" 
-            
-        model_family = get_model_family(model_id)
-        
-        if model_family== ModelFamily.LLAMA:
-            
-            final_prompt = "<|begin_of_text|><|start_header_id|>user<|end_header_id|>" + '\n'  + base_prompt + '\n' + custom_prompt_str + '\n' + json_prompt + '\n' + "<|eot_id|><|start_header_id|>assistant<|end_header_id|>"
-
-        elif model_family== ModelFamily.MISTRAL:
-            system_prompt = "[INST]"
-            final_prompt = system_prompt +  "\n" + base_prompt + '\n' + custom_prompt_str +  '\n'  + json_prompt + '\n'+ '[/INST]'
-
-        elif model_family == ModelFamily.CLAUDE:
-            final_prompt = base_prompt + '\n' + custom_prompt_str + "\n" + json_prompt 
-        elif model_family== ModelFamily.QWEN:
-            system_prompt = "You are Qwen, created by Alibaba Cloud. You are a helpful assistant."
-            
-            final_prompt = f'''<|im_start|>system
-                                {system_prompt}<|im_end|>
-                                <|im_start|>user
-                                {base_prompt}
-                                {custom_prompt_str}
-                                {json_prompt}<|im_end|>
-                                <|im_start|>assistant
-                                '''
-            
+            task_prompt = f"""Create {num_questions} question-solution pairs about the following topic:
+                        <topic>{topic}</topic>"""
         else:
-            final_prompt = base_prompt + '\n' + custom_prompt_str + "\n" + json_prompt 
-        
-        return final_prompt
+            task_prompt = ""
 
+        return task_prompt + '\n' + omit_prompt
     
     @staticmethod
     def get_eval_prompt(model_id: str,
@@ -514,10 +539,7 @@ class ModelPrompts:
         
         base_prompt = """ You are a brilliant judge on evaluating quality of question and answer pair.
           Follow the given instructions below to evaluate given question and answer pair."""
-        final_instruction = f"""Question: {question}
-            Solution: {solution}
-
-            After examining the solution:
+        final_instruction = f"""After examining the question and solution given at the end:
             Provide your evaluation in a JSON array format following these requirements:. 
             1. The response MUST be a valid JSON array containing objects
             2. Each object MUST have exactly two fields:
@@ -530,33 +552,10 @@ class ModelPrompts:
             6. Follow this exact structure as given below.
             Example format:
             {examples_str}"""
-        model_family = get_model_family(model_id)
-        
-        if model_family== ModelFamily.LLAMA:
-            
-            final_prompt = "<|begin_of_text|><|start_header_id|>user<|end_header_id|>" + base_prompt + '\n' +  custom_prompt_str + '\n' + final_instruction + '\n' + "<|eot_id|><|start_header_id|>assistant<|end_header_id|>"
-
-        elif model_family== ModelFamily.MISTRAL:
-            
-            final_prompt = "[INST]" + base_prompt + "\n" + custom_prompt_str + '\n' + final_instruction + '\n' + '[/INST]'
-
-        elif model_family == ModelFamily.CLAUDE:
-            final_prompt = custom_prompt_str + "\n" + final_instruction 
-        elif model_family== ModelFamily.QWEN:
-            system_prompt = "You are Qwen, created by Alibaba Cloud. You are a helpful assistant."
-            
-            final_prompt = f'''<|im_start|>system
-                                {system_prompt}<|im_end|>
-                                <|im_start|>user
-                                {base_prompt}
-                                {custom_prompt_str}
-                                {final_instruction}<|im_end|>
-                                <|im_start|>assistant
-                                '''
-        else:
-
-            final_prompt = custom_prompt_str + "\n" + final_instruction 
-        return final_prompt
+        stable = ModelPrompts._eval_preamble(model_id, base_prompt) + custom_prompt_str + '\n' + final_instruction
+        variable = f"""Question: {question}
+            Solution: {solution}"""
+        return ModelPrompts._chat_prompt(model_id, stable, variable)
     
     @staticmethod
     def get_freeform_eval_prompt(model_id: str,
@@ -575,10 +574,7 @@ class ModelPrompts:
             examples_str = str(USE_CASE_CONFIGS_EVALS[use_case].default_examples)        
         base_prompt = """ You are a brilliant judge on evaluating a set of data with fields and corresponding values
           Follow the given instructions to understand the structure of given data and evaluate it based on parameters defined for you."""
-        final_instruction = f"""data row: {row}
-            
-
-            After examining the data based on provided instructions:
+        final_instruction = f"""After examining the data row given at the end based on provided instructions:
             Provide your evaluation in a JSON array format following these requirements:. 
             1. The response MUST be a valid JSON array containing objects
             2. Each object MUST have exactly two fields:
@@ -591,33 +587,73 @@ class ModelPrompts:
             6. Follow this exact structure as given below.
             Example format:
             {examples_str}"""
-        model_family = get_model_family(model_id)
-        
-        if model_family== ModelFamily.LLAMA:
-            
-            final_prompt = "<|begin_of_text|><|start_header_id|>user<|end_header_id|>" + base_prompt + '\n' +  custom_prompt_str + '\n' + final_instruction + '\n' + "<|eot_id|><|start_header_id|>assistant<|end_header_id|>"
+        stable = ModelPrompts._eval_preamble(model_id, base_prompt) + custom_prompt_str + '\n' + final_instruction
+        variable = f"""data row: {row}"""
+        return ModelPrompts._chat_prompt(model_id, stable, variable)
 
-        elif model_family== ModelFamily.MISTRAL:
-            
-            final_prompt = "[INST]" + base_prompt + "\n" + custom_prompt_str + '\n' + final_instruction + '\n' + '[/INST]'
+    @staticmethod
+    def _batch_eval_instruction(examples_str: str) -> str:
+        """Shared instructions of the batched evaluation prompts"""
+        return f"""After examining each item given at the end independently:
+            Provide your evaluations in a JSON array format following these requirements:.
+            1. The response MUST be a valid JSON array with exactly one object per item
+            2. Each object MUST have exactly three fields:
+            - "index": the number of the item it evaluates, as given in [index N]
+            - "score": a number based on the requirements explained above.
+            - "justification": a string explaining the score
 
-        elif model_family == ModelFamily.CLAUDE:
-            final_prompt = custom_prompt_str + "\n" + final_instruction 
-        elif model_family== ModelFamily.QWEN:
-            system_prompt = "You are Qwen, created by Alibaba Cloud. You are a helpful assistant."
-            
-            final_prompt = f'''<|im_start|>system
-                                {system_prompt}<|im_end|>
-                                <|im_start|>user
-                                {base_prompt}
-                                {custom_prompt_str}
-                                {final_instruction}<|im_end|>
-                                <|im_start|>assistant
-                                '''
+            3. Ensure all quotes are double quotes (")
+            4. No comments or additional text outside the JSON array
+            5. All strings must be properly escaped
+            6. Score every item on its own; do not compare items with each other
+            Score and justify each item in the style of these examples, adding its "index":
+            {examples_str}"""
+
+    @staticmethod
+    def _batch_eval_items(items: List[str]) -> str:
+        return f"Items to evaluate ({len(items)} in total):\n\n" + "\n\n".join(items)
+
+    @staticmethod
+    def get_batch_eval_prompt(model_id: str,
+        use_case: UseCase,
+        qa_pairs: List[Dict[str, str]],
+        examples: List[Example_eval],
+        custom_prompt = Optional[str]
+    ) -> str:
+        """``get_eval_prompt`` for several question/solution pairs, each a dict with question and solution"""
+        custom_prompt_str = PromptHandler.get_default_custom_eval_prompt(use_case, custom_prompt)
+        examples_str = PromptHandler.get_default_eval_example(use_case, examples)
+
+        base_prompt = """ You are a brilliant judge on evaluating quality of question and answer pairs.
+          Follow the given instructions below to evaluate each given question and answer pair."""
+        items = [
+            f"[index {i}]\nQuestion: {pair['question']}\nSolution: {pair['solution']}"
+            for i, pair in enumerate(qa_pairs)
+        ]
+        stable = (ModelPrompts._eval_preamble(model_id, base_prompt) + custom_prompt_str + '\n'
+                  + ModelPrompts._batch_eval_instruction(examples_str))
+        return ModelPrompts._chat_prompt(model_id, stable, ModelPrompts._batch_eval_items(items))
+
+    @staticmethod
+    def get_batch_freeform_eval_prompt(model_id: str,
+        use_case: UseCase,
+        rows: List[Dict[str, Any]],
+        examples: List[Example_eval],
+        custom_prompt = Optional[str]
+    ) -> str:
+        """``get_freeform_eval_prompt`` for several data rows"""
+        custom_prompt_str = PromptHandler.get_default_custom_eval_prompt(use_case, custom_prompt)
+        if examples:
+            examples_str = PromptHandler.format_examples_eval(examples)
         else:
+            examples_str = str(USE_CASE_CONFIGS_EVALS[use_case].default_examples)
 
-            final_prompt = custom_prompt_str + "\n" + final_instruction 
-        return final_prompt
+        base_prompt = """ You are a brilliant judge on evaluating a set of data with fields and corresponding values
+          Follow the given instructions to understand the structure of given data and evaluate each data row based on parameters defined for you."""
+        items = [f"[index {i}]\ndata row: {row}" for i, row in enumerate(rows)]
+        stable = (ModelPrompts._eval_preamble(model_id, base_prompt) + custom_prompt_str + '\n'
+                  + ModelPrompts._batch_eval_instruction(examples_str))
+        return ModelPrompts._chat_prompt(model_id, stable, ModelPrompts._batch_eval_items(items))
     
 
     # @staticmethod
@@ -894,50 +930,26 @@ class ModelPrompts:
         
         base_prompt += custom_prompt_str
 
-        
-
+        # Everything up to here is shared by all inputs of the job; only the input varies
         if use_case == UseCase.CODE_GENERATION:
-            base_prompt += f"""Give a programming solution for following based on the instructions provided above :
+            task_prompt = f"""Give a programming solution for following based on the instructions provided above :
                         <input>{input}</input>"""
 
             
         elif use_case == UseCase.TEXT2SQL:
             base_prompt += f"""Using this database schema:
-                            {schema_str}
+                            {schema_str}"""
+            task_prompt = f"""
                             Create  a SQL query for about the following:
                             <input>{input}</input>"""
 
         elif use_case == UseCase.CUSTOM:
-            base_prompt+= f"""Create a solution about the following based on above instructions:
+            task_prompt = f"""Create a solution about the following based on above instructions:
                         <input>{input}</input>""" 
-            
-        model_family = get_model_family(model_id)
-        
-        if model_family== ModelFamily.LLAMA:
-            
-            final_prompt = "<|begin_of_text|><|start_header_id|>user<|end_header_id|>" + '\n'  + base_prompt  + '\n' + "<|eot_id|><|start_header_id|>assistant<|end_header_id|>"
-
-        elif model_family== ModelFamily.MISTRAL:
-            system_prompt = "[INST]"
-            final_prompt = system_prompt +  "\n" + base_prompt + '\n' +  '[/INST]'
-
-        elif model_family == ModelFamily.CLAUDE:
-            final_prompt = base_prompt  
-        elif model_family== ModelFamily.QWEN:
-            system_prompt = "You are Qwen, created by Alibaba Cloud. You are a helpful assistant."
-            
-            final_prompt = f'''<|im_start|>system
-                                {system_prompt}<|im_end|>
-                                <|im_start|>user
-                                {base_prompt}
-                                <|im_end|>
-                                <|im_start|>assistant
-                                '''
-            
         else:
-            final_prompt = base_prompt 
-        
-        return final_prompt
+            task_prompt = ""
+
+        return ModelPrompts._chat_prompt(model_id, base_prompt, task_prompt)
 
 
     @staticmethod
@@ -951,11 +963,25 @@ class ModelPrompts:
         custom_prompt: Optional[str] = None,
         schema: Optional[str] = None,
     ) -> str:
+        # Instructions and examples are the same for every batch of the job, so they go
+        # first where providers can cache them; the topic and items to avoid come last.
+        stable = ModelPrompts._freeform_prefix(use_case, example_custom, example_path, custom_prompt, schema)
+        variable = ModelPrompts._freeform_task(topic, num_questions, omit_questions)
+        return ModelPrompts._chat_prompt(model_id, stable, variable)
+
+    @staticmethod
+    def _freeform_prefix(use_case: UseCase,
+        example_custom: Optional[List[Dict[str, Any]]] = None,
+        example_path: Optional[str] = None,
+        custom_prompt: Optional[str] = None,
+        schema: Optional[str] = None,
+    ) -> str:
+        """The part of ``get_freeform_prompt`` shared by every topic and batch of a job"""
         
         if example_path:
             try:
                 # Use DataLoader to load the file, limiting to 10 rows
-                df = DataLoader.load(example_path, sample_rows=10)
+                df = DataLoader.load(example_path, sample_rows=10, sampling="head")
                 
                 # Convert DataFrame to list of dictionaries
                 example_upload = df.head(10).to_dict(orient='records')
@@ -1005,15 +1031,6 @@ class ModelPrompts:
        
         base_prompt = '\n' + "You are a very helpful assistant which creates a valid json array of data based on instructions given" + '\n' 
 
-        # handling duplicates for each topics
-        if len(omit_questions)==0:
-           omit_prompt =  " "
-        else:
-            # Join the questions list with newlines and bullet points
-            formatted_questions = " | ".join(omit_questions)
-            omit_prompt =  """Following is the list of corresponding values for given fields you have already created, 
-            For each item you generate, verify it's distinct from others in the current list by comparing key field.Create NEW items that are substantially different.
-            """+  "\n"+ formatted_questions
         if examples_str:
             json_instruction = f"""Output MUST be a JSON array with objects in this exact format as described in instructions:
                     
@@ -1046,44 +1063,43 @@ class ModelPrompts:
 
                     Return ONLY the JSON array."""
 
-        json_prompt = omit_prompt +  '\n' +  json_instruction
+        return base_prompt + '\n' + custom_prompt_str + '\n' + json_instruction
 
-       
-        base_prompt += f"""Create {num_questions} set of data about the following topic:
+    @staticmethod
+    def _freeform_task(topic: str, num_questions: int, omit_questions: List) -> str:
+        """The per-batch part of ``get_freeform_prompt``"""
+        # handling duplicates for each topics
+        if len(omit_questions)==0:
+           omit_prompt =  " "
+        else:
+            # Join the questions list with newlines and bullet points
+            formatted_questions = " | ".join(omit_questions)
+            omit_prompt =  """Following is the list of corresponding values for given fields you have already created, 
+            For each item you generate, verify it's distinct from others in the current list by comparing key field.Create NEW items that are substantially different.
+            """+  "\n"+ formatted_questions
+        return f"""Create {num_questions} set of data about the following topic:
                         <topic>{topic}</topic>
-                        based on the instructions provided below """
+                        based on the instructions provided above """ + '\n' + omit_prompt
 
-        
-            
-        model_family = get_model_family(model_id)
-        
-        if model_family== ModelFamily.LLAMA:
-            
-            final_prompt = "<|begin_of_text|><|start_header_id|>user<|end_header_id|>" + '\n'  + base_prompt + '\n' + custom_prompt_str + '\n' + json_prompt + '\n' + "<|eot_id|><|start_header_id|>assistant<|end_header_id|>"
 
-        elif model_family== ModelFamily.MISTRAL:
-            system_prompt = "[INST]"
-            final_prompt = system_prompt +  "\n" + base_prompt + '\n' + custom_prompt_str +  '\n'  + json_prompt + '\n'+ '[/INST]'
+class CompiledPromptTemplate:
+    """
+    Generation prompt of one job with its shared part rendered once.
 
-        elif model_family == ModelFamily.CLAUDE:
-            final_prompt = base_prompt + '\n' + custom_prompt_str + "\n" + json_prompt 
-        elif model_family== ModelFamily.QWEN:
-            system_prompt = "You are Qwen, created by Alibaba Cloud. You are a helpful assistant."
-            
-            final_prompt = f'''<|im_start|>system
-                                {system_prompt}<|im_end|>
-                                <|im_start|>user
-                                {base_prompt}
-                                {custom_prompt_str}
-                                {json_prompt}<|im_end|>
-                                <|im_start|>assistant
-                                '''
-            
-        else:
-            final_prompt = base_prompt + '\n' + custom_prompt_str + "\n" + json_prompt 
-        
-        return final_prompt
+    The model family framing, instructions, schema and examples (including
+    any uploaded example file) are built when the template is compiled;
+    ``build`` only renders the topic, question count and items to avoid.
+    Templates are request scoped: compile one per job, not per batch.
+    """
+
+    def __init__(self, model_id: str, stable: str, task: Callable[[str, int, List], str]):
+        opening, separator, closing = ModelPrompts._chat_frame(model_id)
+        self.prefix = opening + stable + separator
+        self.closing = closing
+        self._task = task
 
+    def build(self, topic: str, num_questions: int, omit_questions: List) -> CacheablePrompt:
+        return CacheablePrompt(self.prefix, self._task(topic, num_questions, omit_questions) + self.closing)
 
 
 class PromptBuilder:
@@ -1149,6 +1165,33 @@ class PromptBuilder:
     ) -> str:
         
         return ModelPrompts.get_freeform_prompt(model_id,use_case, topic, num_questions, omit_questions, example_custom, example_path,custom_prompt, schema)
+
+    @staticmethod
+    def compile_prompt(model_id: str,
+        use_case: UseCase,
+        examples: List[Example],
+        technique: Technique = Technique.SFT,
+        schema: Optional[str] = None,
+        custom_prompt: Optional[str] = None
+    ) -> CompiledPromptTemplate:
+        """``build_prompt`` for one job; ``build(topic, num_questions, omit_questions)`` renders each batch"""
+        stable = ModelPrompts._generate_prefix(use_case, examples, schema, custom_prompt)
+        return CompiledPromptTemplate(
+            model_id, stable,
+            lambda topic, num_questions, omit_questions: ModelPrompts._generate_task(use_case, topic, num_questions, omit_questions),
+        )
+
+    @staticmethod
+    def compile_freeform_prompt(model_id: str,
+        use_case: UseCase,
+        example_custom: Optional[List[Dict[str, Any]]],
+        example_path: Optional[str],
+        custom_prompt: Optional[str] = None,
+        schema: Optional[str] = None
+    ) -> CompiledPromptTemplate:
+        """``build_freeform_prompt`` for one job; the example file is read once here rather than per batch"""
+        stable = ModelPrompts._freeform_prefix(use_case, example_custom, example_path, custom_prompt, schema)
+        return CompiledPromptTemplate(model_id, stable, ModelPrompts._freeform_task)
     
     @staticmethod
     def build_freeform_eval_prompt(model_id: str,
@@ -1159,4 +1202,24 @@ class PromptBuilder:
         custom_prompt = Optional[str]
     ) -> str:
         
-        return ModelPrompts.get_freeform_eval_prompt(model_id,use_case, row, examples, custom_prompt)
\ No newline at end of file
+        return ModelPrompts.get_freeform_eval_prompt(model_id,use_case, row, examples, custom_prompt)
+
+    @staticmethod
+    def build_batch_eval_prompt(model_id: str,
+        use_case: UseCase,
+        qa_pairs: List[Dict[str, str]],
+        examples: List[Example_eval],
+        custom_prompt = Optional[str]
+    ) -> str:
+
+        return ModelPrompts.get_batch_eval_prompt(model_id, use_case, qa_pairs, examples, custom_prompt)
+
+    @staticmethod
+    def build_batch_freeform_eval_prompt(model_id: str,
+        use_case: UseCase,
+        rows: List[Dict[str, Any]],
+        examples: List[Example_eval],
+        custom_prompt = Optional[str]
+    ) -> str:
+
+        return ModelPrompts.get_batch_freeform_eval_prompt(model_id, use_case, rows, examples, custom_prompt)
@@ -0,0 +1,194 @@
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import MODEL_RATE_LIMITS, PROVIDER_RATE_LIMITS
+
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(prompt: str, max_tokens: int) -> int:
+    """Rough pre-call token cost: prompt at ~4 chars/token plus the full completion budget"""
+    return len(prompt) // CHARS_PER_TOKEN + 1 + max(max_tokens, 0)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at ``per_minute / 60`` per second.
+
+    ``reserve`` always succeeds and lets the level go negative; the caller sleeps
+    for the returned time, so concurrent callers queue up in arrival order
+    without polling. ``adjust`` applies a post-call correction.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self._level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self._level = min(self.capacity, self._level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        """Take ``amount`` from the bucket and return the seconds to wait before using it"""
+        self._refill(now)
+        self._level -= amount
+        return max(0.0, -self._level / self.rate)
+
+    def adjust(self, delta: float, now: float) -> None:
+        """Charge (positive) or refund (negative) tokens after the fact"""
+        self._refill(now)
+        self._level = min(self.capacity, self._level - delta)
+
+    @property
+    def available(self) -> float:
+        return self._level
+
+
+class RateBudget:
+    """RPM and TPM buckets for one scope (a model, or a provider account)"""
+
+    def __init__(self, scope: Tuple[str, ...], rpm: Optional[int], tpm: Optional[int]):
+        self.scope = scope
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.total_requests = 0
+        self.total_tokens = 0
+        self.total_wait_seconds = 0.0
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "scope": list(self.scope),
+            "rpm": self.requests.capacity if self.requests else None,
+            "tpm": self.tokens.capacity if self.tokens else None,
+            "requests_available": round(self.requests.available, 2) if self.requests else None,
+            "tokens_available": round(self.tokens.available) if self.tokens else None,
+            "total_requests": self.total_requests,
+            "total_tokens": self.total_tokens,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+        }
+
+
+class Reservation:
+    """
+    Tokens taken up front for one call; ``settle`` corrects them from reported usage.
+
+    Used as a context manager around the call, the estimate is refunded when
+    the call raises and kept when it returns without reported usage.
+    """
+
+    def __init__(self, limiter: "RateLimiter", budgets: List[RateBudget], estimated_tokens: int):
+        self._limiter = limiter
+        self._budgets = budgets
+        self.estimated_tokens = estimated_tokens
+        self.settled = False
+
+    def settle(self, actual_tokens: Optional[int]) -> None:
+        if self.settled or not isinstance(actual_tokens, int):
+            return
+        self.settled = True
+        self._limiter._settle(self._budgets, actual_tokens - self.estimated_tokens)
+
+    def refund(self) -> None:
+        """Give the estimated tokens back after a failed call"""
+        if self.settled:
+            return
+        self.settled = True
+        self._limiter._settle(self._budgets, -self.estimated_tokens)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.refund()
+        self.settled = True
+        return False
+
+
+class RateLimiter:
+    """
+    Process-wide RPM/TPM limiter.
+
+    Each call is charged against the budget of its model and of its provider
+    account (from ``MODEL_RATE_LIMITS`` / ``PROVIDER_RATE_LIMITS``) and waits
+    until both allow it, so concurrent generation, evaluation and alignment
+    jobs share one budget instead of throttling each other at the provider.
+    """
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = super(RateLimiter, cls).__new__(cls)
+                cls._instance._initialized = False
+            return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self._initialized = True
+        self._budgets_lock = threading.Lock()
+        self._budgets: Dict[Tuple[str, ...], Optional[RateBudget]] = {}
+
+    def _budget_locked(self, scope: Tuple[str, ...], limits: Optional[Dict[str, Optional[int]]]) -> Optional[RateBudget]:
+        if scope not in self._budgets:
+            limits = limits or {}
+            rpm, tpm = limits.get("rpm"), limits.get("tpm")
+            self._budgets[scope] = RateBudget(scope, rpm, tpm) if (rpm or tpm) else None
+        return self._budgets[scope]
+
+    def _budgets_for(self, inference_type: str, account: str, model_id: str) -> List[RateBudget]:
+        with self._budgets_lock:
+            budgets = [
+                self._budget_locked(("model", inference_type, model_id), MODEL_RATE_LIMITS.get(model_id)),
+                self._budget_locked(("account", inference_type, account), PROVIDER_RATE_LIMITS.get(inference_type)),
+            ]
+        return [b for b in budgets if b is not None]
+
+    async def acquire(self, inference_type: str, account: str, model_id: str, estimated_tokens: int) -> Reservation:
+        """Reserve one request and ``estimated_tokens`` tokens, sleeping until the budgets allow it"""
+        budgets = self._budgets_for(inference_type, account, model_id)
+        wait = 0.0
+        if budgets:
+            now = time.monotonic()
+            with self._budgets_lock:
+                for budget in budgets:
+                    if budget.requests:
+                        wait = max(wait, budget.requests.reserve(1, now))
+                    if budget.tokens:
+                        wait = max(wait, budget.tokens.reserve(estimated_tokens, now))
+                    budget.total_requests += 1
+                    budget.total_tokens += estimated_tokens
+                for budget in budgets:
+                    budget.total_wait_seconds += wait
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return Reservation(self, budgets, estimated_tokens)
+
+    def _settle(self, budgets: List[RateBudget], delta: int) -> None:
+        if not budgets or delta == 0:
+            return
+        now = time.monotonic()
+        with self._budgets_lock:
+            for budget in budgets:
+                budget.total_tokens += delta
+                if budget.tokens:
+                    budget.tokens.adjust(delta, now)
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        with self._budgets_lock:
+            return [b.snapshot() for b in self._budgets.values() if b is not None]
+
+    def reset(self) -> None:
+        """Drop all budgets so they are rebuilt from the current config"""
+        with self._budgets_lock:
+            self._budgets.clear()
+
+
+rate_limiter = RateLimiter()
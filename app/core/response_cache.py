@@ -0,0 +1,207 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from app.core.config import RESPONSE_CACHE_CONFIG
+from app.core.json_stream import ParsedRows
+
+_PARSED_ROWS = "__parsed_rows__"
+
+
+def _encode(value: Any) -> str:
+    """JSON of a cached value; ``ParsedRows`` keep their salvaged/dropped counts"""
+    if isinstance(value, ParsedRows):
+        value = {_PARSED_ROWS: list(value), "salvaged": value.salvaged, "dropped": value.dropped}
+    return json.dumps(value)
+
+
+def _decode(payload: str) -> Any:
+    value = json.loads(payload)
+    if isinstance(value, dict) and _PARSED_ROWS in value:
+        return ParsedRows(value[_PARSED_ROWS], salvaged=value["salvaged"], dropped=value["dropped"])
+    return value
+
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM responses keyed by a hash of everything that shapes the output.
+
+    Hot entries live in an in-memory LRU, serialized like the disk tier so
+    every caller gets its own copy to mutate (``ParsedRows`` come back as
+    ``ParsedRows``, dropped count included); every entry is also written to a
+    SQLite table so re-running an evaluation or retrying a job in a new
+    process still hits. Disk entries expire after ``ttl_seconds`` and the
+    least recently used ones are evicted once the table grows past
+    ``max_disk_bytes``.
+    """
+
+    EVICTION_CHECK_EVERY = 100  # puts between disk size checks
+
+    def __init__(self, path: str, memory_entries: int = 1024, max_disk_bytes: int = 512 * 1024 * 1024,
+                 ttl_seconds: float = 7 * 24 * 3600):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._db_ready = False
+        self._puts_since_check = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(**parts: Any) -> str:
+        payload = json.dumps(parts, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        if not self._db_ready:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT,
+                    size INTEGER,
+                    created_at REAL,
+                    accessed_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_response_cache_accessed ON response_cache(accessed_at)")
+            self._db_ready = True
+        return conn
+
+    @contextmanager
+    def _db(self):
+        """One short transaction on a fresh connection, closed afterwards"""
+        conn = self._connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _remember(self, key: str, payload: str, created_at: float) -> None:
+        with self._lock:
+            self._memory[key] = (payload, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        payload = None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                payload = entry[0]
+            elif entry is not None:
+                del self._memory[key]
+        if payload is not None:
+            return _decode(payload)
+
+        try:
+            with self._db() as conn:
+                row = conn.execute(
+                    "SELECT value, created_at FROM response_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row and now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                    row = None
+                if row:
+                    conn.execute("UPDATE response_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        except sqlite3.Error as e:
+            print(f"Response cache read failed: {str(e)}")
+            row = None
+
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._remember(key, row[0], row[1])
+        with self._lock:
+            self.disk_hits += 1
+        return _decode(row[0])
+
+    def put(self, key: str, value: Any) -> None:
+        now = time.time()
+        payload = _encode(value)
+        self._remember(key, payload, now)
+        try:
+            with self._db() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, size, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), now, now),
+                )
+                self._puts_since_check += 1
+                if self._puts_since_check >= self.EVICTION_CHECK_EVERY:
+                    self._puts_since_check = 0
+                    self._evict(conn, now)
+        except sqlite3.Error as e:
+            print(f"Response cache write failed: {str(e)}")
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> None:
+        conn.execute("DELETE FROM response_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM response_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Trim to 90% of the budget so we don't evict on every subsequent put
+        to_free = total - int(self.max_disk_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in conn.execute("SELECT key, size FROM response_cache ORDER BY accessed_at ASC"):
+            victims.append((key,))
+            freed += size
+            if freed >= to_free:
+                break
+        conn.executemany("DELETE FROM response_cache WHERE key = ?", victims)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None and time.time() - entry[1] <= self.ttl_seconds:
+            return self.get(key)
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, value: Any) -> None:
+        await asyncio.to_thread(self.put, key, value)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_entries": len(self._memory),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        try:
+            with self._db() as conn:
+                conn.execute("DELETE FROM response_cache")
+        except sqlite3.Error as e:
+            print(f"Response cache clear failed: {str(e)}")
+
+
+response_cache = ResponseCache(
+    RESPONSE_CACHE_CONFIG["path"],
+    memory_entries=RESPONSE_CACHE_CONFIG["memory_entries"],
+    max_disk_bytes=RESPONSE_CACHE_CONFIG["max_disk_bytes"],
+    ttl_seconds=RESPONSE_CACHE_CONFIG["ttl_seconds"],
+)
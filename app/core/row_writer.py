@@ -0,0 +1,215 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from app.core.blocking_io import get_io_executor
+from app.core.config import OUTPUT_WRITER_CONFIG
+
+
+def jsonl_path_for(path: str) -> str:
+    """``foo.json`` -> ``foo.jsonl``; the streaming sidecar of a generation output file"""
+    root, _ = os.path.splitext(path)
+    return f"{root}.jsonl"
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield rows from a JSONL file, skipping a torn last line left by a crash"""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"Skipping unreadable line in {path}")
+
+
+class JsonlRowWriter:
+    """
+    Append-only JSONL writer for generated rows.
+
+    Rows hit the file as soon as a batch finishes, so a job that dies keeps
+    everything it produced and memory no longer grows with the row count.
+    The file is fsynced every ``fsync_interval_seconds`` / ``fsync_every_rows``
+    and ``on_progress`` is called with the running row count every
+    ``progress_every_rows`` rows. ``finalize`` optionally rewrites the rows as
+    the legacy indented JSON array at ``path``.
+    """
+
+    def __init__(self, path: str, row_transform: Optional[Callable[[Dict], Dict]] = None,
+                 on_progress: Optional[Callable[[int], Any]] = None, append: bool = False,
+                 config: Optional[Dict[str, Any]] = None):
+        cfg = {**OUTPUT_WRITER_CONFIG, **(config or {})}
+        self.path = path
+        self.jsonl_path = jsonl_path_for(path)
+        self.row_transform = row_transform
+        self.on_progress = on_progress
+        self.fsync_interval = cfg["fsync_interval_seconds"]
+        self.fsync_every_rows = cfg["fsync_every_rows"]
+        self.progress_every_rows = cfg["progress_every_rows"]
+        self.keep_jsonl = cfg["keep_jsonl"]
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._append = append
+        self.rows_written = 0
+        self._rows_since_sync = 0
+        self._rows_since_progress = 0
+        self._last_sync = time.monotonic()
+        self.finalized = False
+        self.final_path = self.jsonl_path
+        if append and not os.path.exists(self.jsonl_path) and os.path.exists(path):
+            # The previous run already finalized to a JSON array; turn it back into JSONL to extend it
+            with open(path, "r", encoding="utf-8") as f:
+                previous_rows = json.load(f)
+            with open(self.jsonl_path, "w", encoding="utf-8") as f:
+                for row in previous_rows:
+                    f.write(json.dumps(row, ensure_ascii=False))
+                    f.write("\n")
+        if append and os.path.exists(self.jsonl_path):
+            # Continue a previous run: keep its rows and count them
+            self.rows_written = sum(1 for _ in iter_jsonl(self.jsonl_path))
+
+    def _open_locked(self):
+        if self._file is None:
+            resume = self._append and os.path.exists(self.jsonl_path)
+            self._file = open(self.jsonl_path, "a" if resume else "w", encoding="utf-8")
+            if resume and self._file.tell() > 0:
+                with open(self.jsonl_path, "rb") as existing:
+                    existing.seek(-1, os.SEEK_END)
+                    if existing.read(1) != b"\n":
+                        # Terminate a line torn by a crash so the next row starts cleanly
+                        self._file.write("\n")
+        return self._file
+
+    def write_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Append rows; returns the total number of rows written so far"""
+        progress = None
+        with self._lock:
+            f = self._open_locked()
+            count = 0
+            for row in rows:
+                if self.row_transform:
+                    row = self.row_transform(row)
+                f.write(json.dumps(row, ensure_ascii=False))
+                f.write("\n")
+                count += 1
+            if count == 0:
+                return self.rows_written
+
+            self.rows_written += count
+            self._rows_since_sync += count
+            self._rows_since_progress += count
+
+            now = time.monotonic()
+            if self._rows_since_sync >= self.fsync_every_rows or now - self._last_sync >= self.fsync_interval:
+                self._sync_locked(now)
+            if self.on_progress and self._rows_since_progress >= self.progress_every_rows:
+                self._rows_since_progress = 0
+                progress = self.rows_written
+            total = self.rows_written
+
+        if progress is not None:
+            try:
+                self.on_progress(progress)
+            except Exception as e:
+                print(f"Progress callback failed: {str(e)}")
+        return total
+
+    def _sync_locked(self, now: float) -> None:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._rows_since_sync = 0
+        self._last_sync = now
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._sync_locked(time.monotonic())
+                self._file.close()
+                self._file = None
+
+    def finalize(self, legacy_json: Optional[bool] = None) -> str:
+        """
+        Close the writer and return the path of the final output.
+
+        With ``legacy_json`` (default from config) the JSONL rows are streamed
+        into an indented JSON array at ``path``, identical to ``json.dump(rows, indent=2)``.
+        """
+        self.close()
+        self.finalized = True
+        if legacy_json is None:
+            legacy_json = OUTPUT_WRITER_CONFIG["legacy_json"]
+        if not legacy_json:
+            return self.final_path
+
+        has_rows = os.path.exists(self.jsonl_path)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            first = True
+            for row in (iter_jsonl(self.jsonl_path) if has_rows else ()):
+                out.write("[\n" if first else ",\n")
+                out.write("\n".join("  " + line for line in json.dumps(row, indent=2).split("\n")))
+                first = False
+            out.write("[]" if first else "\n]")
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self.path)
+
+        if has_rows and not self.keep_jsonl:
+            os.remove(self.jsonl_path)
+        self.final_path = self.path
+        return self.final_path
+
+    def discard(self) -> None:
+        """Close the writer and delete the streamed rows, e.g. when nothing was generated"""
+        self.close()
+        self.finalized = True
+        if os.path.exists(self.jsonl_path):
+            os.remove(self.jsonl_path)
+
+
+class BatchRowSink:
+    """
+    Where one generation batch puts the rows it accepts.
+
+    Without a writer the rows are kept in the topic's output. Otherwise they
+    are written, and counted in the checkpoint, on the I/O pool: the write's
+    fsync, the ``on_progress`` DB update and the manifest save stay off the
+    event loop, which every concurrent batch shares. ``flush`` waits for them.
+    """
+
+    def __init__(self, topic: str, topic_output: List[Dict[str, Any]],
+                 output_writer: Optional[JsonlRowWriter] = None, checkpoint=None):
+        self.topic = topic
+        self.topic_output = topic_output
+        self.output_writer = output_writer
+        self.checkpoint = checkpoint
+        self._pending: List[asyncio.Future] = []
+
+    def emit(self, rows: List[Dict[str, Any]], omit_questions: Optional[List[str]] = None) -> None:
+        """Queue rows for writing; called on the event loop, returns without waiting"""
+        if self.output_writer is None:
+            self.topic_output.extend(rows)
+            if self.checkpoint is None:
+                return
+        omit = list(omit_questions) if omit_questions is not None else None
+        loop = asyncio.get_running_loop()
+        self._pending.append(loop.run_in_executor(get_io_executor(), self._persist, rows, omit))
+
+    def _persist(self, rows: List[Dict[str, Any]], omit_questions: Optional[List[str]]) -> None:
+        if self.output_writer is not None:
+            self.output_writer.write_rows(rows)
+        if self.checkpoint is not None:
+            self.checkpoint.record(self.topic, len(rows), omit_questions)
+
+    async def flush(self) -> None:
+        """Wait for every queued write; the first failure is raised once all of them finished"""
+        pending, self._pending = self._pending, []
+        for result in await asyncio.gather(*pending, return_exceptions=True):
+            if isinstance(result, BaseException):
+                raise result
@@ -27,6 +27,7 @@ import json
 import uuid 
 from fastapi.encoders import jsonable_encoder
 import os, json, csv
+import itertools
 from fastapi import Query
 
 
@@ -54,10 +55,18 @@ from app.core.database import DatabaseManager
 from app.core.exceptions import APIError, InvalidModelError, ModelHandlerError
 from app.services.model_alignment import ModelAlignment
 from app.core.model_handlers import create_handler, UnifiedModelHandler
+from app.core.client_registry import client_registry
+from app.core.adaptive_concurrency import limiter_snapshots
+from app.core.endpoint_pool import endpoint_pool_snapshots
+from app.core.hedging import hedge_policy_snapshots
+from app.core.prompt_caching import prompt_cache_stats
+from app.core.rate_limiter import rate_limiter
+from app.core.checkpoint import JobCheckpoint
 from app.services.aws_bedrock import get_bedrock_client
 from app.migrations.alembic_manager import AlembicMigrationManager
-from app.core.config import responses, caii_check
+from app.core.config import responses, caii_check_pool
 from app.core.path_manager import PathManager
+from app.core.blocking_io import read_json, run_blocking
 from app.core.model_endpoints import collect_model_catalog, sort_unique_models, list_bedrock_models
 
 # from app.core.telemetry_middleware import TelemetryMiddleware
@@ -262,6 +271,7 @@ async def lifespan(app: FastAPI):
     
     yield
     print("Application shutting down...")
+    await client_registry.aclose_all()
 
 
 app = FastAPI(
@@ -367,7 +377,7 @@ app.add_middleware(
            description = "get project file details")
 async def get_project_files(request: RelativePath):
     file_path = path_manager.get_str_path(request.path)
-    return client_cml.list_project_files(project_id, file_path)
+    return await run_blocking(client_cml.list_project_files, project_id, file_path)
     
     
 
@@ -380,21 +390,20 @@ async def get_dataset_size(request:JsonDataSize):
         file_paths = request.input_path
         for path in file_paths:
             try:
-                with open(path) as f:
-                    data = json.load(f)
-                    if not data:
-                        raise ValueError(f"Empty JSON data in file: {path}")
-                    
-                    # Check if input_key exists in at least one item
-                    key_exists = any(request.input_key in item for item in data)
-                    if not key_exists:
-                        raise KeyError(f"Input key '{request.input_key}' not found in any item in file: {path}")
-                    
-                    # Collect values, raising error if any item is missing the key
-                    for item in data:
-                        if request.input_key not in item:
-                            raise KeyError(f"Input key '{request.input_key}' missing in item: {item}")
-                        inputs.append(item[request.input_key])
+                data = await run_blocking(read_json, path)
+                if not data:
+                    raise ValueError(f"Empty JSON data in file: {path}")
+                
+                # Check if input_key exists in at least one item
+                key_exists = any(request.input_key in item for item in data)
+                if not key_exists:
+                    raise KeyError(f"Input key '{request.input_key}' not found in any item in file: {path}")
+                
+                # Collect values, raising error if any item is missing the key
+                for item in data:
+                    if request.input_key not in item:
+                        raise KeyError(f"Input key '{request.input_key}' missing in item: {item}")
+                    inputs.append(item[request.input_key])
                         
             except json.JSONDecodeError as e:
                 error_msg = f"Invalid JSON format in file {path}: {str(e)}"
@@ -451,8 +460,7 @@ async def get_dataset_size(request: RelativePath):
     ext = os.path.splitext(path)[1].lower()
     try:
         if ext == ".json":
-            with open(path) as f:
-                raw = json.load(f)
+            raw = await run_blocking(read_json, path)
 
             if isinstance(raw, list):
                 data = _truncate(raw)
@@ -465,9 +473,11 @@ async def get_dataset_size(request: RelativePath):
 
 
         elif ext == ".csv":
-            with open(path, newline="") as f:
-                reader = csv.DictReader(f)
-                data = _truncate([row for row in reader])
+            def _read_csv_head():
+                with open(path, newline="") as f:
+                    return list(itertools.islice(csv.DictReader(f), MAX_ROWS))
+
+            data = await run_blocking(_read_csv_head)
 
         else:
             return JSONResponse(status_code=400, content={"status": "failed", "error": "unsupported file type"})
@@ -497,8 +507,7 @@ async def get_dataset_size(request: RelativePath):
     ext = os.path.splitext(path)[1].lower()
     try:
         if ext == ".json":
-            with open(path) as f:
-                raw = json.load(f)
+            raw = await run_blocking(read_json, path)
 
 
         return {"data": raw}
@@ -523,9 +532,7 @@ async def generate_examples(request: SynthesisRequest):
     request_id = str(uuid.uuid4())
 
     if request.inference_type == "CAII":
-        caii_endpoint = request.caii_endpoint
-       
-        caii_check(caii_endpoint)
+        await run_blocking(caii_check_pool, [request.caii_endpoint, *(request.caii_endpoints or [])])
        
     
     is_demo = request.is_demo
@@ -534,7 +541,7 @@ async def generate_examples(request: SynthesisRequest):
     if project_id != "local":
         if request.doc_paths:
             paths = request.doc_paths
-            data_size = get_total_size(paths)
+            data_size = await run_blocking(get_total_size, paths)
             if data_size > 1 and data_size <=10:
                 is_demo = False
                 mem = data_size +2
@@ -562,7 +569,7 @@ async def generate_examples(request: SynthesisRequest):
             # SFT technique - route to legacy service
             return await synthesis_legacy_service.generate_examples(request,is_demo, request_id=request_id)
     else:
-       return synthesis_job.generate_job(request, core, mem, request_id=request_id)
+       return await run_blocking(synthesis_job.generate_job, request, core, mem, request_id=request_id)
     
 
 @app.post("/synthesis/freeform", include_in_schema=True,
@@ -574,8 +581,7 @@ async def generate_freeform_data(request: SynthesisRequest):
     request_id = str(uuid.uuid4())
 
     if request.inference_type == "CAII":
-        caii_endpoint = request.caii_endpoint
-        caii_check(caii_endpoint)
+        await run_blocking(caii_check_pool, [request.caii_endpoint, *(request.caii_endpoints or [])])
     
     is_demo = request.is_demo
     mem = 4
@@ -583,7 +589,7 @@ async def generate_freeform_data(request: SynthesisRequest):
     if project_id != "local":
         if request.doc_paths:
             paths = request.doc_paths
-            data_size = get_total_size(paths)
+            data_size = await run_blocking(get_total_size, paths)
             if data_size > 1 and data_size <= 10:
                 is_demo = False
                 mem = data_size + 2
@@ -616,7 +622,32 @@ async def generate_freeform_data(request: SynthesisRequest):
         # Convert back to SynthesisRequest object
         freeform_request = SynthesisRequest(**request_dict)
 
-        return synthesis_job.generate_job(freeform_request, core, mem, request_id=request_id, freeform = freeform)
+        return await run_blocking(synthesis_job.generate_job, freeform_request, core, mem, request_id=request_id, freeform = freeform)
+
+
+@app.post("/synthesis/resume/{job_name}", include_in_schema=True,
+    responses=responses,
+    description="Resume a failed generation job from its checkpoint")
+async def resume_generation_job(job_name: str, force: bool = False):
+    """
+    Re-launch a failed generation job; topics and rows already generated are skipped.
+    ``force`` resumes a job whose checkpoint still says running when its run status can't be read.
+    """
+    request_id = str(uuid.uuid4())
+    checkpoint = JobCheckpoint.load(job_name)
+    if checkpoint is None:
+        return JSONResponse(status_code=404, content={"status": "failed", "error": f"No checkpoint found for job {job_name}"})
+
+    mem = 4
+    core = 2
+    doc_paths = checkpoint.params.get("doc_paths")
+    if project_id != "local" and doc_paths:
+        data_size = await run_blocking(get_total_size, doc_paths)
+        if data_size > 1:
+            mem = data_size + 2
+            core = max(2, data_size // 2)
+
+    return await run_blocking(synthesis_job.resume_job, job_name, core, mem, request_id=request_id, force=force)
 
 @app.post("/synthesis/evaluate", 
     include_in_schema=True,
@@ -627,16 +658,15 @@ async def evaluate_examples(request: EvaluationRequest):
     request_id = str(uuid.uuid4())
 
     if request.inference_type == "CAII":
-        caii_endpoint = request.caii_endpoint
-        caii_check(caii_endpoint)
+        await run_blocking(caii_check_pool, [request.caii_endpoint, *(request.caii_endpoints or [])])
    
     is_demo = request.is_demo
     if is_demo:
        # SFT and Custom_Workflow evaluation - route to legacy service
-       return evaluator_legacy_service.evaluate_results(request, request_id=request_id)
+       return await evaluator_legacy_service.evaluate_results(request, request_id=request_id)
     
     else:
-        return synthesis_job.evaluate_job(request, request_id=request_id)
+        return await run_blocking(synthesis_job.evaluate_job, request, request_id=request_id)
     
 @app.post("/synthesis/evaluate_freeform", 
     include_in_schema=True,
@@ -647,19 +677,18 @@ async def evaluate_freeform(request: EvaluationRequest):
     request_id = str(uuid.uuid4())
 
     if request.inference_type == "CAII":
-        caii_endpoint = request.caii_endpoint
-        caii_check(caii_endpoint)
+        await run_blocking(caii_check_pool, [request.caii_endpoint, *(request.caii_endpoints or [])])
         
    
     is_demo = getattr(request, 'is_demo', True)
     if is_demo:
-        return evaluator_service.evaluate_row_data(request, request_id=request_id)
+        return await evaluator_service.evaluate_row_data(request, request_id=request_id)
     else:
         request_dict = request.model_dump()
         freeform = True
         # Convert back to SynthesisRequest object
         freeform_request = EvaluationRequest(**request_dict)
-        return synthesis_job.evaluate_job(freeform_request, request_id=request_id,freeform = freeform)
+        return await run_blocking(synthesis_job.evaluate_job, freeform_request, request_id=request_id,freeform = freeform)
 
 
 @app.post("/model/alignment",
@@ -710,7 +739,7 @@ async def generate_alignment_data(
 @app.post("/export_results", include_in_schema=True)
 async def export_results(request:Export_synth):
     try: 
-        return synthesis_job.export_job(request)
+        return await run_blocking(synthesis_job.export_job, request)
     
     except Exception as e:
 
@@ -733,7 +762,7 @@ async def create_custom_prompt(request: CustomPromptRequest, request_id = None):
                 example = request.example
             )
         #print(prompt)
-        prompt_gen = model_handler.generate_response(prompt, request_id=request_id)
+        prompt_gen = await model_handler.agenerate_response(prompt, request_id=request_id)
 
         return {"generated_prompt":prompt_gen}
     except Exception as e:
@@ -814,6 +843,18 @@ async def get_model_parameters() -> Dict:
     }
 
 
+@app.get("/model/concurrency", include_in_schema=True)
+async def get_model_concurrency() -> Dict:
+    """Current adaptive concurrency limit, recent throttle counts, RPM/TPM budgets, replica health, hedging and prompt cache hits per provider/model"""
+    return {
+        "limiters": limiter_snapshots(),
+        "rate_limits": rate_limiter.snapshots(),
+        "endpoint_pools": endpoint_pool_snapshots(),
+        "hedging": hedge_policy_snapshots(),
+        "prompt_cache": prompt_cache_stats.snapshots(),
+    }
+
+
 
 @app.post("/complete_gen_prompt")
 async def complete_prompt(request: SynthesisRequest):
@@ -824,7 +865,8 @@ async def complete_prompt(request: SynthesisRequest):
         omit_questions = []
 
         if request.technique == Technique.Freeform:
-            prompt = PromptBuilder.build_freeform_prompt(
+            # Reads the example file, if any
+            prompt = await run_blocking(PromptBuilder.build_freeform_prompt,
                                         model_id=request.model_id,
                                         use_case=request.use_case,
                                         topic=topic,
@@ -860,14 +902,13 @@ async def complete_prompt(request: SynthesisRequest):
 
             # Proceed only if path was successfully retrieved
             try:
-                with open(path) as f:
-                    data = json.load(f)
+                data = await run_blocking(read_json, path)
 
-                    # Assuming data is a list of dicts
-                    if not isinstance(data, list):
-                        raise ValueError(f"Expected JSON data in {path} to be a list, but got {type(data).__name__}")
+                # Assuming data is a list of dicts
+                if not isinstance(data, list):
+                    raise ValueError(f"Expected JSON data in {path} to be a list, but got {type(data).__name__}")
 
-                    inputs.extend(item.get(request.input_key, '') for item in data if isinstance(item, dict)) # Ensure item is a dict
+                inputs.extend(item.get(request.input_key, '') for item in data if isinstance(item, dict)) # Ensure item is a dict
 
             except FileNotFoundError:
                 raise HTTPException(status_code=404, detail=f"Input file not found: {path}")
@@ -919,8 +960,7 @@ async def complete_prompt(request: EvaluationRequest):
       
 
         if request.technique == Technique.Freeform:
-            with open(request.import_path, 'r') as file:
-                data = json.load(file)
+            data = await run_blocking(read_json, request.import_path)
             
                 # Ensure data is a list of rows
             rows = data if isinstance(data, list) else [data]
@@ -934,8 +974,7 @@ async def complete_prompt(request: EvaluationRequest):
   
         elif request.technique == Technique.SFT or request.technique == Technique.Custom_Workflow:
                   
-                with open(request.import_path, 'r') as file:
-                    data = json.load(file)
+                data = await run_blocking(read_json, request.import_path)
                 qa_pairs =  [{
                 request.output_key: item.get(request.output_key, ''),  # Use get() with default value
                 request.output_value: item.get(request.output_value, '')   # Use get() with default value
@@ -998,18 +1037,22 @@ async def get_generation_history(
     page_size: int = Query(10, ge=1, le=100, description="Items per page")
 ):
     """Get history of all generations with pagination"""
-    pending_job_ids = db_manager.get_pending_generate_job_ids()
-    
-    if pending_job_ids:
-        job_status_map = {
-            job_id: get_job_status(job_id)
-            for job_id in pending_job_ids
-        }
-        db_manager.update_job_statuses_generate(job_status_map)
-    
-    # Get paginated data
-    #total_count, results = db_manager.get_paginated_generate_metadata(page, page_size)
-    total_count, results = db_manager.get_paginated_generate_metadata_light(page, page_size)
+    def _refresh_and_page():
+        # SQLite queries and CML job status calls, run off the event loop
+        pending_job_ids = db_manager.get_pending_generate_job_ids()
+        
+        if pending_job_ids:
+            job_status_map = {
+                job_id: get_job_status(job_id)
+                for job_id in pending_job_ids
+            }
+            db_manager.update_job_statuses_generate(job_status_map)
+        
+        # Get paginated data
+        #return db_manager.get_paginated_generate_metadata(page, page_size)
+        return db_manager.get_paginated_generate_metadata_light(page, page_size)
+
+    total_count, results = await run_blocking(_refresh_and_page)
     
     # Return in the structure expected by the frontend
     return {
@@ -1040,7 +1083,7 @@ async def get_generation_history(
 @app.get("/generations/{file_name}", include_in_schema=True)
 async def get_generation_by_filename(file_name: str):
     """Get generation metadata by filename"""
-    result = db_manager.get_metadata_by_filename(file_name)
+    result = await run_blocking(db_manager.get_metadata_by_filename, file_name)
     
     if result is None:
         raise HTTPException(
@@ -1052,8 +1095,7 @@ async def get_generation_by_filename(file_name: str):
 
 @app.get("/dataset_details/{file_path}", include_in_schema=True)
 async def get_dataset(file_path: str):
-    with open(file_path) as f:
-            data = json.load(f)
+    data = await run_blocking(read_json, file_path)
     
    
     if 'qa_pairs' and 'evaluated' in file_path:
@@ -1100,17 +1142,21 @@ async def get_evaluation_history(
     page_size: int = Query(10, ge=1, le=100, description="Items per page")
 ):
     """Get history of all evaluations with pagination"""
-    pending_job_ids = db_manager.get_pending_evaluate_job_ids()
-    
-    if pending_job_ids:
-        job_status_map = {
-            job_id: get_job_status(job_id)
-            for job_id in pending_job_ids
-        }
-        db_manager.update_job_statuses_evaluate(job_status_map)
-    
-    # Get paginated data
-    total_count, results = db_manager.get_paginated_evaluate_metadata(page, page_size)
+    def _refresh_and_page():
+        # SQLite queries and CML job status calls, run off the event loop
+        pending_job_ids = db_manager.get_pending_evaluate_job_ids()
+        
+        if pending_job_ids:
+            job_status_map = {
+                job_id: get_job_status(job_id)
+                for job_id in pending_job_ids
+            }
+            db_manager.update_job_statuses_evaluate(job_status_map)
+        
+        # Get paginated data
+        return db_manager.get_paginated_evaluate_metadata(page, page_size)
+
+    total_count, results = await run_blocking(_refresh_and_page)
     
     return {
         "data": results,  # Keep the same response format for backward compatibility
@@ -1126,7 +1172,7 @@ async def get_evaluation_history(
 @app.get("/evaluations/{file_name}", include_in_schema=True)
 async def get_evaluation_by_filename(file_name: str):
     """Get generation metadata by filename"""
-    result = db_manager.get_evaldata_by_filename(file_name)
+    result = await run_blocking(db_manager.get_evaldata_by_filename, file_name)
     
     if result is None:
         raise HTTPException(
@@ -1141,26 +1187,26 @@ async def get_evaluation_by_filename(file_name: str):
 @app.put("/generations/display-name")
 async def update_display_name_generate(file_name: str, display_name: str):
     """Update display name for a generation"""
-    db_manager.update_generate_display_name(file_name, display_name)
+    await run_blocking(db_manager.update_generate_display_name, file_name, display_name)
     return {"message": "Display name updated successfully"}
 
 @app.put("/evaluations/display-name")
 async def update_display_name_evaluate(file_name: str, display_name: str):
     """Update display name for a generation"""
-    db_manager.update_evaluate_display_name(file_name, display_name)
+    await run_blocking(db_manager.update_evaluate_display_name, file_name, display_name)
     return {"message": "Display name updated successfully"}
 
 @app.delete("/generations/{file_name}")
 async def delete_generation(file_name: str, file_path: Optional[str] = None):
     """Delete generation metadata and optionally delete the local file"""
-    db_manager.delete_generate_data(file_name, file_path)
+    await run_blocking(db_manager.delete_generate_data, file_name, file_path)
     return {"message": f"Generation data for '{file_name}' has been deleted successfully."}
 
 
 @app.delete("/evaluations/{file_name}")
 async def delete_evaluation(file_name: str, file_path: Optional[str] = None):
     """Delete evaluation metadata and optionally delete the local file"""
-    db_manager.delete_evaluate_data(file_name, file_path)
+    await run_blocking(db_manager.delete_evaluate_data, file_name, file_path)
     return {"message": f"Evaluation data for '{file_name}' has been deleted successfully."}
 
 
@@ -1249,7 +1295,8 @@ async def get_custom_gen_examples(use_case: UseCase):
 async def health_check():
     """Get API health status"""
     #return {"status": "healthy"}
-    return synthesis_legacy_service.get_health_check()
+    # The check calls Bedrock with the synchronous client
+    return await run_blocking(synthesis_legacy_service.get_health_check)
 
 @app.get("/{use_case}/example_payloads")
 async def get_example_payloads(use_case:UseCase):
@@ -36,6 +36,7 @@ class GenerationMetadataModel(Base):
     job_status = Column(Text)
     job_creator_name = Column(Text)
     completed_rows = Column(Integer)
+    dedup_stats = Column(Text)
 
 class EvaluationMetadataModel(Base):
     __tablename__ = 'evaluation_metadata'
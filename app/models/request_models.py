@@ -1,6 +1,6 @@
 from typing import List, Dict, Optional, Any, Union
 import os
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from pydantic import BaseModel, Field, field_validator, model_validator, ConfigDict
 from enum import Enum
 from app.core.config import USE_CASE_CONFIGS, UseCase
 
@@ -10,6 +10,12 @@ from app.core.config import USE_CASE_CONFIGS, UseCase
 #     TEXT2SQL = "text2sql"
 #     CUSTOM = "custom"
 
+class ChunkSampling(str, Enum):
+    FIRST = "first"
+    UNIFORM = "uniform"
+    STRATIFIED = "stratified"
+    WEIGHTED = "weighted"
+
 class Technique(str, Enum):
     SFT = "sft"
     Custom_Workflow = "custom_workflow"
@@ -123,9 +129,17 @@ class SynthesisRequest(BaseModel):
     # Optional fields that can override defaults
     inference_type: Optional[str] = "aws_bedrock"
     caii_endpoint: Optional[str] = None
+    caii_endpoints: Optional[List[str]] = Field(
+        default=None,
+        description="Equivalent replicas of the model; calls are balanced across them and caii_endpoint"
+    )
     openai_compatible_endpoint: Optional[str] = None
     topics: Optional[List[str]] = None
     doc_paths: Optional[List[str]] = None
+    chunk_sampling: Optional[ChunkSampling] = Field(
+        default=None,
+        description="How doc_paths chunks are picked when there are more than num_questions (defaults to SDS_CHUNK_SAMPLING, first)"
+    )
     input_path: Optional[List[str]] = None
     input_key: Optional[str] = 'Prompt'
     output_key: Optional[str] = 'Prompt'
@@ -145,6 +159,14 @@ class SynthesisRequest(BaseModel):
         le=100, 
         description="Maximum number of concurrent topics to process (1-100)"
     ) 
+    stream: Optional[bool] = Field(
+        default=None,
+        description="Stream generation so rows are written as the model produces them (defaults to SDS_STREAMING)"
+    )
+    bulk: Optional[bool] = Field(
+        default=None,
+        description="Run a non-demo job through the provider's batch API (defaults to SDS_BULK_INFERENCE)"
+    )
     
     # Optional model parameters with defaults
     model_params: Optional[ModelParameters] = Field(
@@ -152,6 +174,13 @@ class SynthesisRequest(BaseModel):
         description="Low-level model generation parameters"
     )
 
+    @model_validator(mode="after")
+    def _primary_endpoint_from_pool(self):
+        # Job records and health checks read caii_endpoint, so fill it when only a pool is given
+        if self.caii_endpoints and not self.caii_endpoint:
+            self.caii_endpoint = self.caii_endpoints[0]
+        return self
+
     model_config = ConfigDict(protected_namespaces=(),
         json_schema_extra={
             "example": {
@@ -210,6 +239,10 @@ class EvaluationRequest(BaseModel):
     is_demo:bool = True
     inference_type :Optional[str] = "aws_bedrock"
     caii_endpoint: Optional[str] = None
+    caii_endpoints: Optional[List[str]] = Field(
+        default=None,
+        description="Equivalent replicas of the model; calls are balanced across them and caii_endpoint"
+    )
     examples: Optional[List[Example_eval]] = Field(default=None)
     custom_prompt: Optional[str] = None 
     display_name: Optional[str] = None 
@@ -221,6 +254,20 @@ class EvaluationRequest(BaseModel):
         le=100, 
         description="Maximum number of worker threads for parallel evaluation (1-100)"
     )
+    bulk: Optional[bool] = Field(
+        default=None,
+        description="Run a non-demo evaluation through the provider's batch API (defaults to SDS_BULK_INFERENCE)"
+    )
+    hedge: Optional[bool] = Field(
+        default=None,
+        description="Duplicate evaluation calls slower than the model's p95 latency and keep the first response (defaults to SDS_HEDGING)"
+    )
+    eval_batch_size: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=100,
+        description="Most rows scored per evaluation prompt; fewer when they don't fit the model's context (defaults to SDS_EVAL_BATCH_ROWS)"
+    )
 
     # Export configuration
     export_type: str = "local"  # "local" or "s3"
@@ -231,6 +278,13 @@ class EvaluationRequest(BaseModel):
         description="Low-level model generation parameters"
     )
 
+    @model_validator(mode="after")
+    def _primary_endpoint_from_pool(self):
+        # Job records and health checks read caii_endpoint, so fill it when only a pool is given
+        if self.caii_endpoints and not self.caii_endpoint:
+            self.caii_endpoint = self.caii_endpoints[0]
+        return self
+
     model_config = ConfigDict(protected_namespaces=(),
         json_schema_extra={
             "example": {
@@ -42,7 +42,7 @@ async def run_eval(request, job_name, request_id):
     try:
         
         job = EvaluatorLegacyService()
-        result = job.evaluate_results(request,job_name, is_demo=False, request_id=request_id)
+        result = await job.evaluate_results(request,job_name, is_demo=False, request_id=request_id)
         return result
     except Exception as e:
         print(f"Error in evaluation: {e}")
@@ -52,7 +52,7 @@ async def run_freeform_eval(request, job_name, request_id):
     """Run freeform data synthesis job"""
     try:
         job = EvaluatorService()
-        result = job.evaluate_row_data(request, job_name, is_demo=False, request_id=request_id)
+        result = await job.evaluate_row_data(request, job_name, is_demo=False, request_id=request_id)
         return result
     except Exception as e:
         print(f"Error in freeform synthesis: {e}")
@@ -39,25 +39,25 @@ import nest_asyncio  # Add this import
 # Enable nested event loop
 nest_asyncio.apply()
 
-async def run_synthesis(request, job_name, request_id):
+async def run_synthesis(request, job_name, request_id, resume=False):
     """Run standard synthesis job for question-answer pairs"""
     try:
         job = SynthesisLegacyService()
         if request.input_path:
             result = await job.generate_result(request, job_name, is_demo=False, request_id=request_id)
         else:
-            result = await job.generate_examples(request, job_name, is_demo=False, request_id=request_id)
+            result = await job.generate_examples(request, job_name, is_demo=False, request_id=request_id, resume=resume)
         
         return result
     except Exception as e:
         print(f"Error in synthesis: {e}")
         raise
 
-async def run_freeform_synthesis(request, job_name, request_id):
+async def run_freeform_synthesis(request, job_name, request_id, resume=False):
     """Run freeform data synthesis job"""
     try:
         job = SynthesisService()
-        result = await job.generate_freeform(request, job_name, is_demo=False, request_id=request_id)
+        result = await job.generate_freeform(request, job_name, is_demo=False, request_id=request_id, resume=resume)
         return result
     except Exception as e:
         print(f"Error in freeform synthesis: {e}")
@@ -73,6 +73,12 @@ if __name__ == "__main__":
         
         job_name = params.pop('job_name')
         request_id  = params.pop('request_id')
+        # A resumed run continues (and reports into) the original job
+        resume_job_name = params.pop('resume_job_name', None)
+        resume = resume_job_name is not None
+        if resume:
+            print(f"Resuming job {resume_job_name} as {job_name}")
+            job_name = resume_job_name
         print(f"Starting job: {job_name}")
         print(f"Parameters: {params}")
         
@@ -95,10 +101,10 @@ if __name__ == "__main__":
         # Run appropriate synthesis based on type
         if is_freeform:
             print("Running freeform data generation job")
-            result = loop.run_until_complete(run_freeform_synthesis(request, job_name, request_id))
+            result = loop.run_until_complete(run_freeform_synthesis(request, job_name, request_id, resume))
         else:
             print("Running standard question-answer generation job")
-            result = loop.run_until_complete(run_synthesis(request, job_name, request_id))
+            result = loop.run_until_complete(run_synthesis(request, job_name, request_id, resume))
             
         print(f"Job completed successfully: {result}")
         
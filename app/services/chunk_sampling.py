@@ -0,0 +1,133 @@
+import asyncio
+import heapq
+import math
+import random
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import CHUNK_STORE_CONFIG
+from app.services.doc_extraction import DocumentProcessor
+from app.services.doc_ingestion import iter_document_chunks, iter_indexed_document_chunks, stored_document_chunks
+
+SAMPLING_STRATEGIES = ("first", "uniform", "stratified", "weighted")
+
+
+class ChunkSampler:
+    """
+    Picks ``count`` chunks of a corpus in one pass, keeping at most ``count`` per heap.
+
+    Every chunk gets a random key drawn from (seed, document) in chunk order,
+    so a request picks the same chunks whether they are streamed out of the
+    extractor or only counted in the chunk store:
+
+    - ``uniform``: the ``count`` chunks with the smallest keys; every chunk is equally likely
+    - ``weighted``: likelier the longer the chunk (A-Res weighted reservoir sampling)
+    - ``stratified``: each document gets a share of ``count`` proportional
+      to its chunks, at least one when ``count`` allows, picked uniformly within it
+    """
+
+    def __init__(self, count: int, strategy: str, seed: int = 0):
+        if strategy not in SAMPLING_STRATEGIES[1:]:
+            raise ValueError(f"Unknown chunk sampling strategy: {strategy}")
+        self.count = count
+        self.strategy = strategy
+        self.seed = seed
+        self._rngs: Dict[int, random.Random] = {}
+        self._heaps: Dict[int, list] = {}   # min-heaps of (priority, doc, position, chunk); one per document if stratified
+        self._sizes: Dict[int, int] = {}    # chunks seen per document
+
+    def offer(self, doc: int, position: int, length: int, chunk: Optional[str] = None) -> None:
+        """The ``position``-th chunk of document ``doc``; chunks of a document must come in order"""
+        rng = self._rngs.get(doc)
+        if rng is None:
+            rng = self._rngs[doc] = random.Random(f"{self.seed}:{doc}")
+        key = 1.0 - rng.random()  # (0, 1]
+        priority = math.log(key) / max(length, 1) if self.strategy == "weighted" else -key
+        self._sizes[doc] = self._sizes.get(doc, 0) + 1
+        heap = self._heaps.setdefault(doc if self.strategy == "stratified" else -1, [])
+        entry = (priority, doc, position, chunk)
+        if len(heap) < self.count:
+            heapq.heappush(heap, entry)
+        elif priority > heap[0][0]:
+            heapq.heapreplace(heap, entry)
+
+    def selected(self) -> List[Tuple[int, int, Optional[str]]]:
+        """(doc, position, chunk) of the picked chunks, in corpus order"""
+        if self.strategy == "stratified":
+            quotas = self._quotas()
+            entries = [e for doc, heap in self._heaps.items() for e in heapq.nlargest(quotas[doc], heap)]
+        else:
+            entries = self._heaps.get(-1, [])
+        return [(doc, position, chunk) for _, doc, position, chunk in sorted(entries, key=lambda e: (e[1], e[2]))]
+
+    def _quotas(self) -> Dict[int, int]:
+        docs = sorted(self._sizes)
+        if sum(self._sizes.values()) <= self.count:
+            return dict(self._sizes)
+        # One chunk per document first when there is room, the rest by largest remainder
+        base = 1 if self.count >= len(docs) else 0
+        remaining = self.count - base * len(docs)
+        extra = {doc: self._sizes[doc] - base for doc in docs}
+        total = sum(extra.values())
+        exact = {doc: remaining * extra[doc] / total for doc in docs}
+        quotas = {doc: base + math.floor(exact[doc]) for doc in docs}
+        left = self.count - sum(quotas.values())
+        for doc in sorted(docs, key=lambda d: (math.floor(exact[d]) - exact[d], d))[:left]:
+            quotas[doc] += 1
+        return quotas
+
+
+async def sample_document_chunks(
+    paths: Sequence[str],
+    processor: DocumentProcessor,
+    count: int,
+    strategy: str = "uniform",
+    seed: int = 0,
+) -> AsyncIterator[str]:
+    """
+    Up to ``count`` chunks of the documents in ``paths``, picked by ``strategy``, in corpus order.
+
+    ``first`` streams the chunks from the start of the first document, so
+    generation can begin before the rest is parsed. The other strategies
+    see every chunk before yielding, holding only the ones picked so far;
+    when every document is in the chunk store only their lengths are read,
+    then the picked chunks.
+    """
+    if strategy == "first":
+        chunks = iter_document_chunks(paths, processor)
+        try:
+            yielded = 0
+            async for chunk in chunks:
+                yield chunk
+                yielded += 1
+                if yielded >= count:
+                    break
+        finally:
+            await chunks.aclose()
+        return
+
+    loop = asyncio.get_running_loop()
+    sampler = ChunkSampler(count, strategy, seed)
+    stored = [await loop.run_in_executor(None, stored_document_chunks, path, processor) for path in paths]
+
+    if all(chunks is not None for chunks in stored):
+        def offer_stored():
+            for doc, chunks in enumerate(stored):
+                for position, length in enumerate(chunks.sizes().tolist()):
+                    sampler.offer(doc, position, length)
+
+        await loop.run_in_executor(None, offer_stored)
+        picked = sampler.selected()
+        batch_size = max(1, CHUNK_STORE_CONFIG["read_batch_chunks"])
+        for start in range(0, len(picked), batch_size):
+            batch = picked[start:start + batch_size]
+            for chunk in await loop.run_in_executor(None, lambda: [stored[doc][position] for doc, position, _ in batch]):
+                yield chunk
+        return
+
+    positions: Dict[int, int] = {}
+    async for doc, chunk in iter_indexed_document_chunks(paths, processor):
+        position = positions.get(doc, 0)
+        positions[doc] = position + 1
+        sampler.offer(doc, position, len(chunk.encode("utf-8")) if strategy == "weighted" else 0, chunk)
+    for _, _, chunk in sampler.selected():
+        yield chunk
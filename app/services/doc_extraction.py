@@ -2,19 +2,213 @@ import fitz
 import docx
 from pathlib import Path
 import re
-from typing import List, Optional
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+from app.core.chunk_store import chunk_store
+from app.core.config import CHUNK_STORE_CONFIG
+
+# Bump whenever extraction, cleaning or chunking changes what a document turns into,
+# so chunks stored by an older version are no longer used.
+EXTRACTOR_VERSION = "1"
+
+class StreamingChunker:
+    """
+    Incremental ``DocumentProcessor._chunk_text(_clean_text(text))`` over pieces of one document.
+
+    Only the text after the last complete chunk is kept, so memory is about
+    one chunk plus one piece however large the document is.
+    """
+
+    def __init__(self, processor: "DocumentProcessor"):
+        self.processor = processor
+        self.buffer = ""
+        self.start = 0
+
+    def feed(self, piece: str) -> List[str]:
+        """Add the next piece of raw text; returns the chunks it completed"""
+        piece = re.sub(r'\s+', ' ', piece)
+        if not self.buffer or self.buffer.endswith(' '):
+            # Leading whitespace of the document, or a run continuing across pieces
+            piece = piece.lstrip(' ')
+        self.buffer += piece
+        chunks = []
+        # Keep one character in hand: a trailing space is stripped if no text follows
+        while self.start + self.processor.chunk_size < len(self.buffer) - 1:
+            chunk, self.start = self.processor._next_chunk(self.buffer, self.start)
+            if chunk:
+                chunks.append(chunk)
+        # Never empties a started buffer: the loop leaves at least two characters
+        self.buffer, self.start = self.buffer[self.start:], 0
+        return chunks
+
+    def close(self) -> List[str]:
+        """The chunks left once the document has ended"""
+        text = self.buffer.rstrip(' ')
+        chunks = []
+        while self.start < len(text):
+            chunk, self.start = self.processor._next_chunk(text, self.start)
+            if chunk:
+                chunks.append(chunk)
+        self.buffer, self.start = "", 0
+        return chunks
+
+
+# A sentence end and the whitespace after it, or a blank line; a match spanning two newlines ends a paragraph
+_SEGMENT_BOUNDARY = re.compile(r'([.!?])\s+|\n[^\S\n]*\n\s*')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def approx_token_count(text: str) -> int:
+    """
+    ``estimate_token_count``'s 4 characters per token, plus one for the space
+    joining the text to the next sentence of a chunk, so the counts of a
+    chunk's sentences never add up to less than the estimate for the chunk.
+    """
+    return len(text) // 4 + 1
+
+
+class TokenChunker:
+    """
+    Chunks of one document by token budget, fed in pieces like ``StreamingChunker``.
+
+    The text is split into sentences once, and each sentence is counted once;
+    a chunk is the longest run of whole sentences within ``chunk_tokens``,
+    cut short at the end of a paragraph when one falls in its second half,
+    and the next chunk starts with up to ``overlap_tokens`` tokens of its
+    trailing sentences. Sentences over the budget are split at spaces.
+    Time is linear in the length of the text.
+    """
+
+    def __init__(self, chunk_tokens: int, overlap_tokens: int = 0,
+                 count_tokens: Callable[[str], int] = approx_token_count):
+        self.budget = max(1, chunk_tokens)
+        self.overlap = max(0, overlap_tokens)
+        self.count_tokens = count_tokens
+        self.pending = ""        # text after the last sentence boundary seen
+        self.scan_from = 0       # where in `pending` a boundary can still start
+        self.segments: List[str] = []
+        self.tokens: List[int] = []
+        self.paragraph_end: List[bool] = []
+        self.start = 0           # first segment of the next chunk
+
+    def feed(self, piece: str) -> List[str]:
+        """Add the next piece of raw text; returns the chunks it completed"""
+        if not piece:
+            return []
+        scan_from = self.scan_from
+        stripped = piece.rstrip()
+        if stripped:
+            # A boundary still to come starts at the trailing whitespace, or the sentence end before it
+            self.scan_from = len(self.pending) + len(stripped) - 1
+        self.pending += piece
+        consumed = 0
+        for match in _SEGMENT_BOUNDARY.finditer(self.pending, scan_from):
+            if match.end() == len(self.pending):
+                break  # the whitespace may go on in the next piece
+            sentence_end = match.start(1) + 1 if match.group(1) else match.start()
+            self._add_segment(self.pending[consumed:sentence_end], match.group().count('\n') >= 2)
+            consumed = match.end()
+        if consumed:
+            self.pending = self.pending[consumed:]
+            self.scan_from -= consumed
+        return self._emit(final=False)
+
+    def close(self) -> List[str]:
+        """The chunks left once the document has ended"""
+        self._add_segment(self.pending, True)
+        chunks = self._emit(final=True)
+        self.__init__(self.budget, self.overlap, self.count_tokens)
+        return chunks
+
+    def _add_segment(self, raw: str, paragraph_end: bool) -> None:
+        text = _WHITESPACE.sub(' ', raw).strip()
+        if not text:
+            if paragraph_end and self.paragraph_end:
+                self.paragraph_end[-1] = True
+            return
+        tokens = self.count_tokens(text)
+        if tokens <= self.budget:
+            self._append(text, tokens, paragraph_end)
+            return
+        # Over the budget: take windows of ~4 characters per token, shrunk until they fit
+        position = 0
+        while position < len(text):
+            piece = text[position:position + 4 * self.budget]
+            last = position + len(piece) == len(text)
+            count = self.count_tokens(piece)
+            while count > self.budget and len(piece) > 1:
+                cut = max(1, len(piece) * self.budget // count)
+                space = piece.rfind(' ', 0, cut + 1)
+                piece = piece[:space] if space > 0 else piece[:cut]
+                count, last = self.count_tokens(piece), False
+            if not last and position + len(piece) < len(text) and text[position + len(piece)] != ' ':
+                # Ended inside a word: back up to the last space if there is one
+                space = piece.rfind(' ')
+                if space > 0:
+                    piece = piece[:space]
+                    count = self.count_tokens(piece)
+            self._append(piece.strip(), count, paragraph_end and last)
+            position += len(piece)
+            while position < len(text) and text[position] == ' ':
+                position += 1
+
+    def _append(self, text: str, tokens: int, paragraph_end: bool) -> None:
+        self.segments.append(text)
+        self.tokens.append(tokens)
+        self.paragraph_end.append(paragraph_end)
+
+    def _emit(self, final: bool) -> List[str]:
+        chunks = []
+        count = len(self.segments)
+        while self.start < count:
+            end, total, totals = self.start, 0, []
+            while end < count and (end == self.start or total + self.tokens[end] <= self.budget):
+                total += self.tokens[end]
+                totals.append(total)
+                end += 1
+            if end == count and not final:
+                break  # segments still to come may belong in this chunk
+            cut = end
+            if end < count:
+                for i in range(end - 1, self.start, -1):
+                    if self.paragraph_end[i] and totals[i - self.start] * 2 >= self.budget:
+                        cut = i + 1
+                        break
+            chunks.append(" ".join(self.segments[self.start:cut]))
+            if cut == count:
+                self.start = count
+                break
+            next_start, repeated = cut, 0
+            while next_start - 1 > self.start and repeated + self.tokens[next_start - 1] <= self.overlap:
+                next_start -= 1
+                repeated += self.tokens[next_start]
+            self.start = next_start
+        if self.start > 1024 and self.start * 2 > count:
+            # Drop chunked segments now and then, not per chunk, to stay linear
+            del self.segments[:self.start], self.tokens[:self.start], self.paragraph_end[:self.start]
+            self.start = 0
+        return chunks
+
 
 class DocumentProcessor:
-    def __init__(self, chunk_size: int = 1000, overlap: int = 100):
+    def __init__(self, chunk_size: int = 1000, overlap: int = 100, chunk_tokens: Optional[int] = None,
+                 overlap_tokens: int = 0, count_tokens: Callable[[str], int] = approx_token_count):
         """
         Initialize DocumentProcessor with chunking parameters.
         
         Args:
             chunk_size (int): Maximum size of each chunk in characters
             overlap (int): Number of overlapping characters between chunks
+            chunk_tokens (int, optional): Chunk by token budget instead, see ``TokenChunker``
+            overlap_tokens (int): Tokens of trailing sentences repeated in the next chunk
+            count_tokens (callable): Token count of a text, for ``chunk_tokens``; a named
+                function, since its name is part of the chunk store key
         """
         self.chunk_size = chunk_size
         self.overlap = overlap
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.count_tokens = count_tokens
         self.supported_formats = {'.pdf', '.doc', '.docx', '.txt'}
 
     def _chunk_text(self, text: str) -> List[str]:
@@ -31,20 +225,47 @@ class DocumentProcessor:
         start = 0
         
         while start < len(text):
-            end = start + self.chunk_size
-            
-            if end < len(text):
-                break_point = text.rfind('.', start, end)
-                if break_point == -1:
-                    break_point = text.rfind(' ', start, end)
-                if break_point != -1:
-                    end = break_point + 1
-            
-            chunks.append(text[start:end].strip())
-            start = end - self.overlap
+            chunk, start = self._next_chunk(text, start)
+            chunks.append(chunk)
             
         return [chunk for chunk in chunks if chunk]
 
+    def _next_chunk(self, text: str, start: int) -> Tuple[str, int]:
+        """The chunk starting at ``start`` and where the next one starts"""
+        end = start + self.chunk_size
+        
+        if end < len(text):
+            break_point = text.rfind('.', start, end)
+            if break_point == -1:
+                break_point = text.rfind(' ', start, end)
+            if break_point != -1:
+                end = break_point + 1
+
+        next_start = end - self.overlap
+        if next_start <= start:
+            # A break point within `overlap` of the start would find itself again forever
+            next_start = end
+        return text[start:end].strip(), next_start
+
+    def chunker(self) -> Union[StreamingChunker, TokenChunker]:
+        """A chunker for one document with this processor's settings"""
+        if self.chunk_tokens:
+            return TokenChunker(self.chunk_tokens, self.overlap_tokens, self.count_tokens)
+        return StreamingChunker(self)
+
+    def iter_chunks(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Chunk text that arrives in pieces, yielding chunks as soon as they are complete.
+
+        The pieces concatenated are the raw document text; the result is the
+        same as for the whole text in one piece, which in character mode is
+        ``_chunk_text(_clean_text(...))``.
+        """
+        chunker = self.chunker()
+        for piece in pieces:
+            yield from chunker.feed(piece)
+        yield from chunker.close()
+
     def _extract_pdf(self, file_path: Path) -> str:
         """Extract text from PDF file."""
         with fitz.open(file_path) as doc:
@@ -64,6 +285,17 @@ class DocumentProcessor:
         """Clean extracted text by removing extra whitespace."""
         return re.sub(r'\s+', ' ', text).strip()
 
+    def store_key(self, file_path: str) -> Optional[str]:
+        """Chunk store key of a document for this processor's settings; None when the store is disabled."""
+        if not CHUNK_STORE_CONFIG["enabled"]:
+            return None
+        if self.chunk_tokens:
+            tokenizer = f"{self.count_tokens.__module__}.{self.count_tokens.__qualname__}"
+            settings = ("tokens", self.chunk_tokens, self.overlap_tokens, tokenizer)
+        else:
+            settings = (self.chunk_size, self.overlap)
+        return chunk_store.key(str(file_path), *settings, EXTRACTOR_VERSION)
+
     def process_document(self, file_path: str) -> List[str]:
         """
         Process document and return chunks of text.
@@ -83,6 +315,11 @@ class DocumentProcessor:
             
             if file_path.suffix.lower() not in self.supported_formats:
                 raise ValueError(f"Unsupported file format: {file_path.suffix}")
+
+            key = self.store_key(file_path)
+            stored = chunk_store.get(key) if key else None
+            if stored is not None:
+                return list(stored)
             
             # Extract text based on file type
             if file_path.suffix.lower() == '.pdf':
@@ -92,9 +329,14 @@ class DocumentProcessor:
             else:  # .txt
                 text = self._extract_txt(file_path)
             
-            # Clean and chunk the text
-            text = self._clean_text(text)
-            return self._chunk_text(text)
+            # Clean and chunk the text; token chunking needs the line breaks to find paragraphs
+            if self.chunk_tokens:
+                chunks = list(self.iter_chunks([text]))
+            else:
+                chunks = self._chunk_text(self._clean_text(text))
+            if key:
+                chunk_store.save(key, chunks)
+            return chunks
             
         except Exception as e:
             raise Exception(f"Error processing {file_path}: {str(e)}")
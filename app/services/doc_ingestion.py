@@ -0,0 +1,268 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import AsyncIterator, Callable, List, Optional, Sequence, Tuple
+
+import fitz
+
+from app.core.chunk_store import ChunkWriter, StoredChunks, chunk_store
+from app.core.config import CHUNK_STORE_CONFIG, DOC_INGEST_CONFIG
+from app.services.doc_extraction import DocumentProcessor
+
+_pool: Optional[Executor] = None
+_pool_lock = threading.Lock()
+
+
+def get_ingestion_pool() -> Optional[Executor]:
+    """
+    Process pool shared by every job for text extraction; None when
+    SDS_DOC_INGEST_WORKERS is 0 and extraction runs on the default thread pool.
+    """
+    global _pool
+    if DOC_INGEST_CONFIG["workers"] <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the server process has threads (uvicorn, SDK clients) a fork would copy mid-flight
+            _pool = ProcessPoolExecutor(
+                max_workers=DOC_INGEST_CONFIG["workers"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+# ---------- extraction tasks (run in the pool) ----------------------------------
+def _pdf_pages_text(path: str, start: int, stop: int) -> str:
+    """Text of pages [start, stop), joined the way DocumentProcessor._extract_pdf joins all pages"""
+    with fitz.open(path) as doc:
+        text = " ".join(doc[i].get_text() for i in range(start, stop))
+    return text if start == 0 else " " + text
+
+
+def _docx_text(path: str) -> str:
+    return DocumentProcessor()._extract_doc(Path(path))
+
+
+def _line_start(f, offset: int) -> int:
+    """Offset of the first line starting at or after ``offset``"""
+    if offset == 0:
+        return 0
+    f.seek(offset - 1)
+    position = offset - 1
+    # Scan in blocks rather than readline() so a file without newlines is not read whole
+    while True:
+        block = f.read(64 * 1024)
+        if not block:
+            return position
+        newline = block.find(b"\n")
+        if newline != -1:
+            return position + newline + 1
+        position += len(block)
+
+
+def _txt_block_text(path: str, start: int, stop: int) -> str:
+    """
+    The lines starting within bytes [start, stop) of a UTF-8 text file.
+
+    Blocks split at line starts never cut a multi-byte character, and the
+    blocks of a file concatenate to the whole file.
+    """
+    with open(path, "rb") as f:
+        begin, end = _line_start(f, start), _line_start(f, stop)
+        if end <= begin:
+            return ""
+        f.seek(begin)
+        return f.read(end - begin).decode("utf-8")
+
+
+def _plan_document(path: str) -> Optional[List[Tuple[Callable[..., str], tuple]]]:
+    """
+    Extraction tasks of one document, in text order; None for formats
+    left to ``DocumentProcessor.process_document`` as a whole.
+    """
+    suffix = Path(path).suffix.lower()
+    if suffix == ".pdf":
+        with fitz.open(path) as doc:
+            pages = doc.page_count
+        step = max(1, DOC_INGEST_CONFIG["pdf_pages_per_task"])
+        return [(_pdf_pages_text, (path, start, min(start + step, pages))) for start in range(0, pages, step)]
+    if suffix in (".doc", ".docx"):
+        return [(_docx_text, (path,))]
+    if suffix != ".txt":
+        return None
+    size = os.path.getsize(path)
+    step = max(1, DOC_INGEST_CONFIG["txt_bytes_per_task"])
+    return [(_txt_block_text, (path, start, min(start + step, size))) for start in range(0, size, step)]
+
+
+def _finish_document(writer: ChunkWriter, chunker, tasks: List[Tuple[Callable[..., str], tuple]],
+                     pool: Optional[Executor], window: int) -> None:
+    """
+    Extract the rest of a document its consumer stopped reading part way and
+    store it; runs on a background thread, ``window`` tasks in flight at a time.
+    """
+    try:
+        remaining = iter(tasks)
+        pending: deque = deque()
+        while True:
+            while len(pending) < window and (task := next(remaining, None)) is not None:
+                pending.append(pool.submit(task[0], *task[1]) if pool is not None else task)
+            if not pending:
+                break
+            item = pending.popleft()
+            writer.add(chunker.feed(item.result() if pool is not None else item[0](*item[1])))
+        writer.add(chunker.close())
+        writer.commit()
+    except Exception as e:
+        print(f"Chunk store write failed: {str(e)}")
+        writer.abort()
+
+
+DOCUMENT_FORMATS = (".pdf", ".doc", ".docx", ".txt")
+
+
+def stored_document_chunks(path: str, processor: DocumentProcessor) -> Optional[StoredChunks]:
+    """The chunks of one document in the chunk store, or None"""
+    if Path(path).suffix.lower() not in DOCUMENT_FORMATS:
+        return None
+    key = processor.store_key(path)
+    return chunk_store.get(key) if key else None
+
+
+def _open_document(path: str, processor: DocumentProcessor):
+    """
+    (store key, stored chunks, tasks) of one document: the chunks from the
+    chunk store when it has them, otherwise the tasks extracting them.
+    """
+    if Path(path).suffix.lower() not in DOCUMENT_FORMATS:
+        return None, None, None
+    key = processor.store_key(path)
+    stored = chunk_store.get(key) if key else None
+    if stored is not None:
+        return key, stored, None
+    return key, None, _plan_document(path)
+
+
+async def iter_document_chunks(paths: Sequence[str], processor: DocumentProcessor) -> AsyncIterator[str]:
+    """Chunks of every document in ``paths``, in order, see ``iter_indexed_document_chunks``"""
+    chunks = iter_indexed_document_chunks(paths, processor)
+    try:
+        async for _, chunk in chunks:
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+
+async def iter_indexed_document_chunks(paths: Sequence[str], processor: DocumentProcessor) -> AsyncIterator[Tuple[int, str]]:
+    """
+    (index in ``paths``, chunk) of every document in ``paths``, in order, as they are extracted.
+
+    The same chunks ``processor.process_document`` returns for each path;
+    other formats than PDF, DOC/DOCX and TXT go through it whole.
+    Documents found in the chunk store are paged from it instead of being
+    extracted; the others are written to it as their chunks come out.
+    Up to ``prefetch_tasks`` page ranges / text blocks are extracted ahead of
+    the consumer, across document boundaries; closing the iterator early
+    cancels the ones not yet started. The document being read when it is
+    closed is finished and stored in the background (``finish_on_close``);
+    documents not yet started are left alone.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_ingestion_pool()
+    window = max(1, DOC_INGEST_CONFIG["prefetch_tasks"])
+    documents = iter(enumerate(paths))
+    # (doc index, path, task); task None ends the document, "whole" chunks it in one go
+    # and StoredChunks come from the chunk store
+    planned: deque = deque()
+    running: deque = deque()   # (doc index, path, task, future or None)
+    keys = {}                  # doc index -> chunk store key of documents being extracted
+    current, chunker = None, None
+    writer: Optional[ChunkWriter] = None
+
+    try:
+        while True:
+            while len(running) < window:
+                if not planned:
+                    index, path = next(documents, (None, None))
+                    if path is None:
+                        break
+                    try:
+                        key, stored, tasks = await loop.run_in_executor(None, _open_document, path, processor)
+                    except Exception as e:
+                        raise Exception(f"Error processing {path}: {str(e)}")
+                    if stored is not None:
+                        planned.append((index, path, stored))
+                        continue
+                    if tasks is None:
+                        planned.append((index, path, "whole"))
+                        continue
+                    keys[index] = key
+                    planned.extend((index, path, task) for task in tasks)
+                    planned.append((index, path, None))
+                index, path, task = planned.popleft()
+                if task is None or isinstance(task, StoredChunks):
+                    future = None
+                elif task == "whole":
+                    future = loop.run_in_executor(None, processor.process_document, path)
+                else:
+                    future = loop.run_in_executor(pool, task[0], *task[1])
+                running.append((index, path, task, future))
+            if not running:
+                return
+
+            index, path, task, future = running.popleft()
+            if task == "whole":
+                # process_document raises errors with the path in them already
+                for chunk in await future:
+                    yield index, chunk
+                continue
+            if isinstance(task, StoredChunks):
+                # Read a batch at a time from the memory map rather than the whole document
+                batches = task.batches(max(1, CHUNK_STORE_CONFIG["read_batch_chunks"]))
+                while batch := await loop.run_in_executor(None, next, batches, None):
+                    for chunk in batch:
+                        yield index, chunk
+                continue
+            if index != current:
+                current, chunker = index, processor.chunker()
+                key = keys.pop(index, None)
+                writer = chunk_store.writer(key) if key else None
+            if future is None:
+                chunks = chunker.close()
+                if writer is not None:
+                    writer.add(chunks)
+                    await loop.run_in_executor(None, writer.commit)
+                    writer = None
+                for chunk in chunks:
+                    yield index, chunk
+                continue
+            try:
+                piece = await future
+            except Exception as e:
+                raise Exception(f"Error processing {path}: {str(e)}")
+            chunks = chunker.feed(piece)
+            if writer is not None:
+                writer.add(chunks)
+            for chunk in chunks:
+                yield index, chunk
+    except GeneratorExit:
+        if writer is not None and CHUNK_STORE_CONFIG["finish_on_close"]:
+            # Closed part way through a document: extract the rest of it off the consumer's path
+            rest = [task for i, _, task, _ in running if i == current and isinstance(task, tuple)]
+            rest += [task for i, _, task in planned if i == current and isinstance(task, tuple)]
+            threading.Thread(
+                target=_finish_document, args=(writer, chunker, rest, pool, window), daemon=True
+            ).start()
+            writer = None
+        raise
+    finally:
+        if writer is not None:
+            # Failed part way through a document: nothing partial goes into the store
+            writer.abort()
+        for _, _, _, future in running:
+            if future is not None:
+                future.cancel()
@@ -0,0 +1,104 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from app.core.config import EVAL_BATCH_CONFIG, MODEL_CONFIGS
+from app.core.rate_limiter import CHARS_PER_TOKEN
+from app.models.request_models import ModelParameters
+
+
+def eval_batch_size(request) -> int:
+    """Most rows an evaluation prompt of this request may carry"""
+    size = request.eval_batch_size if getattr(request, "eval_batch_size", None) else EVAL_BATCH_CONFIG["rows"]
+    return max(1, int(size))
+
+
+def _tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def plan_eval_batches(item_texts: Sequence[str], overhead_prompt: str, request) -> List[List[int]]:
+    """
+    Group item indexes into evaluation prompts.
+
+    ``overhead_prompt`` is the batched prompt without any items (instructions
+    and examples). A group is closed once it has ``eval_batch_size`` items,
+    once its answers would not fit the request's max_tokens, or once the next
+    item would overflow the model's context window. An item too large for any
+    group goes on its own.
+    """
+    params = request.model_params or ModelParameters()
+    per_row_output = EVAL_BATCH_CONFIG["output_tokens_per_row"]
+    max_rows = min(eval_batch_size(request), max(1, params.max_tokens // per_row_output))
+    context = MODEL_CONFIGS.get(request.model_id, {}).get("max_input_tokens") or EVAL_BATCH_CONFIG["context_tokens"]
+    budget = context - _tokens(overhead_prompt)
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+    used = 0
+    for index, text in enumerate(item_texts):
+        cost = _tokens(text) + per_row_output
+        if current and (len(current) >= max_rows or used + cost > budget):
+            batches.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def scores_by_index(response: Optional[List[Any]], size: int) -> Dict[int, Dict[str, Any]]:
+    """Evaluations of a batched response keyed by item index; entries without a usable index or score are ignored"""
+    scores: Dict[int, Dict[str, Any]] = {}
+    for entry in response or []:
+        if not isinstance(entry, dict) or "score" not in entry:
+            continue
+        try:
+            index = int(entry.get("index"))
+        except (TypeError, ValueError):
+            continue
+        if 0 <= index < size and index not in scores:
+            scores[index] = entry
+    return scores
+
+
+async def run_eval_batches(
+    items: Sequence[Any],
+    batches: List[List[int]],
+    evaluate_batch: Callable[[List[Any]], Awaitable[List[Optional[Dict[str, Any]]]]],
+    evaluate_single: Callable[[Any], Awaitable[Dict[str, Any]]],
+    semaphore: asyncio.Semaphore,
+    logger=None,
+) -> List[Any]:
+    """
+    Evaluate ``items`` in the planned batches; results (or exceptions) come back in item order.
+
+    ``evaluate_batch`` returns one result per item, None for items the model
+    left out of its answer; those are evaluated again on their own. Errors
+    that fail a whole batch propagate, as they would from a single call.
+    """
+    results: List[Any] = [None] * len(items)
+
+    async def run_single(item):
+        async with semaphore:
+            return await evaluate_single(item)
+
+    async def run_batch(indexes: List[int]) -> None:
+        if len(indexes) == 1:
+            results[indexes[0]] = (await asyncio.gather(run_single(items[indexes[0]]), return_exceptions=True))[0]
+            return
+        async with semaphore:
+            scored = await evaluate_batch([items[i] for i in indexes])
+        missing = [i for i, result in zip(indexes, scored) if result is None]
+        for i, result in zip(indexes, scored):
+            if result is not None:
+                results[i] = result
+        if missing:
+            if logger is not None:
+                logger.info(f"{len(missing)} of {len(indexes)} items missing from batched evaluation, re-queuing them")
+            retried = await asyncio.gather(*(run_single(items[i]) for i in missing), return_exceptions=True)
+            for i, result in zip(missing, retried):
+                results[i] = result
+
+    await asyncio.gather(*(run_batch(indexes) for indexes in batches))
+    return results
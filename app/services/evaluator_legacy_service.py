@@ -1,12 +1,16 @@
 import boto3
 from typing import Dict, List, Optional, Any
 from typing import Dict, List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 from app.models.request_models import Example, ModelParameters, EvaluationRequest
 from app.core.model_handlers import create_handler
+from app.core.batch_inference import BulkModelHandler, bulk_handler_for
+from app.core.hedging import HedgedModelHandler, hedged_handler_for
+from app.services.eval_batching import eval_batch_size, plan_eval_batches, run_eval_batches, scores_by_index
 from app.core.prompt_templates import PromptBuilder, PromptHandler
 from app.services.aws_bedrock import get_bedrock_client
 from app.core.database import DatabaseManager
+from app.core.blocking_io import read_json, run_blocking, write_json
 from app.core.config import UseCase, Technique, get_model_family
 from app.services.check_guardrail import ContentGuardrail
 from app.core.exceptions import APIError, InvalidModelError, ModelHandlerError
@@ -16,7 +20,6 @@ import json
 import logging
 from logging.handlers import RotatingFileHandler
 from app.core.telemetry_integration import track_llm_operation
-from functools import partial
 
 class EvaluatorLegacyService:
     """Legacy service for evaluating generated QA pairs using Claude with parallel processing (SFT and Custom_Workflow only)"""
@@ -58,7 +61,7 @@ class EvaluatorLegacyService:
 
     
     #@track_llm_operation("evaluate_single_pair")
-    def evaluate_single_pair(self, qa_pair: Dict, model_handler, request: EvaluationRequest, request_id=None) -> Dict:
+    async def evaluate_single_pair(self, qa_pair: Dict, model_handler, request: EvaluationRequest, request_id=None) -> Dict:
         """Evaluate a single QA pair"""
         try:
             # Default error response
@@ -100,7 +103,7 @@ class EvaluatorLegacyService:
                 return error_response
 
             try:
-                response = model_handler.generate_response(prompt, request_id=request_id)
+                response = await model_handler.agenerate_response(prompt, request_id=request_id)
             except ModelHandlerError as e:
                 self.logger.error(f"ModelHandlerError in generate_response: {str(e)}")
                 raise  
@@ -146,52 +149,106 @@ class EvaluatorLegacyService:
             self.logger.error(f"Critical error in evaluate_single_pair: {str(e)}")
             return error_response
         
+    async def evaluate_pair_batch(self, qa_pairs: List[Dict], model_handler, request: EvaluationRequest, request_id=None) -> List[Optional[Dict]]:
+        """Evaluate several QA pairs with one prompt; None for pairs the model left out of its answer"""
+        try:
+            prompt = PromptBuilder.build_batch_eval_prompt(
+                request.model_id,
+                request.use_case,
+                [{"question": pair[request.output_key], "solution": pair[request.output_value]} for pair in qa_pairs],
+                request.examples,
+                request.custom_prompt
+            )
+            response = await model_handler.agenerate_response(prompt, request_id=request_id)
+        except ModelHandlerError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error in batched QA pair evaluation, re-queuing pairs: {str(e)}")
+            return [None] * len(qa_pairs)
+
+        scores = scores_by_index(response, len(qa_pairs))
+        return [
+            {
+                "question": pair[request.output_key],
+                "solution": pair[request.output_value],
+                "evaluation": {
+                    "score": scores[i]["score"],
+                    "justification": scores[i].get("justification", "No justification provided")
+                }
+            } if i in scores else None
+            for i, pair in enumerate(qa_pairs)
+        ]
+
     #@track_llm_operation("evaluate_topic")
-    def evaluate_topic(self, topic: str, qa_pairs: List[Dict], model_handler, request: EvaluationRequest, request_id=None) -> Dict:
-        """Evaluate all QA pairs for a given topic in parallel"""
+    async def evaluate_topic(self, topic: str, qa_pairs: List[Dict], model_handler, request: EvaluationRequest, request_id=None, semaphore: Optional[asyncio.Semaphore] = None) -> Dict:
+        """
+        Evaluate all QA pairs for a given topic concurrently.
+
+        ``semaphore`` bounds the LLM calls in flight; pass the job-wide one so
+        that all topics share a single ``max_workers`` budget.
+        """
         try:
             self.logger.info(f"Starting evaluation for topic: {topic} with {len(qa_pairs)} QA pairs")
             evaluated_pairs = []
             failed_pairs = []
 
             try:
-                max_workers = request.max_workers or self.max_workers
-                with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                    try:
-                        evaluate_func = partial(
-                            self.evaluate_single_pair,
-                            model_handler=model_handler,
-                            request=request, request_id=request_id
+                if semaphore is None:
+                    semaphore = asyncio.Semaphore(request.max_workers or self.max_workers)
+
+                async def evaluate_pair(pair):
+                    async with semaphore:
+                        return await self.evaluate_single_pair(pair, model_handler, request, request_id=request_id)
+
+                if eval_batch_size(request) > 1 and qa_pairs:
+                    overhead = PromptBuilder.build_batch_eval_prompt(
+                        request.model_id, request.use_case, [], request.examples, request.custom_prompt
+                    )
+                    # Pairs missing a key go on their own so they get the usual error response
+                    complete = [
+                        i for i, pair in enumerate(qa_pairs)
+                        if all(key in pair for key in [request.output_key, request.output_value])
+                    ]
+                    batches = [
+                        [complete[j] for j in batch]
+                        for batch in plan_eval_batches(
+                            [f"{qa_pairs[i][request.output_key]}\n{qa_pairs[i][request.output_value]}" for i in complete],
+                            overhead,
+                            request,
                         )
-                        
-                        future_to_pair = {
-                            executor.submit(evaluate_func, pair): pair 
-                            for pair in qa_pairs
-                        }
-                        
-                        for future in as_completed(future_to_pair):
-                            try:
-                                result = future.result()
-                                evaluated_pairs.append(result)
-                            except ModelHandlerError:
-                                raise  
-                            except Exception as e:
-                                error_msg = f"Error processing future result: {str(e)}"
-                                self.logger.error(error_msg)
-                                failed_pairs.append({
-                                    "error": error_msg,
-                                    "pair": future_to_pair[future]
-                                })
-                                
-                    except Exception as e:
-                        error_msg = f"Error in parallel execution: {str(e)}"
+                    ]
+                    batches += [[i] for i in sorted(set(range(len(qa_pairs))) - set(complete))]
+                    self.logger.info(f"Evaluating {len(qa_pairs)} QA pairs of topic {topic} in {len(batches)} prompts")
+                    results = await run_eval_batches(
+                        qa_pairs,
+                        batches,
+                        lambda batch: self.evaluate_pair_batch(batch, model_handler, request, request_id=request_id),
+                        lambda pair: self.evaluate_single_pair(pair, model_handler, request, request_id=request_id),
+                        semaphore,
+                        logger=self.logger,
+                    )
+                else:
+                    results = await asyncio.gather(
+                        *(evaluate_pair(pair) for pair in qa_pairs),
+                        return_exceptions=True
+                    )
+                for pair, result in zip(qa_pairs, results):
+                    if isinstance(result, ModelHandlerError):
+                        raise result
+                    if isinstance(result, Exception):
+                        error_msg = f"Error processing evaluation result: {str(result)}"
                         self.logger.error(error_msg)
-                        raise
+                        failed_pairs.append({
+                            "error": error_msg,
+                            "pair": pair
+                        })
+                    else:
+                        evaluated_pairs.append(result)
 
             except ModelHandlerError:
                 raise              
             except Exception as e:
-                error_msg = f"Error in ThreadPoolExecutor setup: {str(e)}"
+                error_msg = f"Error in parallel execution: {str(e)}"
                 self.logger.error(error_msg)
                 raise
 
@@ -246,7 +303,7 @@ class EvaluatorLegacyService:
             }
     
     #@track_llm_operation("evaluate_results")
-    def evaluate_results(self, request: EvaluationRequest, job_name=None,is_demo: bool = True, request_id=None) -> Dict:
+    async def evaluate_results(self, request: EvaluationRequest, job_name=None,is_demo: bool = True, request_id=None) -> Dict:
         """Evaluate all QA pairs with parallel processing"""
         try:
             self.logger.info(f"Starting evaluation process - Demo Mode: {is_demo}")
@@ -259,12 +316,16 @@ class EvaluatorLegacyService:
                 self.bedrock_client,
                 model_params=model_params,
                 inference_type = request.inference_type,
-                caii_endpoint =  request.caii_endpoint
+                caii_endpoint =  request.caii_endpoint,
+                caii_endpoints = request.caii_endpoints
             )
+            # Non-demo evaluations can run as provider batch jobs instead of one call per pair
+            model_handler = bulk_handler_for(request, model_handler, is_demo)
+            # Hedge the slowest calls so a few stragglers don't hold up the whole job
+            model_handler = hedged_handler_for(request, model_handler)
             
             self.logger.info(f"Loading QA pairs from: {request.import_path}")
-            with open(request.import_path, 'r') as file:
-                data = json.load(file)
+            data = await run_blocking(read_json, request.import_path)
             
             evaluated_results = {}
             all_scores = []
@@ -289,31 +350,33 @@ class EvaluatorLegacyService:
                 transformed_data['results'][topic].append(qa_pair)
             
             max_workers = request.max_workers or self.max_workers
+            if isinstance(model_handler, BulkModelHandler):
+                # Every prompt has to be queued before the batch job is submitted
+                max_workers = max(1, len(data))
             self.logger.info(f"Processing {len(transformed_data['results'])} topics with {max_workers} workers")
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                future_to_topic = {
-                    executor.submit(
-                        self.evaluate_topic,
+            semaphore = asyncio.Semaphore(max_workers)
+            topics = list(transformed_data['results'].keys())
+            try:
+                topic_stats_list = await asyncio.gather(*(
+                    self.evaluate_topic(
                         topic,
-                        qa_pairs,
+                        transformed_data['results'][topic],
                         model_handler,
-                        request, request_id=request_id
-                    ): topic
-                    for topic, qa_pairs in transformed_data['results'].items()
-                }
-                
-                for future in as_completed(future_to_topic):
-                    try:
-                        topic = future_to_topic[future]
-                        topic_stats = future.result()
-                        evaluated_results[topic] = topic_stats
-                        all_scores.extend([
-                            pair["evaluation"]["score"] 
-                            for pair in topic_stats["evaluated_pairs"]
-                        ])
-                    except ModelHandlerError as e:
-                        self.logger.error(f"ModelHandlerError in future processing: {str(e)}")
-                        raise APIError(f"Model evaluation failed: {str(e)}")
+                        request, request_id=request_id,
+                        semaphore=semaphore
+                    )
+                    for topic in topics
+                ))
+            except ModelHandlerError as e:
+                self.logger.error(f"ModelHandlerError in topic evaluation: {str(e)}")
+                raise APIError(f"Model evaluation failed: {str(e)}")
+
+            for topic, topic_stats in zip(topics, topic_stats_list):
+                evaluated_results[topic] = topic_stats
+                all_scores.extend([
+                    pair["evaluation"]["score"] 
+                    for pair in topic_stats["evaluated_pairs"]
+                ])
 
             
             overall_average = sum(all_scores) / len(all_scores) if all_scores else 0
@@ -321,6 +384,8 @@ class EvaluatorLegacyService:
             evaluated_results['Overall_Average'] = overall_average
             
             self.logger.info(f"Evaluation completed. Overall average score: {overall_average:.2f}")
+            if isinstance(model_handler, HedgedModelHandler):
+                self.logger.info(f"Hedging: {model_handler.stats()}")
             
             
             timestamp = datetime.now(timezone.utc).isoformat()
@@ -329,8 +394,7 @@ class EvaluatorLegacyService:
             output_path = f"qa_pairs_{model_name}_{time_file}_evaluated.json"
             
             self.logger.info(f"Saving evaluation results to: {output_path}")
-            with open(output_path, 'w') as f:
-                json.dump(evaluated_results, f, indent=2)
+            await run_blocking(write_json, output_path, evaluated_results)
             
             custom_prompt_str = PromptHandler.get_default_custom_eval_prompt(
                 request.use_case, 
@@ -366,7 +430,7 @@ class EvaluatorLegacyService:
             
             
             if is_demo:
-                self.db.save_evaluation_metadata(metadata)
+                await run_blocking(self.db.save_evaluation_metadata, metadata)
                 return {
                     "status": "completed",
                     "result": evaluated_results,
@@ -377,8 +441,8 @@ class EvaluatorLegacyService:
                 
                 job_status = "ENGINE_SUCCEEDED"
                 evaluate_file_name = os.path.basename(output_path)
-                self.db.update_job_evaluate(job_name, evaluate_file_name, output_path, timestamp, overall_average, job_status)
-                self.db.backup_and_restore_db()
+                await run_blocking(self.db.update_job_evaluate, job_name, evaluate_file_name, output_path, timestamp, overall_average, job_status)
+                await run_blocking(self.db.backup_and_restore_db)
                 return {
                     "status": "completed",
                     "output_path": output_path
@@ -400,7 +464,7 @@ class EvaluatorLegacyService:
                 file_name = ''
                 output_path = ''
                 overall_average = ''
-                self.db.update_job_evaluate(job_name,file_name, output_path, time_stamp, job_status)
+                await run_blocking(self.db.update_job_evaluate, job_name, file_name, output_path, time_stamp, job_status)
                 
                 raise
 
@@ -1,12 +1,16 @@
 import boto3
 from typing import Dict, List, Optional, Any
 from typing import Dict, List, Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 from app.models.request_models import Example, ModelParameters, EvaluationRequest
 from app.core.model_handlers import create_handler
+from app.core.batch_inference import BulkModelHandler, bulk_handler_for
+from app.core.hedging import HedgedModelHandler, hedged_handler_for
+from app.services.eval_batching import eval_batch_size, plan_eval_batches, run_eval_batches, scores_by_index
 from app.core.prompt_templates import PromptBuilder, PromptHandler
 from app.services.aws_bedrock import get_bedrock_client
 from app.core.database import DatabaseManager
+from app.core.blocking_io import read_json, run_blocking, write_json
 from app.core.config import UseCase, Technique, get_model_family
 from app.services.check_guardrail import ContentGuardrail
 from app.core.exceptions import APIError, InvalidModelError, ModelHandlerError
@@ -16,7 +20,6 @@ import json
 import logging
 from logging.handlers import RotatingFileHandler
 from app.core.telemetry_integration import track_llm_operation
-from functools import partial
 
 class EvaluatorService:
     """Service for evaluating freeform data rows using Claude with parallel processing (Freeform technique only)"""
@@ -56,7 +59,7 @@ class EvaluatorService:
         error_handler.setFormatter(formatter)
         self.logger.addHandler(error_handler)
 
-    def evaluate_single_row(self, row: Dict[str, Any], model_handler, request: EvaluationRequest, request_id = None) -> Dict:
+    async def evaluate_single_row(self, row: Dict[str, Any], model_handler, request: EvaluationRequest, request_id = None) -> Dict:
         """Evaluate a single data row"""
         try:
             # Default error response
@@ -89,7 +92,7 @@ class EvaluatorService:
                 return error_response
 
             try:
-                response = model_handler.generate_response(prompt, request_id=request_id)
+                response = await model_handler.agenerate_response(prompt, request_id=request_id)
             except ModelHandlerError as e:
                 self.logger.error(f"ModelHandlerError in generate_response: {str(e)}")
                 raise  
@@ -134,8 +137,37 @@ class EvaluatorService:
             self.logger.error(f"Critical error in evaluate_single_row: {str(e)}")
             return error_response
         
+    async def evaluate_row_batch(self, rows: List[Dict[str, Any]], model_handler, request: EvaluationRequest, request_id=None) -> List[Optional[Dict]]:
+        """Evaluate several rows with one prompt; None for rows the model left out of its answer"""
+        try:
+            prompt = PromptBuilder.build_batch_freeform_eval_prompt(
+                request.model_id,
+                request.use_case,
+                rows,
+                request.examples,
+                request.custom_prompt
+            )
+            response = await model_handler.agenerate_response(prompt, request_id=request_id)
+        except ModelHandlerError:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error in batched row evaluation, re-queuing rows: {str(e)}")
+            return [None] * len(rows)
+
+        scores = scores_by_index(response, len(rows))
+        return [
+            {
+                "row": row,
+                "evaluation": {
+                    "score": scores[i]["score"],
+                    "justification": scores[i].get("justification", "No justification provided")
+                }
+            } if i in scores else None
+            for i, row in enumerate(rows)
+        ]
+
     #@track_llm_operation("evaluate_all_rows")
-    def evaluate_rows(self, rows: List[Dict[str, Any]], model_handler, request: EvaluationRequest, request_id=None) -> Dict:
+    async def evaluate_rows(self, rows: List[Dict[str, Any]], model_handler, request: EvaluationRequest, request_id=None) -> Dict:
         """Evaluate all data rows in parallel"""
         try:
             self.logger.info(f"Starting row evaluation with {len(rows)} rows")
@@ -144,42 +176,51 @@ class EvaluatorService:
 
             try:
                 max_workers = request.max_workers or self.max_workers
-                with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                    try:
-                        evaluate_func = partial(
-                            self.evaluate_single_row,
-                            model_handler=model_handler,
-                            request=request, request_id=request_id
-                        )
-                        
-                        future_to_row = {
-                            executor.submit(evaluate_func, row): row 
-                            for row in rows
-                        }
-                        
-                        for future in as_completed(future_to_row):
-                            try:
-                                result = future.result()
-                                evaluated_rows.append(result)
-                            except ModelHandlerError:
-                                raise  
-                            except Exception as e:
-                                error_msg = f"Error processing future result: {str(e)}"
-                                self.logger.error(error_msg)
-                                failed_rows.append({
-                                    "error": error_msg,
-                                    "row": future_to_row[future]
-                                })
-                                
-                    except Exception as e:
-                        error_msg = f"Error in parallel execution: {str(e)}"
+                if isinstance(model_handler, BulkModelHandler):
+                    # Every prompt has to be queued before the batch job is submitted
+                    max_workers = max(1, len(rows))
+                semaphore = asyncio.Semaphore(max_workers)
+
+                async def evaluate_row(row):
+                    async with semaphore:
+                        return await self.evaluate_single_row(row, model_handler, request, request_id=request_id)
+
+                if eval_batch_size(request) > 1 and rows:
+                    overhead = PromptBuilder.build_batch_freeform_eval_prompt(
+                        request.model_id, request.use_case, [], request.examples, request.custom_prompt
+                    )
+                    batches = plan_eval_batches([str(row) for row in rows], overhead, request)
+                    self.logger.info(f"Evaluating {len(rows)} rows in {len(batches)} batched prompts")
+                    results = await run_eval_batches(
+                        rows,
+                        batches,
+                        lambda batch: self.evaluate_row_batch(batch, model_handler, request, request_id=request_id),
+                        lambda row: self.evaluate_single_row(row, model_handler, request, request_id=request_id),
+                        semaphore,
+                        logger=self.logger,
+                    )
+                else:
+                    results = await asyncio.gather(
+                        *(evaluate_row(row) for row in rows),
+                        return_exceptions=True
+                    )
+                for row, result in zip(rows, results):
+                    if isinstance(result, ModelHandlerError):
+                        raise result
+                    if isinstance(result, Exception):
+                        error_msg = f"Error processing evaluation result: {str(result)}"
                         self.logger.error(error_msg)
-                        raise
+                        failed_rows.append({
+                            "error": error_msg,
+                            "row": row
+                        })
+                    else:
+                        evaluated_rows.append(result)
 
             except ModelHandlerError:
                 raise              
             except Exception as e:
-                error_msg = f"Error in ThreadPoolExecutor setup: {str(e)}"
+                error_msg = f"Error in parallel execution: {str(e)}"
                 self.logger.error(error_msg)
                 raise
 
@@ -234,7 +275,7 @@ class EvaluatorService:
             }
         
     #@track_llm_operation("evaluate_freeform_data")
-    def evaluate_row_data(self, request: EvaluationRequest, job_name=None, is_demo: bool = True, request_id = None) -> Dict:
+    async def evaluate_row_data(self, request: EvaluationRequest, job_name=None, is_demo: bool = True, request_id = None) -> Dict:
         """Evaluate rows of data with parallel processing"""
         try:
             self.logger.info(f"Starting row evaluation process - Demo Mode: {is_demo}")
@@ -247,18 +288,22 @@ class EvaluatorService:
                 self.bedrock_client,
                 model_params=model_params,
                 inference_type=request.inference_type,
-                caii_endpoint=request.caii_endpoint
+                caii_endpoint=request.caii_endpoint,
+                caii_endpoints=request.caii_endpoints
             )
+            # Non-demo evaluations can run as provider batch jobs instead of one call per row
+            model_handler = bulk_handler_for(request, model_handler, is_demo)
+            # Hedge the slowest calls so a few stragglers don't hold up the whole job
+            model_handler = hedged_handler_for(request, model_handler)
             
             self.logger.info(f"Loading data rows from: {request.import_path}")
-            with open(request.import_path, 'r') as file:
-                data = json.load(file)
+            data = await run_blocking(read_json, request.import_path)
             
             # Ensure data is a list of rows
             rows = data if isinstance(data, list) else [data]
             
             # Evaluate all rows
-            evaluated_results = self.evaluate_rows(rows, model_handler, request, request_id=request_id)
+            evaluated_results = await self.evaluate_rows(rows, model_handler, request, request_id=request_id)
             all_scores = [row["evaluation"]["score"] for row in evaluated_results["evaluated_rows"]]
             
             overall_average = sum(all_scores) / len(all_scores) if all_scores else 0
@@ -266,6 +311,8 @@ class EvaluatorService:
             evaluated_results['Overall_Average'] = overall_average
             
             self.logger.info(f"Row evaluation completed. Overall average score: {overall_average:.2f}")
+            if isinstance(model_handler, HedgedModelHandler):
+                self.logger.info(f"Hedging: {model_handler.stats()}")
             
             timestamp = datetime.now(timezone.utc).isoformat()
             time_file = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')[:-3] 
@@ -273,8 +320,7 @@ class EvaluatorService:
             output_path = f"row_data_{model_name}_{time_file}_evaluated.json"
             
             self.logger.info(f"Saving row evaluation results to: {output_path}")
-            with open(output_path, 'w') as f:
-                json.dump(evaluated_results, f, indent=2)
+            await run_blocking(write_json, output_path, evaluated_results)
             
             custom_prompt_str = PromptHandler.get_default_custom_eval_prompt(
                 request.use_case, 
@@ -308,7 +354,7 @@ class EvaluatorService:
             self.logger.info("Saving row evaluation metadata to database")
             
             if is_demo:
-                self.db.save_evaluation_metadata(metadata)
+                await run_blocking(self.db.save_evaluation_metadata, metadata)
                 return {
                     "status": "completed",
                     "result": evaluated_results,
@@ -317,8 +363,8 @@ class EvaluatorService:
             else:
                 job_status = "ENGINE_SUCCEEDED"
                 evaluate_file_name = os.path.basename(output_path)
-                self.db.update_job_evaluate(job_name, evaluate_file_name, output_path, timestamp, overall_average, job_status)
-                self.db.backup_and_restore_db()
+                await run_blocking(self.db.update_job_evaluate, job_name, evaluate_file_name, output_path, timestamp, overall_average, job_status)
+                await run_blocking(self.db.backup_and_restore_db)
                 return {
                     "status": "completed",
                     "output_path": output_path
@@ -340,7 +386,7 @@ class EvaluatorService:
                 file_name = ''
                 output_path = ''
                 overall_average = ''
-                self.db.update_job_evaluate(job_name, file_name, output_path, time_stamp, overall_average, job_status)
+                await run_blocking(self.db.update_job_evaluate, job_name, file_name, output_path, time_stamp, overall_average, job_status)
                 
                 raise
 
@@ -1,8 +1,6 @@
 import logging
 from logging.handlers import RotatingFileHandler
 import os
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from functools import partial
 
 import asyncio
 from datetime import datetime, timezone
@@ -83,7 +81,7 @@ class ModelAlignment:
             
             # Create model handler
             self.logger.info("Creating model handler")
-            model_handler = create_handler(synthesis_request.model_id, self.bedrock_client, model_params = model_params, inference_type = synthesis_request.inference_type, caii_endpoint =  synthesis_request.caii_endpoint, custom_p = True)
+            model_handler = create_handler(synthesis_request.model_id, self.bedrock_client, model_params = model_params, inference_type = synthesis_request.inference_type, caii_endpoint =  synthesis_request.caii_endpoint, caii_endpoints = synthesis_request.caii_endpoints, custom_p = True)
 
             path = synthesis_request.input_path
             inputs = []
@@ -94,24 +92,14 @@ class ModelAlignment:
                 initial_response.extend(item.get(synthesis_request.output_value, '') for item in data)
 
             MAX_WORKERS = 5
-            
-            
-            # Create thread pool
-            print(MAX_WORKERS)
-            loop = asyncio.get_event_loop()
-            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                # Create futures for each input
-                input_futures = [
-                    loop.run_in_executor(
-                        executor,
-                        lambda x: asyncio.run(self.synthesis_service.process_single_input(x, model_handler, synthesis_request)),
-                        input
-                    )
-                    for input in inputs
-                ]
-                
-                # Wait for all futures to complete
-                final_output = await asyncio.gather(*input_futures)
+            semaphore = asyncio.Semaphore(MAX_WORKERS)
+
+            async def process_input(input):
+                async with semaphore:
+                    return await self.synthesis_service.process_single_input(input, model_handler, synthesis_request)
+
+            # Wait for all inputs to complete
+            final_output = await asyncio.gather(*(process_input(input) for input in inputs))
             
 
             result = [{
@@ -139,7 +127,8 @@ class ModelAlignment:
                 self.bedrock_client,
                 model_params=model_params,
                 inference_type = evaluation_request.inference_type,
-                caii_endpoint =  evaluation_request.caii_endpoint
+                caii_endpoint =  evaluation_request.caii_endpoint,
+                caii_endpoints = evaluation_request.caii_endpoints
             )
 
 
@@ -151,41 +140,41 @@ class ModelAlignment:
             }
                 qa_pairs.append(qa_pair)
                 
-            with ThreadPoolExecutor(max_workers=4) as executor:
-                try:
-                    # Create list of futures for parallel execution
-                    evaluated_pairs = []
-                    failed_pairs = []
-                    futures = [
-                        executor.submit(
-                            self.evaluator_service.evaluate_single_pair,
-                            qa_pair=pair,
-                            model_handler=model_handler,
-                            request=evaluation_request
-                        ) 
-                        for pair in qa_pairs
-                    ]
-                    
-                    # Process completed futures
-                    for future in as_completed(futures):
-                        try:
-                            result = future.result()
-                            evaluated_pairs.append(result)
-                        except Exception as e:
-                            error_msg = f"Error processing evaluation result: {str(e)}"
-                            self.logger.error(error_msg)
-                            failed_pairs.append({
-                                "error": error_msg,
-                                "pair": qa_pairs[futures.index(future)]  # Get original pair that failed
-                            })
-                    scores = [pair["evaluation"]["score"] for pair in evaluated_pairs if pair.get("evaluation", {}).get("score") is not None]  
+            semaphore = asyncio.Semaphore(4)
+
+            async def evaluate_pair(pair):
+                async with semaphore:
+                    return await self.evaluator_service.evaluate_single_pair(
+                        qa_pair=pair,
+                        model_handler=model_handler,
+                        request=evaluation_request
+                    )
 
-                    return scores
-                    
-                except Exception as e:
-                    error_msg = f"Error in parallel evaluation execution: {str(e)}"
-                    self.logger.error(error_msg)
-                    raise
+            try:
+                evaluated_pairs = []
+                failed_pairs = []
+                results = await asyncio.gather(
+                    *(evaluate_pair(pair) for pair in qa_pairs),
+                    return_exceptions=True
+                )
+                for pair, result in zip(qa_pairs, results):
+                    if isinstance(result, Exception):
+                        error_msg = f"Error processing evaluation result: {str(result)}"
+                        self.logger.error(error_msg)
+                        failed_pairs.append({
+                            "error": error_msg,
+                            "pair": pair  # Original pair that failed
+                        })
+                    else:
+                        evaluated_pairs.append(result)
+                scores = [pair["evaluation"]["score"] for pair in evaluated_pairs if pair.get("evaluation", {}).get("score") is not None]  
+
+                return scores
+                
+            except Exception as e:
+                error_msg = f"Error in parallel evaluation execution: {str(e)}"
+                self.logger.error(error_msg)
+                raise
 
     async def model_alignment(self,
         synthesis_request: SynthesisRequest,
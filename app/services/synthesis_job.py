@@ -10,6 +10,7 @@ from app.services.export_results import Export_Service
 from app.core.prompt_templates import PromptBuilder, PromptHandler
 from app.core.config import UseCase, USE_CASE_CONFIGS
 from app.core.database import DatabaseManager
+from app.core.checkpoint import JobCheckpoint
 from app.core.exceptions import APIError, InvalidModelError, ModelHandlerError
 from app.services.model_alignment import ModelAlignment
 from app.core.model_handlers import create_handler
@@ -163,6 +164,56 @@ class SynthesisJob:
         self.db_manager.save_generation_metadata(metadata)
         return {"job_name": job_name, "job_id": job_run.job_id}
     
+    ACTIVE_RUN_STATUSES = ("ENGINE_SCHEDULING", "ENGINE_STARTING", "ENGINE_RUNNING", "ENGINE_STOPPING")
+
+    def _job_run_active(self, job_name: str) -> Optional[bool]:
+        """Whether the CML run of a job is still going; None when it can't be told"""
+        job_id = self.db_manager.get_generation_job_id(job_name)
+        if not job_id:
+            return None
+        try:
+            return self.get_job_status(job_id) in self.ACTIVE_RUN_STATUSES
+        except Exception as e:
+            print(f"Could not get the run status of job {job_name}: {str(e)}")
+            return None
+
+    def resume_job(self, job_name: str, cpu: int = 2, memory: int = 4, request_id = None, force: bool = False) -> Dict[str, str]:
+        """
+        Re-launch a failed generation job from its checkpoint, generating only the missing rows.
+
+        A run killed outright (OOM, SIGKILL, node loss) leaves its checkpoint
+        marked running; it is resumed once CML no longer reports the run as
+        active, or with ``force`` when the run status can't be read.
+        """
+        checkpoint = JobCheckpoint.load(job_name)
+        if checkpoint is None:
+            raise APIError(f"No checkpoint found for job {job_name}", status_code=404)
+        if checkpoint.status == "running" and not force:
+            active = self._job_run_active(job_name)
+            if active is None:
+                raise APIError(f"Job {job_name} may still be running; resume with force=true if it has stopped",
+                               status_code=409)
+            if active:
+                raise APIError(f"Job {job_name} is still running", status_code=409)
+            print(f"Job {job_name} stopped without closing its checkpoint; resuming")
+
+        params = dict(checkpoint.params)
+        params['resume_job_name'] = job_name
+        new_job_name, job_run, file_name = self._create_and_run_job(
+            "run_job.py",
+            "synth_job",
+            params,
+            cpu=cpu,
+            memory=memory,
+            request_id=request_id,
+            freeform=checkpoint.generation_type == "freeform"
+        )
+        checkpoint.finish("running")
+
+        # The original metadata row tracks the new run so status polling follows it
+        self.db_manager.update_job_resumed(job_name, job_run.job_id, self.get_job_status(job_run.job_id))
+        return {"job_name": job_name, "job_id": job_run.job_id, "resumed_as": new_job_name}
+
     #@track_job("evaluate")
     def evaluate_job(self, request: Any, cpu: int = 2, memory: int = 4, request_id = None, freeform = None) -> Dict[str, str]:
         """Create and run an evaluation job"""
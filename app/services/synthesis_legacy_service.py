@@ -8,9 +8,7 @@ import uuid
 from datetime import datetime, timezone
 import os
 from huggingface_hub import HfApi, HfFolder, Repository
-from concurrent.futures import ThreadPoolExecutor
 from functools import partial
-import math
 import asyncio
 from fastapi import FastAPI, BackgroundTasks, HTTPException
 from app.core.exceptions import APIError, InvalidModelError, ModelHandlerError, JSONParsingError
@@ -20,12 +18,19 @@ import numpy as np
 
 from app.models.request_models import SynthesisRequest, Example, ModelParameters
 from app.core.model_handlers import create_handler
-from app.core.prompt_templates import PromptBuilder, PromptHandler
-from app.core.config import UseCase, Technique, get_model_family
+from app.core.batch_inference import BulkModelHandler, bulk_handler_for
+from app.core.prompt_templates import CompiledPromptTemplate, PromptBuilder, PromptHandler
+from app.core.config import UseCase, Technique, get_model_family, DOC_CHUNK_CONFIG
 from app.services.aws_bedrock import get_bedrock_client
 from app.core.database import DatabaseManager
+from app.core.row_writer import BatchRowSink, JsonlRowWriter, iter_jsonl
+from app.core.checkpoint import JobCheckpoint
+from app.core.blocking_io import run_blocking, read_json, write_json
+from app.core.dedup import NearDuplicateIndex, create_dedup_index
+from app.services.work_scheduler import TopicWork, feed_topics, finish_topic, plan_work_items, run_work_items, topic_work_from_checkpoint, use_streaming
 from app.services.check_guardrail import ContentGuardrail
 from app.services.doc_extraction import DocumentProcessor
+from app.services.chunk_sampling import sample_document_chunks
 import logging
 from logging.handlers import RotatingFileHandler
 import traceback
@@ -75,8 +80,19 @@ class SynthesisLegacyService:
         self.logger.addHandler(error_handler)
 
     
+    def _compile_prompt(self, request: SynthesisRequest) -> CompiledPromptTemplate:
+        """The job's generation prompt with instructions and examples rendered once"""
+        return PromptBuilder.compile_prompt(
+            model_id=request.model_id,
+            use_case=request.use_case,
+            examples=request.examples or [],
+            technique=request.technique,
+            schema=request.schema,
+            custom_prompt=request.custom_prompt,
+        )
+
     #@track_llm_operation("process_single_topic")
-    def process_single_topic(self, topic: str, model_handler: any, request: SynthesisRequest, num_questions: int, request_id=None) -> Tuple[str, List[Dict], List[str], List[Dict]]:
+    async def process_single_topic(self, topic: str, model_handler: any, request: SynthesisRequest, num_questions: int, request_id=None, output_writer: Optional[JsonlRowWriter] = None, checkpoint: Optional[JobCheckpoint] = None, dedup_index: Optional[NearDuplicateIndex] = None, prompt_template: Optional[CompiledPromptTemplate] = None) -> Tuple[str, List[Dict], List[str], List[Dict]]:
         """
         Process a single topic to generate questions and solutions.
         Attempts batch processing first (default 5 questions), falls back to single question processing if batch fails.
@@ -86,184 +102,221 @@ class SynthesisLegacyService:
             model_handler: Handler for the AI model
             request: The synthesis request object
             num_questions: Total number of questions to generate
+            output_writer: Optional writer that receives output rows as each batch finishes
+            checkpoint: Optional job checkpoint; questions already generated for the topic are skipped
+            dedup_index: Optional job-wide index; near-duplicate questions are rejected and regenerated
+            prompt_template: Optional template compiled for the job; compiled here when not given
         
         Returns:
             Tuple containing:
             - topic (str)
             - list of validated QA pairs
             - list of error messages
-            - list of output dictionaries with topic information
+            - list of output dictionaries with topic information (empty when streamed to output_writer)
         
         Raises:
             ModelHandlerError: When there's an error in model generation that should stop processing
         """
-        topic_results = []
-        topic_output = []
-        topic_errors = []
-        questions_remaining = num_questions
-        omit_questions = []
-        
+        state = topic_work_from_checkpoint(topic, num_questions, checkpoint, dedup_index)
+        if state is None:
+            return topic, [], [], []
+
+        if prompt_template is None:
+            prompt_template = await run_blocking(self._compile_prompt, request)
+        for batch_size in state.batch_sizes(self.QUESTIONS_PER_BATCH):
+            await self._process_topic_batch(state, batch_size, model_handler, request, request_id, output_writer, checkpoint, dedup_index, prompt_template)
+
+        await run_blocking(finish_topic, state, checkpoint)
+        return state.as_result()
+
+    async def _process_topic_batch(self, state: TopicWork, planned_size: int, model_handler: any, request: SynthesisRequest, request_id=None, output_writer: Optional[JsonlRowWriter] = None, checkpoint: Optional[JobCheckpoint] = None, dedup_index: Optional[NearDuplicateIndex] = None, prompt_template: Optional[CompiledPromptTemplate] = None) -> None:
+        """
+        Generate one batch of QA pairs for a topic, falling back to single questions
+        for whatever the batch did not yield.
+
+        Raises:
+            ModelHandlerError: When the batch request fails with anything but a JSON parsing error
+        """
+        topic = state.topic
+        if prompt_template is None:
+            prompt_template = await run_blocking(self._compile_prompt, request)
+        batch_size = min(planned_size, state.unclaimed)
+        if batch_size <= 0:
+            return
+
+        # Claim the questions so concurrent batches of this topic don't ask for them too
+        state.in_flight += batch_size
+        claimed = batch_size
+        sink = BatchRowSink(topic, state.output, output_writer, checkpoint)
+
+        def land(count: int) -> None:
+            nonlocal claimed
+            released = min(count, claimed)
+            state.in_flight -= released
+            claimed -= released
+            state.generated += count
+
         try:
-            # Process questions in batches
-            for batch_idx in range(0, num_questions, self.QUESTIONS_PER_BATCH):
-                if questions_remaining <= 0:
+            self.logger.info(f"Processing topic: {topic}, attempting batch of {batch_size} ({state.generated}/{state.target} done)")
+
+            # Attempt batch processing
+            prompt = prompt_template.build(topic, batch_size, state.omit_questions)
+            valid_count = 0
+            duplicate_count = 0
+
+            def accept(pairs: List[Dict]) -> None:
+                nonlocal valid_count, duplicate_count
+                valid_pairs = []
+                valid_outputs = []
+                for pair in pairs:
+                    if self._validate_qa_pair(pair):
+                        if dedup_index is not None and not dedup_index.add_if_new(pair["question"]):
+                            duplicate_count += 1
+                            continue
+                        valid_pairs.append({
+                            "question": pair["question"],
+                            "solution": pair["solution"]
+                        })
+                        valid_outputs.append({
+                            "Topic": topic,
+                            "question": pair["question"],
+                            "solution": pair["solution"]
+                        })
+                        state.remember(pair["question"])
+
+                if valid_pairs:
+                    state.results.extend(valid_pairs)
+                    sink.emit(valid_outputs, state.omit_questions)
+                    land(len(valid_pairs))
+                    valid_count += len(valid_pairs)
+
+            def on_row(pair: Dict) -> bool:
+                accept([pair])
+                # Close the stream once this batch's questions (or the topic's) are all in
+                return claimed > 0 and state.remaining > 0
+
+            streaming = use_streaming(request, model_handler)
+            batch_qa_pairs = None
+            try:
+                if streaming:
+                    batch_qa_pairs = await model_handler.astream_rows(prompt, on_row, request_id=request_id)
+                else:
+                    batch_qa_pairs = await model_handler.agenerate_response(prompt, request_id=request_id)
+            except ModelHandlerError as e:
+                self.logger.warning(f"Batch processing failed: {str(e)}")
+                if isinstance(e, JSONParsingError):
+                    # For JSON parsing errors, fall back to single processing
+                    self.logger.info("JSON parsing failed, falling back to single processing")
+                    return
+                # For other model errors, propagate up
+                raise
+
+            dropped = getattr(batch_qa_pairs, "dropped", 0)
+            if dropped:
+                self.logger.info(f"Recovered {len(batch_qa_pairs)} of {batch_size} rows from malformed JSON for topic {topic}, {dropped} dropped")
+            elif not batch_qa_pairs:
+                return
+
+            # Process batch results (streamed pairs were already accepted as they arrived)
+            if not streaming:
+                accept(batch_qa_pairs)
+
+            invalid_count = batch_size - valid_count
+            if duplicate_count:
+                self.logger.info(f"Rejected {duplicate_count} near-duplicate questions in batch for topic {topic}")
+
+            if valid_count:
+                self.logger.info(f"Successfully generated {valid_count} questions in batch for topic {topic}")
+            print("invalid_count:", invalid_count, '\n', "batch_size: ", batch_size, '\n', "valid_pairs: ", valid_count)
+            # If all pairs were valid, skip fallback
+            if invalid_count <= 0:
+                return
+
+            # Fall back to single processing for remaining or failed questions
+            self.logger.info(f"Falling back to single processing for remaining questions in topic {topic}")
+            remaining_batch = invalid_count
+            print("remaining_batch:", remaining_batch, '\n', "batch_size: ", batch_size, '\n', "valid_pairs: ", valid_count)
+            for _ in range(remaining_batch):
+                if claimed <= 0 or state.remaining <= 0:
                     break
-                    
-                batch_size = min(self.QUESTIONS_PER_BATCH, questions_remaining)
-                self.logger.info(f"Processing topic: {topic}, attempting batch {batch_idx+1}-{batch_idx+batch_size}")
-                
+
                 try:
-                    # Attempt batch processing
-                    prompt = PromptBuilder.build_prompt(
-                        model_id=request.model_id,
-                        use_case=request.use_case,
-                        topic=topic,
-                        num_questions=batch_size,
-                        omit_questions=omit_questions,
-                        examples=request.examples or [],
-                        technique=request.technique,
-                        schema=request.schema,
-                        custom_prompt=request.custom_prompt,
-                    )
-                   # print("prompt :", prompt)
-                    batch_qa_pairs = None
+                    # Single question processing
+                    prompt = prompt_template.build(topic, 1, state.omit_questions)
+
                     try:
-                        batch_qa_pairs = model_handler.generate_response(prompt, request_id=request_id)
+                        single_qa_pairs = await model_handler.agenerate_response(prompt, request_id=request_id)
                     except ModelHandlerError as e:
                         self.logger.warning(f"Batch processing failed: {str(e)}")
                         if isinstance(e, JSONParsingError):
                             # For JSON parsing errors, fall back to single processing
                             self.logger.info("JSON parsing failed, falling back to single processing")
                             continue
+                        # For other model errors, propagate up
+                        raise
+
+                    if single_qa_pairs and len(single_qa_pairs) > 0:
+                        pair = single_qa_pairs[0]
+                        is_valid = self._validate_qa_pair(pair)
+                        if is_valid and dedup_index is not None and not dedup_index.add_if_new(pair["question"]):
+                            self.logger.info(f"Rejected near-duplicate question in single processing for topic {topic}")
+                        elif is_valid:
+                            validated_pair = {
+                                "question": pair["question"],
+                                "solution": pair["solution"]
+                            }
+                            validated_output = {
+                                "Topic": topic,
+                                "question": pair["question"],
+                                "solution": pair["solution"]
+                            }
+
+                            state.results.append(validated_pair)
+                            state.remember(pair["question"])
+                            sink.emit([validated_output], state.omit_questions)
+                            land(1)
+
+                            self.logger.info(f"Successfully generated single question for topic {topic}")
                         else:
-                            # For other model errors, propagate up
-                            raise
-                    
-                    if batch_qa_pairs:
-                        # Process batch results
-                        valid_pairs = []
-                        valid_outputs = []
-                        invalid_count = 0
-                        
-                        for pair in batch_qa_pairs:
-                            if self._validate_qa_pair(pair):
-                                valid_pairs.append({
-                                    "question": pair["question"],
-                                    "solution": pair["solution"]
-                                })
-                                valid_outputs.append({
-                                    "Topic": topic,
-                                    "question": pair["question"],
-                                    "solution": pair["solution"]
-                                })
-                                omit_questions.append(pair["question"])
-                            #else:
-                        invalid_count = batch_size - len(valid_pairs)
-                        
-                        if valid_pairs:
-                            topic_results.extend(valid_pairs)
-                            topic_output.extend(valid_outputs)
-                            questions_remaining -= len(valid_pairs)
-                            omit_questions = omit_questions[-100:]  # Keep last 100 questions
-                            self.logger.info(f"Successfully generated {len(valid_pairs)} questions in batch for topic {topic}")
-                        print("invalid_count:", invalid_count, '\n', "batch_size: ", batch_size, '\n', "valid_pairs: ", len(valid_pairs))
-                        # If all pairs were valid, skip fallback
-                        if invalid_count <= 0:
-                            continue
-                    
-                        else:
-                            # Fall back to single processing for remaining or failed questions
-                            self.logger.info(f"Falling back to single processing for remaining questions in topic {topic}")
-                            remaining_batch = invalid_count
-                            print("remaining_batch:", remaining_batch, '\n', "batch_size: ", batch_size, '\n', "valid_pairs: ", len(valid_pairs))
-                            for _ in range(remaining_batch):
-                                if questions_remaining <= 0:
-                                    break
-                                    
-                                try:
-                                    # Single question processing
-                                    prompt = PromptBuilder.build_prompt(
-                                        model_id=request.model_id,
-                                        use_case=request.use_case,
-                                        topic=topic,
-                                        num_questions=1,
-                                        omit_questions=omit_questions,
-                                        examples=request.examples or [],
-                                        technique=request.technique,
-                                        schema=request.schema,
-                                        custom_prompt=request.custom_prompt,
-                                    )
-                                    
-                                    try:
-                                        single_qa_pairs = model_handler.generate_response(prompt, request_id=request_id)
-                                    except ModelHandlerError as e:
-                                        self.logger.warning(f"Batch processing failed: {str(e)}")
-                                        if isinstance(e, JSONParsingError):
-                                            # For JSON parsing errors, fall back to single processing
-                                            self.logger.info("JSON parsing failed, falling back to single processing")
-                                            continue
-                                        else:
-                                            # For other model errors, propagate up
-                                            raise
-                                    
-                                    if single_qa_pairs and len(single_qa_pairs) > 0:
-                                        pair = single_qa_pairs[0]
-                                        if self._validate_qa_pair(pair):
-                                            validated_pair = {
-                                                "question": pair["question"],
-                                                "solution": pair["solution"]
-                                            }
-                                            validated_output = {
-                                                "Topic": topic,
-                                                "question": pair["question"],
-                                                "solution": pair["solution"]
-                                            }
-                                            
-                                            topic_results.append(validated_pair)
-                                            topic_output.append(validated_output)
-                                            omit_questions.append(pair["question"])
-                                            omit_questions = omit_questions[-100:]
-                                            questions_remaining -= 1
-                                            
-                                            self.logger.info(f"Successfully generated single question for topic {topic}")
-                                        else:
-                                            error_msg = f"Invalid QA pair structure in single processing for topic {topic}"
-                                            self.logger.warning(error_msg)
-                                            topic_errors.append(error_msg)
-                                    else:
-                                        error_msg = f"No QA pair generated in single processing for topic {topic}"
-                                        self.logger.warning(error_msg)
-                                        topic_errors.append(error_msg)
-                                        
-                                except ModelHandlerError as e:
-                                    # Don't raise - add to errors and continue
-                                    error_msg = f"ModelHandlerError in single processing for topic {topic}: {str(e)}"
-                                    self.logger.error(error_msg)
-                                    topic_errors.append(error_msg)
-                                    continue
-                                    
-                except ModelHandlerError:
-                    # Re-raise ModelHandlerError to propagate up
-                    raise
-                except Exception as e:
-                    error_msg = f"Error processing batch for topic {topic}: {str(e)}"
+                            error_msg = f"Invalid QA pair structure in single processing for topic {topic}"
+                            self.logger.warning(error_msg)
+                            state.errors.append(error_msg)
+                    else:
+                        error_msg = f"No QA pair generated in single processing for topic {topic}"
+                        self.logger.warning(error_msg)
+                        state.errors.append(error_msg)
+
+                except ModelHandlerError as e:
+                    # Don't raise - add to errors and continue
+                    error_msg = f"ModelHandlerError in single processing for topic {topic}: {str(e)}"
                     self.logger.error(error_msg)
-                    topic_errors.append(error_msg)
+                    state.errors.append(error_msg)
                     continue
-                    
+
         except ModelHandlerError:
             # Re-raise ModelHandlerError to propagate up
             raise
         except Exception as e:
-            error_msg = f"Critical error processing topic {topic}: {str(e)}"
+            error_msg = f"Error processing batch for topic {topic}: {str(e)}"
             self.logger.error(error_msg)
-            topic_errors.append(error_msg)
-            
-        return topic, topic_results, topic_errors, topic_output
+            state.errors.append(error_msg)
+        finally:
+            state.in_flight -= claimed
+            try:
+                await sink.flush()
+            except Exception as e:
+                error_msg = f"Error writing rows for topic {topic}: {str(e)}"
+                self.logger.error(error_msg)
+                state.errors.append(error_msg)
                
         
-    async def generate_examples(self, request: SynthesisRequest , job_name = None, is_demo: bool = True, request_id= None) -> Dict:
-        """Generate examples based on request parameters (SFT technique)"""
+    async def generate_examples(self, request: SynthesisRequest , job_name = None, is_demo: bool = True, request_id= None, resume: bool = False) -> Dict:
+        """
+        Generate examples based on request parameters (SFT technique).
+
+        Jobs (``is_demo=False``) keep a checkpoint manifest; with ``resume`` the
+        job continues from it, appending only the questions that are still missing.
+        """
         try:
             output_key = request.output_key 
             output_value = request.output_value
@@ -275,25 +328,25 @@ class SynthesisLegacyService:
             
             # Create model handler
             self.logger.info("Creating model handler")
-            model_handler = create_handler(request.model_id, self.bedrock_client, model_params = model_params, inference_type = request.inference_type, caii_endpoint =  request.caii_endpoint)
+            model_handler = create_handler(request.model_id, self.bedrock_client, model_params = model_params, inference_type = request.inference_type, caii_endpoint =  request.caii_endpoint, caii_endpoints = request.caii_endpoints)
+            # Non-demo jobs can run as provider batch jobs instead of one call per prompt
+            model_handler = bulk_handler_for(request, model_handler, is_demo)
 
             # Limit topics and questions in demo mode
             if request.doc_paths:
-                processor = DocumentProcessor(chunk_size=1000, overlap=100)
-                paths = request.doc_paths
+                # Document chunks become topics as they are picked, see feed_topics below
+                processor = DocumentProcessor(
+                    chunk_size=1000, overlap=100,
+                    chunk_tokens=DOC_CHUNK_CONFIG["chunk_tokens"] or None,
+                    overlap_tokens=DOC_CHUNK_CONFIG["overlap_tokens"],
+                )
+                doc_chunks = sample_document_chunks(
+                    request.doc_paths, processor, request.num_questions,
+                    request.chunk_sampling or DOC_CHUNK_CONFIG["sampling"],
+                    DOC_CHUNK_CONFIG["sampling_seed"],
+                )
                 topics = []
-                for path in paths:
-                    chunks = processor.process_document(path)
-                    topics.extend(chunks)
-                #topics = topics[0:5]
-                print("total chunks: ", len(topics))
-                if request.num_questions<=len(topics):
-                    topics = topics[0:request.num_questions]
-                    num_questions = 1
-                    print("num_questions :", num_questions)
-                else:
-                    num_questions = math.ceil(request.num_questions/len(topics))
-                    #print(num_questions)
+                num_questions = 1
                 total_count = request.num_questions
             else:
                 if request.topics:
@@ -309,68 +362,119 @@ class SynthesisLegacyService:
             # Track results for each topic
             results = {}
             all_errors = []
-            final_output = []
+
+            time_file = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')[:-3] 
+            mode_suffix = "test" if is_demo else "final"
+            model_name = get_model_family(request.model_id).split('.')[-1]
+            file_path = f"qa_pairs_{model_name}_{time_file}_{mode_suffix}.json"
+            topic_key = 'Generated_From' if request.doc_paths else 'Seeds'
+
+            checkpoint = None
+            resuming = False
+            if job_name and not is_demo:
+                checkpoint = JobCheckpoint.load(job_name) if resume else None
+                resuming = checkpoint is not None
+                if resuming:
+                    file_path = checkpoint.output_file
+                    self.logger.info(f"Resuming job {job_name} into {file_path}")
+                else:
+                    checkpoint = JobCheckpoint.create(job_name, "sft", file_path, request.model_dump(mode="json"))
+
+            # Rows are appended to <file>.jsonl as each batch finishes instead of being held in memory
+            output_writer = JsonlRowWriter(
+                file_path,
+                row_transform=lambda item: {
+                    topic_key: item['Topic'],
+                    output_key: item['question'],
+                    output_value: item['solution']},
+                on_progress=(lambda n: self.db.update_job_progress(job_name, n)) if job_name and not is_demo else None,
+                append=resuming,
+            )
+            if resuming:
+                await run_blocking(checkpoint.reconcile, topic_key)
+
+            # Near-duplicate questions are rejected across all topics after generation; a resumed
+            # job first indexes the questions the previous run already wrote
+            dedup_index = create_dedup_index()
+            if dedup_index is not None and resuming and os.path.exists(output_writer.jsonl_path):
+                dedup_index.seed(
+                    row[output_key] for row in iter_jsonl(output_writer.jsonl_path)
+                    if isinstance(row.get(output_key), str)
+                )
             
-            # Create thread pool
-            loop = asyncio.get_event_loop()
+            # One queue of (topic, batch) work items drained by max_workers workers, so a few
+            # large topics still use every worker instead of one worker per topic
             max_workers = request.max_concurrent_topics or self.MAX_CONCURRENT_TOPICS
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                topic_futures = [
-                    loop.run_in_executor(
-                        executor,
-                        self.process_single_topic,
-                        topic,
-                        model_handler,
-                        request,
-                        num_questions,
-                        request_id
-                    )
-                    for topic in topics
-                ]
-                
-                # Wait for all futures to complete
-                try:
-                    completed_topics = await asyncio.gather(*topic_futures)
-                except ModelHandlerError as e:
-                    self.logger.error(f"Model generation failed: {str(e)}")
-                    raise APIError(f"Failed to generate content: {str(e)}")
+            states = [topic_work_from_checkpoint(topic, num_questions, checkpoint, dedup_index) for topic in topics]
+            states = [state for state in states if state is not None]
+            work_items = plan_work_items(states, self.QUESTIONS_PER_BATCH)
+            feed = None
+            if request.doc_paths:
+                # The first batches start while the rest of the documents are still being parsed
+                feed = feed_topics(
+                    doc_chunks,
+                    request.num_questions,
+                    states,
+                    lambda topic, target: topic_work_from_checkpoint(topic, target, checkpoint, dedup_index),
+                    self.QUESTIONS_PER_BATCH,
+                    logger=self.logger,
+                )
+            if isinstance(model_handler, BulkModelHandler):
+                # Every prompt has to be queued before the batch job is submitted
+                if feed is not None:
+                    work_items += [item async for new_items in feed for item in new_items]
+                    feed = None
+                max_workers = max(1, len(work_items))
+
+            # Examples, schema and instructions are rendered once for the whole job
+            prompt_template = await run_blocking(self._compile_prompt, request)
+
+            async def process_item(item):
+                await self._process_topic_batch(item.state, item.size, model_handler, request, request_id, output_writer, checkpoint, dedup_index, prompt_template)
+
+            # Wait for all work items to complete
+            try:
+                await run_work_items(
+                    work_items,
+                    process_item,
+                    max_workers,
+                    on_topic_done=lambda state: run_blocking(finish_topic, state, checkpoint),
+                    logger=self.logger,
+                    feed=feed,
+                )
+                completed_topics = [state.as_result() for state in states]
+            except ModelHandlerError as e:
+                self.logger.error(f"Model generation failed: {str(e)}")
+                await run_blocking(output_writer.finalize)
+                if checkpoint is not None:
+                    await run_blocking(checkpoint.finish, "failed")
+                raise APIError(f"Failed to generate content: {str(e)}")
                 
             # Process results
             
-            for topic, topic_results, topic_errors, topic_output in completed_topics:
+            for topic, topic_results, topic_errors, _ in completed_topics:
                 if topic_errors:
                     all_errors.extend(topic_errors)
                 if topic_results and is_demo:
                     results[topic] = topic_results
-                if topic_output:
-                    final_output.extend(topic_output)
 
             generation_time = time.time() - st
             self.logger.info(f"Generation completed in {generation_time:.2f} seconds")
+            dedup_stats = json.dumps(dedup_index.stats()) if dedup_index is not None else None
+            if dedup_stats:
+                self.logger.info(f"Deduplication: {dedup_stats}")
+            if isinstance(model_handler, BulkModelHandler):
+                self.logger.info(f"Bulk inference: {model_handler.stats()}")
 
             timestamp = datetime.now(timezone.utc).isoformat()
-            time_file = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')[:-3] 
-            mode_suffix = "test" if is_demo else "final"
-            model_name = get_model_family(request.model_id).split('.')[-1]
-            file_path = f"qa_pairs_{model_name}_{time_file}_{mode_suffix}.json"
-            if request.doc_paths:
-                final_output = [{
-                                    'Generated_From': item['Topic'],
-                                    output_key: item['question'],
-                                    output_value: item['solution'] }
-                                 for item in final_output]
-            else:
-                final_output = [{
-                                    'Seeds': item['Topic'],
-                                    output_key: item['question'],
-                                    output_value: item['solution'] }
-                                 for item in final_output]
             output_path = {}
             try:
-                with open(file_path, "w") as f:
-                    json.dump(final_output, indent=2, fp=f)
+                file_path = await run_blocking(output_writer.finalize)
             except Exception as e:
                 self.logger.error(f"Error saving results: {str(e)}", exc_info=True)
+            completed_rows = output_writer.rows_written
+            if checkpoint is not None:
+                await run_blocking(checkpoint.finish, "completed" if completed_rows else "failed")
                 
             output_path['local']= file_path
 
@@ -424,13 +528,15 @@ class SynthesisLegacyService:
                 'input_path':input_path_str,
                 'input_key': request.input_key,
                 'output_key':request.output_key,
-                'output_value':request.output_value
+                'output_value':request.output_value,
+                'completed_rows': completed_rows,
+                'dedup_stats': dedup_stats
                 }
             
             #print("metadata: ",metadata)
             if is_demo:
                 
-                self.db.save_generation_metadata(metadata)
+                await run_blocking(self.db.save_generation_metadata, metadata)
                 return {
                     "status": "completed" if results else "failed",
                     "results": results,
@@ -443,10 +549,10 @@ class SynthesisLegacyService:
                 job_status = "ENGINE_SUCCEEDED"
                 generate_file_name = os.path.basename(output_path['local'])
                 
-                self.db.update_job_generate(job_name,generate_file_name, output_path['local'], timestamp, job_status)
-                self.db.backup_and_restore_db()
+                await run_blocking(self.db.update_job_generate, job_name,generate_file_name, output_path['local'], timestamp, job_status, completed_rows, dedup_stats=dedup_stats)
+                await run_blocking(self.db.backup_and_restore_db)
                 return {
-                    "status": "completed" if final_output else "failed",
+                    "status": "completed" if completed_rows else "failed",
                     "export_path": output_path
                 }
         except APIError:
@@ -461,7 +567,21 @@ class SynthesisLegacyService:
                 job_status = "ENGINE_FAILED"
                 file_name = ''
                 output_path = ''
-                self.db.update_job_generate(job_name, file_name, output_path, time_stamp, job_status)
+                completed_rows = 0
+                if 'output_writer' in locals() and not output_writer.finalized:
+                    # Keep whatever was generated before the failure
+                    try:
+                        completed_rows = output_writer.rows_written
+                        if completed_rows:
+                            output_path = await run_blocking(output_writer.finalize)
+                            file_name = os.path.basename(output_path)
+                        else:
+                            output_writer.discard()
+                    except Exception as save_error:
+                        self.logger.error(f"Failed to save partial results: {str(save_error)}")
+                if locals().get('checkpoint') is not None:
+                    await run_blocking(checkpoint.finish, "failed")
+                await run_blocking(self.db.update_job_generate, job_name, file_name, output_path, time_stamp, job_status, completed_rows)
                 raise  # Just re-raise the original exception
 
 
@@ -489,7 +609,7 @@ class SynthesisLegacyService:
                 custom_prompt=request.custom_prompt,
             )
             try:
-                result = model_handler.generate_response(prompt, request_id=request_id)
+                result = await model_handler.agenerate_response(prompt, request_id=request_id)
             except ModelHandlerError as e:
                 self.logger.error(f"ModelHandlerError in generate_response: {str(e)}")
                 raise
@@ -513,39 +633,32 @@ class SynthesisLegacyService:
             
             # Create model handler
             self.logger.info("Creating model handler")
-            model_handler = create_handler(request.model_id, self.bedrock_client, model_params = model_params, inference_type = request.inference_type, caii_endpoint =  request.caii_endpoint, custom_p = True)
+            model_handler = create_handler(request.model_id, self.bedrock_client, model_params = model_params, inference_type = request.inference_type, caii_endpoint =  request.caii_endpoint, caii_endpoints = request.caii_endpoints, custom_p = True)
+            model_handler = bulk_handler_for(request, model_handler, is_demo)
 
             inputs = []
             file_paths = request.input_path
             for path in file_paths:
                 try:
-                    with open(path) as f:
-                        data = json.load(f)
-                        inputs.extend(item.get(request.input_key, '') for item in data)
+                    data = await run_blocking(read_json, path)
+                    inputs.extend(item.get(request.input_key, '') for item in data)
                 except Exception as e:
                     print(f"Error processing {path}: {str(e)}")
             MAX_WORKERS = 5
-            
-            
-            # Create thread pool
-            loop = asyncio.get_event_loop()
-            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
-                # Create futures for each input
-                input_futures = [
-                    loop.run_in_executor(
-                        executor,
-                        lambda x: asyncio.run(self.process_single_input(x, model_handler, request, request_id)),
-                        input
-                    )
-                    for input in inputs
-                ]
-                
-                # Wait for all futures to complete
-                try:
-                    final_output = await asyncio.gather(*input_futures)
-                except ModelHandlerError as e:
-                    self.logger.error(f"Model generation failed: {str(e)}")
-                    raise APIError(f"Failed to generate content: {str(e)}")
+            if isinstance(model_handler, BulkModelHandler):
+                MAX_WORKERS = max(1, len(inputs))
+            semaphore = asyncio.Semaphore(MAX_WORKERS)
+
+            async def process_input(input):
+                async with semaphore:
+                    return await self.process_single_input(input, model_handler, request, request_id)
+
+            # Wait for all inputs to complete
+            try:
+                final_output = await asyncio.gather(*(process_input(input) for input in inputs))
+            except ModelHandlerError as e:
+                self.logger.error(f"Model generation failed: {str(e)}")
+                raise APIError(f"Failed to generate content: {str(e)}")
                 
          
             
@@ -563,8 +676,7 @@ class SynthesisLegacyService:
                              for item in final_output]
             output_path = {}
             try:
-                with open(file_path, "w") as f:
-                    json.dump(result, indent=2, fp=f)
+                await run_blocking(write_json, file_path, result)
             except Exception as e:
                 self.logger.error(f"Error saving results: {str(e)}", exc_info=True)
                 
@@ -629,7 +741,7 @@ class SynthesisLegacyService:
             
             if is_demo:
                 
-                self.db.save_generation_metadata(metadata)
+                await run_blocking(self.db.save_generation_metadata, metadata)
                 return {
                     "status": "completed" if final_output else "failed",
                     "results": final_output,
@@ -641,8 +753,8 @@ class SynthesisLegacyService:
                 job_status = "success"
                 generate_file_name = os.path.basename(output_path['local'])
                 
-                self.db.update_job_generate(job_name,generate_file_name, output_path['local'], timestamp, job_status)
-                self.db.backup_and_restore_db()
+                await run_blocking(self.db.update_job_generate, job_name,generate_file_name, output_path['local'], timestamp, job_status, len(final_output))
+                await run_blocking(self.db.backup_and_restore_db)
                 return {
                     "status": "completed" if final_output else "failed",
                     "export_path": output_path
@@ -659,7 +771,7 @@ class SynthesisLegacyService:
                 job_status = "failure"
                 file_name = ''
                 output_path = ''
-                self.db.update_job_generate(job_name, file_name, output_path, time_stamp, job_status)
+                await run_blocking(self.db.update_job_generate, job_name, file_name, output_path, time_stamp, job_status, 0)
                 raise  # Just re-raise the original exception
 
     def get_health_check(self) -> Dict:
@@ -8,10 +8,7 @@ import uuid
 from datetime import datetime, timezone
 import os
 from huggingface_hub import HfApi, HfFolder, Repository
-from concurrent.futures import ThreadPoolExecutor
 from functools import partial
-import math
-import asyncio
 from fastapi import FastAPI, BackgroundTasks, HTTPException
 from app.core.exceptions import APIError, InvalidModelError, ModelHandlerError, JSONParsingError
 from app.core.data_loader import DataLoader
@@ -20,12 +17,19 @@ import numpy as np
 
 from app.models.request_models import SynthesisRequest, Example, ModelParameters
 from app.core.model_handlers import create_handler
-from app.core.prompt_templates import PromptBuilder, PromptHandler
-from app.core.config import UseCase, Technique, get_model_family
+from app.core.batch_inference import BulkModelHandler, bulk_handler_for
+from app.core.prompt_templates import CompiledPromptTemplate, PromptBuilder, PromptHandler
+from app.core.config import UseCase, Technique, get_model_family, DOC_CHUNK_CONFIG
 from app.services.aws_bedrock import get_bedrock_client
 from app.core.database import DatabaseManager
+from app.core.row_writer import BatchRowSink, JsonlRowWriter, iter_jsonl
+from app.core.checkpoint import JobCheckpoint
+from app.core.blocking_io import run_blocking
+from app.core.dedup import NearDuplicateIndex, create_dedup_index, item_text
+from app.services.work_scheduler import TopicWork, feed_topics, finish_topic, plan_work_items, run_work_items, topic_work_from_checkpoint, use_streaming
 from app.services.check_guardrail import ContentGuardrail
 from app.services.doc_extraction import DocumentProcessor
+from app.services.chunk_sampling import sample_document_chunks
 import logging
 from logging.handlers import RotatingFileHandler
 import traceback
@@ -74,8 +78,19 @@ class SynthesisService:
         error_handler.setFormatter(formatter)
         self.logger.addHandler(error_handler)
 
+    def _compile_prompt(self, request: SynthesisRequest) -> CompiledPromptTemplate:
+        """The job's generation prompt with instructions and examples rendered once"""
+        return PromptBuilder.compile_freeform_prompt(
+            model_id=request.model_id,
+            use_case=request.use_case,
+            example_custom=request.example_custom or [],
+            example_path=request.example_path,
+            custom_prompt=request.custom_prompt,
+            schema=request.schema,
+        )
+
     #@track_llm_operation("process_single_freeform") 
-    def process_single_freeform(self, topic: str, model_handler: any, request: SynthesisRequest, num_questions: int, request_id=None) -> Tuple[str, List[Dict], List[str], List[Dict]]:
+    async def process_single_freeform(self, topic: str, model_handler: any, request: SynthesisRequest, num_questions: int, request_id=None, output_writer: Optional[JsonlRowWriter] = None, checkpoint: Optional[JobCheckpoint] = None, dedup_index: Optional[NearDuplicateIndex] = None, prompt_template: Optional[CompiledPromptTemplate] = None) -> Tuple[str, List[Dict], List[str], List[Dict]]:
         """
         Process a single topic to generate freeform data.
         Attempts batch processing first (default batch size), falls back to single item processing if batch fails.
@@ -85,226 +100,221 @@ class SynthesisService:
             model_handler: Handler for the AI model
             request: The synthesis request object
             num_questions: Total number of data items to generate
+            output_writer: Optional writer that receives output rows as each batch finishes
+            checkpoint: Optional job checkpoint; rows already generated for the topic are skipped
+            dedup_index: Optional job-wide index; near-duplicate items are rejected and regenerated
+            prompt_template: Optional template compiled for the job; compiled here when not given
         
         Returns:
             Tuple containing:
             - topic (str)
             - list of generated data items
             - list of error messages
-            - list of output dictionaries with topic information
+            - list of output dictionaries with topic information (empty when streamed to output_writer)
         """
-        topic_results = []
-        topic_output = []
-        topic_errors = []
-        questions_remaining = num_questions
-        omit_questions = []
-        
+        state = topic_work_from_checkpoint(topic, num_questions, checkpoint, dedup_index)
+        if state is None:
+            return topic, [], [], []
+
+        if prompt_template is None:
+            prompt_template = await run_blocking(self._compile_prompt, request)
+        for batch_size in state.batch_sizes(self.QUESTIONS_PER_BATCH):
+            await self._process_freeform_batch(state, batch_size, model_handler, request, request_id, output_writer, checkpoint, dedup_index, prompt_template)
+
+        await run_blocking(finish_topic, state, checkpoint)
+        return state.as_result()
+
+    async def _process_freeform_batch(self, state: TopicWork, planned_size: int, model_handler: any, request: SynthesisRequest, request_id=None, output_writer: Optional[JsonlRowWriter] = None, checkpoint: Optional[JobCheckpoint] = None, dedup_index: Optional[NearDuplicateIndex] = None, prompt_template: Optional[CompiledPromptTemplate] = None) -> None:
+        """
+        Generate one batch of freeform items for a topic, falling back to single items
+        for whatever the batch did not yield. Errors are recorded on the topic state, never raised.
+        """
+        topic = state.topic
+        if prompt_template is None:
+            prompt_template = await run_blocking(self._compile_prompt, request)
+        batch_size = min(planned_size, state.unclaimed)
+        if batch_size <= 0:
+            return
+
+        # Claim the rows so concurrent batches of this topic don't ask for them too
+        state.in_flight += batch_size
+        claimed = batch_size
+        sink = BatchRowSink(topic, state.output, output_writer, checkpoint)
+
+        def land(count: int) -> None:
+            nonlocal claimed
+            released = min(count, claimed)
+            state.in_flight -= released
+            claimed -= released
+            state.generated += count
+
         try:
-            # Process data in batches
-            for batch_idx in range(0, num_questions, self.QUESTIONS_PER_BATCH):
-                if questions_remaining <= 0:
+            self.logger.info(f"Processing topic: {topic}, attempting batch of {batch_size} ({state.generated}/{state.target} done)")
+
+            # Attempt batch processing
+            prompt = prompt_template.build(topic, batch_size, state.omit_questions)
+            valid_count = 0
+            duplicate_count = 0
+
+            def accept(items: List[Dict]) -> None:
+                nonlocal valid_count, duplicate_count
+                valid_items = []
+                valid_outputs = []
+                for item in items:
+                    if self._validate_freeform_item(item):
+                        if dedup_index is not None and not dedup_index.add_if_new(item_text(item)):
+                            duplicate_count += 1
+                            continue
+                        valid_items.append(item)
+
+                        # Create a new dict with Topic field added
+                        output_item = {"Topic": topic}
+                        output_item.update(item)
+                        valid_outputs.append(output_item)
+                        state.remember(self._item_identifier(item))
+
+                if valid_items:
+                    state.results.extend(valid_items)
+                    sink.emit(valid_outputs, state.omit_questions)
+                    land(len(valid_items))
+                    valid_count += len(valid_items)
+
+            def on_row(item: Dict) -> bool:
+                accept([item])
+                # Close the stream once this batch's rows (or the topic's) are all in
+                return claimed > 0 and state.remaining > 0
+
+            streaming = use_streaming(request, model_handler)
+            batch_items = None
+            try:
+                if streaming:
+                    batch_items = await model_handler.astream_rows(prompt, on_row, request_id=request_id)
+                else:
+                    batch_items = await model_handler.agenerate_response(prompt, request_id=request_id)
+            except ModelHandlerError as e:
+                self.logger.warning(f"Batch processing failed: {str(e)}")
+                if isinstance(e, JSONParsingError):
+                    # For JSON parsing errors, fall back to single processing
+                    self.logger.info("JSON parsing failed, falling back to single processing")
+                    return
+                # Don't raise - add to errors and continue
+                error_msg = f"ModelHandlerError in batch processing for topic {topic}: {str(e)}"
+                self.logger.error(error_msg)
+                state.errors.append(error_msg)
+                return
+
+            dropped = getattr(batch_items, "dropped", 0)
+            if dropped:
+                self.logger.info(f"Recovered {len(batch_items)} of {batch_size} rows from malformed JSON for topic {topic}, {dropped} dropped")
+            elif not batch_items:
+                return
+
+            # Process batch results (streamed rows were already accepted as they arrived)
+            if not streaming:
+                accept(batch_items)
+
+            invalid_count = batch_size - valid_count
+            if duplicate_count:
+                self.logger.info(f"Rejected {duplicate_count} near-duplicate items in batch for topic {topic}")
+
+            if valid_count:
+                self.logger.info(f"Successfully generated {valid_count} items in batch for topic {topic}")
+
+            print("invalid_count:", invalid_count, '\n', "batch_size: ", batch_size, '\n', "valid_items: ", valid_count)
+            # If all items were valid, skip fallback
+            if invalid_count <= 0:
+                return
+
+            # Fall back to single processing for remaining or failed items
+            self.logger.info(f"Falling back to single processing for remaining items in topic {topic}")
+            remaining_batch = invalid_count
+            print("remaining_batch:", remaining_batch, '\n', "batch_size: ", batch_size, '\n', "valid_items: ", valid_count)
+
+            for _ in range(remaining_batch):
+                if claimed <= 0 or state.remaining <= 0:
                     break
-                    
-                batch_size = min(self.QUESTIONS_PER_BATCH, questions_remaining)
-                self.logger.info(f"Processing topic: {topic}, attempting batch {batch_idx+1}-{batch_idx+batch_size}")
-                
+
                 try:
-                    # Attempt batch processing
-                    prompt = PromptBuilder.build_freeform_prompt(
-                        model_id=request.model_id,
-                        use_case=request.use_case,
-                        topic=topic,
-                        num_questions=batch_size,
-                        omit_questions=omit_questions,
-                        example_custom=request.example_custom or [],
-                        example_path=request.example_path,
-                        custom_prompt=request.custom_prompt,
-                        schema=request.schema,
-                    )
-                    #print(prompt)
-                    batch_items = None
+                    # Single item processing
+                    prompt = prompt_template.build(topic, 1, state.omit_questions)
+
                     try:
-                        batch_items = model_handler.generate_response(prompt, request_id=request_id)
+                        single_items = await model_handler.agenerate_response(prompt, request_id=request_id)
                     except ModelHandlerError as e:
-                        self.logger.warning(f"Batch processing failed: {str(e)}")
+                        self.logger.warning(f"Single processing failed: {str(e)}")
                         if isinstance(e, JSONParsingError):
-                            # For JSON parsing errors, fall back to single processing
-                            self.logger.info("JSON parsing failed, falling back to single processing")
+                            self.logger.info("JSON parsing failed in single processing")
                             continue
+                        # Don't raise - add to errors and continue
+                        error_msg = f"ModelHandlerError in single processing for topic {topic}: {str(e)}"
+                        self.logger.error(error_msg)
+                        state.errors.append(error_msg)
+                        continue
+
+                    if single_items and len(single_items) > 0:
+                        item = single_items[0]
+                        is_valid = self._validate_freeform_item(item)
+                        if is_valid and dedup_index is not None and not dedup_index.add_if_new(item_text(item)):
+                            self.logger.info(f"Rejected near-duplicate item in single processing for topic {topic}")
+                        elif is_valid:
+                            # Create a new dict with Topic field added
+                            output_item = {"Topic": topic}
+                            output_item.update(item)
+
+                            state.results.append(item)
+                            state.remember(self._item_identifier(item))
+                            sink.emit([output_item], state.omit_questions)
+                            land(1)
+                            self.logger.info(f"Successfully generated single item for topic {topic}")
                         else:
-                            # Don't raise - add to errors and continue
-                            error_msg = f"ModelHandlerError in batch processing for topic {topic}: {str(e)}"
-                            self.logger.error(error_msg)
-                            topic_errors.append(error_msg)
-                            continue
-                    
-                    if batch_items:
-                        # Process batch results
-                        valid_items = []
-                        valid_outputs = []
-                        invalid_count = 0
-                        
-                        for item in batch_items:
-                            if self._validate_freeform_item(item):
-                                valid_items.append(item)
-                                
-                                # Create a new dict with Topic field added
-                                output_item = {"Topic": topic}
-                                output_item.update(item)
-                                valid_outputs.append(output_item)
-                                
-                                # Initialize item_identifier variable
-                                item_identifier = None 
-                                    # First try the specific potential keys
-                                for potential_key in ["id", "name", "title", "question", "prompt", "key"]:
-                                    if potential_key in item and isinstance(item[potential_key], str):
-                                        #item_identifier = item[potential_key]
-                                        item_identifier = f"{potential_key} : {item[potential_key]} "
-                                        break
-                                
-                                # If no suitable identifier found among preferred keys, look for any string value
-                                if not item_identifier:
-                                    for key, value in item.items():
-                                        if isinstance(value, str) and value.strip():  # Check for non-empty string
-                                            #item_identifier = value
-                                            item_identifier = f"{key} : {value} "
-                                            break
-                                
-                                # If still no string value found, use a blank string
-                                if not item_identifier:
-                                    item_identifier = ""
-                                        
-                                omit_questions.append(item_identifier)
-                        #print("topic :", topic, '\n',omit_questions)        
-                            
-                        invalid_count = batch_size - len(valid_items)
-                        
-                        if valid_items:
-                            topic_results.extend(valid_items)
-                            topic_output.extend(valid_outputs)
-                            questions_remaining -= len(valid_items)
-                            omit_questions = omit_questions[-100:]  # Keep last 100 items
-                            self.logger.info(f"Successfully generated {len(valid_items)} items in batch for topic {topic}")
-                        
-                        print("invalid_count:", invalid_count, '\n', "batch_size: ", batch_size, '\n', "valid_items: ", len(valid_items))
-                        # If all items were valid, skip fallback
-                        if invalid_count <= 0:
-                            continue
-                    
-                        # Fall back to single processing for remaining or failed items
-                        self.logger.info(f"Falling back to single processing for remaining items in topic {topic}")
-                        remaining_batch = invalid_count
-                        print("remaining_batch:", remaining_batch, '\n', "batch_size: ", batch_size, '\n', "valid_items: ", len(valid_items))
-                        
-                        for _ in range(remaining_batch):
-                            if questions_remaining <= 0:
-                                break
-                                
-                            try:
-                                # Single item processing
-                                prompt = PromptBuilder.build_freeform_prompt(
-                                     model_id=request.model_id,
-                                        use_case=request.use_case,
-                                        topic=topic,
-                                        num_questions=batch_size,
-                                        omit_questions=omit_questions,
-                                        example_custom=request.example_custom or [],
-                                        example_path=request.example_path,
-                                        custom_prompt=request.custom_prompt,
-                                        schema=request.schema,
-                                )
-                                
-                                try:
-                                    single_items = model_handler.generate_response(prompt, request_id=request_id)
-                                except ModelHandlerError as e:
-                                    self.logger.warning(f"Single processing failed: {str(e)}")
-                                    if isinstance(e, JSONParsingError):
-                                        self.logger.info("JSON parsing failed in single processing")
-                                        continue
-                                    else:
-                                        # Don't raise - add to errors and continue
-                                        error_msg = f"ModelHandlerError in single processing for topic {topic}: {str(e)}"
-                                        self.logger.error(error_msg)
-                                        topic_errors.append(error_msg)
-                                        continue
-                                
-                                if single_items and len(single_items) > 0:
-                                    item = single_items[0]
-                                    if self._validate_freeform_item(item):
-                                        # Create a new dict with Topic field added
-                                        output_item = {"Topic": topic}
-                                        output_item.update(item)
-                                        
-                                        topic_results.append(item)
-                                        topic_output.append(output_item)
-                                        
-                                        # Initialize item_identifier variable
-                                        item_identifier = None 
-                                       # First try the specific potential keys
-                                        for potential_key in ["id", "name", "title", "question", "prompt", "key"]:
-                                            if potential_key in item and isinstance(item[potential_key], str):
-                                                #item_identifier = item[potential_key]
-                                                item_identifier = f"{potential_key} : {item[potential_key]} "
-                                                break
-                                        
-                                        # If no suitable identifier found among preferred keys, look for any string value
-                                        if not item_identifier:
-                                            for key, value in item.items():
-                                                if isinstance(value, str) and value.strip():  # Check for non-empty string
-                                                    #item_identifier = value
-                                                    item_identifier = f"{key} : {value} "
-                                                    break
-                                        
-                                        # If still no string value found, use a blank string
-                                        if not item_identifier:
-                                            item_identifier = ""
-                                                
-                                        omit_questions.append(item_identifier)
-                                        omit_questions = omit_questions[-100:]
-                                        
-                                        questions_remaining -= 1
-                                        self.logger.info(f"Successfully generated single item for topic {topic}")
-                                    else:
-                                        error_msg = f"Invalid item structure in single processing for topic {topic}"
-                                        self.logger.warning(error_msg)
-                                        topic_errors.append(error_msg)
-                                else:
-                                    error_msg = f"No item generated in single processing for topic {topic}"
-                                    self.logger.warning(error_msg)
-                                    topic_errors.append(error_msg)
-                                    
-                            except ModelHandlerError as e:
-                                # Don't raise - add to errors and continue
-                                error_msg = f"ModelHandlerError in single processing for topic {topic}: {str(e)}"
-                                self.logger.error(error_msg)
-                                topic_errors.append(error_msg)
-                                continue
-                                
+                            error_msg = f"Invalid item structure in single processing for topic {topic}"
+                            self.logger.warning(error_msg)
+                            state.errors.append(error_msg)
+                    else:
+                        error_msg = f"No item generated in single processing for topic {topic}"
+                        self.logger.warning(error_msg)
+                        state.errors.append(error_msg)
+
                 except ModelHandlerError as e:
                     # Don't raise - add to errors and continue
-                    error_msg = f"ModelHandlerError in batch processing for topic {topic}: {str(e)}"
-                    self.logger.error(error_msg)
-                    topic_errors.append(error_msg)
-                    continue
-                except Exception as e:
-                    error_msg = f"Error processing batch for topic {topic}: {str(e)}"
+                    error_msg = f"ModelHandlerError in single processing for topic {topic}: {str(e)}"
                     self.logger.error(error_msg)
-                    topic_errors.append(error_msg)
+                    state.errors.append(error_msg)
                     continue
-                    
+
         except ModelHandlerError as e:
-            # Don't raise - add to errors and return partial results
-            error_msg = f"ModelHandlerError in topic {topic}: {str(e)}"
+            # Don't raise - add to errors and continue
+            error_msg = f"ModelHandlerError in batch processing for topic {topic}: {str(e)}"
             self.logger.error(error_msg)
-            topic_errors.append(error_msg)
-            
+            state.errors.append(error_msg)
         except Exception as e:
-            # Don't raise - add to errors and return partial results  
-            error_msg = f"Error processing topic {topic}: {str(e)}"
+            error_msg = f"Error processing batch for topic {topic}: {str(e)}"
             self.logger.error(error_msg)
-            topic_errors.append(error_msg)
-            
-        return topic, topic_results, topic_errors, topic_output
+            state.errors.append(error_msg)
+        finally:
+            state.in_flight -= claimed
+            try:
+                await sink.flush()
+            except Exception as e:
+                error_msg = f"Error writing rows for topic {topic}: {str(e)}"
+                self.logger.error(error_msg)
+                state.errors.append(error_msg)
+
+    @staticmethod
+    def _item_identifier(item: Dict) -> str:
+        """Short "key : value" label of an item, used in the omit_questions prompt window"""
+        # First try the specific potential keys
+        for potential_key in ["id", "name", "title", "question", "prompt", "key"]:
+            if potential_key in item and isinstance(item[potential_key], str):
+                return f"{potential_key} : {item[potential_key]} "
+
+        # If no suitable identifier found among preferred keys, look for any string value
+        for key, value in item.items():
+            if isinstance(value, str) and value.strip():  # Check for non-empty string
+                return f"{key} : {value} "
+
+        # If still no string value found, use a blank string
+        return ""
 
     def _validate_freeform_item(self, item: Dict) -> bool:
         """
@@ -313,8 +323,13 @@ class SynthesisService:
         """
         return isinstance(item, dict) and len(item) > 0
 
-    async def generate_freeform(self, request: SynthesisRequest, job_name=None, is_demo: bool = True, request_id=None) -> Dict:
-        """Generate freeform data based on request parameters"""
+    async def generate_freeform(self, request: SynthesisRequest, job_name=None, is_demo: bool = True, request_id=None, resume: bool = False) -> Dict:
+        """
+        Generate freeform data based on request parameters.
+
+        Jobs (``is_demo=False``) keep a checkpoint manifest; with ``resume`` the
+        job continues from it, appending only the rows that are still missing.
+        """
         try:
             output_key = request.output_key 
             output_value = request.output_value
@@ -331,26 +346,27 @@ class SynthesisService:
                 self.bedrock_client, 
                 model_params=model_params, 
                 inference_type=request.inference_type, 
-                caii_endpoint=request.caii_endpoint
+                caii_endpoint=request.caii_endpoint,
+                caii_endpoints=request.caii_endpoints
             )
+            # Non-demo jobs can run as provider batch jobs instead of one call per prompt
+            model_handler = bulk_handler_for(request, model_handler, is_demo)
 
             # Handle topics from documents or direct topics
             if request.doc_paths:
-                processor = DocumentProcessor(chunk_size=1000, overlap=100)
-                paths = request.doc_paths
+                # Document chunks become topics as they are picked, see feed_topics below
+                processor = DocumentProcessor(
+                    chunk_size=1000, overlap=100,
+                    chunk_tokens=DOC_CHUNK_CONFIG["chunk_tokens"] or None,
+                    overlap_tokens=DOC_CHUNK_CONFIG["overlap_tokens"],
+                )
+                doc_chunks = sample_document_chunks(
+                    request.doc_paths, processor, request.num_questions,
+                    request.chunk_sampling or DOC_CHUNK_CONFIG["sampling"],
+                    DOC_CHUNK_CONFIG["sampling_seed"],
+                )
                 topics = []
-                for path in paths:
-                    chunks = processor.process_document(path)
-                    topics.extend(chunks)
-                
-                print("total chunks: ", len(topics))
-                if request.num_questions <= len(topics):
-                    topics = topics[0:request.num_questions]
-                    num_questions = 1
-                    print("num_questions :", num_questions)
-                else:
-                    num_questions = math.ceil(request.num_questions/len(topics))
-                
+                num_questions = 1
                 total_count = request.num_questions
             else:
                 if request.topics:
@@ -364,57 +380,106 @@ class SynthesisService:
             # Track results for each topic
             results = {}
             all_errors = []
-            final_output = []
+
+            time_file = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')[:-3] 
+            mode_suffix = "test" if is_demo else "final"
+            model_name = get_model_family(request.model_id).split('.')[-1]
+            file_path = f"freeform_data_{model_name}_{time_file}_{mode_suffix}.json"
+            topic_key = 'Generated_From' if request.doc_paths else 'Seeds'
+
+            checkpoint = None
+            resuming = False
+            if job_name and not is_demo:
+                checkpoint = JobCheckpoint.load(job_name) if resume else None
+                resuming = checkpoint is not None
+                if resuming:
+                    file_path = checkpoint.output_file
+                    self.logger.info(f"Resuming job {job_name} into {file_path}")
+                else:
+                    checkpoint = JobCheckpoint.create(job_name, "freeform", file_path, request.model_dump(mode="json"))
+
+            # Rows are appended to <file>.jsonl as each batch finishes instead of being held in memory
+            output_writer = JsonlRowWriter(
+                file_path,
+                row_transform=self._freeform_output_row(topic_key),
+                on_progress=(lambda n: self.db.update_job_progress(job_name, n)) if job_name and not is_demo else None,
+                append=resuming,
+            )
+            if resuming:
+                await run_blocking(checkpoint.reconcile, topic_key)
+
+            # Near-duplicates are rejected across all topics after generation; a resumed job
+            # first indexes the rows the previous run already wrote
+            dedup_index = create_dedup_index()
+            if dedup_index is not None and resuming and os.path.exists(output_writer.jsonl_path):
+                dedup_index.seed(
+                    item_text({k: v for k, v in row.items() if k != topic_key})
+                    for row in iter_jsonl(output_writer.jsonl_path)
+                )
             
-            # Create thread pool
-            loop = asyncio.get_event_loop()
+            # One queue of (topic, batch) work items drained by max_workers workers, so a few
+            # large topics still use every worker instead of one worker per topic
             max_workers = request.max_concurrent_topics or self.MAX_CONCURRENT_TOPICS
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                topic_futures = [
-                    loop.run_in_executor(
-                        executor,
-                        self.process_single_freeform,
-                        topic,
-                        model_handler,
-                        request,
-                        num_questions, request_id
-                    )
-                    for topic in topics
-                ]
-                
-                # Wait for all futures to complete (no exceptions now since process_single_freeform doesn't raise)
-                completed_topics = await asyncio.gather(*topic_futures)
+            states = [topic_work_from_checkpoint(topic, num_questions, checkpoint, dedup_index) for topic in topics]
+            states = [state for state in states if state is not None]
+            work_items = plan_work_items(states, self.QUESTIONS_PER_BATCH)
+            feed = None
+            if request.doc_paths:
+                # The first batches start while the rest of the documents are still being parsed
+                feed = feed_topics(
+                    doc_chunks,
+                    request.num_questions,
+                    states,
+                    lambda topic, target: topic_work_from_checkpoint(topic, target, checkpoint, dedup_index),
+                    self.QUESTIONS_PER_BATCH,
+                    logger=self.logger,
+                )
+            if isinstance(model_handler, BulkModelHandler):
+                # Every prompt has to be queued before the batch job is submitted
+                if feed is not None:
+                    work_items += [item async for new_items in feed for item in new_items]
+                    feed = None
+                max_workers = max(1, len(work_items))
+
+            # Examples, schema and instructions are rendered once for the whole job
+            prompt_template = await run_blocking(self._compile_prompt, request)
+
+            async def process_item(item):
+                await self._process_freeform_batch(item.state, item.size, model_handler, request, request_id, output_writer, checkpoint, dedup_index, prompt_template)
+
+            # Batches record their errors instead of raising, so every item runs to completion
+            await run_work_items(
+                work_items,
+                process_item,
+                max_workers,
+                on_topic_done=lambda state: run_blocking(finish_topic, state, checkpoint),
+                logger=self.logger,
+                feed=feed,
+            )
+            completed_topics = [state.as_result() for state in states]
 
             # Process results
-            for topic, topic_results, topic_errors, topic_output in completed_topics:
+            for topic, topic_results, topic_errors, _ in completed_topics:
                 if topic_errors:
                     all_errors.extend(topic_errors)
                 if topic_results and is_demo:
                     results[topic] = topic_results
-                if topic_output:
-                    final_output.extend(topic_output)
 
             generation_time = time.time() - st
             self.logger.info(f"Generation completed in {generation_time:.2f} seconds")
+            dedup_stats = json.dumps(dedup_index.stats()) if dedup_index is not None else None
+            if dedup_stats:
+                self.logger.info(f"Deduplication: {dedup_stats}")
+            if isinstance(model_handler, BulkModelHandler):
+                self.logger.info(f"Bulk inference: {model_handler.stats()}")
 
-            # Initialize variables outside conditional blocks to fix scope issues
             timestamp = datetime.now(timezone.utc).isoformat()
-            time_file = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')[:-3] 
-            mode_suffix = "test" if is_demo else "final"
-            model_name = get_model_family(request.model_id).split('.')[-1]
-            file_path = f"freeform_data_{model_name}_{time_file}_{mode_suffix}.json"
             
             # Save partial results if we have any data
-            if final_output:
-                # Transform output
-                if request.doc_paths:
-                    final_output = [{'Generated_From': item['Topic'], **{k: v for k, v in item.items() if k != 'Topic'}} for item in final_output]
-                else:
-                    final_output = [{'Seeds': item['Topic'], **{k: v for k, v in item.items() if k != 'Topic'}} for item in final_output]
-                
-                with open(file_path, "w") as f:
-                    json.dump(final_output, indent=2, fp=f)
-                self.logger.info(f"Saved {len(final_output)} results to {file_path}")
+            completed_rows = await run_blocking(self._finalize_output, output_writer)
+            if completed_rows:
+                file_path = output_writer.final_path
+                self.logger.info(f"Saved {completed_rows} results to {file_path}")
 
             # Find the first critical model error message
             first_critical_error = None
@@ -429,12 +494,17 @@ class SynthesisService:
 
             # After saving (or if no data), check for critical errors
             if first_critical_error:
-                if final_output:
-                    self.logger.info(f"Saved {len(final_output)} results before failing due to model errors")
+                if completed_rows:
+                    self.logger.info(f"Saved {completed_rows} results before failing due to model errors")
                 else:
                     self.logger.info("No results to save before failing due to model errors")
+                if checkpoint is not None:
+                    await run_blocking(checkpoint.finish, "failed")
                 raise APIError(first_critical_error)
 
+            if checkpoint is not None:
+                await run_blocking(checkpoint.finish, "completed" if completed_rows else "failed")
+
             # Handle custom prompt, examples and schema
             custom_prompt_str = PromptHandler.get_default_custom_prompt(request.use_case, request.custom_prompt)
             
@@ -442,7 +512,7 @@ class SynthesisService:
             if request.example_path:
                 try:
                     # Use DataLoader to load the file, limiting to 10 rows
-                    df = DataLoader.load(request.example_path, sample_rows=10)
+                    df = DataLoader.load(request.example_path, sample_rows=10, sampling="head")
                     
                     # Convert DataFrame to list of dictionaries
                     example_upload = df.head(10).to_dict(orient='records')
@@ -508,11 +578,12 @@ class SynthesisService:
                 'input_key': request.input_key,
                 'output_key': request.output_key,
                 'output_value': request.output_value,
-                'completed_rows': len(final_output) if final_output else 0
+                'completed_rows': completed_rows,
+                'dedup_stats': dedup_stats
             }
             
             if is_demo:
-                self.db.save_generation_metadata(metadata)
+                await run_blocking(self.db.save_generation_metadata, metadata)
                 return {
                     "status": "completed" if results else "failed",
                     "results": results,
@@ -520,14 +591,14 @@ class SynthesisService:
                     "export_path": {'local': file_path}
                 }
             else:
-                job_status = "ENGINE_SUCCEEDED" if final_output else "ENGINE_FAILED"
-                generate_file_name = os.path.basename(file_path) if final_output else ''
-                final_output_path = file_path if final_output else ''
+                job_status = "ENGINE_SUCCEEDED" if completed_rows else "ENGINE_FAILED"
+                generate_file_name = os.path.basename(file_path) if completed_rows else ''
+                final_output_path = file_path if completed_rows else ''
                 
-                self.db.update_job_generate(job_name, generate_file_name, final_output_path, timestamp, job_status, len(final_output) if final_output else 0)
-                self.db.backup_and_restore_db()
+                await run_blocking(self.db.update_job_generate, job_name, generate_file_name, final_output_path, timestamp, job_status, completed_rows, dedup_stats=dedup_stats)
+                await run_blocking(self.db.backup_and_restore_db)
                 return {
-                    "status": "completed" if final_output else "failed",
+                    "status": "completed" if completed_rows else "failed",
                     "export_path": {'local': file_path}
                 }
         except APIError:
@@ -548,20 +619,18 @@ class SynthesisService:
             
             # Try to save partial results if any exist before failing
             saved_partial_results = False
-            if 'final_output' in locals() and final_output:
+            completed_rows = 0
+            if 'output_writer' in locals():
                 try:
-                    # Transform output
-                    if request.doc_paths:
-                        final_output = [{'Generated_From': item['Topic'], **{k: v for k, v in item.items() if k != 'Topic'}} for item in final_output]
-                    else:
-                        final_output = [{'Seeds': item['Topic'], **{k: v for k, v in item.items() if k != 'Topic'}} for item in final_output]
-                    
-                    with open(file_path, "w") as f:
-                        json.dump(final_output, indent=2, fp=f)
-                    saved_partial_results = True
-                    self.logger.info(f"Saved {len(final_output)} partial results to {file_path} before failing")
+                    completed_rows = await run_blocking(self._finalize_output, output_writer)
+                    if completed_rows:
+                        file_path = output_writer.final_path
+                        saved_partial_results = True
+                        self.logger.info(f"Saved {completed_rows} partial results to {file_path} before failing")
                 except Exception as save_error:
                     self.logger.error(f"Failed to save partial results: {str(save_error)}")
+            if locals().get('checkpoint') is not None:
+                await run_blocking(checkpoint.finish, "failed")
             
             # Continue with original error handling
             self.logger.error(f"Generation failed: {str(e)}", exc_info=True)
@@ -573,15 +642,32 @@ class SynthesisService:
                     # Update with actual file information for partial results
                     generate_file_name = os.path.basename(file_path)
                     final_output_path = file_path   
-                    completed_rows = len(final_output) if final_output else 0
                 else:
                     # No results saved, use empty values
                     generate_file_name = ''
                     final_output_path = ''
                     completed_rows = 0
-                self.db.update_job_generate(job_name, generate_file_name, final_output_path, timestamp, job_status, completed_rows = completed_rows )
+                await run_blocking(self.db.update_job_generate, job_name, generate_file_name, final_output_path, timestamp, job_status, completed_rows = completed_rows )
                 raise
 
+    @staticmethod
+    def _freeform_output_row(topic_key: str):
+        """Rename the internal Topic field to Generated_From (documents) or Seeds (topics)"""
+        def transform(item: Dict) -> Dict:
+            return {topic_key: item['Topic'], **{k: v for k, v in item.items() if k != 'Topic'}}
+        return transform
+
+    @staticmethod
+    def _finalize_output(output_writer: JsonlRowWriter) -> int:
+        """Finish the streamed output file; returns the number of rows saved (0 leaves no file behind)"""
+        if output_writer.finalized:
+            return output_writer.rows_written
+        if output_writer.rows_written:
+            output_writer.finalize()
+        else:
+            output_writer.discard()
+        return output_writer.rows_written
+
     def get_health_check(self) -> Dict:
         """Get service health status"""
         try:
@@ -0,0 +1,260 @@
+import asyncio
+import inspect
+import logging
+import math
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import DEDUP_CONFIG, STREAMING_CONFIG
+from app.core.dedup import compact_hint
+
+
+@dataclass
+class TopicWork:
+    """
+    Shared state of one topic while its batches run, possibly concurrently.
+
+    ``in_flight`` counts rows claimed by running batches so two batches of the
+    same topic never ask for the same missing rows, and ``omit_questions`` is
+    the per-topic window of recent items every batch puts in its prompt. With
+    job-wide deduplication the window shrinks to a short diversity hint
+    (``omit_window`` items cut to ``hint_chars``).
+    """
+    topic: str
+    target: int
+    generated: int = 0
+    in_flight: int = 0
+    omit_questions: List[str] = field(default_factory=list)
+    results: List[Dict[str, Any]] = field(default_factory=list)
+    output: List[Dict[str, Any]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    batches_total: int = 0
+    batches_done: int = 0
+    omit_window: int = 100
+    hint_chars: Optional[int] = None
+
+    @property
+    def remaining(self) -> int:
+        return self.target - self.generated
+
+    @property
+    def unclaimed(self) -> int:
+        return self.target - self.generated - self.in_flight
+
+    def remember(self, identifier: str) -> None:
+        """Add a generated item to the topic's omit_questions window"""
+        if self.hint_chars:
+            identifier = compact_hint(identifier, self.hint_chars)
+        self.omit_questions.append(identifier)
+        overflow = len(self.omit_questions) - max(self.omit_window, 0)
+        if overflow > 0:
+            del self.omit_questions[:overflow]
+
+    def batch_sizes(self, batch_size: int) -> List[int]:
+        """Split the remaining rows into batches of at most ``batch_size``"""
+        remaining = max(self.remaining, 0)
+        return [min(batch_size, remaining - start) for start in range(0, remaining, batch_size)]
+
+    def as_result(self):
+        """(topic, results, errors, output), the tuple the per-topic helpers have always returned"""
+        return self.topic, self.results, self.errors, self.output
+
+
+@dataclass
+class WorkItem:
+    state: TopicWork
+    index: int
+    size: int
+
+
+def plan_work_items(states: List[TopicWork], batch_size: int) -> List[WorkItem]:
+    """
+    Break every topic into batch-sized work items, interleaved round-robin.
+
+    Interleaving lets 500 one-batch topics and 2 thousand-row topics both
+    fill the worker pool instead of being bounded by the number of topics.
+    """
+    per_topic = []
+    for state in states:
+        sizes = state.batch_sizes(batch_size)
+        state.batches_total = len(sizes)
+        per_topic.append([WorkItem(state, index, size) for index, size in enumerate(sizes)])
+
+    items = []
+    for round_index in range(max((len(t) for t in per_topic), default=0)):
+        for topic_items in per_topic:
+            if round_index < len(topic_items):
+                items.append(topic_items[round_index])
+    return items
+
+
+def add_topic_work(state: TopicWork, target: int, batch_size: int) -> List[WorkItem]:
+    """Raise a topic's target and plan work items for the rows that adds"""
+    extra = max(target - max(state.target, state.generated), 0)
+    state.target = target
+    sizes = [min(batch_size, extra - start) for start in range(0, extra, batch_size)]
+    items = [WorkItem(state, state.batches_total + i, size) for i, size in enumerate(sizes)]
+    state.batches_total += len(sizes)
+    return items
+
+
+async def feed_topics(
+    topics: AsyncIterator[str],
+    total: int,
+    states: List[TopicWork],
+    make_state: Callable[[str, int], Optional[TopicWork]],
+    batch_size: int,
+    logger: Optional[logging.Logger] = None,
+) -> AsyncIterator[List[WorkItem]]:
+    """
+    Work items for topics that arrive while the job runs (document chunks), for ``run_work_items(feed=...)``.
+
+    Like taking the first ``total`` topics with one row each: the source is
+    closed once ``total`` topics arrived. If it ends with fewer, every topic
+    is topped up to ``ceil(total / count)`` rows. New states are appended to
+    ``states``; ``make_state(topic, target)`` may return None for topics a
+    resumed job already finished.
+    """
+    count = 0
+    try:
+        async for topic in topics:
+            count += 1
+            state = make_state(topic, 1)
+            if state is not None:
+                states.append(state)
+                yield plan_work_items([state], batch_size)
+            if count >= total:
+                break
+    finally:
+        aclose = getattr(topics, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+    if logger:
+        logger.info(f"{count} topics fed to the work queue")
+    if count == 0:
+        raise ValueError("No text could be extracted from the documents")
+    if count < total:
+        per_topic = math.ceil(total / count)
+        yield [item for state in states for item in add_topic_work(state, per_topic, batch_size)]
+
+
+async def run_work_items(
+    items: List[WorkItem],
+    process: Callable[[WorkItem], Awaitable[None]],
+    concurrency: int,
+    on_topic_done: Optional[Callable[[TopicWork], Optional[Awaitable[None]]]] = None,
+    logger: Optional[logging.Logger] = None,
+    feed: Optional[AsyncIterator[List[WorkItem]]] = None,
+) -> None:
+    """
+    Run work items from one queue with ``concurrency`` workers.
+
+    ``on_topic_done`` fires once a topic's last batch finishes, and is awaited
+    when it returns an awaitable. An exception escaping ``process`` stops the
+    remaining work and is re-raised.
+
+    With a ``feed`` more items are queued while the workers run, and a topic
+    may still get work until the feed ends, so its ``on_topic_done`` waits
+    for that. An exception from the feed stops the work like one from ``process``.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+    feeding = feed is not None
+    finished_while_feeding: Dict[int, TopicWork] = {}
+
+    async def notify(state: TopicWork) -> None:
+        result = on_topic_done(state)
+        if inspect.isawaitable(result):
+            await result
+
+    async def topic_done(state: TopicWork) -> None:
+        if on_topic_done is None:
+            return
+        if feeding:
+            finished_while_feeding[id(state)] = state
+        else:
+            await notify(state)
+
+    async def produce(workers: int):
+        nonlocal feeding
+        try:
+            async for new_items in feed:
+                for item in new_items:
+                    queue.put_nowait(item)
+        finally:
+            feeding = False
+            for state in finished_while_feeding.values():
+                if state.batches_done == state.batches_total:
+                    await notify(state)
+            # One stop marker per worker, behind everything queued
+            for _ in range(workers):
+                queue.put_nowait(None)
+
+    async def worker():
+        while True:
+            if feed is not None:
+                item = await queue.get()
+                if item is None:
+                    return
+            else:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+            await process(item)
+            state = item.state
+            state.batches_done += 1
+            if logger:
+                logger.info(
+                    f"Topic {state.topic}: {state.generated}/{state.target} rows, "
+                    f"batch {state.batches_done}/{state.batches_total} done"
+                )
+            if state.batches_done == state.batches_total:
+                await topic_done(state)
+
+    worker_count = max(1, concurrency if feed is not None else min(concurrency, len(items)))
+    workers = [asyncio.create_task(worker()) for _ in range(worker_count)]
+    if feed is not None:
+        workers.append(asyncio.create_task(produce(worker_count)))
+    try:
+        await asyncio.gather(*workers)
+    except BaseException:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        raise
+
+
+def topic_work_from_checkpoint(topic: str, target: int, checkpoint=None, dedup_index=None) -> Optional[TopicWork]:
+    """
+    Fresh state for a topic, or the state a previous run left; None when the topic already finished.
+
+    With a ``dedup_index`` duplicates are rejected after generation, so the
+    prompt only keeps a compact hint instead of the 100-item window.
+    """
+    state = TopicWork(topic=topic, target=target)
+    if dedup_index is not None:
+        state.omit_window = DEDUP_CONFIG["hint_items"]
+        state.hint_chars = DEDUP_CONFIG["hint_chars"]
+    if checkpoint is not None:
+        saved = checkpoint.topic_state(topic)
+        if saved["completed"]:
+            return None
+        state.generated = saved["rows"]
+        for identifier in saved["omit_questions"]:
+            state.remember(identifier)
+    return state
+
+
+def finish_topic(state: TopicWork, checkpoint=None) -> None:
+    """Mark a topic complete in the checkpoint once it reached its target"""
+    if checkpoint is not None and state.remaining <= 0:
+        checkpoint.complete_topic(state.topic, state.omit_questions)
+
+
+def use_streaming(request, model_handler) -> bool:
+    """Whether batches of this request should be generated with a streamed completion"""
+    enabled = request.stream if getattr(request, "stream", None) is not None else STREAMING_CONFIG["enabled"]
+    return bool(enabled) and hasattr(model_handler, "astream_rows")
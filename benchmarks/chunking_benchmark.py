@@ -0,0 +1,144 @@
+"""
+Microbenchmark of DocumentProcessor chunking over multi-MB text.
+
+Times, per text size:
+
+- ``chars``:  the character chunker, ``_chunk_text(_clean_text(text))``
+- ``tokens``: ``TokenChunker`` over the whole text in one piece
+- ``stream``: ``TokenChunker`` fed 64 KB pieces, as ``iter_document_chunks`` does
+
+and reports MB/s plus the estimated tokens per chunk (``estimate_token_count``)
+against the budget. The text is generated prose: sentences of random words,
+paragraphs separated by blank lines and lines wrapped the way PDF text is.
+Time per MB should stay flat as the text grows; the run exits with status 1
+when it grows by more than ``--max-scaling`` from the smallest size to the largest.
+
+Example::
+
+    python -m benchmarks.chunking_benchmark --mb 1 4 16 --chunk-tokens 250 --overlap-tokens 25
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from app.core.telemetry_integration import estimate_token_count  # noqa: E402
+from app.services.doc_extraction import DocumentProcessor  # noqa: E402
+
+PIECE_CHARS = 64 * 1024
+
+
+def generate_text(megabytes: float, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(1, 12)))
+                  for _ in range(5000)]
+    target = int(megabytes * 1024 * 1024)
+    paragraphs, size = [], 0
+    while size < target:
+        sentences = []
+        for _ in range(rng.randint(2, 8)):
+            words = rng.choices(vocabulary, k=rng.randint(4, 40))
+            sentences.append(" ".join(words).capitalize() + rng.choice([".", ".", ".", "?", "!"]))
+        paragraph = " ".join(sentences)
+        # Wrap at ~80 characters like extracted PDF text
+        lines, line = [], []
+        for word in paragraph.split(" "):
+            line.append(word)
+            if sum(len(w) + 1 for w in line) > 80:
+                lines.append(" ".join(line))
+                line = []
+        lines.append(" ".join(line))
+        paragraphs.append("\n".join(lines))
+        size += len(paragraphs[-1]) + 2
+    return "\n\n".join(paragraphs)
+
+
+def best_time(fn: Callable[[], List[str]], repeat: int):
+    best, chunks = float("inf"), []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, chunks
+
+
+def measure(text: str, args) -> Dict[str, Any]:
+    chars = DocumentProcessor(chunk_size=args.chunk_chars, overlap=args.overlap_chars)
+    tokens = DocumentProcessor(chunk_tokens=args.chunk_tokens, overlap_tokens=args.overlap_tokens)
+    pieces = [text[i:i + PIECE_CHARS] for i in range(0, len(text), PIECE_CHARS)]
+    runs = {
+        "chars": lambda: chars._chunk_text(chars._clean_text(text)),
+        "tokens": lambda: list(tokens.iter_chunks([text])),
+        "stream": lambda: list(tokens.iter_chunks(pieces)),
+    }
+    megabytes = len(text.encode("utf-8")) / (1024 * 1024)
+    result, outputs = {"mb": round(megabytes, 2)}, {}
+    for name, fn in runs.items():
+        seconds, chunks = best_time(fn, args.repeat)
+        outputs[name] = chunks
+        counts = [estimate_token_count(chunk) for chunk in chunks]
+        result[name] = {
+            "seconds": round(seconds, 4),
+            "mb_per_sec": round(megabytes / seconds, 2),
+            "sec_per_mb": seconds / megabytes,
+            "chunks": len(chunks),
+            "tokens_mean": round(statistics.mean(counts), 1) if counts else 0,
+            "tokens_min": min(counts, default=0),
+            "tokens_max": max(counts, default=0),
+        }
+    if outputs["stream"] != outputs["tokens"]:
+        raise AssertionError("streamed chunks differ from whole-text chunks")
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mb", type=float, nargs="+", default=[1, 2, 4, 8], help="text sizes in MB")
+    parser.add_argument("--chunk-tokens", type=int, default=250)
+    parser.add_argument("--overlap-tokens", type=int, default=25)
+    parser.add_argument("--chunk-chars", type=int, default=1000)
+    parser.add_argument("--overlap-chars", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the fastest counts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-scaling", type=float, default=1.5,
+                        help="largest allowed growth of time per MB from the smallest to the largest size")
+    parser.add_argument("--output", default=None, help="write results as JSON to this path")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    results = [measure(generate_text(mb, args.seed), args) for mb in sorted(args.mb)]
+
+    print(f"{'MB':>6} {'chunker':<8} {'MB/s':>8} {'chunks':>8} {'tok mean':>9} {'tok min':>8} {'tok max':>8}")
+    for r in results:
+        for name in ("chars", "tokens", "stream"):
+            m = r[name]
+            print(f"{r['mb']:>6.1f} {name:<8} {m['mb_per_sec']:>8.2f} {m['chunks']:>8d} "
+                  f"{m['tokens_mean']:>9.1f} {m['tokens_min']:>8d} {m['tokens_max']:>8d}")
+    print(f"token budget: {args.chunk_tokens}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps({"config": vars(args), "results": results}, indent=2))
+
+    failed = []
+    for name in ("chars", "tokens", "stream"):
+        scaling = results[-1][name]["sec_per_mb"] / results[0][name]["sec_per_mb"]
+        print(f"{name}: time per MB x{scaling:.2f} from {results[0]['mb']} MB to {results[-1]['mb']} MB")
+        if len(results) > 1 and scaling > args.max_scaling:
+            failed.append(name)
+    if failed:
+        print(f"\nNot linear: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
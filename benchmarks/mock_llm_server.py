@@ -0,0 +1,367 @@
+"""
+Local stand-in for the LLM providers the generation pipeline talks to.
+
+Serves the OpenAI chat completions API (``POST /v1/chat/completions``, used by
+the ``openai_compatible`` inference type, with ``stream: true`` served as
+server-sent events), the OpenAI Files/Batches API used for bulk jobs
+(``/v1/files``, ``/v1/batches``) and the Bedrock runtime ``converse``
+API (``POST /model/{model_id}/converse``) with configurable latency, jitter,
+throttle rate and malformed-JSON rate. Responses are shaped after the prompt:
+generation prompts ("Create N ...") get N unique rows, anything else gets an
+evaluation score.
+
+Run it standalone with::
+
+    python -m benchmarks.mock_llm_server --port 8765 --latency-ms 200 --throttle-rate 0.05
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+_CREATE_PATTERN = re.compile(r"Create (\d+)")
+_STREAM_CHUNK_CHARS = 24
+_FIRST_TOKEN_FRACTION = 0.2  # share of the latency spent before a stream's first chunk
+_WORDS = (
+    "array cache graph index join lambda matrix network parser queue record schema "
+    "socket stream string thread token tree vector window buffer cursor filter hash "
+    "merge pipeline report sample signal table update"
+).split()
+
+
+@dataclass
+class ServerConfig:
+    latency_ms: float = 200.0
+    jitter_ms: float = 50.0
+    throttle_rate: float = 0.0
+    malformed_rate: float = 0.0
+    seed: int = 0
+
+
+class ServerStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.throttled = 0
+            self.malformed = 0
+            self.in_flight = 0
+            self.peak_in_flight = 0
+            self.batches = 0
+            self.batch_requests = 0
+
+    def incr(self, field: str, delta: int = 1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+            if field == "in_flight":
+                self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "malformed": self.malformed,
+                "peak_in_flight": self.peak_in_flight,
+                "batches": self.batches,
+                "batch_requests": self.batch_requests,
+            }
+
+
+def _sentence(rng: random.Random, words: int = 8) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(words)) + f" {uuid.uuid4().hex[:8]}"
+
+
+def completion_text(prompt: str, rng: random.Random, malformed: bool) -> str:
+    """Body the model "generates" for a prompt"""
+    match = _CREATE_PATTERN.search(prompt)
+    if match:
+        rows = [
+            {"question": f"How would you {_sentence(rng)}?", "solution": _sentence(rng, 16)}
+            for _ in range(int(match.group(1)))
+        ]
+    else:
+        rows = [{"score": rng.randint(1, 5), "justification": _sentence(rng, 12)}]
+    text = json.dumps(rows, indent=2)
+    if malformed:
+        # Truncate mid-object, the most common way real completions break
+        text = text[: max(1, len(text) * 2 // 3)]
+    return text
+
+
+def multipart_file(body: bytes, content_type: str) -> bytes:
+    """Content of the ``file`` field of a multipart/form-data upload"""
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+    for part in body.split(b"--" + boundary):
+        head, sep, data = part.partition(b"\r\n\r\n")
+        if sep and b'name="file"' in head:
+            return data[:-2] if data.endswith(b"\r\n") else data
+    raise ValueError("no file field in upload")
+
+
+def chat_completion(model: str, prompt: str, text: str):
+    """``chat.completion`` response body for ``text``"""
+    prompt_tokens = len(prompt) // 4 + 1
+    completion_tokens = len(text) // 4 + 1
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": 0,
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def create_app(config: ServerConfig) -> FastAPI:
+    app = FastAPI(title="Mock LLM server")
+    stats = ServerStats()
+    rng = random.Random(config.seed)
+    files = {}
+    batches = {}
+    batch_tasks = set()
+
+    async def simulate(prompt: str, first_token_only: bool = False):
+        """
+        Sleep like a model would; returns (throttled, text, remaining delay).
+        A streamed call only waits for its first token here and spends the rest
+        of the delay between chunks.
+        """
+        stats.incr("requests")
+        stats.incr("in_flight")
+        try:
+            delay = max(0.0, rng.gauss(config.latency_ms, config.jitter_ms)) / 1000
+            if rng.random() < config.throttle_rate:
+                stats.incr("throttled")
+                await asyncio.sleep(delay / 10)
+                return True, None, 0.0
+            waited = delay * _FIRST_TOKEN_FRACTION if first_token_only else delay
+            await asyncio.sleep(waited)
+            malformed = rng.random() < config.malformed_rate
+            if malformed:
+                stats.incr("malformed")
+            return False, completion_text(prompt, rng, malformed), delay - waited
+        finally:
+            stats.incr("in_flight", -1)
+
+    def usage(prompt: str, text: str):
+        prompt_tokens = len(prompt) // 4 + 1
+        completion_tokens = len(text) // 4 + 1
+        return prompt_tokens, completion_tokens
+
+    async def stream_chunks(model: str, text: str, remaining: float):
+        """Server-sent ``chat.completion.chunk`` events spreading ``text`` over ``remaining`` seconds"""
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        pieces = [text[i:i + _STREAM_CHUNK_CHARS] for i in range(0, len(text), _STREAM_CHUNK_CHARS)]
+        pause = remaining / max(1, len(pieces))
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        stats.incr("in_flight")
+        try:
+            yield event({"role": "assistant", "content": ""})
+            for piece in pieces:
+                yield event({"content": piece})
+                await asyncio.sleep(pause)
+            yield event({}, "stop")
+            yield "data: [DONE]\n\n"
+        finally:
+            stats.incr("in_flight", -1)
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "config": asdict(config)}
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats.snapshot()
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        stats.reset()
+        return stats.snapshot()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+        streamed = bool(body.get("stream"))
+        throttled, text, remaining = await simulate(prompt, first_token_only=streamed)
+        if throttled:
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit exceeded", "type": "rate_limit_error", "code": "rate_limit_exceeded"}},
+            )
+        if streamed:
+            return StreamingResponse(
+                stream_chunks(body.get("model", "mock"), text, remaining),
+                media_type="text/event-stream",
+            )
+        return chat_completion(body.get("model", "mock"), prompt, text)
+
+    def file_object(file_id: str, size: int, filename: str, purpose: str):
+        return {
+            "id": file_id,
+            "object": "file",
+            "bytes": size,
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed",
+        }
+
+    def store_file(content: bytes, filename: str, purpose: str):
+        file_id = f"file-{uuid.uuid4().hex}"
+        files[file_id] = content
+        return file_object(file_id, len(content), filename, purpose)
+
+    async def run_batch(batch):
+        """Answer every request of a batch after one model latency"""
+        lines = [line for line in files[batch["input_file_id"]].decode("utf-8").splitlines() if line.strip()]
+        batch["request_counts"]["total"] = len(lines)
+        await asyncio.sleep(max(0.0, rng.gauss(config.latency_ms, config.jitter_ms)) / 1000)
+        output = []
+        for line in lines:
+            entry = json.loads(line)
+            body = entry["body"]
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+            malformed = rng.random() < config.malformed_rate
+            if malformed:
+                stats.incr("malformed")
+            stats.incr("batch_requests")
+            output.append(json.dumps({
+                "id": f"batch_req_{uuid.uuid4().hex}",
+                "custom_id": entry["custom_id"],
+                "response": {
+                    "status_code": 200,
+                    "request_id": uuid.uuid4().hex,
+                    "body": chat_completion(body.get("model", "mock"), prompt, completion_text(prompt, rng, malformed)),
+                },
+                "error": None,
+            }))
+        output_file = store_file("\n".join(output).encode("utf-8"), f"{batch['id']}_output.jsonl", "batch_output")
+        batch["request_counts"]["completed"] = len(lines)
+        batch.update(status="completed", output_file_id=output_file["id"], completed_at=int(time.time()))
+
+    @app.post("/v1/files")
+    async def upload_file(request: Request):
+        content = multipart_file(await request.body(), request.headers.get("content-type", ""))
+        return store_file(content, "batch_input.jsonl", "batch")
+
+    @app.get("/v1/files/{file_id}/content")
+    async def file_content(file_id: str):
+        if file_id not in files:
+            return JSONResponse(status_code=404, content={"error": {"message": f"No such file: {file_id}"}})
+        return Response(files[file_id], media_type="application/octet-stream")
+
+    @app.post("/v1/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        if body.get("input_file_id") not in files:
+            return JSONResponse(status_code=404, content={"error": {"message": "input file not found"}})
+        batch = {
+            "id": f"batch_{uuid.uuid4().hex}",
+            "object": "batch",
+            "endpoint": body.get("endpoint", "/v1/chat/completions"),
+            "input_file_id": body["input_file_id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "output_file_id": None,
+            "error_file_id": None,
+            "created_at": int(time.time()),
+            "request_counts": {"total": 0, "completed": 0, "failed": 0},
+        }
+        batches[batch["id"]] = batch
+        stats.incr("batches")
+        task = asyncio.create_task(run_batch(batch))
+        batch_tasks.add(task)
+        task.add_done_callback(batch_tasks.discard)
+        return batch
+
+    @app.get("/v1/batches/{batch_id}")
+    async def get_batch(batch_id: str):
+        if batch_id not in batches:
+            return JSONResponse(status_code=404, content={"error": {"message": f"No such batch: {batch_id}"}})
+        return batches[batch_id]
+
+    @app.post("/model/{model_id:path}/converse")
+    async def converse(model_id: str, request: Request):
+        body = await request.json()
+        prompt = "\n".join(
+            part.get("text", "")
+            for message in body.get("messages", [])
+            for part in message.get("content", [])
+        )
+        throttled, text, _ = await simulate(prompt)
+        if throttled:
+            return JSONResponse(
+                status_code=429,
+                content={"message": "Too many requests, please wait before trying again."},
+                headers={"x-amzn-ErrorType": "ThrottlingException"},
+            )
+        prompt_tokens, completion_tokens = usage(prompt, text)
+        return {
+            "output": {"message": {"role": "assistant", "content": [{"text": text}]}},
+            "stopReason": "end_turn",
+            "usage": {
+                "inputTokens": prompt_tokens,
+                "outputTokens": completion_tokens,
+                "totalTokens": prompt_tokens + completion_tokens,
+            },
+            "metrics": {"latencyMs": int(config.latency_ms)},
+        }
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI-compatible / Bedrock converse server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=ServerConfig.latency_ms)
+    parser.add_argument("--jitter-ms", type=float, default=ServerConfig.jitter_ms)
+    parser.add_argument("--throttle-rate", type=float, default=ServerConfig.throttle_rate)
+    parser.add_argument("--malformed-rate", type=float, default=ServerConfig.malformed_rate)
+    parser.add_argument("--seed", type=int, default=ServerConfig.seed)
+    args = parser.parse_args()
+
+    config = ServerConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        throttle_rate=args.throttle_rate,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,527 @@
+"""
+Benchmark the generation and evaluation pipelines against the local mock LLM server.
+
+Each scenario drives a real service entry point end to end (prompt building,
+model handler, concurrency/rate limiting, parsing, output writing) while
+``benchmarks.mock_llm_server`` plays the provider:
+
+- ``generate_freeform``: ``SynthesisService.generate_freeform``
+- ``generate_examples``: ``SynthesisLegacyService.generate_examples``
+- ``evaluate_rows``:     ``EvaluatorService.evaluate_rows``
+- ``evaluate_results``:  ``EvaluatorLegacyService.evaluate_results``
+
+Reported per scenario: rows/sec, p50/p95/p99 model call latency, peak RSS and
+peak thread count, plus what the server saw (requests, throttles, malformed
+responses, peak concurrency). Results are written as JSON; pass
+``--baseline`` with an earlier result file to print the change per metric.
+
+Example::
+
+    python -m benchmarks.run_benchmarks --provider openai_compatible --topics 20 --rows-per-topic 25 \\
+        --latency-ms 300 --throttle-rate 0.02 --malformed-rate 0.02 --output benchmarks/results/run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+SCENARIOS = ["generate_freeform", "generate_examples", "evaluate_rows", "evaluate_results"]
+BEDROCK_MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+OPENAI_MODEL_ID = "mock-model"
+
+# Higher is better for these metrics, lower is better for everything else compared
+_HIGHER_IS_BETTER = {"rows_per_sec"}
+
+
+# ---------- mock server -----------------------------------------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def mock_server(args):
+    """Run the mock server in a subprocess so it doesn't skew RSS/thread measurements"""
+    port = args.port or _free_port()
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.mock_llm_server",
+            "--port", str(port),
+            "--latency-ms", str(args.latency_ms),
+            "--jitter-ms", str(args.jitter_ms),
+            "--throttle-rate", str(args.throttle_rate),
+            "--malformed-rate", str(args.malformed_rate),
+            "--seed", str(args.seed),
+        ],
+        cwd=str(ROOT_DIR),
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{url}/health", timeout=1).raise_for_status()
+                break
+            except httpx.HTTPError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("Mock LLM server did not start")
+                time.sleep(0.2)
+        yield url
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# ---------- measurement -----------------------------------------------------
+def _proc_status() -> Dict[str, int]:
+    """Current RSS (bytes) and OS thread count of this process"""
+    try:
+        values = {}
+        with open("/proc/self/status") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                if key in ("VmRSS", "Threads"):
+                    values[key] = int(value.split()[0])
+        return {"rss": values["VmRSS"] * 1024, "threads": values["Threads"]}
+    except (OSError, KeyError, ValueError):
+        # No /proc (macOS): fall back to the lifetime peak and Python-level threads
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss": peak if sys.platform == "darwin" else peak * 1024, "threads": threading.active_count()}
+
+
+class ResourceSampler:
+    """Sample RSS and thread count in the background, keeping the peaks"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_threads = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        status = _proc_status()
+        self.peak_rss = max(self.peak_rss, status["rss"])
+        self.peak_threads = max(self.peak_threads, status["threads"])
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+class CallRecorder:
+    """
+    Time every ``UnifiedModelHandler.agenerate_response`` / ``astream_rows`` call made
+    while active, and how long each took to deliver its first row.
+    """
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_rows: List[float] = []
+        self.errors = 0
+
+    @contextmanager
+    def patched(self):
+        from app.core.model_handlers import UnifiedModelHandler
+
+        original = UnifiedModelHandler.agenerate_response
+        original_stream = UnifiedModelHandler.astream_rows
+        recorder = self
+
+        async def timed(handler, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await original(handler, *args, **kwargs)
+            except Exception:
+                recorder.errors += 1
+                raise
+            finally:
+                recorder.latencies.append(time.perf_counter() - start)
+                recorder.first_rows.append(time.perf_counter() - start)
+
+        async def timed_stream(handler, prompt, on_row, *args, **kwargs):
+            start = time.perf_counter()
+            first_row = None
+
+            def timed_row(row):
+                nonlocal first_row
+                if first_row is None:
+                    first_row = time.perf_counter() - start
+                return on_row(row)
+
+            try:
+                return await original_stream(handler, prompt, timed_row, *args, **kwargs)
+            except Exception:
+                recorder.errors += 1
+                raise
+            finally:
+                recorder.latencies.append(time.perf_counter() - start)
+                if first_row is not None:
+                    recorder.first_rows.append(first_row)
+
+        UnifiedModelHandler.agenerate_response = timed
+        UnifiedModelHandler.astream_rows = timed_stream
+        try:
+            yield self
+        finally:
+            UnifiedModelHandler.agenerate_response = original
+            UnifiedModelHandler.astream_rows = original_stream
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# ---------- scenarios -------------------------------------------------------
+class BenchContext:
+    def __init__(self, args, server_url: str, workdir: str):
+        self.args = args
+        self.server_url = server_url
+        self.workdir = workdir
+        if args.provider == "aws_bedrock":
+            self.model_id = BEDROCK_MODEL_ID
+            self.caii_endpoint = None
+        else:
+            self.model_id = OPENAI_MODEL_ID
+            self.caii_endpoint = f"{server_url}/v1"
+
+    def bedrock_client(self):
+        import boto3
+        from botocore.config import Config
+
+        return boto3.client(
+            service_name="bedrock-runtime",
+            region_name="us-west-2",
+            endpoint_url=self.server_url,
+            aws_access_key_id="benchmark",
+            aws_secret_access_key="benchmark",
+            config=Config(
+                retries={"max_attempts": 2, "mode": "standard"},
+                connect_timeout=5,
+                read_timeout=3600,
+                max_pool_connections=max(10, self.args.concurrency * 2),
+            ),
+        )
+
+    def prepare(self, service):
+        """Point a service at the mock server"""
+        if self.args.provider == "aws_bedrock":
+            service.bedrock_client = self.bedrock_client()
+        return service
+
+    def handler(self, service):
+        from app.core.model_handlers import create_handler
+
+        return create_handler(
+            self.model_id,
+            service.bedrock_client,
+            inference_type=self.args.provider,
+            caii_endpoint=self.caii_endpoint,
+        )
+
+    def topics(self) -> List[str]:
+        return [f"benchmark topic {i}" for i in range(self.args.topics)]
+
+    def qa_rows(self) -> List[Dict[str, str]]:
+        return [
+            {"Seeds": f"benchmark topic {i % max(1, self.args.topics)}",
+             "Prompt": f"Benchmark question {i}?", "Completion": f"Benchmark answer {i}."}
+            for i in range(self.args.eval_rows)
+        ]
+
+
+async def bench_generate_freeform(ctx: BenchContext) -> int:
+    from app.models.request_models import SynthesisRequest
+    from app.services.synthesis_service import SynthesisService
+
+    service = ctx.prepare(SynthesisService())
+    request = SynthesisRequest(
+        model_id=ctx.model_id,
+        inference_type=ctx.args.provider,
+        caii_endpoint=ctx.caii_endpoint,
+        use_case="custom",
+        technique="freeform",
+        topics=ctx.topics(),
+        num_questions=ctx.args.rows_per_topic,
+        max_concurrent_topics=ctx.args.concurrency,
+        stream=ctx.args.stream,
+    )
+    result = await service.generate_freeform(request, is_demo=True)
+    return sum(len(rows) for rows in result["results"].values())
+
+
+async def bench_generate_examples(ctx: BenchContext) -> int:
+    from app.models.request_models import SynthesisRequest
+    from app.services.synthesis_legacy_service import SynthesisLegacyService
+
+    service = ctx.prepare(SynthesisLegacyService())
+    request = SynthesisRequest(
+        model_id=ctx.model_id,
+        inference_type=ctx.args.provider,
+        caii_endpoint=ctx.caii_endpoint,
+        use_case="code_generation",
+        technique="sft",
+        topics=ctx.topics(),
+        num_questions=ctx.args.rows_per_topic,
+        max_concurrent_topics=ctx.args.concurrency,
+        stream=ctx.args.stream,
+    )
+    result = await service.generate_examples(request, is_demo=True)
+    return sum(len(rows) for rows in result["results"].values())
+
+
+async def bench_evaluate_rows(ctx: BenchContext) -> int:
+    from app.models.request_models import EvaluationRequest
+    from app.services.evaluator_service import EvaluatorService
+
+    service = ctx.prepare(EvaluatorService())
+    request = EvaluationRequest(
+        model_id=ctx.model_id,
+        inference_type=ctx.args.provider,
+        caii_endpoint=ctx.caii_endpoint,
+        use_case="custom",
+        technique="freeform",
+        max_workers=ctx.args.concurrency,
+    )
+    result = await service.evaluate_rows(ctx.qa_rows(), ctx.handler(service), request)
+    return result.get("total_evaluated", 0)
+
+
+async def bench_evaluate_results(ctx: BenchContext) -> int:
+    from app.models.request_models import EvaluationRequest
+    from app.services.evaluator_legacy_service import EvaluatorLegacyService
+
+    import_path = os.path.join(ctx.workdir, "benchmark_qa_pairs.json")
+    rows = ctx.qa_rows()
+    with open(import_path, "w") as f:
+        json.dump(rows, f)
+
+    service = ctx.prepare(EvaluatorLegacyService())
+    request = EvaluationRequest(
+        model_id=ctx.model_id,
+        inference_type=ctx.args.provider,
+        caii_endpoint=ctx.caii_endpoint,
+        use_case="code_generation",
+        import_path=import_path,
+        max_workers=ctx.args.concurrency,
+    )
+    await service.evaluate_results(request, is_demo=True)
+    return len(rows)
+
+
+SCENARIO_FUNCS = {
+    "generate_freeform": bench_generate_freeform,
+    "generate_examples": bench_generate_examples,
+    "evaluate_rows": bench_evaluate_rows,
+    "evaluate_results": bench_evaluate_results,
+}
+
+
+def run_scenario(name: str, ctx: BenchContext) -> Dict[str, Any]:
+    httpx.post(f"{ctx.server_url}/stats/reset", timeout=5)
+    recorder = CallRecorder()
+    error = None
+    start = time.perf_counter()
+    with ResourceSampler() as sampler, recorder.patched():
+        try:
+            rows = asyncio.run(SCENARIO_FUNCS[name](ctx))
+        except Exception as e:
+            rows = 0
+            error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    latencies_ms = [x * 1000 for x in recorder.latencies]
+    first_rows_ms = [x * 1000 for x in recorder.first_rows]
+
+    result = {
+        "rows": rows,
+        "seconds": round(elapsed, 3),
+        "rows_per_sec": round(rows / elapsed, 2) if elapsed > 0 else 0.0,
+        "calls": len(latencies_ms),
+        "call_errors": recorder.errors,
+        "call_latency_ms": {
+            "p50": round(percentile(latencies_ms, 50), 1),
+            "p95": round(percentile(latencies_ms, 95), 1),
+            "p99": round(percentile(latencies_ms, 99), 1),
+            "max": round(max(latencies_ms), 1) if latencies_ms else 0.0,
+            "mean": round(statistics.fmean(latencies_ms), 1) if latencies_ms else 0.0,
+        },
+        "first_row_ms": {
+            "p50": round(percentile(first_rows_ms, 50), 1),
+            "p95": round(percentile(first_rows_ms, 95), 1),
+        },
+        "peak_rss_mb": round(sampler.peak_rss / (1024 * 1024), 1),
+        "peak_threads": sampler.peak_threads,
+        "server": httpx.get(f"{ctx.server_url}/stats", timeout=5).json(),
+    }
+    if error:
+        result["error"] = error
+    return result
+
+
+# ---------- reporting -------------------------------------------------------
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _flatten(metrics: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in metrics.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and key != "server":
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Per-metric change against a baseline run; returns the regressions beyond ``tolerance``"""
+    regressions = []
+    changed = {
+        k for k, v in current["config"].items()
+        if k not in ("scenarios", "port", "tolerance") and baseline.get("config", {}).get(k) != v
+    }
+    if changed:
+        print(f"\nWarning: baseline was run with different settings: {', '.join(sorted(changed))}")
+    for name, metrics in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        print(f"\n{name} vs baseline ({baseline.get('git_commit') or baseline.get('timestamp')}):")
+        base_flat = _flatten(base)
+        for metric, value in _flatten(metrics).items():
+            before = base_flat.get(metric)
+            if before in (None, 0):
+                continue
+            change = (value - before) / before
+            worse = -change if metric in _HIGHER_IS_BETTER else change
+            flag = ""
+            if metric in ("rows_per_sec", "call_latency_ms.p50", "call_latency_ms.p99", "first_row_ms.p50",
+                          "peak_rss_mb", "peak_threads") \
+                    and worse > tolerance:
+                flag = "  <-- regression"
+                regressions.append(f"{name}.{metric}")
+            print(f"  {metric:24s} {before:>10} -> {value:>10} ({change:+.1%}){flag}")
+    return regressions
+
+
+def print_summary(results: Dict[str, Any]) -> None:
+    print(f"\nprovider={results['config']['provider']} commit={results['git_commit']}")
+    print(f"{'scenario':20s} {'rows':>7s} {'rows/s':>9s} {'p50 ms':>9s} {'p99 ms':>9s} {'1st row':>9s} {'rss MB':>8s} {'threads':>8s}")
+    for name, r in results["scenarios"].items():
+        print(
+            f"{name:20s} {r['rows']:>7d} {r['rows_per_sec']:>9.2f} {r['call_latency_ms']['p50']:>9.1f} "
+            f"{r['call_latency_ms']['p99']:>9.1f} {r['first_row_ms']['p50']:>9.1f} {r['peak_rss_mb']:>8.1f} {r['peak_threads']:>8d}"
+            + (f"  ERROR {r['error']}" if "error" in r else "")
+        )
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--provider", choices=["openai_compatible", "aws_bedrock"], default="openai_compatible")
+    parser.add_argument("--topics", type=int, default=10)
+    parser.add_argument("--rows-per-topic", type=int, default=20)
+    parser.add_argument("--eval-rows", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20, help="max_concurrent_topics / max_workers")
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stream", action="store_true", help="generate with streamed completions (openai_compatible only)")
+    parser.add_argument("--port", type=int, default=0, help="mock server port (default: any free port)")
+    parser.add_argument("--output", default=None, help="result JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="earlier result JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="relative change flagged as a regression")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    output = Path(args.output or ROOT_DIR / "benchmarks" / "results" /
+                  f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S')}_{args.provider}.json").resolve()
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+
+    # Credentials the handlers insist on; the mock server ignores them
+    os.environ.setdefault("OpenAI_Endpoint_Compatible_Key", "benchmark")
+    os.environ.setdefault("AWS_ACCESS_KEY_ID", "benchmark")
+    os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "benchmark")
+
+    results = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        "scenarios": {},
+    }
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="sds_bench_") as workdir, mock_server(args) as url:
+        # Services write output files, logs and metadata.db relative to the working directory
+        os.chdir(workdir)
+        try:
+            ctx = BenchContext(args, url, workdir)
+            for name in args.scenarios:
+                print(f"Running {name} ...", flush=True)
+                results["scenarios"][name] = run_scenario(name, ctx)
+        finally:
+            os.chdir(cwd)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print_summary(results)
+    print(f"\nResults saved to {output}")
+
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
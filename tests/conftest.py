@@ -104,3 +104,8 @@ def upload_dir(tmp_path):
 def mock_db(monkeypatch):
     from tests.mocks import mock_db as mdb
     monkeypatch.setattr('app.core.database.DatabaseManager', lambda: mdb.MockDatabaseManager())
+
+@pytest.fixture(autouse=True)
+def isolated_chunk_store(monkeypatch, tmp_path):
+    from app.core.chunk_store import chunk_store
+    monkeypatch.setattr(chunk_store, 'path', str(tmp_path / 'chunk_store'))
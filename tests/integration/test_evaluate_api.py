@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
 import json
 from fastapi.testclient import TestClient
 from pathlib import Path
@@ -52,7 +52,7 @@ def test_evaluate_endpoint(mock_qa_file):
     }
     # Optionally, patch create_handler to return a dummy handler that returns a dummy evaluation.
     with patch('app.services.evaluator_legacy_service.create_handler') as mock_handler:
-        mock_handler.return_value.generate_response.return_value = [{"score": 1.0, "justification": "Dummy evaluation"}]
+        mock_handler.return_value.agenerate_response = AsyncMock(return_value=[{"score": 1.0, "justification": "Dummy evaluation"}])
         response = client.post("/synthesis/evaluate", json=request_data)
     # In demo mode, our endpoint returns a dict with "status", "result", and "output_path".
     assert response.status_code == 200
@@ -72,7 +72,7 @@ def test_job_handling(mock_qa_file):
         "output_value": "Completion"
     }
     with patch('app.services.evaluator_legacy_service.create_handler') as mock_handler:
-        mock_handler.return_value.generate_response.return_value = [{"score": 1.0, "justification": "Dummy evaluation"}]
+        mock_handler.return_value.agenerate_response = AsyncMock(return_value=[{"score": 1.0, "justification": "Dummy evaluation"}])
         response = client.post("/synthesis/evaluate", json=request_data)
     assert response.status_code == 200
     res_json = response.json()
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.blocking_io import read_json
+from app.main import app, db_manager, synthesis_legacy_service
+
+class DummyBedrockClient:
+    def invoke_model(self, modelId, body):
+        return {}
+    @property
+    def meta(self):
+        class Meta:
+            region_name = "us-west-2"
+        return Meta()
+
+@pytest.fixture(autouse=True)
+def quick_health_check(monkeypatch):
+    monkeypatch.setattr(synthesis_legacy_service, "bedrock_client", DummyBedrockClient())
+
+def slow(fn, seconds=1.0):
+    def wrapper(*args, **kwargs):
+        time.sleep(seconds)  # a large file or a busy database
+        return fn(*args, **kwargs)
+    return wrapper
+
+async def health_latency_while(client, request):
+    """Seconds /health takes to answer once asked 0.2 s into ``request``, which blocks for 1 s if run on the loop"""
+    task = asyncio.create_task(request)
+    start = time.perf_counter()
+    await asyncio.sleep(0.2)
+    health = await client.get("/health")
+    latency = time.perf_counter() - start - 0.2
+    assert health.status_code == 200 and health.json()["status"] == "healthy"
+    assert not task.done()
+    return latency, await task
+
+@pytest.mark.asyncio
+async def test_health_stays_fast_during_a_long_evaluation(tmp_path):
+    path = tmp_path / "qa_pairs.json"
+    path.write_text(json.dumps([{"Seeds": "t", "Prompt": f"q{i}", "Completion": f"a{i}"} for i in range(4)]))
+    request = {
+        "use_case": "custom",
+        "model_id": "us.anthropic.claude-3-5-haiku-20241022-v1:0",
+        "import_path": str(path),
+        "is_demo": True,
+        "output_key": "Prompt",
+        "output_value": "Completion",
+    }
+
+    async def evaluate(prompt, **kwargs):
+        await asyncio.sleep(0.5)
+        return [{"score": 4, "justification": "ok"}]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        with patch("app.services.evaluator_legacy_service.read_json", slow(read_json)), \
+                patch("app.services.evaluator_legacy_service.create_handler") as create:
+            create.return_value.agenerate_response = AsyncMock(side_effect=evaluate)
+            latency, response = await health_latency_while(client, client.post("/synthesis/evaluate", json=request))
+
+    assert response.status_code == 200 and response.json()["status"] == "completed"
+    assert latency < 0.5
+
+@pytest.mark.asyncio
+async def test_health_stays_fast_during_a_slow_history_query():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        with patch.object(db_manager, "get_pending_generate_job_ids", slow(lambda: [])), \
+                patch.object(db_manager, "get_paginated_generate_metadata_light", return_value=(0, [])):
+            latency, response = await health_latency_while(client, client.get("/generations/history"))
+
+    assert response.status_code == 200 and response.json()["pagination"]["total"] == 0
+    assert latency < 0.5
+
+@pytest.mark.asyncio
+async def test_health_stays_fast_while_a_freeform_prompt_compiles():
+    from app.core.prompt_templates import PromptBuilder
+    request = {
+        "use_case": "custom",
+        "model_id": "us.anthropic.claude-3-5-haiku-20241022-v1:0",
+        "num_questions": 1,
+        "topics": ["loans"],
+        "is_demo": True,
+        "technique": "freeform",
+    }
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+        with patch.object(PromptBuilder, "compile_freeform_prompt", slow(PromptBuilder.compile_freeform_prompt)), \
+                patch("app.services.synthesis_service.create_handler") as create:
+            create.return_value.agenerate_response = AsyncMock(return_value=[{"amount": 1000, "purpose": "car"}])
+            latency, response = await health_latency_while(client, client.post("/synthesis/freeform", json=request))
+
+    assert response.status_code == 200 and response.json()["status"] == "completed"
+    assert latency < 0.5
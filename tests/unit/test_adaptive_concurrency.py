@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+from botocore.exceptions import ClientError
+from app.core.adaptive_concurrency import AdaptiveConcurrencyLimiter, get_limiter, is_throttle_error
+
+def throttle_error():
+    return ClientError(
+        {"Error": {"Code": "ThrottlingException", "Message": "Too many requests"},
+         "ResponseMetadata": {"HTTPStatusCode": 429}},
+        "Converse",
+    )
+
+def test_is_throttle_error():
+    assert is_throttle_error(throttle_error())
+    assert not is_throttle_error(ClientError({"Error": {"Code": "ValidationException"}}, "Converse"))
+    assert not is_throttle_error(ValueError("bad json"))
+
+@pytest.mark.asyncio
+async def test_limit_grows_when_healthy_and_halves_on_throttle():
+    limiter = AdaptiveConcurrencyLimiter("aws_bedrock", "m", {"initial_limit": 4, "max_limit": 16})
+    for _ in range(40):
+        async with limiter.slot():
+            pass
+    grown = limiter.limit
+    assert grown > 4
+
+    with pytest.raises(ClientError):
+        async with limiter.slot():
+            raise throttle_error()
+    assert limiter.limit <= grown // 2 + 1
+
+    # A burst of throttles inside the cooldown only backs off once
+    after_first = limiter.limit
+    with pytest.raises(ClientError):
+        async with limiter.slot():
+            raise throttle_error()
+    assert limiter.limit == after_first
+    assert limiter.snapshot()["recent_throttles"] == 2
+
+@pytest.mark.asyncio
+async def test_in_flight_never_exceeds_limit():
+    limiter = AdaptiveConcurrencyLimiter("openai", "m", {"initial_limit": 2, "max_limit": 2})
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.snapshot()["in_flight"])
+            await asyncio.sleep(0.01)
+
+    await asyncio.gather(*(call() for _ in range(10)))
+    assert peak == 2
+    assert limiter.snapshot()["in_flight"] == 0
+
+def test_limiter_shared_per_provider_and_model():
+    assert get_limiter("CAII", "llama") is get_limiter("CAII", "llama")
+    assert get_limiter("CAII", "llama") is not get_limiter("openai", "llama")
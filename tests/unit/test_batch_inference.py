@@ -0,0 +1,96 @@
+import asyncio
+import json
+import httpx
+import pytest
+from unittest.mock import AsyncMock, Mock
+from openai import AsyncOpenAI
+from app.core.batch_inference import BatchJobStatus, BulkModelHandler, OpenAIBatchBackend
+from app.core.exceptions import ModelHandlerError
+from app.core.model_handlers import create_handler
+from app.models.request_models import EvaluationRequest
+from app.services.evaluator_service import EvaluatorService
+from benchmarks.mock_llm_server import ServerConfig, create_app
+
+FAST = {"min_records": 2, "collect_window": 0.05, "poll_interval": 0.01}
+
+class FakeBackend:
+    def __init__(self, text, state="completed", failed=False):
+        self.text = text
+        self.state = state
+        self.failed = failed
+        self.jobs = []
+
+    async def submit(self, records):
+        self.jobs.append(dict(records))
+        return f"job-{len(self.jobs)}"
+
+    async def status(self, batch_id):
+        return BatchJobStatus(self.state, finished=True, failed=self.failed, message="quota exceeded")
+
+    async def results(self, batch_id):
+        return {record_id: (self.text, None) for record_id in self.jobs[-1]}
+
+@pytest.mark.asyncio
+async def test_bulk_calls_run_as_one_openai_batch_against_local_stand_in():
+    app = create_app(ServerConfig(latency_ms=0, jitter_ms=0))
+    http_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://mock")
+    client = AsyncOpenAI(api_key="test", base_url="http://mock/v1", http_client=http_client)
+    handler = create_handler("mock-model", bedrock_client=Mock(), inference_type="openai_compatible", caii_endpoint="http://mock/v1")
+    bulk = BulkModelHandler(handler, backend=OpenAIBatchBackend(handler, client=client), config=FAST)
+
+    responses = await asyncio.gather(*(bulk.agenerate_response(f"Create 2 rows about topic {i}") for i in range(5)))
+
+    assert [len(rows) for rows in responses] == [2] * 5
+    assert all("question" in row for rows in responses for row in rows)
+    server_stats = (await http_client.get("/stats")).json()
+    assert server_stats["batches"] == 1 and server_stats["batch_requests"] == 5
+    assert server_stats["requests"] == 0
+    assert bulk.stats() == {"batch_jobs": 1, "batch_records": 5, "on_demand_records": 0}
+
+@pytest.mark.asyncio
+async def test_rounds_below_min_records_run_on_demand():
+    handler = Mock(model_id="m", inference_type="openai", custom_p=False)
+    handler._response_cache_key.return_value = None
+    handler.agenerate_response = AsyncMock(return_value=[{"question": "q", "solution": "s"}])
+    backend = FakeBackend("[]")
+    bulk = BulkModelHandler(handler, backend=backend, config={**FAST, "min_records": 10})
+
+    response = await bulk.agenerate_response("Create 1")
+    assert response == [{"question": "q", "solution": "s"}]
+    assert backend.jobs == []
+    assert bulk.stats()["on_demand_records"] == 1
+
+@pytest.mark.asyncio
+async def test_failed_batch_job_fails_every_call():
+    handler = create_handler("mock-model", bedrock_client=Mock(), inference_type="openai")
+    bulk = BulkModelHandler(handler, backend=FakeBackend("[]", state="failed", failed=True), config=FAST)
+    results = await asyncio.gather(*(bulk.agenerate_response(f"p{i}") for i in range(3)), return_exceptions=True)
+    assert all(isinstance(r, ModelHandlerError) and "quota exceeded" in str(r) for r in results)
+
+@pytest.mark.asyncio
+async def test_evaluate_rows_queues_every_row_into_one_job():
+    handler = create_handler("mock-model", bedrock_client=Mock(), inference_type="openai")
+    backend = FakeBackend(json.dumps([{"score": 4, "justification": "fine"}]))
+    bulk = BulkModelHandler(handler, backend=backend, config=FAST)
+    request = EvaluationRequest(model_id="mock-model", use_case="custom", max_workers=1)
+    rows = [{"question": f"q{i}", "answer": f"a{i}"} for i in range(4)]
+
+    result = await EvaluatorService().evaluate_rows(rows, bulk, request)
+
+    assert len(backend.jobs) == 1 and len(backend.jobs[0]) == 4
+    assert [r["evaluation"]["score"] for r in result["evaluated_rows"]] == [4, 4, 4, 4]
+
+@pytest.mark.asyncio
+async def test_records_without_json_are_not_cached(tmp_path, monkeypatch):
+    from app.core import batch_inference, model_handlers
+    from app.core.json_stream import UnparsedOutput
+    from app.core.response_cache import ResponseCache
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setitem(model_handlers.RESPONSE_CACHE_CONFIG, "enabled", True)
+    monkeypatch.setattr(batch_inference, "response_cache", cache)
+    handler = create_handler("mock-model", bedrock_client=Mock(), inference_type="openai")
+    bulk = BulkModelHandler(handler, backend=FakeBackend("no json here"), config=FAST)
+
+    responses = await asyncio.gather(*(bulk.agenerate_response(f"p{i}") for i in range(2)))
+    assert all(isinstance(r, UnparsedOutput) for r in responses)
+    assert await cache.aget(handler._response_cache_key("p0")) is None
@@ -0,0 +1,37 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from benchmarks.mock_llm_server import ServerConfig, create_app
+from benchmarks.run_benchmarks import compare, percentile
+
+def test_mock_server_speaks_openai_and_bedrock():
+    client = TestClient(create_app(ServerConfig(latency_ms=0, jitter_ms=0)))
+
+    response = client.post("/v1/chat/completions", json={"messages": [{"role": "user", "content": "Create 3 question-solution pairs"}]})
+    rows = json.loads(response.json()["choices"][0]["message"]["content"])
+    assert len(rows) == 3 and len({r["question"] for r in rows}) == 3
+
+    response = client.post("/model/us.anthropic.claude/converse", json={"messages": [{"role": "user", "content": [{"text": "Evaluate this pair"}]}]})
+    body = response.json()
+    assert "score" in json.loads(body["output"]["message"]["content"][0]["text"])[0]
+    assert body["usage"]["totalTokens"] > 0
+    assert client.get("/stats").json()["requests"] == 2
+
+def test_mock_server_throttles_and_breaks_json():
+    client = TestClient(create_app(ServerConfig(latency_ms=0, jitter_ms=0, throttle_rate=1.0)))
+    response = client.post("/model/m/converse", json={"messages": []})
+    assert response.status_code == 429
+    assert response.headers["x-amzn-ErrorType"] == "ThrottlingException"
+
+    client = TestClient(create_app(ServerConfig(latency_ms=0, jitter_ms=0, malformed_rate=1.0)))
+    text = client.post("/v1/chat/completions", json={"messages": [{"content": "Create 2 rows"}]}).json()["choices"][0]["message"]["content"]
+    with pytest.raises(json.JSONDecodeError):
+        json.loads(text)
+
+def test_compare_flags_regressions():
+    def run(rows_per_sec, p99):
+        return {"config": {"provider": "openai_compatible"}, "scenarios": {"evaluate_rows": {
+            "rows_per_sec": rows_per_sec, "call_latency_ms": {"p50": 100, "p99": p99}, "peak_rss_mb": 100, "peak_threads": 5}}}
+    assert compare(run(100, 200), run(100, 200), 0.1) == []
+    assert compare(run(80, 300), run(100, 200), 0.1) == ["evaluate_rows.rows_per_sec", "evaluate_rows.call_latency_ms.p99"]
+    assert percentile([1, 2, 3, 4], 50) in (2, 3)
@@ -0,0 +1,60 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.core import checkpoint as checkpoint_module
+from app.core.checkpoint import JobCheckpoint
+from app.services.synthesis_service import SynthesisService
+from app.models.request_models import SynthesisRequest
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(checkpoint_module, "CHECKPOINT_SAVE_INTERVAL", 0)
+    return tmp_path
+
+def test_manifest_round_trip_and_reconcile(workdir):
+    cp = JobCheckpoint.create("job_1", "freeform", "out.json", {"topics": ["a", "b"]}, directory="checkpoints")
+    cp.record("a", 2, ["q1", "q2"])
+    cp.complete_topic("a", ["q1", "q2"])
+    with open("out.jsonl", "w") as f:
+        for seed in ["a", "a", "b"]:
+            f.write(json.dumps({"Seeds": seed}) + "\n")
+
+    loaded = JobCheckpoint.load("job_1", directory="checkpoints")
+    loaded.reconcile("Seeds")
+    assert loaded.topic_state("a") == {"rows": 2, "completed": True, "omit_questions": ["q1", "q2"]}
+    assert loaded.topic_state("b")["rows"] == 1
+    assert JobCheckpoint.load("missing", directory="checkpoints") is None
+
+@pytest.mark.asyncio
+async def test_resume_generates_only_missing_rows(workdir):
+    request = SynthesisRequest(
+        model_id="us.anthropic.claude-3-5-haiku-20241022-v1:0",
+        inference_type="aws_bedrock",
+        use_case="custom",
+        technique="freeform",
+        num_questions=3,
+        topics=["a", "b"],
+        is_demo=False,
+    )
+    cp = JobCheckpoint.create("job_2", "freeform", "freeform_out.json", request.model_dump(mode="json"))
+    cp.complete_topic("a")
+    with open("freeform_out.jsonl", "w") as f:
+        for i in range(3):
+            f.write(json.dumps({"Seeds": "a", "q": f"a{i}"}) + "\n")
+        f.write(json.dumps({"Seeds": "b", "q": "b0"}) + "\n")
+    cp.finish("failed")
+
+    service = SynthesisService()
+    handler = Mock()
+    handler.agenerate_response = AsyncMock(return_value=[{"q": "b1"}, {"q": "b2"}])
+
+    await service.process_single_freeform("a", handler, request, 3, output_writer=None, checkpoint=JobCheckpoint.load("job_2"))
+    assert handler.agenerate_response.await_count == 0
+
+    resumed = JobCheckpoint.load("job_2")
+    resumed.reconcile("Seeds")
+    _, results, _, output = await service.process_single_freeform("b", handler, request, 3, checkpoint=resumed)
+    assert len(results) == 2
+    assert handler.agenerate_response.await_count == 1
+    assert resumed.topic_state("b")["completed"]
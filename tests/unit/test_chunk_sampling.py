@@ -0,0 +1,70 @@
+import pytest
+from collections import Counter
+from unittest.mock import patch
+from app.core.chunk_store import StoredChunks
+from app.services.chunk_sampling import ChunkSampler, sample_document_chunks
+from app.services.doc_extraction import DocumentProcessor
+from app.services.doc_ingestion import iter_document_chunks
+
+def pick(count, strategy, seed, docs):
+    sampler = ChunkSampler(count, strategy, seed)
+    for doc, lengths in enumerate(docs):
+        for position, length in enumerate(lengths):
+            sampler.offer(doc, position, length, f"{doc}:{position}")
+    return [chunk for _, _, chunk in sampler.selected()]
+
+def test_uniform_sampling_covers_the_corpus_evenly_in_corpus_order():
+    counts = Counter()
+    for seed in range(400):
+        chunks = pick(5, "uniform", seed, [[10] * 30, [10] * 20])
+        assert len(chunks) == 5 and chunks == sorted(chunks, key=lambda c: tuple(map(int, c.split(":"))))
+        counts.update(chunks)
+    # Each of the 50 chunks is picked with probability 5/50, i.e. ~40 times in 400 draws
+    assert len(counts) == 50 and min(counts.values()) > 15 and max(counts.values()) < 70
+
+def test_weighted_sampling_prefers_long_chunks():
+    counts = Counter()
+    for seed in range(300):
+        counts.update(pick(1, "weighted", seed, [[1000, 10, 10, 10, 10, 10]]))
+    # Picked with probability 1000/1050
+    assert counts["0:0"] > 270
+
+def test_stratified_sampling_gives_every_document_a_proportional_share():
+    chunks = pick(10, "stratified", 0, [[1] * 10, [1] * 30, [1] * 60])
+    assert Counter(c.split(":")[0] for c in chunks) == {"0": 2, "1": 3, "2": 5}
+    assert len(pick(10, "stratified", 0, [[1] * 3, [1] * 4])) == 7
+    with pytest.raises(ValueError):
+        ChunkSampler(1, "random")
+
+@pytest.fixture
+def documents(tmp_path):
+    paths = []
+    for name, words in (("a.txt", "alpha"), ("b.txt", "beta")):
+        path = tmp_path / name
+        path.write_text("\n".join(f"{words} sentence number {i}." for i in range(400)), encoding="utf-8")
+        paths.append(str(path))
+    return paths
+
+async def sample(paths, processor, count, strategy):
+    return [chunk async for chunk in sample_document_chunks(paths, processor, count, strategy, seed=3)]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("strategy", ["uniform", "stratified", "weighted"])
+async def test_stored_documents_give_the_same_picks_without_reading_every_chunk(documents, strategy):
+    processor = DocumentProcessor(chunk_size=200, overlap=20)
+    every = [chunk async for chunk in iter_document_chunks(documents, processor)]
+    cold = await sample(documents, processor, 6, strategy)
+    assert len(cold) == 6 and all(chunk in every for chunk in cold)
+    assert any("alpha" in c for c in cold) and any("beta" in c for c in cold)
+
+    with patch("app.services.chunk_sampling.iter_indexed_document_chunks") as stream, \
+            patch.object(StoredChunks, "__getitem__", autospec=True, side_effect=StoredChunks.__getitem__) as read:
+        warm = await sample(documents, processor, 6, strategy)
+    stream.assert_not_called()
+    assert warm == cold and read.call_count == 6
+
+@pytest.mark.asyncio
+async def test_first_keeps_the_streaming_order(documents):
+    processor = DocumentProcessor(chunk_size=200, overlap=20)
+    every = [chunk async for chunk in iter_document_chunks(documents, processor)]
+    assert await sample(documents, processor, 3, "first") == every[:3]
@@ -0,0 +1,105 @@
+import os
+import random
+import time
+import fitz
+import pytest
+from unittest.mock import patch
+from app.core.chunk_store import ChunkStore, chunk_store
+from app.services.doc_extraction import DocumentProcessor
+from app.services.doc_ingestion import iter_document_chunks
+
+@pytest.fixture
+def pdf(tmp_path):
+    rng = random.Random(3)
+    path = tmp_path / "a.pdf"
+    doc = fitz.open()
+    for i in range(5):
+        doc.new_page().insert_text((50, 72), " ".join(rng.choice(["héllo", "world.", "ünï"]) for _ in range(30)) + f" page{i}.")
+    doc.save(path)
+    return str(path)
+
+async def collect(paths, processor):
+    with patch.dict("app.services.doc_ingestion.DOC_INGEST_CONFIG", {"workers": 0, "pdf_pages_per_task": 2}), \
+            patch.dict("app.core.config.CHUNK_STORE_CONFIG", {"read_batch_chunks": 2}):
+        return [chunk async for chunk in iter_document_chunks(paths, processor)]
+
+@pytest.mark.asyncio
+async def test_repeat_runs_read_chunks_from_the_store_instead_of_extracting(pdf):
+    processor = DocumentProcessor(chunk_size=100, overlap=10)
+    first = await collect([pdf], processor)
+    assert first and chunk_store.get(processor.store_key(pdf))[:] == first
+
+    with patch("app.services.doc_ingestion._pdf_pages_text") as extract, \
+            patch.object(DocumentProcessor, "_extract_pdf") as extract_whole:
+        assert await collect([pdf], processor) == first
+        assert processor.process_document(pdf) == first
+        assert processor.get_document_info(pdf)["chunk_count"] == len(first)
+    extract.assert_not_called()
+    extract_whole.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_settings_and_content_changes_miss_the_store(pdf, tmp_path):
+    processor = DocumentProcessor(chunk_size=100, overlap=10)
+    await collect([pdf], processor)
+    other = DocumentProcessor(chunk_size=120, overlap=10)
+    assert chunk_store.get(other.store_key(pdf)) is None
+    assert await collect([pdf], other) == other.process_document(pdf)
+
+    txt = tmp_path / "b.txt"
+    txt.write_text("first version " * 50, encoding="utf-8")
+    before = processor.process_document(str(txt))
+    txt.write_text("second version " * 50, encoding="utf-8")
+    assert processor.process_document(str(txt)) != before
+
+@pytest.mark.asyncio
+async def test_documents_closed_part_way_are_finished_in_the_background(tmp_path):
+    txt = tmp_path / "b.txt"
+    txt.write_text("word.\n" * 2000, encoding="utf-8")
+    later = tmp_path / "c.txt"
+    later.write_text("other.\n" * 200, encoding="utf-8")
+    processor = DocumentProcessor(chunk_size=100, overlap=10)
+    with patch.dict("app.services.doc_ingestion.DOC_INGEST_CONFIG", {"workers": 0, "txt_bytes_per_task": 1000, "prefetch_tasks": 2}):
+        chunks = iter_document_chunks([str(txt), str(later)], processor)
+        await chunks.__anext__()
+        await chunks.aclose()
+
+    deadline = time.monotonic() + 5
+    while chunk_store.get(processor.store_key(str(txt))) is None and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert chunk_store.get(processor.store_key(str(txt)))[:] == processor.process_document(str(txt))
+    # Documents not started yet are left alone
+    assert chunk_store.get(processor.store_key(str(later))) is None
+
+@pytest.mark.asyncio
+async def test_documents_closed_part_way_are_not_stored_when_finishing_is_off(tmp_path):
+    txt = tmp_path / "b.txt"
+    txt.write_text("word " * 2000, encoding="utf-8")
+    processor = DocumentProcessor(chunk_size=100, overlap=10)
+    with patch.dict("app.core.config.CHUNK_STORE_CONFIG", {"finish_on_close": False}):
+        chunks = iter_document_chunks([str(txt)], processor)
+        await chunks.__anext__()
+        await chunks.aclose()
+    assert chunk_store.get(processor.store_key(str(txt))) is None
+
+def test_stored_chunks_are_read_lazily_and_evicted_least_recently_used(tmp_path):
+    store = ChunkStore(str(tmp_path), max_bytes=10**9)
+    chunks = ["", "héllo wörld", "x" * 1000]
+    store.save("a", chunks)
+    stored = store.get("a")
+    assert len(stored) == 3 and stored[1] == "héllo wörld" and stored[-1] == "x" * 1000 and list(stored) == chunks
+    assert list(stored.batches(2)) == [chunks[:2], chunks[2:]]
+    store.save("empty", [])
+    assert len(store.get("empty")) == 0 and store.get("empty")[:] == []
+
+    size = sum(p.stat().st_size for p in tmp_path.glob("a.*"))
+    empty = sum(p.stat().st_size for p in tmp_path.glob("empty.*"))
+    store.max_bytes = 2 * size + empty
+    store.save("b", chunks)
+    # Written within one timestamp tick; age them explicitly so the order is unambiguous
+    for age, key in enumerate(("b", "empty", "a")):
+        os.utime(store.offsets_path(key), (1000 - age, 1000 - age))
+    store.get("a")
+    store.save("c", chunks)
+    assert store.get("b") is None
+    assert store.get("a") is not None and store.get("c") is not None
+    assert store.stats() == {"hits": 6, "misses": 1}
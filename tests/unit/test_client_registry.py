@@ -0,0 +1,35 @@
+import pytest
+import httpx
+from app.core.client_registry import client_registry
+from app.core.config import HTTP_POOL_CONFIG
+
+TIMEOUT = httpx.Timeout(5.0)
+
+def test_sync_client_is_shared_per_endpoint():
+    a = client_registry.get_openai_client("CAII", "token-a", "https://caii.example/v1", timeout=TIMEOUT)
+    b = client_registry.get_openai_client("CAII", "token-a", "https://caii.example/v1", timeout=TIMEOUT)
+    other = client_registry.get_openai_client("CAII", "token-a", "https://other.example/v1", timeout=TIMEOUT)
+    assert a is b
+    assert other is not a
+
+def test_rotated_token_replaces_client(monkeypatch):
+    old = client_registry.get_openai_client("openai_compatible", "old", "https://oc.example/v1", timeout=TIMEOUT)
+    new = client_registry.get_openai_client("openai_compatible", "new", "https://oc.example/v1", timeout=TIMEOUT)
+    assert new is not old
+    # Requests still in flight on the old client keep working
+    assert not old._client.is_closed
+    assert client_registry.get_openai_client("openai_compatible", "new", "https://oc.example/v1", timeout=TIMEOUT) is new
+
+    # The idle sweep closes it once it has not been handed out for the idle TTL
+    monkeypatch.setitem(HTTP_POOL_CONFIG, "client_idle_ttl", 0)
+    monkeypatch.setattr(client_registry, "_last_sweep", 0.0)
+    client_registry.get_openai_client("openai_compatible", "new", "https://oc.example/v1", timeout=TIMEOUT)
+    assert old._client.is_closed
+
+@pytest.mark.asyncio
+async def test_async_client_is_shared_on_loop():
+    a = await client_registry.get_async_openai_client("openai", "key", timeout=TIMEOUT)
+    b = await client_registry.get_async_openai_client("openai", "key", timeout=TIMEOUT)
+    assert a is b
+    await client_registry.aclose_all()
+    assert client_registry.stats() == {"sync_clients": 0, "async_clients": 0}
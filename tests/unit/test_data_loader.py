@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from app.core.data_loader import CSV_READ_OPTIONS, DataLoader, LoadedFrameCache, head_rows, reservoir_sample
+
+@pytest.fixture
+def cache():
+    cache = LoadedFrameCache(max_bytes=10 * 1024 * 1024)
+    with patch("app.core.data_loader.loaded_frame_cache", cache):
+        yield cache
+
+def write_csv(path, rows, encoding="utf-8"):
+    path.write_bytes(("name,amount\n" + "".join(f"{n},{a}\n" for n, a in rows)).encode(encoding))
+
+def test_repeated_loads_are_served_from_cache_until_the_file_changes(tmp_path, cache):
+    path = tmp_path / "data.csv"
+    write_csv(path, [("a", 1), ("b", 2)])
+
+    with patch("app.core.data_loader.pd.read_csv", wraps=pd.read_csv) as read_csv:
+        first = DataLoader.load(str(path), sample_rows=10)
+        first.loc[0, "name"] = "changed by caller"
+        second = DataLoader.load(str(path), sample_rows=10)
+        assert read_csv.call_count == 1
+        assert second["name"].tolist() == ["a", "b"]
+
+        write_csv(path, [("a", 1), ("b", 2), ("c", 3)])
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+        assert len(DataLoader.load(str(path), sample_rows=10)) == 3
+        assert read_csv.call_count == 2
+    assert cache.stats()["hits"] == 1
+
+def test_csv_options_that_worked_are_tried_first(tmp_path, cache):
+    path = tmp_path / "latin.csv"
+    write_csv(path, [("café", 1)], encoding="latin1")
+
+    with patch("app.core.data_loader.pd.read_csv", wraps=pd.read_csv) as read_csv:
+        assert DataLoader.load(str(path), sample_rows=10)["name"][0] == "café"
+        assert read_csv.call_count == 2  # utf-8 fails, latin1 works
+        read_csv.reset_mock()
+        DataLoader.load(str(path), sample_rows=5)
+        assert [c.kwargs for c in read_csv.call_args_list] == [CSV_READ_OPTIONS[1]]
+
+
+def test_rewritten_file_is_not_read_with_stale_options(tmp_path, cache):
+    path = tmp_path / "data.csv"
+    write_csv(path, [("café", 1)], encoding="latin1")
+    assert DataLoader.load(str(path), sample_rows=10)["name"][0] == "café"
+
+    # Rewritten as UTF-8: latin1 would decode it without error, but garbled
+    write_csv(path, [("café", 1), ("thé", 2)])
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+    assert DataLoader.load(str(path), sample_rows=10)["name"].tolist() == ["café", "thé"]
+
+def test_least_recently_used_frames_are_evicted(tmp_path):
+    frame = pd.DataFrame({"value": range(1000)})
+    size = int(frame.memory_usage(deep=True).sum())
+    cache = LoadedFrameCache(max_bytes=2 * size)
+    for name in ("a", "b"):
+        cache.put((name,), frame)
+    cache.get(("a",))
+    cache.put(("c",), frame)
+
+    assert cache.get(("b",)) is None
+    assert cache.get(("a",)) is not None and cache.get(("c",)) is not None
+    assert cache.stats()["bytes"] == 2 * size
+
+def test_failed_loads_are_not_cached(tmp_path, cache):
+    path = tmp_path / "data.json"
+    path.write_text("{not json")
+    assert "error_message" in DataLoader.load(str(path))
+    assert cache.stats()["entries"] == 0
+
+STREAMING = {"threshold_bytes": 0, "chunk_rows": 7}
+
+@pytest.mark.parametrize("ext", [".csv", ".tsv", ".jsonl", ".parquet"])
+def test_large_files_are_read_in_chunks_down_to_the_sample(tmp_path, cache, ext):
+    frame = pd.DataFrame({"id": range(100), "name": [f"row {i}" for i in range(100)]})
+    path = tmp_path / f"data{ext}"
+    if ext == ".csv":
+        frame.to_csv(path, index=False)
+    elif ext == ".tsv":
+        frame.to_csv(path, sep="\t", index=False)
+    elif ext == ".jsonl":
+        frame.to_json(path, orient="records", lines=True)
+    else:
+        frame.to_parquet(path, row_group_size=10)
+
+    with patch.dict("app.core.data_loader.DATA_LOADER_STREAM_CONFIG", STREAMING):
+        head = DataLoader.load(str(path), sample_rows=10, sampling="head")
+        sample = DataLoader.load(str(path), sample_rows=10)
+
+    assert head["id"].tolist() == list(range(10))
+    ids = sample["id"].tolist()
+    assert len(ids) == 10 and len(set(ids)) == 10 and ids == sorted(ids) and ids != list(range(10))
+    assert sample["name"].tolist() == [f"row {i}" for i in ids]
+
+def test_head_sampling_stops_reading_early(tmp_path, cache):
+    path = tmp_path / "data.csv"
+    write_csv(path, [(f"n{i}", i) for i in range(100)])
+    with patch.dict("app.core.data_loader.DATA_LOADER_STREAM_CONFIG", STREAMING), \
+            patch("app.core.data_loader.pd.read_csv", wraps=pd.read_csv) as read_csv:
+        DataLoader.load(str(path), sample_rows=5, sampling="head")
+    assert read_csv.call_args.kwargs["nrows"] == 5
+
+def test_reservoir_sample_is_uniform_and_bounded():
+    counts = np.zeros(50)
+    for seed in range(400):
+        chunks = (pd.DataFrame({"id": range(start, start + 10)}) for start in range(0, 50, 10))
+        sample = reservoir_sample(chunks, 5, seed=seed)
+        assert len(sample) == 5
+        counts[sample["id"]] += 1
+    # Every row is picked with probability 5/50, i.e. ~40 times in 400 draws
+    assert counts.min() > 15 and counts.max() < 70
+    assert head_rows(iter([]), 3).empty and reservoir_sample(iter([]), 3).empty
@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.dedup import EmbeddingDuplicateIndex, NearDuplicateIndex, create_dedup_index, item_text
+from app.services.work_scheduler import TopicWork
+from app.services.synthesis_legacy_service import SynthesisLegacyService
+from app.models.request_models import SynthesisRequest
+from tests.mocks.mock_db import MockDatabaseManager
+
+def test_index_rejects_near_duplicates_and_counts_them():
+    index = NearDuplicateIndex(threshold=0.8)
+    assert index.add_if_new("How do I reverse a linked list in Python?")
+    assert not index.add_if_new("how do I reverse a linked-list in python")
+    assert not index.add_if_new("How do I reverse a linked list in Python 3?")
+    assert index.add_if_new("Write a SQL query returning the top 5 customers by revenue.")
+    assert index.stats() == {
+        "backend": "minhash",
+        "checked": 4,
+        "unique": 2,
+        "duplicates": 2,
+        "exact_duplicates": 1,
+        "duplicate_rate": 0.5,
+    }
+    assert item_text({"instruction": "Sort a list", "count": 3}) == "Sort a list 3"
+
+def test_tabular_rows_differing_in_numbers_are_kept():
+    index = create_dedup_index({"enabled": True, "backend": "minhash"})
+    base = {"term": "36 months", "grade": "B", "home_ownership": "RENT", "purpose": "credit_card"}
+    assert index.add_if_new(item_text({**base, "loan_amnt": 12000, "annual_inc": 58000, "verified": True}))
+    assert index.add_if_new(item_text({**base, "loan_amnt": 30500, "annual_inc": 142000, "verified": False}))
+    assert not index.add_if_new(item_text({**base, "loan_amnt": 12000, "annual_inc": 58000, "verified": True}))
+
+def test_embedding_backend_falls_back_to_minhash_without_sentence_transformers():
+    with patch("app.core.dedup.SentenceTransformer", None):
+        assert create_dedup_index({"enabled": True, "backend": "embedding"}).backend == "minhash"
+    assert create_dedup_index({"enabled": False}) is None
+
+def test_topic_window_is_a_compact_hint():
+    state = TopicWork("t", 10, omit_window=2, hint_chars=10)
+    for question in ["first question", "second question", "third"]:
+        state.remember(question)
+    assert state.omit_questions == ["second que...", "third"]
+
+@pytest.mark.asyncio
+async def test_duplicates_across_topics_are_regenerated():
+    request = SynthesisRequest(
+        model_id="us.anthropic.claude-3-5-haiku-20241022-v1:0",
+        use_case="code_generation",
+        technique="sft",
+        topics=["lists", "strings"],
+        num_questions=2,
+        max_concurrent_topics=1,
+    )
+    responses = [
+        [{"question": "How do I reverse a list in Python?", "solution": "a[::-1]"},
+         {"question": "How do I sort a list in Python?", "solution": "sorted(a)"}],
+        # Second topic repeats a question from the first; it is dropped and regenerated
+        [{"question": "How do I reverse a list in Python?", "solution": "reversed(a)"},
+         {"question": "How do I split a string on commas?", "solution": "s.split(',')"}],
+        [{"question": "How do I upper-case a string?", "solution": "s.upper()"}],
+    ]
+    service = SynthesisLegacyService()
+    service.db = MockDatabaseManager()
+    handler = AsyncMock()
+    handler.agenerate_response.side_effect = responses
+    with patch("app.services.synthesis_legacy_service.create_handler", return_value=handler):
+        result = await service.generate_examples(request, is_demo=True)
+
+    questions = [pair["question"] for rows in result["results"].values() for pair in rows]
+    assert len(questions) == 4 and len(set(questions)) == 4
+    stats = service.db.generation_metadata[0]["dedup_stats"]
+    assert '"duplicates": 1' in stats
+
+
+class BagOfWordsModel:
+    """Stands in for a sentence-transformers model: normalized word-count vectors"""
+
+    def __init__(self, model_name):
+        self.vocabulary = {}
+
+    def encode(self, texts, normalize_embeddings=True):
+        vector = np.zeros(512, dtype=np.float32)
+        for word in texts[0].lower().split():
+            vector[self.vocabulary.setdefault(word, len(self.vocabulary))] += 1
+        return [vector / np.linalg.norm(vector)]
+
+def test_embedding_index_grows_past_its_first_block():
+    with patch("app.core.dedup.SentenceTransformer", BagOfWordsModel):
+        index = EmbeddingDuplicateIndex("bow", threshold=0.9)
+    assert not hasattr(index, "_signatures")
+    texts = [f"question number {i} about topic {i * 7}" for i in range(100)]
+    assert all(index.add_if_new(text) for text in texts)
+    assert not index.add_if_new("question number 5 about topic 35 ")
+    assert not index.add_if_new("question number 70 about topic 490 again")
+    assert len(index) == 100
+    assert index.stats()["duplicates"] == 2 and index.stats()["exact_duplicates"] == 1
@@ -0,0 +1,51 @@
+import random
+from app.core.telemetry_integration import estimate_token_count
+from app.services.doc_extraction import DocumentProcessor, TokenChunker
+from benchmarks import chunking_benchmark
+
+WORDS = ["alpha", "beta.", "gamma!", "héllo?", "\n", "\n\n", "\t", "ünï.", "x" * 30, "  ", "y" * 300]
+
+def chunk(pieces, chunk_tokens, overlap_tokens=0, count_tokens=None):
+    processor = DocumentProcessor(chunk_tokens=chunk_tokens, overlap_tokens=overlap_tokens,
+                                  **({"count_tokens": count_tokens} if count_tokens else {}))
+    return list(processor.iter_chunks(pieces))
+
+def test_token_chunks_fit_the_budget_and_do_not_depend_on_how_text_arrives():
+    rng = random.Random(0)
+    for _ in range(500):
+        text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 200)))
+        budget, overlap = rng.choice([3, 20, 60]), rng.choice([0, 5, 30])
+        whole = chunk([text], budget, overlap)
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, 15)))
+        assert chunk([text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])], budget, overlap) == whole
+        if budget >= 20:
+            assert all(0 < estimate_token_count(c) <= budget for c in whole)
+        if overlap == 0:
+            # Nothing lost or repeated
+            assert "".join(whole).replace(" ", "") == "".join(text.split())
+
+def test_chunks_end_at_sentences_prefer_paragraphs_and_overlap_in_tokens():
+    words = lambda n, w: " ".join([w] * n)
+    count = lambda text: len(text.split())
+    text = f"{words(4, 'a')}. {words(4, 'b')}.\n\n{words(4, 'c')}. {words(4, 'd')}. {words(4, 'e')}."
+    # 14 tokens fit a-c, but the paragraph ends after b in the second half of the budget
+    assert chunk([text], 14, count_tokens=count) == [f"{words(4, 'a')}. {words(4, 'b')}.", f"{words(4, 'c')}. {words(4, 'd')}. {words(4, 'e')}."]
+    assert chunk([text.replace("\n\n", " ")], 14, 4, count_tokens=count) == [
+        f"{words(4, 'a')}. {words(4, 'b')}. {words(4, 'c')}.",
+        f"{words(4, 'c')}. {words(4, 'd')}. {words(4, 'e')}.",
+    ]
+    # A sentence over the budget is split between words
+    assert chunk([words(10, "w") + "."], 4, count_tokens=count) == [words(4, "w"), words(4, "w"), words(2, "w") + "."]
+
+def test_token_mode_keeps_paragraphs_and_its_own_store_entries(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text("First paragraph line\nwrapped here.\n\nSecond paragraph.", encoding="utf-8")
+    chars = DocumentProcessor(chunk_size=1000, overlap=100)
+    tokens = DocumentProcessor(chunk_tokens=10, overlap_tokens=0)
+    assert tokens.process_document(str(path)) == ["First paragraph line wrapped here.", "Second paragraph."]
+    assert chars.process_document(str(path)) == ["First paragraph line wrapped here. Second paragraph."]
+    assert tokens.store_key(str(path)) != chars.store_key(str(path))
+    assert TokenChunker(8).close() == []
+
+def test_chunking_benchmark_runs():
+    assert chunking_benchmark.main(["--mb", "0.02", "0.04", "--repeat", "1", "--max-scaling", "100"]) == 0
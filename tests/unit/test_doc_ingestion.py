@@ -0,0 +1,137 @@
+import asyncio
+import random
+import fitz
+import pytest
+from unittest.mock import AsyncMock, patch
+import app.services.doc_ingestion as doc_ingestion
+from app.models.request_models import SynthesisRequest
+from app.services.doc_extraction import DocumentProcessor
+from app.services.doc_ingestion import iter_document_chunks
+from app.services.synthesis_service import SynthesisService
+from app.services.work_scheduler import TopicWork, feed_topics, run_work_items
+from tests.mocks.mock_db import MockDatabaseManager
+
+WORDS = ["alpha", "beta.", "gamma", "héllo", "\n", "\t", "ünï.", "x" * 30, "  "]
+
+def random_text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+@pytest.fixture
+def documents(tmp_path):
+    rng = random.Random(7)
+    pdf = tmp_path / "a.pdf"
+    doc = fitz.open()
+    for i in range(9):
+        doc.new_page().insert_text((50, 72), random_text(rng, 40)[:200] + f" page{i}.")
+    doc.save(pdf)
+    txt = tmp_path / "b.txt"
+    txt.write_text("\n".join(random_text(rng, rng.randint(0, 30)) for _ in range(300)), encoding="utf-8")
+    return [str(pdf), str(txt)]
+
+@pytest.fixture
+def fresh_pool():
+    yield
+    if doc_ingestion._pool is not None:
+        doc_ingestion._pool.shutdown()
+        doc_ingestion._pool = None
+
+async def collect(paths, processor, workers):
+    config = {"workers": workers, "pdf_pages_per_task": 2, "txt_bytes_per_task": 501, "prefetch_tasks": 3}
+    with patch.dict("app.services.doc_ingestion.DOC_INGEST_CONFIG", config):
+        return [chunk async for chunk in iter_document_chunks(paths, processor)]
+
+def test_streamed_chunks_match_whole_text_chunking():
+    rng = random.Random(1)
+    for _ in range(100):
+        processor = DocumentProcessor(chunk_size=rng.choice([40, 200]), overlap=rng.choice([0, 15]))
+        text = random_text(rng, rng.randint(0, 300))
+        cuts = sorted(rng.sample(range(len(text) + 1), min(len(text) + 1, 20)))
+        pieces = [text[a:b] for a, b in zip([0] + cuts, cuts + [len(text)])]
+        assert list(processor.iter_chunks(pieces)) == processor._chunk_text(processor._clean_text(text))
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [0, 2])
+async def test_parallel_ingestion_yields_the_same_chunks(documents, workers, fresh_pool):
+    processor = DocumentProcessor(chunk_size=300, overlap=30)
+    expected = [chunk for path in documents + documents[:1] for chunk in processor.process_document(path)]
+    assert await collect(documents + documents[:1], processor, workers) == expected
+
+@pytest.mark.asyncio
+async def test_unsupported_formats_fail_like_process_document(tmp_path):
+    path = tmp_path / "notes.md"
+    path.write_text("text")
+    with pytest.raises(Exception, match="Unsupported file format: .md"):
+        await collect([str(path)], DocumentProcessor(), 0)
+
+async def chunk_source(chunks, produced):
+    for chunk in chunks:
+        produced.append(chunk)
+        yield chunk
+
+@pytest.mark.asyncio
+async def test_feed_stops_reading_once_enough_topics_arrived_and_tops_up_when_short():
+    async def run(chunks, total):
+        produced, states, processed = [], [], []
+
+        async def process(item):
+            item.state.generated += item.size
+            processed.append((item.state.topic, item.size))
+
+        feed = feed_topics(chunk_source(chunks, produced), total, states, lambda topic, target: TopicWork(topic, target), 5)
+        await run_work_items([], process, 2, feed=feed)
+        return produced, states, processed
+
+    produced, states, processed = await run([f"c{i}" for i in range(10)], 3)
+    assert produced == ["c0", "c1", "c2"]
+    assert [(s.topic, s.generated) for s in states] == [("c0", 1), ("c1", 1), ("c2", 1)]
+
+    # 3 chunks for 8 rows: ceil(8 / 3) = 3 rows per chunk, as before
+    produced, states, processed = await run(["a", "b", "c"], 8)
+    assert [(s.topic, s.generated, s.target) for s in states] == [("a", 3, 3), ("b", 3, 3), ("c", 3, 3)]
+
+@pytest.mark.asyncio
+async def test_topic_done_waits_for_the_feed_to_end():
+    done = []
+    states = []
+    feed = feed_topics(chunk_source(["a"], []), 4, states, lambda topic, target: TopicWork(topic, target), 2)
+
+    async def process(item):
+        item.state.generated += item.size
+
+    await run_work_items([], process, 3, on_topic_done=lambda state: done.append((state.topic, state.generated)), feed=feed)
+    # "a" first finished with 1 row, but was topped up to 4 before it counted as done
+    assert done == [("a", 4)]
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("chunk_sampling", ["first", None])  # None: the SDS_CHUNK_SAMPLING default
+async def test_generation_starts_before_documents_are_parsed(chunk_sampling):
+    first_call = asyncio.Event()
+
+    async def slow_documents(paths, processor):
+        yield "chunk one"
+        # The rest of the "corpus" only parses once generation has begun
+        await asyncio.wait_for(first_call.wait(), timeout=5)
+        yield "chunk two"
+
+    async def respond(prompt, request_id=None):
+        first_call.set()
+        topic = "one" if "chunk one" in prompt else "two"
+        return [{"field": f"a row generated from chunk {topic} of the corpus"}]
+
+    request = SynthesisRequest(
+        model_id="us.anthropic.claude-3-5-haiku-20241022-v1:0",
+        num_questions=2,
+        doc_paths=["corpus.pdf"],
+        use_case="custom",
+        technique="freeform",
+        chunk_sampling=chunk_sampling,
+    )
+    service = SynthesisService()
+    service.db = MockDatabaseManager()
+    with patch("app.services.synthesis_service.create_handler") as create, \
+            patch("app.services.chunk_sampling.iter_document_chunks", slow_documents):
+        create.return_value.agenerate_response = AsyncMock(side_effect=respond)
+        result = await service.generate_freeform(request)
+
+    assert result["status"] == "completed"
+    assert set(result["results"]) == {"chunk one", "chunk two"}
@@ -0,0 +1,90 @@
+import time
+import pytest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, Mock, patch
+from app.core.endpoint_pool import EndpointPool, is_endpoint_failure
+from app.core.exceptions import ModelHandlerError
+from app.core.model_handlers import create_handler
+
+def test_least_outstanding_spreads_calls_across_replicas():
+    pool = EndpointPool(["http://a", "http://b", "http://c"], strategy="least_outstanding")
+    picked = [pool.acquire().url for _ in range(6)]
+    assert sorted(picked) == ["http://a", "http://a", "http://b", "http://b", "http://c", "http://c"]
+
+def test_latency_strategy_prefers_faster_replica():
+    pool = EndpointPool(["http://slow", "http://fast"], strategy="latency")
+    for url, latency in (("http://slow", 2.0), ("http://fast", 0.2)):
+        endpoint = next(e for e in pool.endpoints if e.url == url)
+        endpoint.outstanding += 1
+        pool.release(endpoint, latency=latency)
+    # The fast replica takes calls until its queue outweighs the latency gap
+    picked = [pool.acquire().url for _ in range(5)]
+    assert picked.count("http://fast") >= 4
+
+def test_failing_replica_is_ejected_and_readmitted_after_cooldown():
+    pool = EndpointPool(["http://a", "http://b"], eject_after=2, cooldown_seconds=0.05)
+    a = pool.endpoints[0]
+    for _ in range(2):
+        a.outstanding += 1
+        pool.release(a, error=ConnectionError("refused"))
+    assert {pool.acquire().url for _ in range(4)} == {"http://b"}
+    assert pool.snapshot()[0]["healthy"] is False
+
+    time.sleep(0.06)
+    for e in pool.endpoints:
+        e.outstanding = 0
+    assert pool.acquire().url == "http://a"
+    # Still failing after re-admission: ejected again on the next error
+    pool.release(a, error=ConnectionError("refused"))
+    assert pool.snapshot()[0]["healthy"] is False and a.ejections == 2
+
+def test_client_errors_do_not_count_against_a_replica():
+    pool = EndpointPool(["http://a", "http://b"], eject_after=1)
+    a = pool.acquire()
+    pool.release(a, error=SimpleNamespace(status_code=400))
+    assert a.consecutive_failures == 0 and a.available(time.monotonic())
+
+def test_only_transport_throttling_and_upstream_5xx_are_replica_failures():
+    assert is_endpoint_failure(ConnectionError("refused"))
+    assert is_endpoint_failure(SimpleNamespace(status_code=429))
+    assert is_endpoint_failure(SimpleNamespace(status_code=503))
+    assert not is_endpoint_failure(ModelHandlerError("OpenAI_Endpoint_Compatible_Key environment variable not set", 500))
+    assert not is_endpoint_failure(ValueError("Expecting value: line 1 column 1"))
+
+@pytest.mark.asyncio
+async def test_missing_configuration_never_reaches_the_pool(monkeypatch):
+    monkeypatch.delenv("OpenAI_Endpoint_Compatible_Key", raising=False)
+    handler = create_handler("m-unconfigured", bedrock_client=Mock(), inference_type="openai_compatible",
+                             caii_endpoint="http://a/v1", caii_endpoints=["http://b/v1"])
+    for _ in range(4):
+        with pytest.raises(ModelHandlerError):
+            await handler.agenerate_response("prompt")
+    assert all(e["healthy"] and e["total_calls"] == 0 for e in handler.endpoint_pool.snapshot())
+
+@pytest.mark.asyncio
+async def test_handler_fails_over_to_healthy_replica(monkeypatch):
+    monkeypatch.setenv("OpenAI_Endpoint_Compatible_Key", "test")
+    completion = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content='[{"question": "q?", "solution": "s"}]'))],
+        usage=SimpleNamespace(total_tokens=10),
+    )
+    clients = {}
+    for url, behaviour in (("http://down/v1", {"side_effect": ConnectionError("refused")}),
+                           ("http://up/v1", {"return_value": completion})):
+        client = Mock()
+        client.chat.completions.create = AsyncMock(**behaviour)
+        clients[url] = client
+
+    async def get_client(inference_type, api_key, base_url=None, timeout=None):
+        return clients[base_url]
+
+    handler = create_handler("m", bedrock_client=Mock(), inference_type="openai_compatible",
+                             caii_endpoint="http://down/v1", caii_endpoints=["http://up/v1"])
+    with patch("app.core.model_handlers.client_registry.get_async_openai_client", side_effect=get_client):
+        results = [await handler.agenerate_response(f"prompt {i}") for i in range(4)]
+
+    assert all(r == [{"question": "q?", "solution": "s"}] for r in results)
+    snapshot = {e["url"]: e for e in handler.endpoint_pool.snapshot()}
+    assert snapshot["http://up/v1"]["total_calls"] == 4
+    assert snapshot["http://down/v1"]["healthy"] is False
+    assert snapshot["http://down/v1"]["total_calls"] == 3
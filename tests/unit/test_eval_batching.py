@@ -0,0 +1,73 @@
+import re
+import pytest
+from unittest.mock import AsyncMock, Mock
+from app.models.request_models import EvaluationRequest, ModelParameters
+from app.services.eval_batching import plan_eval_batches, scores_by_index
+from app.services.evaluator_service import EvaluatorService
+from app.services.evaluator_legacy_service import EvaluatorLegacyService
+
+MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+
+def scoring_handler(skip=()):
+    """Scores every [index N] item of a batched prompt with N, leaving out the rows in ``skip``"""
+    prompts = []
+
+    async def respond(prompt, request_id=None):
+        prompts.append(prompt)
+        indexes = [int(i) for i in re.findall(r"\[index (\d+)\]", prompt)]
+        if not indexes:
+            return [{"score": 9, "justification": "single"}]
+        values = re.findall(r"value(\d+)", prompt)
+        return [
+            {"index": i, "score": int(values[i]), "justification": "batched"}
+            for i in indexes if int(values[i]) not in skip
+        ]
+
+    handler = Mock()
+    handler.agenerate_response = AsyncMock(side_effect=respond)
+    return handler, prompts
+
+def test_plan_respects_row_cap_output_budget_and_context():
+    texts = ["x" * 400] * 10
+    request = EvaluationRequest(model_id=MODEL_ID, use_case="custom", eval_batch_size=4)
+    assert [len(b) for b in plan_eval_batches(texts, "", request)] == [4, 4, 2]
+
+    # 1000 output tokens only hold 4 answers at 250 tokens each
+    request = EvaluationRequest(model_id=MODEL_ID, use_case="custom", eval_batch_size=10,
+                                model_params=ModelParameters(max_tokens=1000))
+    assert [len(b) for b in plan_eval_batches(texts, "", request)] == [4, 4, 2]
+
+    # A 32k-token context minus a 30k-token prompt leaves room for 5 rows of ~351 tokens
+    request = EvaluationRequest(model_id=MODEL_ID, use_case="custom", eval_batch_size=10)
+    assert [len(b) for b in plan_eval_batches(texts, "y" * 120000, request)] == [5, 5]
+
+def test_scores_by_index_ignores_unusable_entries():
+    response = [{"index": "1", "score": 3}, {"index": 7, "score": 1}, {"score": 2}, {"index": 0}, "x", {"index": 1, "score": 5}]
+    assert scores_by_index(response, 2) == {1: {"index": "1", "score": 3}}
+
+@pytest.mark.asyncio
+async def test_evaluate_rows_batches_and_requeues_missing_rows():
+    rows = [{"field": f"value{i}"} for i in range(5)]
+    handler, prompts = scoring_handler(skip={3})
+    request = EvaluationRequest(model_id=MODEL_ID, use_case="custom", eval_batch_size=5)
+
+    result = await EvaluatorService().evaluate_rows(rows, handler, request)
+
+    scores = [r["evaluation"]["score"] for r in result["evaluated_rows"]]
+    assert scores == [0, 1, 2, 9, 4]
+    assert [r["row"] for r in result["evaluated_rows"]] == rows
+    # One batched prompt, then row 3 on its own
+    assert len(prompts) == 2 and "[index 4]" in prompts[0] and "[index" not in prompts[1]
+
+@pytest.mark.asyncio
+async def test_evaluate_topic_batches_qa_pairs():
+    pairs = [{"Prompt": f"question {i}", "Completion": f"value{i}"} for i in range(4)]
+    pairs.append({"Prompt": "no completion"})
+    handler, prompts = scoring_handler()
+    request = EvaluationRequest(model_id=MODEL_ID, use_case="custom", eval_batch_size=2)
+
+    stats = await EvaluatorLegacyService().evaluate_topic("t", pairs, handler, request)
+
+    assert [p["evaluation"]["score"] for p in stats["evaluated_pairs"]] == [0, 1, 2, 3, 0]
+    assert stats["evaluated_pairs"][4]["evaluation"]["justification"] == "Missing required keys in qa_pair"
+    assert len(prompts) == 2
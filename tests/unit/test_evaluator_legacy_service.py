@@ -1,6 +1,6 @@
 import pytest
 from io import StringIO
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock
 import json
 from app.services.evaluator_legacy_service import EvaluatorLegacyService
 from app.models.request_models import EvaluationRequest
@@ -24,7 +24,8 @@ def evaluator_service():
     service.db = MockDatabaseManager()
     return service
 
-def test_evaluate_results(evaluator_service, mock_qa_file):
+@pytest.mark.asyncio
+async def test_evaluate_results(evaluator_service, mock_qa_file):
     request = EvaluationRequest(
         model_id="us.anthropic.claude-3-5-haiku-20241022-v1:0",
         use_case="custom",
@@ -34,16 +35,17 @@ def test_evaluate_results(evaluator_service, mock_qa_file):
         output_value="Completion"
     )
     with patch('app.services.evaluator_legacy_service.create_handler') as mock_handler:
-        mock_handler.return_value.generate_response.return_value = [{"score": 4, "justification": "Good answer"}]
-        result = evaluator_service.evaluate_results(request)
+        mock_handler.return_value.agenerate_response = AsyncMock(return_value=[{"score": 4, "justification": "Good answer"}])
+        result = await evaluator_service.evaluate_results(request)
         assert result["status"] == "completed"
         assert "output_path" in result
         assert len(evaluator_service.db.evaluation_metadata) == 1
 
-def test_evaluate_single_pair():
+@pytest.mark.asyncio
+async def test_evaluate_single_pair():
     with patch('app.services.evaluator_legacy_service.create_handler') as mock_handler:
         mock_response = [{"score": 4, "justification": "Good explanation"}]
-        mock_handler.return_value.generate_response.return_value = mock_response
+        mock_handler.return_value.agenerate_response = AsyncMock(return_value=mock_response)
         service = EvaluatorLegacyService()
         qa_pair = {"Prompt": "What is Python?", "Completion": "Python is a programming language"}
         request = EvaluationRequest(
@@ -54,14 +56,15 @@ def test_evaluate_single_pair():
             output_key="Prompt",
             output_value="Completion"
         )
-        result = service.evaluate_single_pair(qa_pair, mock_handler.return_value, request)
+        result = await service.evaluate_single_pair(qa_pair, mock_handler.return_value, request)
         assert result["evaluation"]["score"] == 4
         assert "justification" in result["evaluation"]
 
-def test_evaluate_results_with_error():
+@pytest.mark.asyncio
+async def test_evaluate_results_with_error():
     fake_json = '[{"Seeds": "python_basics", "Prompt": "What is Python?", "Completion": "Python is a programming language"}]'
     class DummyHandler:
-        def generate_response(self, prompt, **kwargs):  # Accept any keyword arguments
+        async def agenerate_response(self, prompt, **kwargs):  # Accept any keyword arguments
             raise ModelHandlerError("Test error")
     with patch('app.services.evaluator_legacy_service.os.path.exists', return_value=True), \
          patch('builtins.open', new=lambda f, mode, *args, **kwargs: StringIO(fake_json)), \
@@ -80,4 +83,4 @@ def test_evaluate_results_with_error():
             display_name="dummy"
         )
         with pytest.raises(APIError, match="Test error"):
-            service.evaluate_results(request)
+            await service.evaluate_results(request)
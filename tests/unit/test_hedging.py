@@ -0,0 +1,130 @@
+import asyncio
+import pytest
+from unittest.mock import Mock
+from app.core.exceptions import ModelHandlerError
+from app.core.hedging import HedgePolicy, HedgedModelHandler, hedged_handler_for
+from app.models.request_models import EvaluationRequest
+
+FAST = {"min_samples": 4, "window": 50, "percentile": 95, "max_hedge_ratio": 0.5, "max_burst": 10}
+
+class FakeHandler:
+    """Replays one delay (and optional error) per call"""
+
+    def __init__(self, delays, errors=None):
+        self.model_id = "m"
+        self.inference_type = "openai"
+        self.delays = list(delays)
+        self.errors = list(errors or [None] * len(delays))
+        self.calls = 0
+        self.cancelled = 0
+
+    def _response_cache_key(self, prompt):
+        return None
+
+    async def _adispatch_request(self, prompt, retry_with_reduced_tokens):
+        index = self.calls
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delays[index])
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.errors[index]:
+            raise self.errors[index]
+        return [{"score": 5, "justification": f"call {index}"}]
+
+def warmed_policy(latency=0.01, config=FAST, samples=None):
+    policy = HedgePolicy("openai", "m", config)
+    for _ in range(samples or config["min_samples"]):
+        policy.start_call()
+        policy.record(latency)
+    return policy
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged_and_first_response_wins():
+    handler = FakeHandler([1.0, 0.01])
+    hedged = HedgedModelHandler(handler, policy=warmed_policy())
+
+    response = await hedged.agenerate_response("p")
+
+    assert response[0]["justification"] == "call 1"
+    await asyncio.sleep(0)
+    assert handler.calls == 2 and handler.cancelled == 1
+    stats = hedged.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+@pytest.mark.asyncio
+async def test_no_hedging_until_enough_latencies_are_observed():
+    handler = FakeHandler([0.05])
+    hedged = HedgedModelHandler(handler, policy=HedgePolicy("openai", "m", FAST))
+    await hedged.agenerate_response("p")
+    assert handler.calls == 1
+
+@pytest.mark.asyncio
+async def test_budget_caps_hedged_share_of_calls():
+    config = {**FAST, "window": 500, "max_hedge_ratio": 0.25, "max_burst": 1}
+    handler = FakeHandler([0.05] * 16)
+    # Enough fast history that the slow calls below stay above p95
+    policy = warmed_policy(config=config, samples=200)
+    hedged = HedgedModelHandler(handler, policy=policy)
+
+    for _ in range(8):
+        await hedged.agenerate_response("p")
+
+    # Every call is slow, but only the saved-up hedge plus 25% of 8 calls are duplicated
+    assert policy.hedged == 2
+    assert handler.calls == 8 + 2
+
+@pytest.mark.asyncio
+async def test_failed_call_waits_for_the_other_one():
+    handler = FakeHandler([0.03, 0.05], errors=[ModelHandlerError("boom", 500), None])
+    hedged = HedgedModelHandler(handler, policy=warmed_policy())
+    response = await hedged.agenerate_response("p")
+    assert response[0]["justification"] == "call 1"
+
+    handler = FakeHandler([0.03, 0.04], errors=[ModelHandlerError("boom", 500), ModelHandlerError("again", 500)])
+    hedged = HedgedModelHandler(handler, policy=warmed_policy())
+    with pytest.raises(ModelHandlerError, match="boom"):
+        await hedged.agenerate_response("p")
+
+def test_hedging_is_opt_in_and_skips_bulk_handlers():
+    handler = Mock(spec=["model_id", "inference_type", "_adispatch_request", "_response_cache_key", "_calls_in_thread"])
+    handler._calls_in_thread.return_value = False
+    request = EvaluationRequest(model_id="m", use_case="custom")
+    assert hedged_handler_for(request, handler) is handler
+    request = EvaluationRequest(model_id="m", use_case="custom", hedge=True)
+    assert isinstance(hedged_handler_for(request, handler), HedgedModelHandler)
+    bulk = Mock(spec=["model_id", "inference_type", "agenerate_response"])
+    assert hedged_handler_for(request, bulk) is bulk
+
+def test_bedrock_thread_fallback_is_not_hedged():
+    handler = Mock(spec=["model_id", "inference_type", "_adispatch_request", "_response_cache_key", "_calls_in_thread"])
+    handler._calls_in_thread.return_value = True
+    request = EvaluationRequest(model_id="m", use_case="custom", hedge=True)
+    assert hedged_handler_for(request, handler) is handler
+
+@pytest.mark.asyncio
+async def test_unparsed_output_is_not_cached(tmp_path, monkeypatch):
+    from app.core import hedging
+    from app.core.json_stream import UnparsedOutput
+    from app.core.model_handlers import UnifiedModelHandler
+    from app.core.response_cache import ResponseCache
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(hedging, "response_cache", cache)
+
+    class UnparsedHandler(FakeHandler):
+        _cacheable = staticmethod(UnifiedModelHandler._cacheable)
+
+        def _response_cache_key(self, prompt):
+            return "key"
+
+        async def _adispatch_request(self, prompt, retry_with_reduced_tokens):
+            self.calls += 1
+            return UnparsedOutput([{"text": "no json here"}])
+
+    handler = UnparsedHandler([])
+    hedged = HedgedModelHandler(handler, policy=HedgePolicy("openai", "m", FAST))
+    assert isinstance(await hedged.agenerate_response("p"), UnparsedOutput)
+    assert await cache.aget("key") is None
+    await hedged.agenerate_response("p")
+    assert handler.calls == 2
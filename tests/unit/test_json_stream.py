@@ -0,0 +1,67 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.json_stream import IncrementalJsonArrayParser, salvage_json_array
+from app.core.model_handlers import UnifiedModelHandler
+from app.services.synthesis_service import SynthesisService
+from app.models.request_models import SynthesisRequest
+from tests.mocks.mock_db import MockDatabaseManager
+
+BROKEN = (
+    'Here are the rows:\n```json\n[\n'
+    '  {"question": "What is [1] {x}?", "solution": "a \\"quoted\\" }"},\n'
+    '  {"question": "missing comma" "solution": "b"},\n'
+    '  {"question": "trailing comma", "solution": "c",},\n'
+    '  {"question": "truncated", "solu'
+)
+
+def test_salvages_well_formed_elements_in_one_pass():
+    rows = salvage_json_array(BROKEN)
+    assert [r["question"] for r in rows] == ["What is [1] {x}?", "trailing comma"]
+    assert rows[0]["solution"] == 'a "quoted" }'
+    assert (rows.salvaged, rows.dropped) == (2, 2)
+
+    assert salvage_json_array('The [5] items: [{"a": 1}]') == [{"a": 1}]
+    assert salvage_json_array('{"a": 1}\n{"a": 2}') == [{"a": 1}, {"a": 2}]
+    assert salvage_json_array("[{'a': 'single', 'b': None}]") == [{"a": "single", "b": None}]
+
+def test_incremental_feed_matches_single_pass():
+    parser = IncrementalJsonArrayParser()
+    emitted = []
+    for i in range(0, len(BROKEN), 7):
+        emitted.extend(parser.feed(BROKEN[i:i + 7]))
+    rows = parser.close()
+    assert emitted == list(rows) == list(salvage_json_array(BROKEN))
+    assert rows.dropped == 2
+
+def test_handler_reports_salvaged_and_dropped():
+    handler = UnifiedModelHandler("test.model")
+    rows = handler._extract_json_from_text(BROKEN)
+    assert len(rows) == 2 and rows.dropped == 2
+    # Nothing recoverable: an empty result flagged as dropped, not the raw text as a row
+    rows = handler._extract_json_from_text('[{"question": "a" "solution": "b"}]')
+    assert rows == [] and rows.dropped == 1
+    assert handler._extract_json_from_text("no json here") == [{"text": "no json here"}]
+
+@pytest.mark.asyncio
+async def test_fallback_only_requests_lost_rows():
+    request = SynthesisRequest(
+        model_id="us.anthropic.claude-3-5-haiku-20241022-v1:0",
+        use_case="custom",
+        technique="freeform",
+        topics=["t"],
+        num_questions=5,
+    )
+    handler = UnifiedModelHandler("us.anthropic.claude-3-5-haiku-20241022-v1:0")
+    batch = handler._extract_json_from_text(
+        '[' + ', '.join(f'{{"question": "Batch question number {i}", "answer": "{i}"}}' for i in range(4))
+        + ', {"question": "broken" "answer": 5}]'
+    )
+    service = SynthesisService()
+    service.db = MockDatabaseManager()
+    model = AsyncMock()
+    model.agenerate_response.side_effect = [batch, [{"question": "Replacement question", "answer": "r"}]]
+    with patch("app.services.synthesis_service.create_handler", return_value=model):
+        result = await service.generate_freeform(request, is_demo=True)
+
+    assert len(result["results"]["t"]) == 5
+    assert model.agenerate_response.await_count == 2
@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import Mock, AsyncMock, patch
 from app.core.model_handlers import UnifiedModelHandler, create_handler
 from app.models.request_models import ModelParameters
 from app.core.exceptions import InvalidModelError
@@ -26,3 +26,109 @@ def test_invalid_model_error():
     handler = UnifiedModelHandler("invalid.model", bedrock_client=mock_bedrock_client)
     with pytest.raises(InvalidModelError):
         handler.generate_response("test", request_id="test_id")
+
+@pytest.mark.asyncio
+async def test_agenerate_response_bedrock():
+    async_client = Mock()
+    async_client.converse = AsyncMock(return_value={
+        "output": {"message": {"content": [{"text": '[{"question": "q?", "solution": "s!"}]'}]}}
+    })
+    handler = UnifiedModelHandler("us.anthropic.claude-3-5-haiku-20241022-v1:0", bedrock_client=Mock())
+    handler._async_bedrock_client = async_client
+    parsed = await handler.agenerate_response("test", request_id="test_id")
+    assert parsed == [{"question": "q?", "solution": "s!"}]
+    assert async_client.converse.await_args.kwargs["additionalModelRequestFields"] == {"top_k": 150}
+
+@pytest.mark.asyncio
+async def test_agenerate_response_invalid_model():
+    error_response = {'Error': {'Code': 'ValidationException', 'Message': 'model identifier is invalid'}}
+    async_client = Mock()
+    async_client.converse = AsyncMock(side_effect=ClientError(error_response, 'Converse'))
+    handler = UnifiedModelHandler("invalid.model", bedrock_client=Mock())
+    handler._async_bedrock_client = async_client
+    with pytest.raises(InvalidModelError):
+        await handler.agenerate_response("test", request_id="test_id")
+
+@pytest.mark.asyncio
+async def test_agenerate_response_uses_response_cache(tmp_path, monkeypatch):
+    from app.core import model_handlers
+    from app.core.response_cache import ResponseCache
+    monkeypatch.setitem(model_handlers.RESPONSE_CACHE_CONFIG, "enabled", True)
+    monkeypatch.setattr(model_handlers, "response_cache", ResponseCache(str(tmp_path / "cache.db")))
+
+    async_client = Mock()
+    async_client.converse = AsyncMock(return_value={
+        "output": {"message": {"content": [{"text": '[{"question": "q?", "solution": "s!"}]'}]}}
+    })
+    handler = UnifiedModelHandler("us.anthropic.claude-3-5-haiku-20241022-v1:0", bedrock_client=Mock())
+    handler._async_bedrock_client = async_client
+    first = await handler.agenerate_response("test")
+    second = await handler.agenerate_response("test")
+    assert first == second
+    assert async_client.converse.await_count == 1
+
+    # Sampled calls bypass the cache unless the caller opts in
+    handler.model_params = ModelParameters(temperature=0.7)
+    await handler.agenerate_response("test")
+    assert async_client.converse.await_count == 2
+
+@pytest.mark.asyncio
+async def test_agenerate_response_bedrock_thread_fallback_reports_throttles(monkeypatch):
+    from app.core import model_handlers
+    from app.core.adaptive_concurrency import AdaptiveConcurrencyLimiter
+    monkeypatch.setattr(model_handlers, "get_aio_session", None)
+    throttle = ClientError({"Error": {"Code": "ThrottlingException", "Message": "slow down"}}, "Converse")
+    client = Mock()
+    client.converse.side_effect = [throttle, {
+        "output": {"message": {"content": [{"text": '[{"question": "q?", "solution": "s!"}]'}]}}
+    }]
+    handler = UnifiedModelHandler("us.anthropic.claude-3-5-haiku-20241022-v1:0", bedrock_client=client)
+    handler.limiter = AdaptiveConcurrencyLimiter("aws_bedrock", handler.model_id)
+    handler.BASE_DELAY = 0
+    parsed = await handler.agenerate_response("test")
+    assert parsed == [{"question": "q?", "solution": "s!"}]
+    # One limiter call per attempt, and the throttle reached the limiter
+    assert handler.limiter.total_calls == 2
+    assert handler.limiter.total_throttles == 1
+
+@pytest.mark.asyncio
+async def test_pooled_calls_are_charged_to_the_serving_replica(monkeypatch):
+    from types import SimpleNamespace
+    from app.core import model_handlers
+    monkeypatch.setenv("OpenAI_Endpoint_Compatible_Key", "key")
+    accounts = []
+
+    async def acquire(inference_type, account, model_id, estimate):
+        accounts.append(account)
+        return Mock(__enter__=Mock(), __exit__=Mock(return_value=False))
+
+    completion = SimpleNamespace(usage=None, choices=[SimpleNamespace(message=SimpleNamespace(content="ok"))])
+    client = Mock()
+    client.chat.completions.create = AsyncMock(return_value=completion)
+    monkeypatch.setattr(model_handlers.rate_limiter, "acquire", acquire)
+    monkeypatch.setattr(model_handlers.client_registry, "get_async_openai_client", AsyncMock(return_value=client))
+    handler = UnifiedModelHandler("m", inference_type="openai_compatible", custom_p=True,
+                                  caii_endpoint="http://replica-1/v1", caii_endpoints=["http://replica-2/v1"])
+    for _ in range(4):
+        await handler.agenerate_response("test")
+    served = [c.kwargs["base_url"] for c in model_handlers.client_registry.get_async_openai_client.await_args_list]
+    assert accounts == served
+
+@pytest.mark.asyncio
+async def test_unparseable_output_is_not_cached(tmp_path, monkeypatch):
+    from app.core import model_handlers
+    from app.core.response_cache import ResponseCache
+    monkeypatch.setitem(model_handlers.RESPONSE_CACHE_CONFIG, "enabled", True)
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    monkeypatch.setattr(model_handlers, "response_cache", cache)
+
+    async_client = Mock()
+    async_client.converse = AsyncMock(return_value={
+        "output": {"message": {"content": [{"text": "Sorry, I can't help with that."}]}}
+    })
+    handler = UnifiedModelHandler("us.anthropic.claude-3-5-haiku-20241022-v1:0", bedrock_client=Mock())
+    handler._async_bedrock_client = async_client
+    assert await handler.agenerate_response("test") == [{"text": "Sorry, I can't help with that."}]
+    await handler.agenerate_response("test")
+    assert async_client.converse.await_count == 2
+    assert cache.stats()["memory_entries"] == 0
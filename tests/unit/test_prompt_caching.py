@@ -0,0 +1,82 @@
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+from botocore.exceptions import ClientError
+from app.core.model_handlers import UnifiedModelHandler
+from app.core import prompt_caching
+from app.core.prompt_caching import CacheablePrompt, PromptCacheStats, record_openai_usage, split_prompt
+from app.core.prompt_templates import PromptBuilder
+
+MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+RESPONSE = {"output": {"message": {"content": [{"text": '[{"question": "q?", "solution": "s!"}]'}]}}}
+
+def freeform_prompt(topic, omit=()):
+    return PromptBuilder.build_freeform_prompt(MODEL_ID, "lending_data", topic, 5, list(omit), None, None, None, None)
+
+def test_prompts_share_their_prefix_across_topics():
+    first, second = freeform_prompt("Auto loans"), freeform_prompt("Mortgages", omit=["row a"])
+    assert isinstance(first, CacheablePrompt)
+    assert split_prompt(first)[0] == split_prompt(second)[0]
+    assert "Auto loans" in split_prompt(first)[1] and "Auto loans" not in split_prompt(first)[0]
+    assert "row a" in split_prompt(second)[1]
+    # Still a plain string for everyone else
+    assert str(first) == split_prompt(first)[0] + split_prompt(first)[1]
+    assert split_prompt(first + "x") == ("", str(first) + "x")
+
+def test_bedrock_call_carries_cache_point_and_records_cache_tokens():
+    client = Mock()
+    client.converse.return_value = {**RESPONSE, "usage": {"inputTokens": 40, "cacheReadInputTokens": 1600, "cacheWriteInputTokens": 0}}
+    handler = UnifiedModelHandler(MODEL_ID, bedrock_client=client)
+    stats = PromptCacheStats()
+
+    with patch("app.core.prompt_caching.prompt_cache_stats", stats):
+        handler.generate_response(freeform_prompt("Auto loans"))
+
+    content = client.converse.call_args.kwargs["messages"][0]["content"]
+    assert content[1] == {"cachePoint": {"type": "default"}}
+    assert "Auto loans" in content[2]["text"]
+    [snapshot] = stats.snapshots()
+    assert snapshot["cache_read_tokens"] == 1600 and snapshot["input_tokens"] == 1640 and snapshot["cache_hits"] == 1
+
+def test_no_cache_point_for_short_prefixes_or_unlisted_models():
+    client = Mock()
+    client.converse.return_value = RESPONSE
+    UnifiedModelHandler(MODEL_ID, bedrock_client=client).generate_response("plain prompt")
+    assert client.converse.call_args.kwargs["messages"][0]["content"] == [{"text": "plain prompt"}]
+
+    UnifiedModelHandler("us.anthropic.claude-3-haiku-20240307-v1:0", bedrock_client=client).generate_response(freeform_prompt("x"))
+    assert len(client.converse.call_args.kwargs["messages"][0]["content"]) == 1
+
+def test_rejected_cache_point_falls_back_to_plain_prompt():
+    model_id = "us.amazon.nova-lite-v1:0"
+    error = ClientError({"Error": {"Code": "ValidationException", "Message": "Prompt caching is not supported"}}, "Converse")
+    client = Mock()
+    client.converse.side_effect = [error, RESPONSE]
+    handler = UnifiedModelHandler(model_id, bedrock_client=client)
+    handler.BASE_DELAY = 0
+
+    assert handler.generate_response(freeform_prompt("x")) == [{"question": "q?", "solution": "s!"}]
+    first, second = (c.kwargs["messages"][0]["content"] for c in client.converse.call_args_list)
+    assert len(first) == 3 and len(second) == 1
+
+def test_unrelated_validation_error_keeps_cache_points():
+    error = ClientError({"Error": {"Code": "ValidationException", "Message": "Input is too long; cached tokens count too"}}, "Converse")
+    client = Mock()
+    client.converse.side_effect = [error, RESPONSE]
+    handler = UnifiedModelHandler(MODEL_ID, bedrock_client=client)
+    handler.BASE_DELAY = 0
+
+    handler.generate_response(freeform_prompt("x"))
+    assert MODEL_ID not in prompt_caching._bedrock_unsupported
+    # Retried with a smaller completion budget, still with the cache point
+    second = client.converse.call_args_list[1].kwargs
+    assert len(second["messages"][0]["content"]) == 3 and second["inferenceConfig"]["maxTokens"] <= 4096
+
+def test_openai_cached_tokens_are_recorded():
+    stats = PromptCacheStats()
+    usage = SimpleNamespace(prompt_tokens=2000, prompt_tokens_details=SimpleNamespace(cached_tokens=1792))
+    with patch("app.core.prompt_caching.prompt_cache_stats", stats):
+        record_openai_usage("openai", "gpt-4o", usage)
+        record_openai_usage("openai", "gpt-4o", SimpleNamespace(prompt_tokens=2000, prompt_tokens_details=None))
+    [snapshot] = stats.snapshots()
+    assert snapshot["cache_hits"] == 1 and snapshot["cache_misses"] == 1
+    assert snapshot["cached_input_ratio"] == 0.448
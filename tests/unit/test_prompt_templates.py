@@ -0,0 +1,50 @@
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.core.data_loader import DataLoader
+from app.core.prompt_caching import CacheablePrompt
+from app.core.prompt_templates import PromptBuilder
+from app.models.request_models import SynthesisRequest
+from app.services.synthesis_service import SynthesisService
+from tests.mocks.mock_db import MockDatabaseManager
+
+MODELS = ["us.anthropic.claude-3-5-haiku-20241022-v1:0", "us.meta.llama3-1-70b-instruct-v1:0", "mistral.mistral-large", "qwen.qwen3-32b"]
+
+@pytest.mark.parametrize("model_id", MODELS)
+def test_compiled_templates_match_the_prompt_builders(model_id):
+    template = PromptBuilder.compile_freeform_prompt(model_id, "lending_data", None, None)
+    for topic, omit in (("Auto loans", []), ("Mortgages", ["row a", "row b"])):
+        prompt = template.build(topic, 5, omit)
+        assert isinstance(prompt, CacheablePrompt)
+        expected = PromptBuilder.build_freeform_prompt(model_id, "lending_data", topic, 5, omit, None, None, None, None)
+        assert prompt == expected and prompt.prefix_len == expected.prefix_len
+
+    template = PromptBuilder.compile_prompt(model_id, "text2sql", [], schema=None, custom_prompt=None)
+    expected = PromptBuilder.build_prompt(model_id, "text2sql", "Joins", 3, ["q"], [], schema=None, custom_prompt=None)
+    assert template.build("Joins", 3, ["q"]) == expected
+
+@pytest.mark.asyncio
+async def test_example_file_is_read_once_for_all_prompts_of_a_job(tmp_path):
+    example_path = tmp_path / "examples.json"
+    example_path.write_text(json.dumps([{"name": "example", "amount": 1}]))
+    request = SynthesisRequest(
+        model_id=MODELS[0],
+        num_questions=2,
+        topics=["a", "b", "c"],
+        use_case="custom",
+        technique="freeform",
+        example_path=str(example_path),
+    )
+    service = SynthesisService()
+    service.db = MockDatabaseManager()
+
+    with patch("app.services.synthesis_service.create_handler") as create, \
+            patch.object(DataLoader, "load", wraps=DataLoader.load) as load:
+        create.return_value.agenerate_response = AsyncMock(return_value=[{"name": "x", "amount": 2}])
+        result = await service.generate_freeform(request)
+
+    assert result["status"] == "completed"
+    # Once for every prompt of the job, once more for the job's metadata record
+    assert load.call_count == 2
+    prompts = [c.args[0] for c in create.return_value.agenerate_response.call_args_list]
+    assert len(prompts) >= 3 and all('"name": "example"' in p for p in prompts)
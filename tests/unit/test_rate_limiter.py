@@ -0,0 +1,56 @@
+import time
+import pytest
+from app.core import rate_limiter as rate_limiter_module
+from app.core.rate_limiter import TokenBucket, estimate_tokens, rate_limiter
+
+@pytest.fixture
+def budgets(monkeypatch):
+    monkeypatch.setitem(rate_limiter_module.MODEL_RATE_LIMITS, "test-model", {"rpm": 600, "tpm": 6000})
+    rate_limiter.reset()
+    yield
+    rate_limiter.reset()
+
+def test_estimate_tokens():
+    assert estimate_tokens("a" * 400, 100) == 201
+
+def test_bucket_waits_when_exhausted_and_refunds():
+    bucket = TokenBucket(60)  # 1 per second
+    now = time.monotonic()
+    assert bucket.reserve(60, now) == 0
+    assert bucket.reserve(2, now) == pytest.approx(2.0)
+    bucket.adjust(-2, now)  # refund after the provider reported less usage
+    assert bucket.available == pytest.approx(0.0)
+
+@pytest.mark.asyncio
+async def test_requests_share_model_budget(budgets):
+    reservation = await rate_limiter.acquire("aws_bedrock", "us-west-2", "test-model", 5000)
+    reservation.settle(1000)
+    snapshot = next(s for s in rate_limiter.snapshots() if s["scope"][0] == "model")
+    assert snapshot["total_requests"] == 1
+    assert snapshot["total_tokens"] == 1000
+    assert snapshot["tokens_available"] == pytest.approx(5000, abs=5)
+
+    # ~5000 tokens left after the refund; a 5050 token call waits for refill (100 tokens/s)
+    start = time.monotonic()
+    await rate_limiter.acquire("aws_bedrock", "us-east-1", "test-model", 5050)
+    assert time.monotonic() - start >= 0.4
+
+@pytest.mark.asyncio
+async def test_unconfigured_model_is_not_limited(budgets):
+    await rate_limiter.acquire("openai", "default", "other-model", 10**9)
+    assert all(s["scope"][2] != "other-model" for s in rate_limiter.snapshots())
+
+@pytest.mark.asyncio
+async def test_failed_call_refunds_its_reservation(budgets):
+    with pytest.raises(RuntimeError):
+        with await rate_limiter.acquire("CAII", "https://replica-2", "test-model", 5000):
+            raise RuntimeError("throttled")
+    snapshot = next(s for s in rate_limiter.snapshots() if s["scope"][0] == "model")
+    assert snapshot["total_tokens"] == 0
+    assert snapshot["tokens_available"] == pytest.approx(6000, abs=5)
+
+    # Without reported usage the estimate stands
+    with await rate_limiter.acquire("CAII", "https://replica-2", "test-model", 1000) as reservation:
+        pass
+    reservation.settle(10)
+    assert next(s for s in rate_limiter.snapshots() if s["scope"][0] == "model")["total_tokens"] == 1000
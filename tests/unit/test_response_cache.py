@@ -0,0 +1,51 @@
+import time
+from app.core.json_stream import ParsedRows
+from app.core.response_cache import ResponseCache
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path)
+    key = ResponseCache.make_key(model_id="m", prompt="p")
+    cache.put(key, [{"question": "q", "solution": "s"}])
+
+    fresh = ResponseCache(path)
+    assert fresh.get(key) == [{"question": "q", "solution": "s"}]
+    assert fresh.get(key) == [{"question": "q", "solution": "s"}]
+    assert fresh.stats()["disk_hits"] == 1
+    assert fresh.stats()["memory_hits"] == 1
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl_seconds=0.01)
+    cache.put("k", "value")
+    time.sleep(0.02)
+    assert cache.get("k") is None
+
+def test_memory_lru_and_disk_size_eviction(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), memory_entries=2, max_disk_bytes=1000)
+    cache.EVICTION_CHECK_EVERY = 1
+    for i in range(20):
+        cache.put(f"k{i}", "x" * 100)
+    assert cache.stats()["memory_entries"] == 2
+    with cache._db() as conn:
+        total = conn.execute("SELECT SUM(size) FROM response_cache").fetchone()[0]
+    assert total <= 1000
+    assert cache.get("k19") == "x" * 100
+    assert cache.get("k0") is None
+
+def test_callers_get_their_own_copy(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    cache.put("k", [{"question": "q", "solution": "s"}])
+    first = cache.get("k")
+    first[0]["question"] = "changed by one job"
+    first.append({"question": "extra"})
+    assert cache.get("k") == [{"question": "q", "solution": "s"}]
+    assert cache.stats()["memory_hits"] == 2
+
+def test_parsed_rows_keep_their_dropped_count(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path)
+    cache.put("k", ParsedRows([{"question": "q"}], salvaged=1, dropped=2))
+    # Memory tier, then disk tier of a new process
+    for rows in (cache.get("k"), ResponseCache(path).get("k")):
+        assert isinstance(rows, ParsedRows) and rows == [{"question": "q"}]
+        assert (rows.salvaged, rows.dropped) == (1, 2)
@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+import pytest
+from app.core.checkpoint import JobCheckpoint
+from app.core.row_writer import BatchRowSink, JsonlRowWriter, iter_jsonl
+
+def test_finalize_matches_legacy_json_dump(tmp_path):
+    rows = [{"Seeds": "t1", "question": "q?", "nested": {"a": [1, 2]}}, {"Seeds": "t2", "question": "é"}]
+    path = str(tmp_path / "out.json")
+    writer = JsonlRowWriter(path)
+    writer.write_rows(rows[:1])
+    writer.write_rows(rows[1:])
+    assert os.path.exists(writer.jsonl_path)
+
+    assert writer.finalize(legacy_json=True) == path
+    with open(path) as f:
+        content = f.read()
+    assert content == json.dumps(rows, indent=2)
+    assert not os.path.exists(writer.jsonl_path)
+
+def test_progress_callback_and_transform(tmp_path):
+    seen = []
+    writer = JsonlRowWriter(
+        str(tmp_path / "out.json"),
+        row_transform=lambda item: {"Seeds": item["Topic"], "q": item["q"]},
+        on_progress=seen.append,
+        config={"progress_every_rows": 2},
+    )
+    for i in range(5):
+        writer.write_rows([{"Topic": "t", "q": i}])
+    assert seen == [2, 4]
+    assert writer.finalize(legacy_json=False) == writer.jsonl_path
+    assert [row["q"] for row in iter_jsonl(writer.jsonl_path)] == [0, 1, 2, 3, 4]
+
+def test_append_resumes_after_torn_line(tmp_path):
+    path = str(tmp_path / "out.json")
+    with open(tmp_path / "out.jsonl", "w") as f:
+        f.write('{"q": 1}\n{"q": 2')  # crash mid-row
+    writer = JsonlRowWriter(path, append=True)
+    assert writer.rows_written == 1
+    writer.write_rows([{"q": 3}])
+    writer.finalize(legacy_json=True)
+    with open(path) as f:
+        assert json.load(f) == [{"q": 1}, {"q": 3}]
+
+@pytest.mark.asyncio
+async def test_batch_sink_writes_and_checkpoints_off_the_event_loop(tmp_path):
+    loop_thread = threading.current_thread()
+    progress_threads = []
+    writer = JsonlRowWriter(
+        str(tmp_path / "out.json"),
+        on_progress=lambda n: progress_threads.append(threading.current_thread()),
+        config={"progress_every_rows": 1},
+    )
+    checkpoint = JobCheckpoint.create("job", "freeform", writer.path, {}, directory=str(tmp_path / "checkpoints"))
+    sink = BatchRowSink("t", [], writer, checkpoint)
+
+    sink.emit([{"Topic": "t", "q": 1}], ["q 1"])
+    sink.emit([{"Topic": "t", "q": 2}], ["q 1", "q 2"])
+    await sink.flush()
+
+    assert writer.rows_written == 2 and sink.topic_output == []
+    assert progress_threads and loop_thread not in progress_threads
+    assert checkpoint.topic_state("t")["rows"] == 2
+
+@pytest.mark.asyncio
+async def test_batch_sink_keeps_rows_in_memory_without_a_writer():
+    output = []
+    sink = BatchRowSink("t", output)
+    sink.emit([{"q": 1}])
+    await sink.flush()
+    assert output == [{"q": 1}]
@@ -0,0 +1,103 @@
+import json
+import uuid
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from app.core.model_handlers import UnifiedModelHandler
+from app.services.synthesis_service import SynthesisService
+from app.models.request_models import SynthesisRequest
+from tests.mocks.mock_db import MockDatabaseManager
+
+MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+
+class FakeEventStream:
+    """Async ``converse_stream`` event stream that records how far it was read"""
+
+    def __init__(self, text, chunk_chars=7):
+        self.events = [{"messageStart": {"role": "assistant"}}]
+        self.events += [
+            {"contentBlockDelta": {"delta": {"text": text[i:i + chunk_chars]}}}
+            for i in range(0, len(text), chunk_chars)
+        ]
+        self.events += [{"messageStop": {}}, {"metadata": {"usage": {"totalTokens": 42}}}]
+        self.read = 0
+        self.closed = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.read == len(self.events):
+            raise StopAsyncIteration
+        self.read += 1
+        return self.events[self.read - 1]
+
+    def close(self):
+        self.closed = True
+
+def make_handler(stream=None, error=None):
+    async_client = Mock()
+    async_client.converse_stream = AsyncMock(return_value={"stream": stream}, side_effect=error)
+    async_client.converse = AsyncMock(return_value={
+        "output": {"message": {"content": [{"text": '[{"question": "q?", "solution": "s!"}]'}]}}
+    })
+    handler = UnifiedModelHandler(MODEL_ID, bedrock_client=Mock())
+    handler._async_bedrock_client = async_client
+    return handler
+
+@pytest.mark.asyncio
+async def test_astream_rows_closes_stream_once_caller_has_enough():
+    rows = [{"question": f"q{i}?", "solution": f"s{i}"} for i in range(4)]
+    stream = FakeEventStream(json.dumps(rows))
+    handler = make_handler(stream)
+    seen = []
+
+    def on_row(row):
+        seen.append(row)
+        return len(seen) < 2
+
+    parsed = await handler.astream_rows("Create 4", on_row)
+    assert seen == rows[:2]
+    assert list(parsed) == rows[:2]
+    assert stream.closed and stream.read < len(stream.events)
+
+@pytest.mark.asyncio
+async def test_astream_rows_falls_back_to_regular_request_when_stream_fails():
+    handler = make_handler(error=RuntimeError("stream refused"))
+    seen = []
+    parsed = await handler.astream_rows("Create 1", lambda row: seen.append(row) is None)
+    assert seen == parsed == [{"question": "q?", "solution": "s!"}]
+    handler._async_bedrock_client.converse.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_generate_freeform_streams_rows_and_stops_at_batch_size():
+    request = SynthesisRequest(
+        model_id=MODEL_ID,
+        use_case="custom",
+        technique="freeform",
+        topics=["a"],
+        num_questions=5,
+        stream=True,
+    )
+    answers = []
+
+    async def stream_rows(prompt, on_row, request_id=None):
+        # The model overshoots: 8 rows for a batch of 5
+        rows = []
+        for _ in range(8):
+            row = {"question": uuid.uuid4().hex, "answer": uuid.uuid4().hex}
+            rows.append(row)
+            answers.append(on_row(row))
+            if not answers[-1]:
+                break
+        return rows
+
+    service = SynthesisService()
+    service.db = MockDatabaseManager()
+    handler = AsyncMock()
+    handler.astream_rows.side_effect = stream_rows
+    with patch("app.services.synthesis_service.create_handler", return_value=handler):
+        result = await service.generate_freeform(request, is_demo=True)
+
+    assert len(result["results"]["a"]) == 5
+    assert answers == [True, True, True, True, False]
+    handler.agenerate_response.assert_not_awaited()
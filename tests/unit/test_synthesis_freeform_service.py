@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
 import json
 from app.services.synthesis_service import SynthesisService
 from app.models.request_models import SynthesisRequest
@@ -33,7 +33,7 @@ async def test_generate_freeform_with_topics(synthesis_freeform_service):
         technique="freeform"
     )
     with patch('app.services.synthesis_service.create_handler') as mock_handler:
-        mock_handler.return_value.generate_response.return_value = [{"field1": "value1", "field2": "value2"}]
+        mock_handler.return_value.agenerate_response = AsyncMock(return_value=[{"field1": "value1", "field2": "value2"}])
         result = await synthesis_freeform_service.generate_freeform(request)
         assert result["status"] == "completed"
         assert len(synthesis_freeform_service.db.generation_metadata) == 1
@@ -51,7 +51,7 @@ async def test_generate_freeform_with_custom_examples(synthesis_freeform_service
         example_custom=[{"example_field": "example_value"}]
     )
     with patch('app.services.synthesis_service.create_handler') as mock_handler:
-        mock_handler.return_value.generate_response.return_value = [{"generated_field": "generated_value"}]
+        mock_handler.return_value.agenerate_response = AsyncMock(return_value=[{"generated_field": "generated_value"}])
         result = await synthesis_freeform_service.generate_freeform(request)
         assert result["status"] == "completed"
         assert "export_path" in result
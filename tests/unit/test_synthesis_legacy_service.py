@@ -1,5 +1,5 @@
 import pytest
-from unittest.mock import patch, Mock
+from unittest.mock import patch, Mock, AsyncMock
 import json
 from app.services.synthesis_legacy_service import SynthesisLegacyService
 from app.models.request_models import SynthesisRequest
@@ -32,7 +32,7 @@ async def test_generate_examples_with_topics(synthesis_service):
         use_case="custom"
     )
     with patch('app.services.synthesis_legacy_service.create_handler') as mock_handler:
-        mock_handler.return_value.generate_response.return_value = [{"question": "test?", "solution": "test!"}]
+        mock_handler.return_value.agenerate_response = AsyncMock(return_value=[{"question": "test?", "solution": "test!"}])
         result = await synthesis_service.generate_examples(request)
         assert result["status"] == "completed"
         assert len(synthesis_service.db.generation_metadata) == 1
@@ -50,7 +50,7 @@ async def test_generate_examples_with_doc_paths(synthesis_service, mock_file):
     with patch('app.services.synthesis_legacy_service.create_handler') as mock_handler, \
          patch('app.services.synthesis_legacy_service.DocumentProcessor') as mock_processor:
         mock_processor.return_value.process_document.return_value = ["chunk1"]
-        mock_handler.return_value.generate_response.return_value = [{"question": "test?", "solution": "test!"}]
+        mock_handler.return_value.agenerate_response = AsyncMock(return_value=[{"question": "test?", "solution": "test!"}])
         result = await synthesis_service.generate_examples(request)
         assert result["status"] == "completed"
         assert len(synthesis_service.db.generation_metadata) == 1
@@ -0,0 +1,78 @@
+import asyncio
+import uuid
+import pytest
+from unittest.mock import AsyncMock, patch
+from app.services.work_scheduler import TopicWork, plan_work_items, run_work_items
+from app.services.synthesis_service import SynthesisService
+from app.models.request_models import SynthesisRequest
+from tests.mocks.mock_db import MockDatabaseManager
+
+def test_plan_interleaves_topics_round_robin():
+    states = [TopicWork("big", 12), TopicWork("small", 3)]
+    items = plan_work_items(states, 5)
+    assert [(i.state.topic, i.size) for i in items] == [("big", 5), ("small", 3), ("big", 5), ("big", 2)]
+    assert [s.batches_total for s in states] == [3, 1]
+
+@pytest.mark.asyncio
+async def test_single_large_topic_uses_all_workers():
+    state = TopicWork("big", 40)
+    running = 0
+    peak = 0
+    done = []
+
+    async def process(item):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        item.state.generated += item.size
+        running -= 1
+
+    await run_work_items(plan_work_items([state], 5), process, 4, on_topic_done=done.append)
+    assert peak == 4
+    assert state.generated == 40 and state.batches_done == 8
+    assert done == [state]
+
+@pytest.mark.asyncio
+async def test_async_topic_done_callback_is_awaited():
+    states = [TopicWork("a", 4), TopicWork("b", 2)]
+    done = []
+
+    async def process(item):
+        item.state.generated += item.size
+
+    async def on_topic_done(state):
+        await asyncio.sleep(0.01)
+        done.append(state.topic)
+
+    await run_work_items(plan_work_items(states, 2), process, 2, on_topic_done=on_topic_done)
+    assert sorted(done) == ["a", "b"]
+
+@pytest.mark.asyncio
+async def test_generate_freeform_fills_topics_through_shared_queue():
+    request = SynthesisRequest(
+        model_id="us.anthropic.claude-3-5-haiku-20241022-v1:0",
+        use_case="custom",
+        technique="freeform",
+        topics=["a", "b"],
+        num_questions=10,
+        max_concurrent_topics=4,
+    )
+    calls = 0
+
+    async def respond(prompt, request_id=None):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0)
+        return [{"question": uuid.uuid4().hex, "answer": uuid.uuid4().hex} for _ in range(5)]
+
+    service = SynthesisService()
+    service.db = MockDatabaseManager()
+    handler = AsyncMock()
+    handler.agenerate_response.side_effect = respond
+    with patch("app.services.synthesis_service.create_handler", return_value=handler):
+        result = await service.generate_freeform(request, is_demo=True)
+
+    assert {topic: len(rows) for topic, rows in result["results"].items()} == {"a": 10, "b": 10}
+    # Two full batches per topic, no fallback requests
+    assert calls == 4